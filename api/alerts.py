@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+בדיקת התראות ושליחתן ל-webhooks
+Alert checks shared by the alerts webhook and the ``alerts_worker`` command,
+and the worker that pushes alerts to outbound webhook URLs.
+"""
+
+import hashlib
+import hmac
+import json
+import urllib.request
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.analytics import ActivitySnapshot, BabyAnalytics
+from core.models import AlertOutbox, AlertSnooze, Child, MedicationSlot
+
+from .llm_messages import get_message_generator
+
+DEFAULT_THRESHOLDS = {
+    "feeding": 15,
+    # None: dynamic, from the age and time-of-day wake window.
+    "sleep": None,
+    "diaper": 180,
+    "medication": 0,
+}
+
+
+def in_quiet_hours(hour: int, start: int, end: int) -> bool:
+    """Whether ``hour`` falls in the quiet period from ``start`` to ``end``."""
+    if start > end:
+        return hour >= start or hour < end
+    return start <= hour < end
+
+
+def evaluate_alerts(
+    analytics: BabyAnalytics, thresholds: Optional[Dict] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    בודק אילו התראות פעילות עבור הילד
+    Checks which alerts are active for the analytics' child.
+
+    Only the figures the checks need are computed (no seven day stats), from
+    the analytics' snapshot. Each alert is a dict with the snooze ``key``,
+    ``type``, ``severity``, ``title``, the ``details`` for the message
+    generator and the ``data`` fields added to the alert as returned.
+
+    :returns: the alerts, and the thresholds used (the dynamic sleep threshold
+        resolved, when there was one).
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    if analytics.snapshot is None:
+        analytics.snapshot = ActivitySnapshot(analytics.child)
+    child = analytics.child
+    alerts = []
+
+    # Feeding (skipped while the baby is being fed)
+    feeding_display = analytics.get_feeding_display_status()
+    if feeding_display.get("mode") != "feeding":
+        next_feeding = analytics.predict_next_feeding()
+        if next_feeding:
+            minutes_until = next_feeding.get("minutes_until_next", 0)
+            if minutes_until < -thresholds["feeding"]:
+                data = {
+                    "minutes_overdue": abs(minutes_until),
+                    "threshold_used": thresholds["feeding"],
+                }
+                alerts.append(
+                    {
+                        "key": "feeding",
+                        "type": "feeding_overdue",
+                        "severity": "high",
+                        "title": f"{child.first_name} רעבה!",
+                        "details": data,
+                        "data": data,
+                    }
+                )
+
+    # Sleep (skipped while the baby is sleeping)
+    sleep_display = analytics.get_sleep_display_status()
+    if sleep_display.get("mode") != "sleeping":
+        next_sleep = analytics.predict_next_sleep()
+        if next_sleep:
+            minutes_awake = next_sleep.get("minutes_awake", 0)
+            if thresholds["sleep"] is not None:
+                # Override מפורש - סף קבוע
+                should_alert = minutes_awake > thresholds["sleep"]
+                is_very_tired = should_alert
+            else:
+                # ברירת מחדל דינמית: "עייפה" כשעברנו את קצה חלון הערות,
+                # "עייפה מאוד" רק 15+ דקות אחריו.
+                alert_level = next_sleep.get("alert_level")
+                should_alert = alert_level in ("tired", "very_tired")
+                is_very_tired = alert_level == "very_tired"
+                thresholds["sleep"] = next_sleep.get("wake_window", {}).get(
+                    "max_minutes"
+                )
+            if should_alert:
+                data = {
+                    "minutes_awake": minutes_awake,
+                    "threshold_used": thresholds["sleep"],
+                }
+                alerts.append(
+                    {
+                        "key": "sleep",
+                        "type": "overtired",
+                        "severity": "high" if is_very_tired else "medium",
+                        "title": (
+                            f"{child.first_name} עייפה מאוד!"
+                            if is_very_tired
+                            else f"{child.first_name} עייפה - הגיע זמן שינה"
+                        ),
+                        "details": {**data, "is_very_tired": is_very_tired},
+                        "data": data,
+                    }
+                )
+
+    # Diaper
+    last_diaper = analytics.get_last_diaper_info()
+    if last_diaper and last_diaper.get("time_since_minutes", 0) > thresholds["diaper"]:
+        data = {
+            "hours_since": last_diaper["time_since_hours"],
+            "threshold_used": thresholds["diaper"],
+        }
+        alerts.append(
+            {
+                "key": "diaper",
+                "type": "diaper_overdue",
+                "severity": "medium",
+                "title": "זמן לחיתול",
+                "details": data,
+                "data": data,
+            }
+        )
+
+    # Medications: a broken schedule must not hide the other alerts.
+    try:
+        alert = _medication_alert(child, thresholds["medication"])
+    except Exception:
+        alert = None
+    if alert:
+        alerts.append(alert)
+
+    return alerts, thresholds
+
+
+def _medication_alert(child, threshold: int) -> Optional[Dict]:
+    """The alert for the child's next medication dose, if it is due."""
+    now = timezone.now()
+    scheduled = [
+        entry
+        for entry in MedicationSlot.status(MedicationSlot.for_day(child.id), now)
+        if entry["due"] and entry["next_dose_time"]
+    ]
+    if not scheduled:
+        return None
+    entry = min(scheduled, key=lambda entry: entry["next_dose_time"])
+    next_med, next_time = entry["medication"], entry["next_dose_time"]
+
+    minutes_until = int((next_time - now).total_seconds() / 60)
+    if minutes_until > threshold:
+        return None
+    data = {
+        "medication": {
+            "id": next_med.id,
+            "name": next_med.name,
+            "dosage": next_med.dosage,
+            "type": next_med.medication_type,
+        },
+        "next_dose_time": next_time.isoformat(),
+        "minutes_until": minutes_until,
+        "threshold_used": threshold,
+    }
+    return {
+        "key": f"medication_{next_med.id}",
+        "type": "medication_due",
+        "severity": "high" if minutes_until < 0 else "medium",
+        "title": "זמן לתרופה",
+        "details": data,
+        "data": data,
+    }
+
+
+def render_alerts(child, alerts: List[Dict], use_llm: bool = True) -> List[Dict]:
+    """
+    Returns ``alerts`` as sent to clients: their type, severity, title, the
+    generated message and their data fields. The messages are generated
+    together, within the message generator's latency budget.
+    """
+    messages = get_message_generator().generate_alert_messages(
+        child.first_name,
+        [(alert["type"], alert["details"]) for alert in alerts],
+        use_llm=use_llm,
+    )
+    return [
+        {
+            "type": alert["type"],
+            "severity": alert["severity"],
+            "title": alert["title"],
+            "message": message,
+            **alert["data"],
+        }
+        for alert, message in zip(alerts, messages)
+    ]
+
+
+def post_alert(url: str, payload: Dict, timeout: float = 10) -> None:
+    """
+    Posts ``payload`` as JSON to ``url``. When ``ALERT_WEBHOOK_SECRET`` is set
+    the body is signed with HMAC-SHA256 in the ``X-Baby-Buddy-Signature``
+    header. Raises on network errors and non-2xx responses.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    secret = getattr(settings, "ALERT_WEBHOOK_SECRET", "")
+    if secret:
+        signature = hmac.new(secret.encode("utf-8"), body, hashlib.sha256)
+        headers["X-Baby-Buddy-Signature"] = f"sha256={signature.hexdigest()}"
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        if not 200 <= response.status < 300:
+            raise OSError(f"HTTP {response.status}")
+
+
+class AlertWorker:
+    """
+    מעריך התראות לכל הילדים ודוחף אותן ל-webhooks
+    Evaluates the alerts of all children on each tick and pushes new ones to
+    webhook URLs.
+
+    A child's snapshot is kept between ticks while the child's data generation
+    is unchanged, so a tick only reloads the children with new entries (all of
+    them together, see ``ActivitySnapshot.for_children``). Snoozes are kept in
+    ``AlertSnooze`` rows, and each new alert is added to ``AlertOutbox`` once
+    per URL in the same transaction that snoozes it; ``deliver`` then posts
+    the due rows and retries failures with backoff.
+    """
+
+    # Rows are reloaded at least this often so the snapshot window moves on.
+    SNAPSHOT_MAX_AGE = timedelta(hours=1)
+    DELIVERY_BATCH = 100
+    # Added to the time a claimed batch may take to deliver.
+    LEASE_MARGIN = timedelta(minutes=1)
+
+    def __init__(
+        self,
+        urls: List[str],
+        thresholds: Optional[Dict] = None,
+        snooze_minutes: int = 30,
+        quiet_hours: Optional[Tuple[int, int]] = (22, 7),
+        use_llm: bool = True,
+        timeout: float = 10,
+    ):
+        """
+        :param urls: webhook URLs every alert is pushed to
+        :param thresholds: overrides of ``DEFAULT_THRESHOLDS``
+        :param snooze_minutes: minutes before the same alert is pushed again
+        :param quiet_hours: (start, end) hours without new alerts, or None
+        :param use_llm: whether messages are generated with the LLM
+        :param timeout: seconds to wait for each webhook request
+        """
+        self.urls = list(urls)
+        self.thresholds = thresholds or {}
+        self.snooze = timedelta(minutes=snooze_minutes)
+        self.quiet_hours = quiet_hours
+        self.use_llm = use_llm
+        self.timeout = timeout
+        # child id -> (generation, snapshot)
+        self._snapshots = {}
+
+    def tick(self) -> Dict:
+        """Queues new alerts, then delivers due ones."""
+        queued = self.evaluate()
+        sent, failed = self.deliver()
+        return {"queued": queued, "sent": sent, "failed": failed}
+
+    def analytics(self, children) -> List[BabyAnalytics]:
+        """
+        Returns analytics for ``children``, reusing the snapshots of children
+        whose data has not changed since the last tick.
+        """
+        now = timezone.now()
+        generations = {child.id: child.generation() for child in children}
+        stale = []
+        for child in children:
+            kept = self._snapshots.get(child.id)
+            if (
+                kept is None
+                or kept[0] != generations[child.id]
+                or now - kept[1].now > self.SNAPSHOT_MAX_AGE
+            ):
+                stale.append(child)
+        for snapshot in ActivitySnapshot.for_children(stale, now=now):
+            self._snapshots[snapshot.child.id] = (
+                generations[snapshot.child.id],
+                snapshot,
+            )
+        for child_id in set(self._snapshots) - set(generations):
+            del self._snapshots[child_id]
+        return [
+            BabyAnalytics(child, snapshot=self._snapshots[child.id][1])
+            for child in children
+        ]
+
+    def evaluate(self) -> int:
+        """
+        Checks every child and queues the alerts that are not snoozed.
+        Returns the number of queued outbox rows.
+        """
+        if self.quiet_hours and in_quiet_hours(
+            timezone.localtime().hour, *self.quiet_hours
+        ):
+            return 0
+
+        now = timezone.now()
+        children = list(Child.objects.all())
+        snoozed = set(
+            AlertSnooze.objects.filter(until__gt=now).values_list("child_id", "key")
+        )
+        queued = 0
+        for analytics in self.analytics(children):
+            child = analytics.child
+            alerts, _ = evaluate_alerts(analytics, self.thresholds)
+            alerts = [
+                alert for alert in alerts if (child.id, alert["key"]) not in snoozed
+            ]
+            rendered = render_alerts(child, alerts, self.use_llm)
+            for alert, message in zip(alerts, rendered):
+                payload = {
+                    "child": {
+                        "id": child.id,
+                        "name": child.name(),
+                        "slug": child.slug,
+                    },
+                    "alert": message,
+                    "timestamp": now.isoformat(),
+                }
+                with transaction.atomic():
+                    AlertSnooze.objects.update_or_create(
+                        child=child,
+                        key=alert["key"],
+                        defaults={"until": now + self.snooze},
+                    )
+                    AlertOutbox.objects.bulk_create(
+                        [
+                            AlertOutbox(child=child, url=url, payload=payload)
+                            for url in self.urls
+                        ]
+                    )
+                queued += len(self.urls)
+        return queued
+
+    def claim(self) -> List[AlertOutbox]:
+        """
+        Takes the due outbox rows. Their next attempt is pushed past the time
+        delivering all of them one after another may take, so another worker
+        skips them and a worker that dies while delivering leaves them to be
+        retried.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                AlertOutbox.objects.select_for_update(skip_locked=True).filter(
+                    status=AlertOutbox.PENDING, next_attempt__lte=now
+                )[: self.DELIVERY_BATCH]
+            )
+            lease = timedelta(seconds=self.timeout * len(rows)) + self.LEASE_MARGIN
+            AlertOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt=now + lease
+            )
+        return rows
+
+    def deliver(self) -> Tuple[int, int]:
+        """
+        Posts the due outbox rows. Returns the number of rows sent and of
+        failed attempts.
+        """
+        sent = failed = 0
+        for row in self.claim():
+            try:
+                post_alert(row.url, row.payload, timeout=self.timeout)
+            except Exception as error:
+                row.record_attempt(error)
+                failed += 1
+            else:
+                row.record_attempt()
+                sent += 1
+        return sent, failed
@@ -3,10 +3,16 @@
 API Views לאנליטיקה וסטטיסטיקות
 Analytics and statistics API views
 """
+import hashlib
+import time
 from datetime import datetime, timedelta
 
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.utils.translation import get_language
 
 from rest_framework import views, status
 from rest_framework.decorators import action
@@ -17,7 +23,73 @@ from core import models
 from core.analytics import BabyAnalytics
 
 
-class ChildAnalyticsView(views.APIView):
+class CachedChildAnalyticsMixin:
+    """
+    מטמון לתשובות אנליטיקה של ילד
+    Caches a child's analytics responses until the child's data changes.
+
+    Responses are cached under (view, child, data generation, minute, language,
+    time zone, query parameters): saving or deleting any of the child's entries starts a new
+    generation (see ``Child.generation``), and the minute bucket keeps
+    "time since" values fresh. The language and time zone activated for the
+    user are part of the key, as responses hold translated text and local
+    times. The same key doubles as the ETag, so a poller
+    sending it back in If-None-Match gets a 304 without any work.
+
+    Views implement ``get_response(request, child)`` instead of ``get``.
+    """
+
+    cache_timeout = 120
+
+    def get(self, request, child_slug):
+        child = get_object_or_404(models.Child, slug=child_slug)
+        key = self.get_cache_key(request, child)
+        etag = '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+
+        if self.etag_matches(etag, request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cached = cache.get(key)
+            if cached is None:
+                response = self.get_response(request, child)
+                cached = (response.data, response.status_code)
+                cache.set(key, cached, self.cache_timeout)
+            response = Response(*cached)
+
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def etag_matches(etag, if_none_match):
+        """
+        Whether an If-None-Match header lists ``etag``, compared weakly (a
+        ``W/`` prefix is ignored) as RFC 9110 requires; ``*`` matches any.
+        """
+        etags = parse_etags(if_none_match)
+        if etags == ["*"]:
+            return True
+        return etag in (tag.removeprefix("W/") for tag in etags)
+
+    def get_cache_key(self, request, child):
+        params = "&".join(
+            f"{name}={value}" for name, value in sorted(request.query_params.items())
+        )
+        return "api.analytics.{}.{}.{}.{}.{}.{}.{}".format(
+            self.__class__.__name__,
+            child.pk,
+            child.generation(),
+            int(time.time() // 60),
+            get_language(),
+            timezone.get_current_timezone_name(),
+            params,
+        )
+
+    def get_response(self, request, child):
+        raise NotImplementedError
+
+
+class ChildAnalyticsView(CachedChildAnalyticsMixin, views.APIView):
     """
     API endpoint לקבלת סטטיסטיקות על ילד ספציפי
     API endpoint for child-specific analytics
@@ -26,9 +98,8 @@ class ChildAnalyticsView(views.APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, child_slug):
+    def get_response(self, request, child):
         """מחזיר סטטיסטיקות כלליות על הילד"""
-        child = get_object_or_404(models.Child, slug=child_slug)
         analytics = BabyAnalytics(child)
 
         days = int(request.query_params.get('days', 7))
@@ -47,7 +118,7 @@ class ChildAnalyticsView(views.APIView):
         return Response(data)
 
 
-class ChildCurrentStatusView(views.APIView):
+class ChildCurrentStatusView(CachedChildAnalyticsMixin, views.APIView):
     """
     מצב נוכחי של הילד - מה קרה לאחרונה ומה צפוי
     Current status - what happened recently and what's expected
@@ -56,9 +127,8 @@ class ChildCurrentStatusView(views.APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, child_slug):
+    def get_response(self, request, child):
         """מחזיר מצב נוכחי מפורט"""
-        child = get_object_or_404(models.Child, slug=child_slug)
         analytics = BabyAnalytics(child)
 
         status_data = analytics.get_current_status()
@@ -125,7 +195,7 @@ class ChildCurrentStatusView(views.APIView):
         }
 
 
-class ChildDailySummaryView(views.APIView):
+class ChildDailySummaryView(CachedChildAnalyticsMixin, views.APIView):
     """
     סיכום יומי של פעילויות הילד
     Daily summary of child activities
@@ -135,9 +205,8 @@ class ChildDailySummaryView(views.APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, child_slug):
+    def get_response(self, request, child):
         """מחזיר סיכום יומי"""
-        child = get_object_or_404(models.Child, slug=child_slug)
         analytics = BabyAnalytics(child)
 
         # פרסור תאריך
@@ -166,7 +235,7 @@ class ChildDailySummaryView(views.APIView):
         return Response(response_data)
 
 
-class ChildFeedingPredictionView(views.APIView):
+class ChildFeedingPredictionView(CachedChildAnalyticsMixin, views.APIView):
     """
     חיזוי האכלה הבאה
     Next feeding prediction
@@ -175,9 +244,8 @@ class ChildFeedingPredictionView(views.APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, child_slug):
+    def get_response(self, request, child):
         """מחזיר חיזוי להאכלה הבאה"""
-        child = get_object_or_404(models.Child, slug=child_slug)
         analytics = BabyAnalytics(child)
 
         prediction = analytics.predict_next_feeding()
@@ -205,7 +273,7 @@ class ChildFeedingPredictionView(views.APIView):
         return Response(response_data)
 
 
-class ChildSleepPredictionView(views.APIView):
+class ChildSleepPredictionView(CachedChildAnalyticsMixin, views.APIView):
     """
     חיזוי שינה הבאה
     Next sleep prediction
@@ -214,9 +282,8 @@ class ChildSleepPredictionView(views.APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, child_slug):
+    def get_response(self, request, child):
         """מחזיר חיזוי לשינה הבאה"""
-        child = get_object_or_404(models.Child, slug=child_slug)
         analytics = BabyAnalytics(child)
 
         prediction = analytics.predict_next_sleep()
@@ -255,9 +322,8 @@ class AllChildrenStatusView(views.APIView):
         children = models.Child.objects.all()
 
         children_data = []
-        for child in children:
-            analytics = BabyAnalytics(child)
-
+        for analytics in BabyAnalytics.for_children(children):
+            child = analytics.child
             last_feeding = analytics.get_last_feeding_info()
             last_sleep = analytics.get_last_sleep_info()
             next_feeding = analytics.predict_next_feeding()
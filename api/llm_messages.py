@@ -4,9 +4,58 @@ LLM Message Generation Service
 Generates cute, varied messages for baby alerts using Claude
 """
 import os
-from typing import Optional
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
 from anthropic import Anthropic
 
+from babybuddy import instrumentation
+
+MODEL = "claude-3-5-haiku-20241022"
+
+WHATSAPP_FORMAT_INSTRUCTIONS = """
+עצב את ההודעה בפורמט WhatsApp markdown:
+- השתמש ב-*טקסט מודגש* להדגשה (מילות מפתח חשובות)
+- השתמש ב-_טקסט נטוי_ לדברים משניים או חמודים
+- השתמש באימוג'ים רלוונטיים בתחילת משפטים או במקומות מתאימים
+- הפרד בין חלקים עם שורה ריקה אם צריך
+
+דוגמה לעיצוב טוב:
+🍼 *נעמי רעבה מאוד!*
+עברו כבר _45 דקות_ מאז האכלה אחרונה 😋
+
+הודעה צריכה להיות קצרה (2-3 שורות מקסימום), חמודה, ומעוצבת יפה."""
+
+# What each pooled message template is about, per (alert type, severity
+# bucket), and the placeholders it must contain.
+TEMPLATE_TOPICS = {
+    ('feeding_overdue', 'short'): 'ש-{name} רעבה, באיחור של {minutes} דקות מהאכלה',
+    ('feeding_overdue', 'long'): 'ש-{name} רעבה מאוד, באיחור גדול של {minutes} דקות מהאכלה',
+    ('overtired', 'tired'): 'ש-{name} עייפה והגיע זמן שינה (בלי לחץ ובלי דרמה), ערה כבר {minutes} דקות',
+    ('overtired', 'very_tired'): 'ש-{name} עייפה מאוד וכדאי להרדים עכשיו, ערה כבר {minutes} דקות',
+    ('diaper_overdue', 'short'): 'שזמן להחליף חיתול ל-{name}, עברו {time} מחיתול אחרון',
+    ('diaper_overdue', 'long'): 'שממש דחוף להחליף חיתול ל-{name}, עברו כבר {time} מחיתול אחרון',
+    ('medication_due', 'upcoming'): 'לתת ל-{name} את התרופה {medication} {dosage} בעוד {minutes} דקות',
+    ('medication_due', 'overdue'): 'לתת ל-{name} את התרופה {medication} {dosage}, באיחור של {minutes} דקות',
+}
+
+# The details field a template's {minutes} stands for.
+TEMPLATE_MINUTES = {
+    'feeding_overdue': 'minutes_overdue',
+    'overtired': 'minutes_awake',
+    'medication_due': 'minutes_until',
+}
+
+TEMPLATE_PLACEHOLDERS = {
+    'feeding_overdue': ('{name}', '{minutes}'),
+    'overtired': ('{name}', '{minutes}'),
+    'diaper_overdue': ('{time}',),
+    'medication_due': ('{medication}', '{minutes}'),
+}
+
 
 def format_time_since(hours: float) -> str:
     """
@@ -77,22 +126,154 @@ def format_time_since(hours: float) -> str:
         return f"{hour_text} ו-{m} דקות"
 
 
-class CuteMessageGenerator:
-    """Generate cute, personalized alert messages using Claude"""
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a while.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    ``allow`` refuses calls for ``reset_seconds``. Then a single trial call is
+    allowed: its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class MessagePool:
+    """Thread-safe queues of message templates, one per key"""
 
     def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def take(self, key) -> Optional[str]:
+        with self._lock:
+            templates = self._templates.get(key)
+            return templates.popleft() if templates else None
+
+    def add(self, key, templates: List[str]):
+        with self._lock:
+            self._templates.setdefault(key, deque()).extend(templates)
+
+    def size(self, key) -> int:
+        with self._lock:
+            return len(self._templates.get(key, ()))
+
+
+class CuteMessageGenerator:
+    """
+    Generate cute, personalized alert messages using Claude
+
+    Alert messages come from a pool of templates per alert type and severity,
+    generated ahead of time and refilled in the background, and are only
+    generated on the spot when the pool is empty. Such calls run in parallel
+    and wait at most ``latency_budget`` seconds in total; a message that is
+    not ready by then is replaced by its fallback. After repeated failures
+    the circuit breaker skips the API for a while.
+    """
+
+    LATENCY_BUDGET = 4.0
+    REQUEST_TIMEOUT = 15.0
+    POOL_SIZE = 5
+
+    def __init__(
+        self,
+        client=None,
+        latency_budget: Optional[float] = None,
+        pool_size: Optional[int] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            client: Anthropic client (or a stub with the same
+                ``messages.create``); by default one is created when
+                ANTHROPIC_API_KEY is set
+            latency_budget: seconds to wait for on-the-spot alert messages
+                (default: ANTHROPIC_ALERT_BUDGET_SECONDS or LATENCY_BUDGET)
+            pool_size: templates kept per alert type and severity; 0 disables
+                the pool
+            breaker: circuit breaker for the API calls
+        """
         self.api_key = os.environ.get('ANTHROPIC_API_KEY')
-        self.client = None
-        if self.api_key:
+        self.client = client
+        if self.client is None and self.api_key:
             try:
                 self.client = Anthropic(api_key=self.api_key)
             except Exception:
                 self.client = None
+        if latency_budget is None:
+            latency_budget = float(
+                os.environ.get('ANTHROPIC_ALERT_BUDGET_SECONDS') or self.LATENCY_BUDGET
+            )
+        self.latency_budget = latency_budget
+        self.pool_size = self.POOL_SIZE if pool_size is None else pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.pool = MessagePool()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='llm-alert')
+        self._refill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='llm-pool')
+        self._refilling = set()
+        self._refill_lock = threading.Lock()
 
     def is_available(self) -> bool:
         """Check if LLM service is configured and available"""
         return self.client is not None
 
+    def _complete(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """
+        Ask Claude for a reply to ``prompt``. Returns None when the circuit
+        breaker is open or the call fails.
+        """
+        if not self.breaker.allow():
+            return None
+        try:
+            message = self.client.messages.create(
+                model=MODEL,
+                max_tokens=max_tokens,
+                temperature=1.0,  # More creative/varied
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                timeout=self.REQUEST_TIMEOUT,
+            )
+            text = message.content[0].text.strip()
+        except Exception:
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        return text
+
     def generate_daily_summary(
         self,
         child_name: str,
@@ -115,23 +296,10 @@ class CuteMessageGenerator:
         if not use_llm or not self.is_available():
             return self._get_fallback_summary(child_name, summary_data, date_str)
 
-        try:
-            prompt = self._build_summary_prompt(child_name, summary_data, date_str)
-
-            message = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=400,
-                temperature=1.0,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
-
-            return message.content[0].text.strip()
-
-        except Exception:
-            return self._get_fallback_summary(child_name, summary_data, date_str)
+        prompt = self._build_summary_prompt(child_name, summary_data, date_str)
+        with instrumentation.span('llm'):
+            summary = self._complete(prompt, max_tokens=400)
+        return summary or self._get_fallback_summary(child_name, summary_data, date_str)
 
     def generate_alert_message(
         self,
@@ -152,43 +320,135 @@ class CuteMessageGenerator:
         Returns:
             A cute, personalized message string
         """
-        if not use_llm or not self.is_available():
-            return self._get_fallback_message(child_name, alert_type, details)
+        return self.generate_alert_messages(
+            child_name, [(alert_type, details)], use_llm=use_llm
+        )[0]
 
-        try:
-            prompt = self._build_prompt(child_name, alert_type, details)
+    def generate_alert_messages(
+        self,
+        child_name: str,
+        alerts: List[Tuple[str, dict]],
+        use_llm: bool = True
+    ) -> List[str]:
+        """
+        Generate the messages of several alerts at once
 
-            message = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=150,
-                temperature=1.0,  # More creative/varied
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+        Pooled templates are used where there are some; the other messages
+        are generated in parallel, and those not ready within the latency
+        budget fall back to the template messages.
 
-            return message.content[0].text.strip()
+        Args:
+            child_name: The child's name
+            alerts: (alert_type, details) pairs, as for generate_alert_message
+            use_llm: Whether to use LLM (if False or unavailable, uses fallback)
 
-        except Exception:
-            # Fallback on any error
-            return self._get_fallback_message(child_name, alert_type, details)
+        Returns:
+            One message per alert, in the same order
+        """
+        messages = [None] * len(alerts)
+        if use_llm and self.is_available():
+            pending = {}
+            for index, (alert_type, details) in enumerate(alerts):
+                messages[index] = self._pooled_message(child_name, alert_type, details)
+                if messages[index] is None:
+                    prompt = self._build_prompt(child_name, alert_type, details)
+                    future = self._executor.submit(self._complete, prompt, 150)
+                    pending[future] = index
+            if pending:
+                # The calls run in the pool, so the request's wait is timed.
+                with instrumentation.span('llm'):
+                    done, not_done = wait(pending, timeout=self.latency_budget)
+                for future in done:
+                    messages[pending[future]] = future.result()
+                for future in not_done:
+                    future.cancel()
+
+        return [
+            message or self._get_fallback_message(child_name, alert_type, details)
+            for message, (alert_type, details) in zip(messages, alerts)
+        ]
+
+    @staticmethod
+    def _severity_bucket(alert_type: str, details: dict) -> str:
+        """The severity bucket of an alert, for the template pool"""
+        if alert_type == 'feeding_overdue':
+            return 'long' if details.get('minutes_overdue', 0) >= 60 else 'short'
+        if alert_type == 'overtired':
+            return 'very_tired' if details.get('is_very_tired', True) else 'tired'
+        if alert_type == 'diaper_overdue':
+            return 'long' if details.get('hours_since', 0) >= 5 else 'short'
+        if alert_type == 'medication_due':
+            return 'overdue' if details.get('minutes_until', 0) < 0 else 'upcoming'
+        return None
+
+    def _pooled_message(self, child_name: str, alert_type: str, details: dict) -> Optional[str]:
+        """
+        Fill a pooled template for the alert, or None when the pool has none.
+        Starts a refill of the pool when it runs low.
+        """
+        key = (alert_type, self._severity_bucket(alert_type, details))
+        if key not in TEMPLATE_TOPICS or not self.pool_size:
+            return None
+        template = self.pool.take(key)
+        if self.pool.size(key) < self.pool_size:
+            self.refill(key)
+        if template is None:
+            return None
+
+        medication = details.get('medication', {})
+        values = {
+            '{name}': child_name,
+            '{minutes}': str(abs(details.get(TEMPLATE_MINUTES.get(alert_type), 0))),
+            '{time}': format_time_since(details.get('hours_since', 0)),
+            '{medication}': str(medication.get('name', 'תרופה')),
+            '{dosage}': str(medication.get('dosage', '')),
+        }
+        for placeholder, value in values.items():
+            template = template.replace(placeholder, value)
+        return template
+
+    def refill(self, key):
+        """
+        Generate templates for ``key`` in the background, unless a refill of
+        it is already running. Returns the refill's future, or None.
+        """
+        if not self.is_available() or not self.pool_size:
+            return None
+        with self._refill_lock:
+            if key in self._refilling:
+                return None
+            self._refilling.add(key)
+        return self._refill_executor.submit(self._refill, key)
+
+    def _refill(self, key):
+        try:
+            missing = self.pool_size - self.pool.size(key)
+            if missing <= 0:
+                return
+            reply = self._complete(self._build_template_prompt(key, missing), 150 * missing)
+            if not reply:
+                return
+            required = TEMPLATE_PLACEHOLDERS[key[0]]
+            templates = [
+                variant.strip() for variant in reply.split('\n---')
+                if variant.strip()
+                and all(placeholder in variant for placeholder in required)
+            ]
+            random.shuffle(templates)
+            self.pool.add(key, templates[:missing])
+        finally:
+            with self._refill_lock:
+                self._refilling.discard(key)
+
+    def warm(self) -> list:
+        """Start filling the pool of every alert type; returns the futures"""
+        futures = [self.refill(key) for key in TEMPLATE_TOPICS]
+        return [future for future in futures if future is not None]
 
     def _build_prompt(self, child_name: str, alert_type: str, details: dict) -> str:
         """Build prompt for Claude"""
 
-        whatsapp_format_instructions = """
-עצב את ההודעה בפורמט WhatsApp markdown:
-- השתמש ב-*טקסט מודגש* להדגשה (מילות מפתח חשובות)
-- השתמש ב-_טקסט נטוי_ לדברים משניים או חמודים
-- השתמש באימוג'ים רלוונטיים בתחילת משפטים או במקומות מתאימים
-- הפרד בין חלקים עם שורה ריקה אם צריך
-
-דוגמה לעיצוב טוב:
-🍼 *נעמי רעבה מאוד!*
-עברו כבר _45 דקות_ מאז האכלה אחרונה 😋
-
-הודעה צריכה להיות קצרה (2-3 שורות מקסימום), חמודה, ומעוצבת יפה."""
+        whatsapp_format_instructions = WHATSAPP_FORMAT_INSTRUCTIONS
 
         if alert_type == 'feeding_overdue':
             minutes = details.get('minutes_overdue', 0)
@@ -246,6 +506,18 @@ class CuteMessageGenerator:
 
         return ""
 
+    def _build_template_prompt(self, key, count: int) -> str:
+        """Build prompt for ``count`` pooled templates of an alert type and severity"""
+        placeholders = ' '.join(TEMPLATE_PLACEHOLDERS[key[0]])
+        return f"""כתוב {count} גרסאות שונות להודעת התראה חמודה בעברית {TEMPLATE_TOPICS[key]}.
+השאר את הסימנים בסוגריים מסולסלים ({placeholders} וכו') בדיוק כמו שהם - הם יוחלפו בערכים האמיתיים.
+
+{WHATSAPP_FORMAT_INSTRUCTIONS}
+
+כל גרסה בסגנון אחר (חמוד, מצחיק, דרמטי קצת, עדין).
+הפרד בין הגרסאות בשורה שמכילה רק ---.
+רק את ההודעות המעוצבות, בלי הסברים."""
+
     def _build_summary_prompt(self, child_name: str, summary_data: dict, date_str: str) -> str:
         """Build prompt for daily summary"""
 
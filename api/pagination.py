@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from rest_framework import pagination
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination on the view's ordering. Pages are read from the last
+    position of the previous page instead of an offset, so they cost the same
+    however deep a client pages and rows added or removed while paging are
+    neither repeated nor skipped. An empty cursor requests the first page.
+    """
+
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class LimitOffsetOrKeysetPagination(pagination.LimitOffsetPagination):
+    """
+    Limit/offset pagination, or keyset pagination when a request has a
+    ``cursor`` parameter (e.g. ``?cursor=`` for the first page, then the
+    ``next`` links).
+    """
+
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -29,6 +29,9 @@ class CoreModelSerializer(serializers.HyperlinkedModelSerializer):
                 setattr(new_instance, attr, value)
         else:
             new_instance = self.Meta.model(**attrs)
+        # Bulk requests check time period overlaps for all entries at once.
+        if self.context.get("bulk"):
+            new_instance.unique_period_checked = True
         new_instance.clean()
         return attrs
 
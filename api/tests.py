@@ -1,9 +1,24 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent import futures
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from api.alerts import AlertWorker
+from api.llm_messages import CuteMessageGenerator
 from babybuddy.models import get_user_model
-from core import models
+from core import analytics, models
+from core.analytics import BabyAnalytics
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 
@@ -25,6 +40,18 @@ class TestBase:
                 response.data["name"], "{} List".format(self.model._meta.verbose_name)
             )
 
+        def test_list_query_budget(self):
+            # A page costs the same number of queries however many rows it
+            # holds, i.e. there are no per-row tag or relation lookups.
+            self.client.get(self.endpoint, {"limit": 1})
+            with CaptureQueriesContext(connection) as single:
+                self.client.get(self.endpoint, {"limit": 1})
+            with CaptureQueriesContext(connection) as page:
+                response = self.client.get(self.endpoint, {"limit": 100})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertGreater(response.data["count"], 0)
+            self.assertEqual(len(page), len(single))
+
         def test_delete(self):
             endpoint = "{}{}/".format(self.endpoint, self.delete_id)
             response = self.client.get(endpoint)
@@ -76,6 +103,98 @@ class TestBase:
             self.assertIsNotNone(obj.end)
 
 
+class AnalyticsAPITestCase(APITestCase):
+    fixtures = ["tests.json"]
+
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        self.endpoint = reverse("api:child-status", args=["fake-child"])
+
+    def test_status_etag(self):
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Logging an entry starts a new generation and so a new ETag.
+        models.DiaperChange.objects.create(
+            child=models.Child.objects.get(slug="fake-child"),
+            time=timezone.now(),
+            wet=True,
+            solid=False,
+        )
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIsNotNone(response.data["last_diaper"])
+
+    def test_status_if_none_match_parsing(self):
+        etag = self.client.get(self.endpoint)["ETag"]
+        for header in (f"W/{etag}", f'"other", {etag}', "*"):
+            response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Only whole tags match, not a tag containing this one.
+        for header in (f'"prefix-{etag}"', f'{etag[:-1]}x"', etag.strip('"')):
+            response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_status_etag_per_timezone(self):
+        etag = self.client.get(self.endpoint)["ETag"]
+
+        # Responses hold local times, so another user time zone is another
+        # cache entry and ETag.
+        user = get_user_model().objects.get(username="admin")
+        user.settings.timezone = "America/New_York"
+        user.settings.save()
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_status_token_request_time_zone(self):
+        user = get_user_model().objects.get(username="admin")
+        user.settings.timezone = "America/New_York"
+        user.settings.save()
+        self.client.get(self.endpoint)
+        self.assertEqual(timezone.get_current_timezone_name(), "America/New_York")
+
+        # Token requests are authenticated in the view, after the time zone
+        # middleware, and must not keep the last user's time zone.
+        self.client.logout()
+        token, created = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            timezone.get_current_timezone_name(),
+            timezone.get_default_timezone_name(),
+        )
+
+    def test_status_cached_between_writes(self):
+        self.client.get(self.endpoint)
+        with mock.patch.object(BabyAnalytics, "get_current_status") as get_status:
+            response = self.client.get(self.endpoint)
+        get_status.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_coalesced_per_timezone(self):
+        child = models.Child.objects.get(slug="fake-child")
+        keys = []
+        do = analytics._flights.do
+
+        def record(key, fn, shared=False):
+            keys.append(key)
+            return do(key, fn, shared)
+
+        with mock.patch.object(analytics._flights, "do", side_effect=record):
+            for zone in ("UTC", "America/New_York"):
+                with timezone.override(zone):
+                    BabyAnalytics(child).get_current_status()
+        self.assertEqual(len(keys), 2)
+        self.assertNotEqual(keys[0], keys[1])
+
+
 class BMIAPITestCase(TestBase.BabyBuddyAPITestCaseBase):
     endpoint = reverse("api:bmi-list")
     model = models.BMI
@@ -328,6 +447,142 @@ class FeedingAPITestCase(TestBase.BabyBuddyAPITestCaseBase):
             },
         )
 
+    def test_bulk(self):
+        entry = {
+            "child": 1,
+            "type": "formula",
+            "method": "bottle",
+            "amount": 60,
+        }
+        data = [
+            dict(
+                entry,
+                start="2017-11-19T10:00:00-05:00",
+                end="2017-11-19T10:15:00-05:00",
+                tags=["bulk"],
+            ),
+            dict(
+                entry,
+                start="2017-11-19T13:00:00-05:00",
+                end="2017-11-19T13:20:00-05:00",
+            ),
+            # Intersects the first entry of this request.
+            dict(
+                entry,
+                start="2017-11-19T10:10:00-05:00",
+                end="2017-11-19T10:30:00-05:00",
+            ),
+            # Intersects an existing entry.
+            dict(
+                entry,
+                start="2017-11-18T09:05:00-05:00",
+                end="2017-11-18T09:10:00-05:00",
+            ),
+            dict(entry, start="2017-11-19T15:00:00-05:00"),
+        ]
+        count = models.Feeding.objects.count()
+        response = self.client.post(
+            "{}bulk/".format(self.endpoint), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in response.data], [201, 201, 400, 400, 400]
+        )
+        self.assertIn("non_field_errors", response.data[2]["errors"])
+        self.assertIn("non_field_errors", response.data[3]["errors"])
+        self.assertIn("end", response.data[4]["errors"])
+        self.assertEqual(models.Feeding.objects.count(), count + 2)
+
+        feeding = models.Feeding.objects.get(pk=response.data[0]["data"]["id"])
+        self.assertEqual(feeding.duration, timezone.timedelta(minutes=15))
+        self.assertEqual(response.data[0]["data"]["tags"], ["bulk"])
+        rollup = models.DailyRollup.objects.get(
+            child_id=1, date=timezone.localdate(feeding.start)
+        )
+        self.assertEqual(rollup.feeding_count, 2)
+
+        response = self.client.post(
+            "{}bulk/".format(self.endpoint), data[0], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_tags_batched(self):
+        def tag_queries(count, hour):
+            data = [
+                {
+                    "child": 1,
+                    "start": "2017-11-2{}T{}:00:00-05:00".format(day, hour),
+                    "end": "2017-11-2{}T{}:15:00-05:00".format(day, hour),
+                    "type": "formula",
+                    "method": "bottle",
+                    "tags": ["bulk", "night"],
+                }
+                for day in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    "{}bulk/".format(self.endpoint), data, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return [
+                query["sql"]
+                for query in queries
+                if '"core_tag"' in query["sql"] or '"core_tagged"' in query["sql"]
+            ]
+
+        # Tagging more entries takes no more queries.
+        self.assertEqual(len(tag_queries(2, 10)), len(tag_queries(4, 11)))
+        self.assertEqual(models.Tagged.objects.filter(tag__name="night").count(), 6)
+
+    def test_bulk_update(self):
+        data = [
+            {"id": 3, "amount": 90, "tags": ["bulk"]},
+            {"id": 999, "amount": 1},
+            # Moved into feeding 1's period.
+            {"id": 2, "start": "2017-11-18T04:10:00-05:00"},
+            # Moved into its own stored period.
+            {
+                "id": 4,
+                "start": "2017-11-17T09:05:00-05:00",
+                "end": "2017-11-17T09:20:00-05:00",
+            },
+        ]
+        response = self.client.patch(
+            "{}bulk/".format(self.endpoint), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in response.data], [200, 404, 400, 200]
+        )
+        self.assertEqual(response.data[0]["data"]["amount"], 90)
+        self.assertEqual(response.data[0]["data"]["tags"], ["bulk"])
+        self.assertIn("non_field_errors", response.data[2]["errors"])
+        feeding = models.Feeding.objects.get(pk=4)
+        self.assertEqual(feeding.duration, timezone.timedelta(minutes=15))
+        self.assertTrue(
+            models.ChangeLog.objects.filter(
+                object_id=4, content_type__model="feeding"
+            ).exists()
+        )
+
+    def test_get_with_cursor(self):
+        ids = []
+        response = self.client.get(self.endpoint, {"cursor": "", "limit": 4})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [result["id"] for result in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(
+            ids,
+            list(
+                models.Feeding.objects.order_by("-end", "-id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
     # check backwards compatibility
     def test_get_with_date_filter(self):
         response = self.client.get(self.endpoint, {"start_min": "2017-11-18"})
@@ -893,3 +1148,306 @@ class TestProfileAPITestCase(APITestCase):
         self.assertIn("api_key", response.data)
         self.assertTrue(isinstance(response.data["api_key"], str))
         self.assertGreater(len(response.data["api_key"]), 30)
+
+
+class SyncAPITestCase(APITestCase):
+    fixtures = ["tests.json"]
+    endpoint = reverse("api:sync")
+
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+
+    def test_sync(self):
+        response = self.client.get(self.endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["changes"], [])
+        cursor = response.data["cursor"]
+
+        note = models.Note.objects.create(
+            child_id=1, note="New note", time=timezone.now()
+        )
+        change = models.DiaperChange.objects.first()
+        change_id = change.id
+        change.delete()
+        note.note = "Edited note"
+        note.save()
+
+        response = self.client.get(self.endpoint, {"since": cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["more"])
+        changes = {
+            (change["model"], change["id"]): change
+            for change in response.data["changes"]
+        }
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(changes[("note", note.id)]["action"], "save")
+        self.assertEqual(changes[("note", note.id)]["data"]["note"], "Edited note")
+        self.assertEqual(changes[("diaperchange", change_id)]["action"], "delete")
+        self.assertNotIn("data", changes[("diaperchange", change_id)])
+
+        response = self.client.get(self.endpoint, {"since": cursor, "limit": 1})
+        self.assertTrue(response.data["more"])
+        self.assertEqual(len(response.data["changes"]), 1)
+
+        latest = self.client.get(self.endpoint).data["cursor"]
+        response = self.client.get(self.endpoint, {"since": latest})
+        self.assertEqual(response.data["changes"], [])
+        self.assertEqual(response.data["cursor"], latest)
+
+        response = self.client.get(self.endpoint, {"since": "invalid"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_pruned(self):
+        models.Note.objects.create(child_id=1, note="Note", time=timezone.now())
+        cursor = self.client.get(self.endpoint).data["cursor"]
+        models.Note.objects.create(child_id=1, note="Note", time=timezone.now())
+        models.Note.objects.create(child_id=1, note="Note", time=timezone.now())
+        models.ChangeLog.prune(timezone.now())
+
+        response = self.client.get(self.endpoint, {"since": cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        cursor = self.client.get(self.endpoint).data["cursor"]
+        response = self.client.get(self.endpoint, {"since": cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AggregateAPITestCase(APITestCase):
+    fixtures = ["tests.json"]
+    endpoint = reverse("api:aggregate", args=["feedings"])
+
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+
+    def test_aggregate(self):
+        response = self.client.get(
+            self.endpoint,
+            {"child": 1, "metric": "count,sum:amount,avg:duration", "tz": "UTC"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["field"], "start")
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "bucket": "2017-11-11",
+                    "count": 2,
+                    "sum_amount": 20.0,
+                    "avg_duration": 900.0,
+                },
+                {
+                    "bucket": "2017-11-17",
+                    "count": 1,
+                    "sum_amount": 0.25,
+                    "avg_duration": 900.0,
+                },
+                {
+                    "bucket": "2017-11-18",
+                    "count": 3,
+                    "sum_amount": 2.5,
+                    "avg_duration": 1500.0,
+                },
+            ],
+        )
+
+    def test_aggregate_buckets(self):
+        # 2017-11-11T05:00:00Z is still November 10th in Los Angeles.
+        response = self.client.get(
+            self.endpoint, {"tz": "America/Los_Angeles", "start_max": "2017-11-12"}
+        )
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"bucket": "2017-11-10", "count": 1},
+                {"bucket": "2017-11-11", "count": 1},
+            ],
+        )
+
+        response = self.client.get(self.endpoint, {"bucket": "week", "tz": "UTC"})
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"bucket": "2017-11-06", "count": 2},
+                {"bucket": "2017-11-13", "count": 4},
+            ],
+        )
+
+    def test_aggregate_errors(self):
+        for params in [
+            {"bucket": "year"},
+            {"metric": "sum:notes"},
+            {"metric": "median:amount"},
+            {"tz": "Mars/Olympus"},
+        ]:
+            response = self.client.get(self.endpoint, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse("api:aggregate", args=["children"]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AlertsWorkerTestCase(APITestCase):
+    fixtures = ["tests.json"]
+    url = "https://hooks.example.com/alerts"
+
+    def setUp(self):
+        models.DiaperChange.objects.create(
+            child_id=1,
+            time=timezone.now() - timezone.timedelta(hours=5),
+            wet=True,
+            solid=False,
+        )
+
+    def tick(self):
+        call_command(
+            "alerts_worker",
+            "--once",
+            "--no-llm",
+            "--ignore-quiet-hours",
+            "--url",
+            self.url,
+            stdout=StringIO(),
+        )
+
+    def diaper_alerts(self):
+        return models.AlertOutbox.objects.filter(
+            child_id=1, payload__alert__type="diaper_overdue"
+        )
+
+    @mock.patch("api.alerts.post_alert")
+    def test_push_and_snooze(self, post_alert):
+        self.tick()
+        row = self.diaper_alerts().get()
+        self.assertEqual(row.status, models.AlertOutbox.SENT)
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.payload["child"]["id"], 1)
+        self.assertEqual(row.payload["alert"]["threshold_used"], 180)
+        post_alert.assert_any_call(self.url, row.payload, timeout=10)
+        self.assertTrue(
+            models.AlertSnooze.objects.filter(child_id=1, key="diaper").exists()
+        )
+
+        # Snoozed: not queued again on the next tick.
+        self.tick()
+        self.assertEqual(self.diaper_alerts().count(), 1)
+
+    @mock.patch("api.alerts.post_alert", side_effect=OSError("HTTP 503"))
+    def test_failed_delivery_is_retried(self, post_alert):
+        before = timezone.now()
+        self.tick()
+        row = self.diaper_alerts().get()
+        self.assertEqual(row.status, models.AlertOutbox.PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.last_error, "HTTP 503")
+        self.assertGreaterEqual(row.next_attempt, before + models.AlertOutbox.BACKOFF)
+
+        # Not due yet, so the next tick leaves it alone.
+        self.tick()
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 1)
+
+        post_alert.side_effect = None
+        models.AlertOutbox.objects.update(next_attempt=timezone.now())
+        self.tick()
+        row.refresh_from_db()
+        self.assertEqual(row.status, models.AlertOutbox.SENT)
+        self.assertEqual(row.attempts, 2)
+
+    def test_claim_leases_whole_batch(self):
+        before = timezone.now()
+        models.AlertOutbox.objects.bulk_create(
+            [
+                models.AlertOutbox(child_id=1, url=self.url, payload={})
+                for _ in range(30)
+            ]
+        )
+        rows = AlertWorker([self.url], timeout=10).claim()
+        self.assertEqual(len(rows), 30)
+        # The last row may only be posted after the 29 before it time out.
+        self.assertFalse(
+            models.AlertOutbox.objects.filter(
+                next_attempt__lt=before + timezone.timedelta(seconds=300)
+            ).exists()
+        )
+
+    def test_requires_urls(self):
+        with self.settings(ALERT_WEBHOOK_URLS=[]):
+            with self.assertRaises(CommandError):
+                call_command("alerts_worker", "--once")
+
+
+class StubLLMClient:
+    """Stand-in for the Anthropic client: replies with ``reply(prompt)``."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+        self.messages = self
+
+    @property
+    def calls(self):
+        return len(self.prompts)
+
+    def create(self, **kwargs):
+        self.prompts.append(kwargs["messages"][0]["content"])
+        text = self.reply(self.prompts[-1])
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+class CuteMessageGeneratorTestCase(SimpleTestCase):
+    feeding = ("feeding_overdue", {"minutes_overdue": 20, "threshold_used": 15})
+    diaper = ("diaper_overdue", {"hours_since": 4, "threshold_used": 180})
+
+    def test_slow_messages_fall_back_within_budget(self):
+        release = threading.Event()
+
+        def reply(prompt):
+            if "חיתול" in prompt:
+                release.wait(5)
+            return "LLM"
+
+        generator = CuteMessageGenerator(
+            client=StubLLMClient(reply), latency_budget=0.2, pool_size=0
+        )
+        started = time.monotonic()
+        messages = generator.generate_alert_messages(
+            "Emma", [self.feeding, self.diaper]
+        )
+        release.set()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(messages[0], "LLM")
+        self.assertEqual(
+            messages[1], generator._get_fallback_message("Emma", *self.diaper)
+        )
+
+    def test_circuit_breaker_skips_failing_api(self):
+        def reply(prompt):
+            raise OSError("overloaded")
+
+        client = StubLLMClient(reply)
+        generator = CuteMessageGenerator(client=client, pool_size=0)
+        for _ in range(5):
+            message = generator.generate_alert_message("Emma", *self.feeding)
+            self.assertEqual(
+                message, generator._get_fallback_message("Emma", *self.feeding)
+            )
+        self.assertEqual(client.calls, generator.breaker.failure_threshold)
+        self.assertTrue(generator.breaker.is_open())
+
+        generator.breaker.opened_at -= generator.breaker.reset_seconds
+        client.reply = lambda prompt: "LLM"
+        self.assertEqual(generator.generate_alert_message("Emma", *self.feeding), "LLM")
+        self.assertFalse(generator.breaker.is_open())
+
+    def test_pooled_templates(self):
+        client = StubLLMClient(
+            lambda prompt: "🍼 {name} רעבה! _{minutes} דקות_\n---\n{name} {minutes}"
+        )
+        generator = CuteMessageGenerator(client=client, pool_size=2)
+        futures.wait(generator.warm())
+        key = ("feeding_overdue", "short")
+        self.assertEqual(generator.pool.size(key), 2)
+
+        message = generator.generate_alert_message("Emma", *self.feeding)
+        self.assertIn(message, ("🍼 Emma רעבה! _20 דקות_", "Emma 20"))
+        # Templates are requested without the child's name: no live call.
+        self.assertFalse(any("Emma" in prompt for prompt in client.prompts))
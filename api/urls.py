@@ -65,6 +65,7 @@ router.register(r"tummy-times", views.TummyTimeViewSet)
 router.register(r"weight", views.WeightViewSet)
 
 router.add_detail_path("profile", "profile", views.ProfileView.as_view())
+router.add_detail_path("sync", "sync", views.SyncView.as_view())
 router.add_detail_path(
     "schema",
     "openapi-schema",
@@ -81,6 +82,11 @@ app_name = "api"
 urlpatterns = [
     path("api/", include(router.urls)),
     path("api/auth/", include("rest_framework.urls", namespace="rest_framework")),
+    path(
+        "api/aggregate/<str:endpoint>/",
+        views.AggregateView.as_view(),
+        name="aggregate",
+    ),
     # Analytics endpoints
     path(
         "api/analytics/child/<slug:child_slug>/",
@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
+import zoneinfo
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework import viewsets, views
+from rest_framework import status, viewsets, views
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.schemas.openapi import AutoSchema
 
@@ -12,12 +24,223 @@ from babybuddy import models as babybuddy_models
 from . import serializers, filters
 
 
+def can_view(request, model):
+    return request.user.has_perm(
+        "{}.view_{}".format(model._meta.app_label, model._meta.model_name)
+    )
+
+
+class BulkMixin:
+    """
+    Adds a ``bulk`` action for lists of entries, with a result per entry in
+    the order given. Entries are validated together, with one time period
+    overlap query per child.
+
+    POST creates the entries: the valid ones are inserted with a single
+    ``bulk_create`` and their tags with a single insert. PATCH updates the
+    entries given by ``id``, fetched with one query; the valid ones are saved
+    one by one in a single transaction, so the signals keeping rollups,
+    learned states and the change log up to date see the old and new values
+    of every entry.
+    """
+
+    bulk_max_entries = 500
+    bulk_unique_period = False
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError(_("Expected a list of entries."))
+        if len(request.data) > self.bulk_max_entries:
+            raise ValidationError(
+                _("At most %(count)d entries can be sent at once.")
+                % {"count": self.bulk_max_entries}
+            )
+        if request.method == "PATCH":
+            return self.bulk_update(request.data)
+        return self.bulk_create(request.data)
+
+    def bulk_create(self, entries):
+        serializer_class = self.get_serializer_class()
+        context = {**self.get_serializer_context(), "bulk": True}
+        results = []
+        valid = []
+        for index, entry in enumerate(entries):
+            if isinstance(entry, dict) and "timer" in entry:
+                results.append(self.timer_error())
+                continue
+            serializer = serializer_class(data=entry, context=context)
+            if serializer.is_valid():
+                results.append(None)
+                valid.append((index, serializer.validated_data))
+            else:
+                results.append({"status": 400, "errors": serializer.errors})
+        if self.bulk_unique_period:
+            valid = self.check_unique_periods(valid, results)
+
+        model = serializer_class.Meta.model
+        instances = []
+        tags = []
+        for index, data in valid:
+            data = dict(data)
+            tags.append(data.pop("tags", None))
+            instances.append(model(**data))
+        with transaction.atomic():
+            created = models.bulk_create_entries(model, instances)
+            self.tag_entries(model, created, tags)
+
+        indexes = [index for index, data in valid]
+        self.add_results(results, indexes, created, status.HTTP_201_CREATED)
+        return self.bulk_response(results, len(created), status.HTTP_201_CREATED)
+
+    def bulk_update(self, entries):
+        serializer_class = self.get_serializer_class()
+        context = {**self.get_serializer_context(), "bulk": True}
+        pks = [entry.get("id") for entry in entries if isinstance(entry, dict)]
+        instances = (
+            self.get_queryset()
+            .select_related("child")
+            .in_bulk([pk for pk in pks if isinstance(pk, int)])
+        )
+        results = []
+        valid = []
+        serializers_by_index = {}
+        for index, entry in enumerate(entries):
+            instance = None
+            if isinstance(entry, dict):
+                instance = instances.get(entry.get("id"))
+            if instance is None:
+                errors = {"id": [_("No entry with this id.")]}
+                results.append({"status": 404, "errors": errors})
+                continue
+            if "timer" in entry:
+                results.append(self.timer_error())
+                continue
+            serializer = serializer_class(
+                instance, data=entry, partial=True, context=context
+            )
+            if serializer.is_valid():
+                results.append(None)
+                serializers_by_index[index] = serializer
+                valid.append((index, serializer.validated_data))
+            else:
+                results.append({"status": 400, "errors": serializer.errors})
+        if self.bulk_unique_period:
+            periods = []
+            for index, data in valid:
+                instance = serializers_by_index[index].instance
+                period = {"pk": instance.pk}
+                for field in ("child", "start", "end"):
+                    period[field] = data.get(field, getattr(instance, field))
+                periods.append((index, period))
+            valid = self.check_unique_periods(periods, results)
+
+        indexes = [index for index, data in valid]
+        with transaction.atomic():
+            updated = [serializers_by_index[index].save() for index in indexes]
+
+        self.add_results(results, indexes, updated, status.HTTP_200_OK)
+        return self.bulk_response(results, len(updated), status.HTTP_200_OK)
+
+    @staticmethod
+    def timer_error():
+        errors = {"timer": [_("Timers cannot be used in bulk requests.")]}
+        return {"status": 400, "errors": errors}
+
+    @staticmethod
+    def tag_entries(model, instances, tags):
+        """
+        Tags created entries with one query for the existing tags and one
+        insert of all Tagged rows. Each tag used is saved once, to create it
+        or update when it was last used.
+        """
+        names = {name for entry_tags in tags if entry_tags for name in entry_tags}
+        if not names:
+            return
+        existing = {tag.name: tag for tag in models.Tag.objects.filter(name__in=names)}
+        used = {}
+        for name in names:
+            tag = existing.get(name) or models.Tag(name=name)
+            tag.last_used = timezone.now()
+            tag.save()
+            used[name] = tag
+        content_type = ContentType.objects.get_for_model(model)
+        models.bulk_create_entries(
+            models.Tagged,
+            [
+                models.Tagged(
+                    content_type=content_type, object_id=instance.pk, tag=used[name]
+                )
+                for instance, entry_tags in zip(instances, tags)
+                for name in dict.fromkeys(entry_tags or ())
+            ],
+        )
+
+    def add_results(self, results, indexes, instances, result_status):
+        """Fills in the serialized data of the saved entries at ``indexes``."""
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        saved = self.get_queryset().in_bulk([instance.pk for instance in instances])
+        for index, instance in zip(indexes, instances):
+            data = serializer_class(saved[instance.pk], context=context).data
+            results[index] = {"status": result_status, "data": data}
+
+    @staticmethod
+    def bulk_response(results, saved, success_status):
+        if saved == len(results):
+            response_status = success_status
+        elif saved:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(results, status=response_status)
+
+    def check_unique_periods(self, valid, results):
+        """
+        Rejects entries whose time period intersects another entry of the same
+        child, either stored or earlier in the request. Updated entries (with
+        a ``pk``) are not checked against their own stored period, but are
+        against the stored periods of other entries of the request.
+        """
+        model = self.get_serializer_class().Meta.model
+        by_child = {}
+        for index, data in valid:
+            by_child.setdefault(data["child"].pk, []).append((index, data))
+
+        accepted = []
+        for child_id, entries in by_child.items():
+            periods = list(
+                model.objects.filter(
+                    child_id=child_id,
+                    start__lt=max(data["end"] for index, data in entries),
+                    end__gt=min(data["start"] for index, data in entries),
+                ).values_list("pk", "start", "end")
+            )
+            for index, data in entries:
+                own_pk = data.get("pk")
+                if any(
+                    (own_pk is None or pk != own_pk)
+                    and start < data["end"]
+                    and end > data["start"]
+                    for pk, start, end in periods
+                ):
+                    message = _("Another entry intersects the specified time period.")
+                    results[index] = {
+                        "status": 400,
+                        "errors": {"non_field_errors": [message]},
+                    }
+                else:
+                    periods.append((own_pk, data["start"], data["end"]))
+                    accepted.append((index, data))
+        return sorted(accepted, key=lambda item: item[0])
+
+
 class BMIViewSet(viewsets.ModelViewSet):
-    queryset = models.BMI.objects.all()
+    queryset = models.BMI.objects.prefetch_related("tags")
     serializer_class = serializers.BMISerializer
     filterset_fields = ("child", "date")
     ordering_fields = ("child", "date")
-    ordering = "-date"
+    ordering = ("-date", "-id")
 
     def get_view_name(self):
         """
@@ -42,71 +265,74 @@ class ChildViewSet(viewsets.ModelViewSet):
         "birth_time",
     )
     ordering_fields = ("birth_date", "birth_time", "first_name", "last_name", "slug")
-    ordering = ["-birth_date", "-birth_time"]
+    ordering = ["-birth_date", "-birth_time", "-id"]
 
 
-class DiaperChangeViewSet(viewsets.ModelViewSet):
-    queryset = models.DiaperChange.objects.all()
+class DiaperChangeViewSet(BulkMixin, viewsets.ModelViewSet):
+    queryset = models.DiaperChange.objects.prefetch_related("tags")
     serializer_class = serializers.DiaperChangeSerializer
     filterset_class = filters.DiaperChangeFilter
     ordering_fields = ("amount", "time")
-    ordering = "-time"
+    ordering = ("-time", "-id")
 
 
-class FeedingViewSet(viewsets.ModelViewSet):
-    queryset = models.Feeding.objects.all()
+class FeedingViewSet(BulkMixin, viewsets.ModelViewSet):
+    queryset = models.Feeding.objects.prefetch_related("tags")
     serializer_class = serializers.FeedingSerializer
+    bulk_unique_period = True
     filterset_class = filters.FeedingFilter
     ordering_fields = ("amount", "duration", "end", "start")
-    ordering = "-end"
+    ordering = ("-end", "-id")
 
 
 class HeadCircumferenceViewSet(viewsets.ModelViewSet):
-    queryset = models.HeadCircumference.objects.all()
+    queryset = models.HeadCircumference.objects.prefetch_related("tags")
     serializer_class = serializers.HeadCircumferenceSerializer
     filterset_fields = ("child", "date")
     ordering_fields = ("date", "head_circumference")
-    ordering = "-date"
+    ordering = ("-date", "-id")
 
 
 class HeightViewSet(viewsets.ModelViewSet):
-    queryset = models.Height.objects.all()
+    queryset = models.Height.objects.prefetch_related("tags")
     serializer_class = serializers.HeightSerializer
     filterset_fields = ("child", "date")
     ordering_fields = ("date", "height")
-    ordering = "-date"
+    ordering = ("-date", "-id")
 
 
 class SolidFoodViewSet(viewsets.ModelViewSet):
-    queryset = models.SolidFood.objects.all()
+    queryset = models.SolidFood.objects.prefetch_related("tags")
     serializer_class = serializers.SolidFoodSerializer
     filterset_class = filters.SolidFoodFilter
     ordering_fields = ("child", "time", "food")
-    ordering = "-time"
+    ordering = ("-time", "-id")
 
 
 class NoteViewSet(viewsets.ModelViewSet):
-    queryset = models.Note.objects.all()
+    queryset = models.Note.objects.prefetch_related("tags")
     serializer_class = serializers.NoteSerializer
     filterset_class = filters.NoteFilter
     ordering_fields = "time"
-    ordering = "-time"
+    ordering = ("-time", "-id")
 
 
-class PumpingViewSet(viewsets.ModelViewSet):
-    queryset = models.Pumping.objects.all()
+class PumpingViewSet(BulkMixin, viewsets.ModelViewSet):
+    queryset = models.Pumping.objects.prefetch_related("tags")
     serializer_class = serializers.PumpingSerializer
+    bulk_unique_period = True
     filterset_class = filters.PumpingFilter
     ordering_fields = ("amount", "duration", "end", "start")
-    ordering = "-end"
+    ordering = ("-end", "-id")
 
 
-class SleepViewSet(viewsets.ModelViewSet):
-    queryset = models.Sleep.objects.all()
+class SleepViewSet(BulkMixin, viewsets.ModelViewSet):
+    queryset = models.Sleep.objects.prefetch_related("tags")
     serializer_class = serializers.SleepSerializer
+    bulk_unique_period = True
     filterset_class = filters.SleepFilter
     ordering_fields = ("duration", "end", "start")
-    ordering = "-end"
+    ordering = ("-end", "-id")
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -119,11 +345,11 @@ class TagViewSet(viewsets.ModelViewSet):
 
 
 class TemperatureViewSet(viewsets.ModelViewSet):
-    queryset = models.Temperature.objects.all()
+    queryset = models.Temperature.objects.prefetch_related("tags")
     serializer_class = serializers.TemperatureSerializer
     filterset_class = filters.TemperatureFilter
     ordering_fields = ("temperature", "time")
-    ordering = "-time"
+    ordering = ("-time", "-id")
 
 
 class TimerViewSet(viewsets.ModelViewSet):
@@ -131,7 +357,7 @@ class TimerViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.TimerSerializer
     filterset_class = filters.TimerFilter
     ordering_fields = ("duration", "end", "start")
-    ordering = "-start"
+    ordering = ("-start", "-id")
 
     @action(detail=True, methods=["patch"])
     def restart(self, request, pk=None):
@@ -140,20 +366,21 @@ class TimerViewSet(viewsets.ModelViewSet):
         return Response(self.serializer_class(timer).data)
 
 
-class TummyTimeViewSet(viewsets.ModelViewSet):
-    queryset = models.TummyTime.objects.all()
+class TummyTimeViewSet(BulkMixin, viewsets.ModelViewSet):
+    queryset = models.TummyTime.objects.prefetch_related("tags")
     serializer_class = serializers.TummyTimeSerializer
+    bulk_unique_period = True
     filterset_class = filters.TummyTimeFilter
     ordering_fields = ("duration", "end", "start")
-    ordering = "-start"
+    ordering = ("-start", "-id")
 
 
 class WeightViewSet(viewsets.ModelViewSet):
-    queryset = models.Weight.objects.all()
+    queryset = models.Weight.objects.prefetch_related("tags")
     serializer_class = serializers.WeightSerializer
     filterset_fields = ("child", "date")
     ordering_fields = ("date", "weight")
-    ordering = "-date"
+    ordering = ("-date", "-id")
 
 
 class ProfileView(views.APIView):
@@ -171,3 +398,238 @@ class ProfileView(views.APIView):
         )
         serializer = self.serializer_class(settings)
         return Response(serializer.data)
+
+
+class SyncView(views.APIView):
+    """
+    Changes to Baby Buddy data after a cursor, for incremental sync.
+
+    Without ``since`` only the current cursor is returned: download the data
+    from the list endpoints, then pass that cursor as ``since``. Each change
+    holds the model name, the object id, the action ("save" or "delete") and,
+    for saves, the object's current data. Repeat with the returned cursor
+    while ``more`` is true.
+    """
+
+    schema = AutoSchema(operation_id_base="Sync")
+    permission_classes = [IsAuthenticated]
+
+    action = "get"
+    basename = "sync"
+
+    page_size = 500
+    max_page_size = 1000
+
+    serializer_classes = {
+        models.BMI: serializers.BMISerializer,
+        models.Child: serializers.ChildSerializer,
+        models.DiaperChange: serializers.DiaperChangeSerializer,
+        models.Feeding: serializers.FeedingSerializer,
+        models.HeadCircumference: serializers.HeadCircumferenceSerializer,
+        models.Height: serializers.HeightSerializer,
+        models.Note: serializers.NoteSerializer,
+        models.Pumping: serializers.PumpingSerializer,
+        models.Sleep: serializers.SleepSerializer,
+        models.SolidFood: serializers.SolidFoodSerializer,
+        models.Tag: serializers.TagSerializer,
+        models.Temperature: serializers.TemperatureSerializer,
+        models.Timer: serializers.TimerSerializer,
+        models.TummyTime: serializers.TummyTimeSerializer,
+        models.Weight: serializers.WeightSerializer,
+    }
+
+    def get(self, request):
+        since = request.query_params.get("since")
+        if since is None:
+            latest = models.ChangeLog.objects.order_by("-id").first()
+            cursor = latest.id if latest else 0
+            return Response({"cursor": str(cursor), "more": False, "changes": []})
+        try:
+            since = int(since)
+            limit = int(request.query_params.get("limit", self.page_size))
+        except ValueError:
+            raise ValidationError("Invalid since or limit value.")
+        limit = max(1, min(limit, self.max_page_size))
+        if not models.ChangeLog.covers(since):
+            return Response(
+                {
+                    "detail": _(
+                        "Changes since this cursor were pruned; download the "
+                        "data again and sync from a new cursor."
+                    )
+                },
+                status=status.HTTP_410_GONE,
+            )
+
+        rows = list(
+            models.ChangeLog.objects.filter(id__gt=since)
+            .order_by("id")
+            .values_list("id", "content_type_id", "object_id", "action")[: limit + 1]
+        )
+        more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Only the latest change of each object matters, in the order the
+        # latest changes were made.
+        latest = {}
+        for _pk, content_type_id, object_id, change in rows:
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model in self.serializer_classes and can_view(request, model):
+                latest.pop((model, object_id), None)
+                latest[(model, object_id)] = change
+
+        instances = {}
+        saved = {}
+        for (model, pk), change in latest.items():
+            if change == models.ChangeLog.SAVE:
+                saved.setdefault(model, []).append(pk)
+        for model, pks in saved.items():
+            queryset = model.objects.filter(pk__in=pks)
+            if "tags" in self.serializer_classes[model].Meta.fields:
+                queryset = queryset.prefetch_related("tags")
+            for instance in queryset:
+                instances[(model, instance.pk)] = instance
+
+        changes = []
+        for (model, pk), change in latest.items():
+            item = {"model": model._meta.model_name, "id": pk}
+            instance = instances.get((model, pk))
+            if instance is None:
+                # Deleted, possibly by a change after this page.
+                item["action"] = models.ChangeLog.DELETE
+            else:
+                item["action"] = models.ChangeLog.SAVE
+                item["data"] = self.serializer_classes[model](
+                    instance, context={"request": request}
+                ).data
+            changes.append(item)
+
+        cursor = rows[-1][0] if rows else since
+        return Response({"cursor": str(cursor), "more": more, "changes": changes})
+
+
+class AggregateView(views.APIView):
+    """
+    Aggregates of an endpoint's entries per day, week or month, computed by
+    the database. E.g. the amount fed per day:
+
+        /api/aggregate/feedings/?child=1&bucket=day&metric=count,sum:amount
+
+    Metrics are "count" or "<sum|avg|min|max>:<field>"; durations are given
+    in seconds. Entries are bucketed by their start, time or date in the
+    ``tz`` time zone (default: the user's). The endpoint's filters (e.g.
+    ``start_min``) narrow down the entries first.
+    """
+
+    schema = AutoSchema(operation_id_base="Aggregate")
+    permission_classes = [IsAuthenticated]
+
+    action = "get"
+    basename = "aggregate"
+
+    # endpoint -> (viewset, field entries are bucketed by)
+    endpoints = {
+        "bmi": (BMIViewSet, "date"),
+        "changes": (DiaperChangeViewSet, "time"),
+        "feedings": (FeedingViewSet, "start"),
+        "head-circumference": (HeadCircumferenceViewSet, "date"),
+        "height": (HeightViewSet, "date"),
+        "notes": (NoteViewSet, "time"),
+        "pumping": (PumpingViewSet, "start"),
+        "sleep": (SleepViewSet, "start"),
+        "solids": (SolidFoodViewSet, "time"),
+        "temperature": (TemperatureViewSet, "time"),
+        "tummy-times": (TummyTimeViewSet, "start"),
+        "weight": (WeightViewSet, "date"),
+    }
+    buckets = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+    functions = {"sum": Sum, "avg": Avg, "min": Min, "max": Max}
+    numeric_fields = (
+        "DecimalField",
+        "DurationField",
+        "FloatField",
+        "IntegerField",
+        "PositiveIntegerField",
+    )
+
+    def get(self, request, endpoint):
+        if endpoint not in self.endpoints:
+            raise ValidationError({"endpoint": "Unknown endpoint."})
+        viewset, field = self.endpoints[endpoint]
+        model = viewset.queryset.model
+        if not can_view(request, model):
+            self.permission_denied(request)
+
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in self.buckets:
+            raise ValidationError({"bucket": "Use day, week or month."})
+        tz = timezone.get_current_timezone()
+        if "tz" in request.query_params:
+            try:
+                tz = zoneinfo.ZoneInfo(request.query_params["tz"])
+            except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+                raise ValidationError({"tz": "Unknown time zone."})
+        metrics = self.get_metrics(model, request.query_params.get("metric", "count"))
+
+        queryset = DjangoFilterBackend().filter_queryset(
+            request, model.objects.all(), viewset()
+        )
+        if model._meta.get_field(field).get_internal_type() == "DateField":
+            trunc = self.buckets[bucket](field)
+        else:
+            trunc = self.buckets[bucket](field, tzinfo=tz)
+        rows = (
+            queryset.order_by()
+            .annotate(bucket=trunc)
+            .values("bucket")
+            .annotate(**metrics)
+            .order_by("bucket")
+        )
+
+        results = []
+        for row in rows:
+            result = {"bucket": row.pop("bucket").isoformat()[:10]}
+            for name, value in row.items():
+                if isinstance(value, timezone.timedelta):
+                    value = value.total_seconds()
+                result[name] = value
+            results.append(result)
+        return Response(
+            {
+                "endpoint": endpoint,
+                "field": field,
+                "bucket": bucket,
+                "tz": str(tz),
+                "results": results,
+            }
+        )
+
+    def get_metrics(self, model, value):
+        """
+        Parses a comma separated list of metrics into aggregate expressions.
+        """
+        metrics = {}
+        for metric in value.split(","):
+            metric = metric.strip()
+            if metric == "count":
+                metrics["count"] = Count("pk")
+                continue
+            function, _sep, name = metric.partition(":")
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if (
+                function not in self.functions
+                or field is None
+                or field.get_internal_type() not in self.numeric_fields
+            ):
+                raise ValidationError({"metric": f"Invalid metric: {metric}"})
+            if field.get_internal_type() == "DurationField":
+                expression = self.functions[function](
+                    name, output_field=DurationField()
+                )
+            else:
+                expression = self.functions[function](name)
+            metrics[f"{function}_{name}"] = expression
+        return metrics
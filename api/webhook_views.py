@@ -18,6 +18,7 @@ from rest_framework.response import Response
 
 from core.models import Child
 from core.analytics import BabyAnalytics
+from .alerts import evaluate_alerts, in_quiet_hours, render_alerts
 from .llm_messages import get_message_generator
 
 
@@ -260,11 +261,10 @@ def alerts_webhook(request):
     feeding_threshold = int(request.GET.get('feeding_threshold', 15))
     # sleep_threshold: אם לא הועבר במפורש, הסף נקבע דינמית לפי חלון
     # הערות של הגיל ושעת היום (ולא סף קבוע של שעה וחצי)
+    # אם התינוק/ת ישן/ה או אין תחזית שינה, הסף הדינמי נשאר None (מוחזר
+    # כ-null בסיכום ה-thresholds).
     sleep_threshold_param = request.GET.get('sleep_threshold')
-    # ברירת מחדל: אם התינוק/ת ישן/ה או אין תחזית שינה, בלוק חישוב השינה
-    # מדולג ו-sleep_threshold נשאר None (מוחזר כ-null בסיכום ה-thresholds).
-    # בלי זה — UnboundLocalError בכל קריאה בזמן שהתינוק/ת ישן/ה.
-    sleep_threshold = None
+    sleep_threshold = int(sleep_threshold_param) if sleep_threshold_param is not None else None
     diaper_threshold = int(request.GET.get('diaper_threshold', 180))
     medication_threshold = int(request.GET.get('medication_threshold', 0))
 
@@ -292,13 +292,9 @@ def alerts_webhook(request):
 
     # Check quiet hours
     current_hour = timezone.localtime().hour
-    is_quiet_hours = False
-
-    if respect_quiet_hours:
-        if quiet_hours_start > quiet_hours_end:
-            is_quiet_hours = current_hour >= quiet_hours_start or current_hour < quiet_hours_end
-        else:
-            is_quiet_hours = quiet_hours_start <= current_hour < quiet_hours_end
+    is_quiet_hours = respect_quiet_hours and in_quiet_hours(
+        current_hour, quiet_hours_start, quiet_hours_end
+    )
 
     if is_quiet_hours:
         return Response({
@@ -313,195 +309,28 @@ def alerts_webhook(request):
             },
         })
 
-    # Get analytics
-    analytics = BabyAnalytics(child)
-    status = analytics.get_current_status()
-
-    # Initialize LLM message generator
+    # Only the figures the checks need are computed, see evaluate_alerts.
     msg_gen = get_message_generator()
-
-    alerts = []
-
-    # Check feeding (skip if baby is currently being fed)
-    feeding_display = status.get('feeding_display_status')
-    is_currently_feeding = feeding_display and feeding_display.get('mode') == 'feeding'
-    next_feeding = status.get('next_feeding_prediction')
-    if next_feeding and not is_currently_feeding:
-        minutes_until = next_feeding.get('minutes_until_next', 0)
-        if minutes_until < -feeding_threshold:
-            alert_key = f'alert_feeding_{child.id}'
-
-            if cache.add(alert_key, True, timeout=snooze_minutes * 60):
-                alert_details = {
-                    'minutes_overdue': abs(minutes_until),
-                    'threshold_used': feeding_threshold,
-                }
-
-                cute_message = msg_gen.generate_alert_message(
-                    child_name=child.first_name,
-                    alert_type='feeding_overdue',
-                    details=alert_details,
-                    use_llm=use_llm
-                )
-
-                alerts.append({
-                    'type': 'feeding_overdue',
-                    'severity': 'high',
-                    'title': f'{child.first_name} רעבה!',
-                    'message': cute_message,
-                    'minutes_overdue': abs(minutes_until),
-                    'threshold_used': feeding_threshold,
-                })
-
-    # Check sleep (skip if baby is currently sleeping)
-    sleep_display = status.get('sleep_display_status')
-    is_currently_sleeping = sleep_display and sleep_display.get('mode') == 'sleeping'
-    next_sleep = status.get('next_sleep_prediction')
-    if next_sleep and not is_currently_sleeping:
-        minutes_awake = next_sleep.get('minutes_awake', 0)
-
-        if sleep_threshold_param is not None:
-            # Override מפורש - סף קבוע כמו קודם
-            sleep_threshold = int(sleep_threshold_param)
-            should_alert = minutes_awake > sleep_threshold
-            is_very_tired = should_alert
-        else:
-            # ברירת מחדל דינמית: לפי מיקום ביחס לחלון הערות.
-            # "עייפה" כשעברנו את קצה החלון, "עייפה מאוד" רק 15+ דקות אחריו.
-            alert_level = next_sleep.get('alert_level')
-            should_alert = alert_level in ('tired', 'very_tired')
-            is_very_tired = alert_level == 'very_tired'
-            sleep_threshold = next_sleep.get('wake_window', {}).get('max_minutes')
-
-        if should_alert:
-            alert_key = f'alert_sleep_{child.id}'
-
-            if cache.add(alert_key, True, timeout=snooze_minutes * 60):
-                alert_details = {
-                    'minutes_awake': minutes_awake,
-                    'threshold_used': sleep_threshold,
-                    'is_very_tired': is_very_tired,
-                }
-
-                cute_message = msg_gen.generate_alert_message(
-                    child_name=child.first_name,
-                    alert_type='overtired',
-                    details=alert_details,
-                    use_llm=use_llm
-                )
-
-                alerts.append({
-                    'type': 'overtired',
-                    'severity': 'high' if is_very_tired else 'medium',
-                    'title': (
-                        f'{child.first_name} עייפה מאוד!'
-                        if is_very_tired
-                        else f'{child.first_name} עייפה - הגיע זמן שינה'
-                    ),
-                    'message': cute_message,
-                    'minutes_awake': minutes_awake,
-                    'threshold_used': sleep_threshold,
-                })
-
-    # Check diaper
-    last_diaper = status.get('last_diaper')
-    if last_diaper:
-        minutes_since = last_diaper.get('time_since_minutes', 0)
-        if minutes_since > diaper_threshold:
-            alert_key = f'alert_diaper_{child.id}'
-
-            if cache.add(alert_key, True, timeout=snooze_minutes * 60):
-                alert_details = {
-                    'hours_since': last_diaper['time_since_hours'],
-                    'threshold_used': diaper_threshold,
-                }
-
-                cute_message = msg_gen.generate_alert_message(
-                    child_name=child.first_name,
-                    alert_type='diaper_overdue',
-                    details=alert_details,
-                    use_llm=use_llm
-                )
-
-                alerts.append({
-                    'type': 'diaper_overdue',
-                    'severity': 'medium',
-                    'title': 'זמן לחיתול',
-                    'message': cute_message,
-                    'hours_since': last_diaper['time_since_hours'],
-                    'threshold_used': diaper_threshold,
-                })
-
-    # Check medications
-    try:
-        from django.db.models import Q
-        from core.models import Medication
-
-        today = timezone.localdate()
-        now = timezone.now()
-
-        active_meds = Medication.objects.filter(
-            child=child,
-            active=True,
-            start_date__lte=today,
-        ).filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
-
-        next_med = None
-        next_time = None
-
-        for med in active_meds:
-            if not med.is_due_today():
-                continue
-            med_time = med.next_dose_time()
-            if not med_time:
-                continue
-            if next_time is None or med_time < next_time:
-                next_time = med_time
-                next_med = med
-
-        if next_med and next_time:
-            minutes_until = int((next_time - now).total_seconds() / 60)
-
-            if minutes_until <= medication_threshold:
-                alert_key = f'alert_medication_{child.id}_{next_med.id}'
-
-                if cache.add(alert_key, True, timeout=snooze_minutes * 60):
-                    alert_details = {
-                        'medication': {
-                            'id': next_med.id,
-                            'name': next_med.name,
-                            'dosage': next_med.dosage,
-                            'type': next_med.medication_type,
-                        },
-                        'next_dose_time': next_time.isoformat(),
-                        'minutes_until': minutes_until,
-                        'threshold_used': medication_threshold,
-                    }
-
-                    cute_message = msg_gen.generate_alert_message(
-                        child_name=child.first_name,
-                        alert_type='medication_due',
-                        details=alert_details,
-                        use_llm=use_llm
-                    )
-
-                    alerts.append({
-                        'type': 'medication_due',
-                        'severity': 'high' if minutes_until < 0 else 'medium',
-                        'title': 'זמן לתרופה',
-                        'message': cute_message,
-                        'medication': {
-                            'id': next_med.id,
-                            'name': next_med.name,
-                            'dosage': next_med.dosage,
-                            'type': next_med.medication_type,
-                        },
-                        'next_dose_time': next_time.isoformat(),
-                        'minutes_until': minutes_until,
-                        'threshold_used': medication_threshold,
-                    })
-    except Exception:
-        pass
+    candidates, thresholds = evaluate_alerts(
+        BabyAnalytics(child),
+        {
+            'feeding': feeding_threshold,
+            'sleep': sleep_threshold,
+            'diaper': diaper_threshold,
+            'medication': medication_threshold,
+        },
+    )
+    sleep_threshold = thresholds['sleep']
+
+    # Messages of all new alerts are generated together, in parallel.
+    alerts = render_alerts(
+        child,
+        [
+            alert for alert in candidates
+            if cache.add(f"alert_{alert['key']}_{child.id}", True, timeout=snooze_minutes * 60)
+        ],
+        use_llm,
+    )
 
     # No alerts
     if not alerts:
@@ -554,8 +383,7 @@ def medication_status_webhook(request):
     GET/POST /api/webhooks/medications/
     GET/POST /api/webhooks/medications/?child=emma
     """
-    from core.models import Medication, MedicationDose
-    from django.db.models import Q
+    from core.models import MedicationSlot
 
     child_slug = request.GET.get('child') or request.POST.get('child')
 
@@ -572,22 +400,18 @@ def medication_status_webhook(request):
     today = timezone.localdate()
     now = timezone.now()
 
-    # Get all active medications
-    active_medications = Medication.objects.filter(
-        child=child,
-        active=True,
-        start_date__lte=today
-    ).filter(
-        Q(end_date__isnull=True) | Q(end_date__gte=today)
-    )
+    # All active medications and their doses today (of the site's time zone,
+    # as medication schedules are), from one query
+    active_medications = MedicationSlot.status(MedicationSlot.for_day(child.id), now)
 
     medications_due = []
     next_medication = None
     earliest_time = None
 
-    for medication in active_medications:
-        if medication.is_due_today():
-            next_time = medication.next_dose_time()
+    for entry in active_medications:
+        medication = entry['medication']
+        if entry['due']:
+            next_time = entry['next_dose_time']
 
             med_info = {
                 'id': medication.id,
@@ -639,7 +463,7 @@ def medication_status_webhook(request):
         },
         'medications_due_today': medications_due,
         'next_medication': next_medication,
-        'total_active_medications': active_medications.count(),
+        'total_active_medications': len(active_medications),
         'message': message_text,
     }
 
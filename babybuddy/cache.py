@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+מטמון קבצים משותף לתהליכים
+A file-based cache tier safe to share between the worker processes of one
+host, the default cache of Baby Buddy
+"""
+
+import os
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # Windows, where only a single worker is supported.
+    fcntl = None
+
+# Number of lock files keys are spread over; keys sharing one only wait for
+# each other's add() and incr() calls.
+LOCK_STRIPES = 64
+
+
+class SharedFileBasedCache(FileBasedCache):
+    """
+    Django's FileBasedCache with add() and incr() made atomic across
+    processes by an exclusive lock on one of ``LOCK_STRIPES`` lock files in
+    the cache directory. Child data generations and the shared analytics lock
+    rely on these being atomic; get(), set() and delete() already are, since
+    set() replaces a key's file in one rename.
+    """
+
+    @contextmanager
+    def _lock(self, key, version=None):
+        if fcntl is None:
+            yield
+            return
+        fname = self._key_to_file(key, version)
+        stripe = zlib.crc32(os.path.basename(fname).encode()) % LOCK_STRIPES
+        self._createdir()
+        # Lock files don't end in .djcache, so clear() and culling skip them.
+        with open(os.path.join(self._dir, f"lock-{stripe}"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._lock(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._lock(key, version):
+            return super().incr(key, delta, version)
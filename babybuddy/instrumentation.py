@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+מדידת ביצועים לכל בקשה
+Per-request timings of named spans (DB queries, cache lookups, template
+rendering, dashboard cards, LLM calls) and rolling per-process statistics of
+them by endpoint, for InstrumentationMiddleware and its staff page
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# How many recent requests of each endpoint (and durations of each span) the
+# rolling statistics are computed from.
+WINDOW = 1000
+
+_recorder = ContextVar("babybuddy_instrumentation_recorder", default=None)
+
+_endpoints = {}
+_spans = {}
+_lock = threading.Lock()
+
+
+class Recorder:
+    """
+    The total duration in milliseconds and the number of occurrences of each
+    span of one request.
+    """
+
+    __slots__ = ("durations", "counts")
+
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, name, duration, count=1):
+        """
+        Add to a span.
+        :param name: the span name, e.g. "db" or "card-feeding_last".
+        :param duration: the duration in milliseconds.
+        :param count: how many occurrences the duration covers.
+        """
+        self.durations[name] = self.durations.get(name, 0) + duration
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def count(self, name, count=1):
+        """Count occurrences of something without a duration, e.g. cache hits."""
+        self.counts[name] = self.counts.get(name, 0) + count
+
+
+def active():
+    """:returns: the Recorder of the current request, or None."""
+    return _recorder.get()
+
+
+@contextmanager
+def recording():
+    """
+    Record the spans of the enclosed code, e.g. a request, in a new Recorder.
+    :returns: the Recorder.
+    """
+    recorder = Recorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed code as an occurrence of a span of the current request.
+    Does nothing outside of recording(), so it is free while instrumentation
+    is disabled.
+
+    Spans are kept in a context variable, so code run in other threads (e.g.
+    a thread pool) is not recorded; time the wait for it instead.
+    :param name: the span name.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, (time.perf_counter() - began) * 1000)
+
+
+def record(endpoint, total, recorder):
+    """
+    Add a request to the rolling statistics.
+    :param endpoint: the endpoint name, e.g. "GET children/<slug:slug>/".
+    :param total: the request duration in milliseconds.
+    :param recorder: the Recorder of the request.
+    """
+    with _lock:
+        if endpoint not in _endpoints:
+            _endpoints[endpoint] = deque(maxlen=WINDOW)
+        _endpoints[endpoint].append(total)
+        for name, duration in recorder.durations.items():
+            if name not in _spans:
+                _spans[name] = deque(maxlen=WINDOW)
+            _spans[name].append(duration)
+
+
+def reset():
+    """Forget the rolling statistics."""
+    with _lock:
+        _endpoints.clear()
+        _spans.clear()
+
+
+def summary():
+    """
+    Summarize the rolling statistics.
+    :returns: a dict with "endpoints" and "spans" lists of dicts of the name,
+              count, p50, p90, p99 and max in milliseconds, slowest p90 first.
+    """
+    with _lock:
+        endpoints = {name: list(values) for name, values in _endpoints.items()}
+        spans = {name: list(values) for name, values in _spans.items()}
+    return {
+        "endpoints": _summarize(endpoints),
+        "spans": _summarize(spans),
+    }
+
+
+def _percentile(values, percent):
+    """
+    Nearest-rank percentile.
+    :param values: a sorted, non-empty list.
+    :param percent: the percentile, 0 to 100.
+    """
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def _summarize(samples):
+    rows = []
+    for name, values in samples.items():
+        values.sort()
+        rows.append(
+            {
+                "name": name,
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p90": _percentile(values, 90),
+                "p99": _percentile(values, 99),
+                "max": values[-1],
+            }
+        )
+    rows.sort(key=lambda row: row["p90"], reverse=True)
+    return rows
@@ -1,11 +1,16 @@
+import json
 import logging
+from contextlib import ExitStack
+from contextvars import ContextVar
 from os import getenv
-from time import time
+from time import perf_counter, time
 from functools import wraps
 
 from urllib.parse import urlunsplit, urlsplit
 
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
 from django.utils import timezone, translation
 from django.contrib.auth.middleware import RemoteUserMiddleware
 from django.http import (
@@ -16,6 +21,8 @@ from django.http import (
 )
 from django.urls.base import set_script_prefix, get_script_prefix
 
+from babybuddy import instrumentation
+
 
 class UserLanguageMiddleware:
     """
@@ -64,6 +71,10 @@ class UserTimezoneMiddleware:
                 timezone.activate(user.settings.timezone)
             except ValueError:
                 pass
+        else:
+            # Don't keep the time zone of the last user served by this thread,
+            # e.g. for API requests authenticated by token in the view.
+            timezone.deactivate()
         return self.get_response(request)
 
 
@@ -226,3 +237,161 @@ class HomeAssistant:
                     )
 
         return response
+
+
+class InstrumentationMiddleware:
+    """
+    Measures where the time of each request goes: database queries, cache
+    lookups, template rendering and the spans timed with
+    `babybuddy.instrumentation.span()` (dashboard cards, LLM calls). The
+    measurements are added to the `Server-Timing` header, logged as one JSON
+    line per request to the `babybuddy.instrumentation` logger and kept as
+    rolling per-endpoint statistics for the staff instrumentation page.
+
+    The middleware is only added (as the first middleware) if the settings
+    variable `INSTRUMENTATION` is set to True.
+    """
+
+    logger = logging.getLogger("babybuddy.instrumentation")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            _instrument_cache(caches[alias])
+
+        began = perf_counter()
+        with instrumentation.recording() as recorder, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_time_query))
+            response = self.get_response(request)
+        total = (perf_counter() - began) * 1000
+
+        match = request.resolver_match
+        endpoint = "{} {}".format(
+            request.method, match.route if match else "(unresolved)"
+        )
+        instrumentation.record(endpoint, total, recorder)
+
+        timing = _server_timing(total, recorder)
+        if response.has_header("Server-Timing"):
+            timing = response["Server-Timing"] + ", " + timing
+        response["Server-Timing"] = timing
+
+        self.logger.info(
+            json.dumps(
+                {
+                    "endpoint": endpoint,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "total_ms": round(total, 1),
+                    "spans": {
+                        name: {
+                            "ms": round(duration, 1),
+                            "count": recorder.counts[name],
+                        }
+                        for name, duration in recorder.durations.items()
+                    },
+                    "cache_hits": recorder.counts.get("cache-hit", 0),
+                    "cache_misses": recorder.counts.get("cache-miss", 0),
+                }
+            )
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # Called last of the middlewares, just before the response renders.
+        began = perf_counter()
+        recorder = instrumentation.active()
+
+        def rendered(response):
+            recorder.add("template", (perf_counter() - began) * 1000)
+
+        if recorder is not None:
+            response.add_post_render_callback(rendered)
+        return response
+
+
+# Sentinel default of instrumented cache lookups, to tell misses from hits.
+_MISS = object()
+
+# Set while an instrumented cache lookup runs, so lookups the backend makes in
+# turn (e.g. DatabaseCache.get() calls get_many()) are not counted twice.
+_in_cache_lookup = ContextVar("babybuddy_in_cache_lookup", default=False)
+
+
+def _cache_lookup(lookup, keys, hits):
+    """
+    Time a cache lookup and count its hits and misses.
+    :param lookup: a callable doing the lookup.
+    :param keys: the number of keys looked up.
+    :param hits: a callable counting the hits in the lookup's result.
+    :returns: the lookup's result.
+    """
+    recorder = instrumentation.active()
+    if recorder is None or _in_cache_lookup.get():
+        return lookup()
+    token = _in_cache_lookup.set(True)
+    try:
+        with instrumentation.span("cache"):
+            result = lookup()
+    finally:
+        _in_cache_lookup.reset(token)
+    found = hits(result)
+    recorder.count("cache-hit", found)
+    recorder.count("cache-miss", keys - found)
+    return result
+
+
+def _instrument_cache(cache):
+    """
+    Wrap the lookups of a cache backend instance, once, to time them and count
+    hits and misses during recorded requests.
+    """
+    if getattr(cache, "_instrumented", False):
+        return
+    get, get_many = cache.get, cache.get_many
+
+    def instrumented_get(key, default=None, version=None):
+        value = _cache_lookup(
+            lambda: get(key, _MISS, version=version),
+            1,
+            lambda value: int(value is not _MISS),
+        )
+        return default if value is _MISS else value
+
+    def instrumented_get_many(keys, version=None):
+        keys = list(keys)
+        return _cache_lookup(lambda: get_many(keys, version=version), len(keys), len)
+
+    cache.get = instrumented_get
+    cache.get_many = instrumented_get_many
+    cache._instrumented = True
+
+
+def _server_timing(total, recorder):
+    """
+    Format the measurements of a request as a Server-Timing header value.
+    Dashboard card spans are left out as the dashboard views add them.
+    """
+    durations = recorder.durations
+    entries = [f"total;dur={total:.1f}"]
+    if "db" in durations:
+        queries = recorder.counts["db"]
+        entries.append(f'db;dur={durations["db"]:.1f};desc="{queries} queries"')
+    if "cache" in durations:
+        hits = recorder.counts.get("cache-hit", 0)
+        misses = recorder.counts.get("cache-miss", 0)
+        entries.append(
+            f'cache;dur={durations["cache"]:.1f};desc="{hits} hits, {misses} misses"'
+        )
+    for name in ("template", "llm"):
+        if name in durations:
+            entries.append(f"{name};dur={durations[name]:.1f}")
+    return ", ".join(entries)
+
+
+def _time_query(execute, sql, params, many, context):
+    with instrumentation.span("db"):
+        return execute(sql, params, many, context)
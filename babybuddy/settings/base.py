@@ -134,13 +134,59 @@ else:
 # Cache
 # https://docs.djangoproject.com/en/5.0/topics/cache/
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
-        "LOCATION": "cache_default",
-    }
+# CACHE_URL (redis:// or rediss://) selects a Redis-compatible server shared by
+# every worker. Otherwise CACHE_BACKEND picks a local tier: "file" (default,
+# shared by the workers of one host without a database round trip),
+# "database" (shared by workers on several hosts) or "memory" (in-process LRU,
+# single worker only). Child data generations and the shared analytics lock
+# need add() and incr() to be atomic across workers, which Redis, the database
+# and the file tier's locks (babybuddy.cache) all provide.
+
+CACHE_BACKENDS = {
+    "memory": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "babybuddy.cache.SharedFileBasedCache",
+    "database": "django.core.cache.backends.db.DatabaseCache",
 }
 
+if os.getenv("CACHE_URL"):
+    config = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL"),
+    }
+else:
+    cache_backend = os.getenv("CACHE_BACKEND") or "file"
+    config = {
+        "BACKEND": CACHE_BACKENDS[cache_backend],
+        "LOCATION": os.getenv("CACHE_LOCATION")
+        or {
+            "memory": "babybuddy",
+            "file": os.path.join(BASE_DIR, "data/cache"),
+            "database": "cache_default",
+        }[cache_backend],
+    }
+    if cache_backend != "database":
+        config["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES") or 1000)}
+CACHES = {"default": config}
+
+# Whether identical analytics computed at the same time by different worker
+# processes wait for one of them, through a lock in the cache. Concurrent
+# identical computations within a process are always coalesced.
+
+ANALYTICS_SHARED_SINGLE_FLIGHT = bool(
+    strtobool(os.environ.get("ANALYTICS_SHARED_SINGLE_FLIGHT") or "False")
+)
+
+
+# Instrumentation
+# Measures where the time of each request goes: DB queries, cache lookups,
+# template rendering, dashboard cards and LLM calls. See
+# babybuddy.middleware.InstrumentationMiddleware.
+
+INSTRUMENTATION = bool(strtobool(os.environ.get("INSTRUMENTATION") or "False"))
+
+if INSTRUMENTATION:
+    MIDDLEWARE.insert(0, "babybuddy.middleware.InstrumentationMiddleware")
+
 
 # WGSI
 # https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
@@ -398,7 +444,7 @@ REST_FRAMEWORK = {
         "rest_framework.filters.OrderingFilter",
     ],
     "DEFAULT_METADATA_CLASS": "api.metadata.APIMetadata",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.LimitOffsetOrKeysetPagination",
     "DEFAULT_PERMISSION_CLASSES": ["api.permissions.BabyBuddyDjangoModelPermissions"],
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -450,3 +496,21 @@ BABY_BUDDY = {
 ENABLE_HOME_ASSISTANT_SUPPORT = bool(
     strtobool(os.environ.get("ENABLE_HOME_ASSISTANT_SUPPORT") or "False")
 )
+
+# Alerts worker configuration
+# Webhook URLs the alerts_worker command pushes alerts to, and the secret their
+# bodies are signed with.
+
+ALERT_WEBHOOK_URLS = [
+    url.strip()
+    for url in (os.environ.get("ALERT_WEBHOOK_URLS") or "").split(",")
+    if url.strip()
+]
+
+ALERT_WEBHOOK_SECRET = os.environ.get("ALERT_WEBHOOK_SECRET") or ""
+
+# Change log retention
+# Days of saves and deletes kept for the API's sync endpoint and incremental
+# backups; the prune_change_log command deletes older changes. 0 keeps them all.
+
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get("CHANGE_LOG_RETENTION_DAYS") or 90)
@@ -10,6 +10,17 @@ PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.MD5PasswordHasher",
 ]
 
+# Cache
+# The database tier is rolled back with each test, so tests don't see each
+# other's cached values the way they would in a shared cache directory.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cache_default",
+    }
+}
+
 # Email
 # https://docs.djangoproject.com/en/5.0/topics/email/
 
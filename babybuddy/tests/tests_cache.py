@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import shutil
+import tempfile
+import unittest
+
+from django.test import SimpleTestCase
+
+from babybuddy import cache
+
+
+def _add(directory, results):
+    results.put(cache.SharedFileBasedCache(directory, {}).add("lock", True, 60))
+
+
+def _incr(directory, count):
+    shared = cache.SharedFileBasedCache(directory, {})
+    for _ in range(count):
+        shared.incr("generation")
+
+
+@unittest.skipIf(cache.fcntl is None, "file locks are not supported")
+class SharedFileBasedCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = cache.SharedFileBasedCache(self.directory, {})
+        self.context = multiprocessing.get_context("fork")
+
+    def run_processes(self, target, *args):
+        processes = [
+            self.context.Process(target=target, args=(self.directory, *args))
+            for _ in range(8)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+    def test_add_once_across_processes(self):
+        results = self.context.Queue()
+        self.run_processes(_add, results)
+        added = [results.get(timeout=5) for _ in range(8)]
+        self.assertEqual(added.count(True), 1)
+
+    def test_incr_across_processes(self):
+        self.cache.set("generation", 0, None)
+        self.run_processes(_incr, 25)
+        self.assertEqual(self.cache.get("generation"), 200)
+
+    def test_clear_keeps_working(self):
+        self.assertTrue(self.cache.add("lock", True))
+        self.cache.clear()
+        self.assertTrue(self.cache.add("lock", True))
+        self.assertFalse(self.cache.add("lock", True))
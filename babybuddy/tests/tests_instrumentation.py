@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client as HttpClient,
+    TestCase,
+    modify_settings,
+    override_settings,
+)
+
+from babybuddy import instrumentation
+from babybuddy.middleware import _instrument_cache
+from core.models import Child
+
+INSTRUMENTED = modify_settings(
+    MIDDLEWARE={"prepend": "babybuddy.middleware.InstrumentationMiddleware"}
+)
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        instrumentation.reset()
+        self.credentials = {"username": "staff", "password": "password"}
+        self.user = get_user_model().objects.create_user(
+            is_superuser=True, is_staff=True, **self.credentials
+        )
+        self.c = HttpClient()
+        self.c.login(**self.credentials)
+
+    def test_disabled(self):
+        page = self.c.get("/welcome/")
+        self.assertNotIn("Server-Timing", page)
+        self.assertEqual(instrumentation.summary()["endpoints"], [])
+
+    @INSTRUMENTED
+    def test_server_timing(self):
+        with self.assertLogs("babybuddy.instrumentation") as logs:
+            page = self.c.get("/welcome/")
+        self.assertEqual(page.status_code, 200)
+        timing = page["Server-Timing"]
+        self.assertTrue(timing.startswith("total;dur="))
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("template;dur=", timing)
+        self.assertIn('"endpoint": "GET welcome/"', logs.output[0])
+
+        summary = instrumentation.summary()
+        self.assertEqual(summary["endpoints"][0]["name"], "GET welcome/")
+        self.assertEqual(summary["endpoints"][0]["count"], 1)
+        self.assertIn("db", [row["name"] for row in summary["spans"]])
+
+    @INSTRUMENTED
+    def test_dashboard_card(self):
+        call_command("fake", verbosity=0, children=1, days=1)
+        child = Child.objects.first()
+        page = self.c.get("/children/{}/dashboard/cards/statistics/".format(child.slug))
+        # The card view's own timing comes first.
+        self.assertTrue(page["Server-Timing"].startswith("card-statistics;dur="))
+        self.assertIn(", total;dur=", page["Server-Timing"])
+        spans = [row["name"] for row in instrumentation.summary()["spans"]]
+        self.assertIn("card-statistics", spans)
+
+    def test_cache_lookups(self):
+        _instrument_cache(cache)
+        cache.set("instrumented", "value")
+        with instrumentation.recording() as recorder:
+            self.assertEqual(cache.get("instrumented"), "value")
+            self.assertEqual(cache.get("missing", "default"), "default")
+            self.assertEqual(
+                cache.get_many(["instrumented", "missing"]),
+                {"instrumented": "value"},
+            )
+        self.assertEqual(recorder.counts["cache"], 3)
+        self.assertEqual(recorder.counts["cache-hit"], 2)
+        self.assertEqual(recorder.counts["cache-miss"], 2)
+
+    def test_span(self):
+        with instrumentation.span("llm"):
+            pass
+        self.assertIsNone(instrumentation.active())
+        with instrumentation.recording() as recorder:
+            with instrumentation.span("llm"):
+                pass
+            with instrumentation.span("llm"):
+                pass
+        self.assertEqual(recorder.counts["llm"], 2)
+        self.assertGreaterEqual(recorder.durations["llm"], 0)
+
+    def test_summary(self):
+        recorder = instrumentation.Recorder()
+        for total in range(1, 101):
+            instrumentation.record("GET slow/", total, recorder)
+        instrumentation.record("GET fast/", 1, recorder)
+        endpoints = instrumentation.summary()["endpoints"]
+        self.assertEqual([row["name"] for row in endpoints], ["GET slow/", "GET fast/"])
+        self.assertEqual(endpoints[0]["p50"], 50)
+        self.assertEqual(endpoints[0]["p90"], 90)
+        self.assertEqual(endpoints[0]["p99"], 99)
+        self.assertEqual(endpoints[0]["max"], 100)
+
+    @override_settings(INSTRUMENTATION=True)
+    def test_instrumentation_page(self):
+        page = self.c.get("/instrumentation/")
+        self.assertEqual(page.status_code, 200)
+        self.assertNotContains(page, "Instrumentation is disabled")
+
+        self.user.is_staff = False
+        self.user.save()
+        page = self.c.get("/instrumentation/")
+        self.assertEqual(page.status_code, 403)
@@ -36,6 +36,7 @@ app_patterns = [
     ),
     path("", views.RootRouter.as_view(), name="root-router"),
     path("welcome/", views.Welcome.as_view(), name="welcome"),
+    path("instrumentation/", views.Instrumentation.as_view(), name="instrumentation"),
     path("users/", views.UserList.as_view(), name="user-list"),
     path("users/add/", views.UserAdd.as_view(), name="user-add"),
     path("users/<int:pk>/edit/", views.UserUpdate.as_view(), name="user-update"),
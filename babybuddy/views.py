@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import json
+import os
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth import update_session_auth_hash
@@ -37,7 +39,7 @@ from django.views.i18n import set_language
 from axes.utils import reset
 from django_filters.views import FilterView
 
-from babybuddy import forms
+from babybuddy import forms, instrumentation
 from babybuddy.mixins import LoginRequiredMixin, PermissionRequiredMixin, StaffOnlyMixin
 
 
@@ -102,6 +104,23 @@ class LogoutView(LogoutViewBase):
     pass
 
 
+class Instrumentation(StaffOnlyMixin, TemplateView):
+    """
+    Rolling request time statistics by endpoint and span, as recorded by
+    InstrumentationMiddleware in the process serving the page.
+    """
+
+    template_name = "babybuddy/instrumentation.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(instrumentation.summary())
+        context["enabled"] = settings.INSTRUMENTATION
+        context["pid"] = os.getpid()
+        context["window"] = instrumentation.WINDOW
+        return context
+
+
 class UserList(StaffOnlyMixin, BabyBuddyFilterView):
     model = get_user_model()
     template_name = "babybuddy/user_list.html"
@@ -3,14 +3,399 @@
 פונקציות אנליטיקה וחיזוי עבור Baby Buddy
 Analytics and prediction functions for tracking baby patterns
 """
+import copy
 import datetime
+import functools
 from datetime import timedelta
+from types import SimpleNamespace
 from typing import Dict, List, Optional, Tuple
 
-from django.db.models import Avg, Count, Sum, QuerySet
+from django.conf import settings
 from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.translation import get_language
 
 from api.llm_messages import format_time_since
+from core.utils import SingleFlight
+
+
+FEEDING_FIELDS = ("id", "start", "end", "duration", "type", "method", "amount")
+SLEEP_FIELDS = ("id", "start", "end", "duration", "nap")
+DIAPER_FIELDS = ("id", "time", "wet", "solid", "color", "amount")
+TIMER_FIELDS = ("id", "name", "start")
+WAKE_WINDOW_STATE_FIELDS = ("id", "anchor", "hours", "recent", "updated")
+FEEDING_PATTERN_STATE_FIELDS = (
+    "id",
+    "anchor",
+    "tracks",
+    "curve_date",
+    "curves",
+    "updated",
+)
+
+# שמות טיימרים (אנגלית ועברית) שמסמנים האכלה / שינה פעילה
+FEEDING_TIMER_NAMES = ("Feeding", "האכלה")
+SLEEP_TIMER_NAMES = ("Sleep", "שינה")
+
+
+def _rows(queryset, fields):
+    """
+    Runs a ``values()`` query and wraps each row for attribute access, so the
+    analytics code reads ``row.end`` whether or not a snapshot is in use.
+    """
+    return [SimpleNamespace(**row) for row in queryset.values(*fields)]
+
+
+def _first_row(queryset, fields, index: int = 0):
+    """The ``index``-th row of an ordered queryset, or None."""
+    rows = list(queryset.values(*fields)[index : index + 1])
+    return SimpleNamespace(**rows[0]) if rows else None
+
+
+class _SnapshotBatch:
+    """
+    טוען נתונים עבור כמה ילדים יחד
+    Loads snapshot rows for several children at once.
+
+    Each collection is fetched for every child in the batch with a single
+    query the first time any snapshot of the batch asks for it, then split
+    per child. The cost of a page that shows N children therefore grows with
+    the number of models read, not with N.
+    """
+
+    # Most recent rows kept per child when a window holds too few of them.
+    LATEST_ROWS = 2
+
+    def __init__(self, child_ids, since: datetime.datetime):
+        self.child_ids = list(child_ids)
+        self.since = since
+        self._loaded = {}
+
+    def rows(self, name: str, child_id: int) -> List[SimpleNamespace]:
+        if name not in self._loaded:
+            self._loaded[name] = self._group(*getattr(self, f"_{name}")())
+        return self._loaded[name].get(child_id, [])
+
+    @staticmethod
+    def _group(queryset, fields) -> Dict[int, List[SimpleNamespace]]:
+        grouped = {}
+        for row in queryset.values("child_id", *fields):
+            child_id = row.pop("child_id")
+            grouped.setdefault(child_id, []).append(SimpleNamespace(**row))
+        return grouped
+
+    def _latest(self, model):
+        from django.db.models import F, Window
+        from django.db.models.functions import RowNumber
+
+        return (
+            model.objects.filter(child_id__in=self.child_ids)
+            .annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=[F("child_id")],
+                    order_by=F("end").desc(),
+                )
+            )
+            .filter(row_number__lte=self.LATEST_ROWS)
+        )
+
+    def _feedings(self):
+        from core.models import Feeding
+
+        return (
+            Feeding.objects.filter(
+                child_id__in=self.child_ids, end__gte=self.since
+            ).order_by("start"),
+            FEEDING_FIELDS,
+        )
+
+    def _latest_feedings(self):
+        from core.models import Feeding
+
+        return self._latest(Feeding), FEEDING_FIELDS
+
+    def _sleeps(self):
+        from core.models import Sleep
+
+        return (
+            Sleep.objects.filter(
+                child_id__in=self.child_ids, end__gte=self.since
+            ).order_by("start"),
+            SLEEP_FIELDS,
+        )
+
+    def _latest_sleeps(self):
+        from core.models import Sleep
+
+        return self._latest(Sleep), SLEEP_FIELDS
+
+    def _diaper_changes(self):
+        from core.models import DiaperChange
+
+        return (
+            DiaperChange.objects.filter(
+                child_id__in=self.child_ids, time__gte=self.since
+            ).order_by("time"),
+            DIAPER_FIELDS,
+        )
+
+    def _active_timers(self):
+        from core.models import Timer
+
+        return (
+            Timer.objects.filter(child_id__in=self.child_ids, active=True).order_by(
+                "-start"
+            ),
+            TIMER_FIELDS,
+        )
+
+    def _wake_window_states(self):
+        from core.models import WakeWindowState
+
+        return (
+            WakeWindowState.objects.filter(child_id__in=self.child_ids),
+            WAKE_WINDOW_STATE_FIELDS,
+        )
+
+    def _feeding_pattern_states(self):
+        from core.models import FeedingPatternState
+
+        return (
+            FeedingPatternState.objects.filter(child_id__in=self.child_ids),
+            FEEDING_PATTERN_STATE_FIELDS,
+        )
+
+
+class ActivitySnapshot:
+    """
+    תמונת מצב של פעילות הילד ב-14 הימים האחרונים
+    In-memory snapshot of a child's recent activity.
+
+    Feedings, sleeps and diaper changes that ended inside the window, plus the
+    child's active timers, are each loaded with a single ``values()`` query
+    the first time they are needed. ``BabyAnalytics`` answers any question
+    whose time range falls inside the window from these rows instead of
+    issuing its own queries; "latest entry" lookups only fall back to the
+    database when the window holds no matching row.
+
+    Snapshots built with ``for_children`` share their queries: see
+    ``_SnapshotBatch``.
+    """
+
+    WINDOW_DAYS = 14
+
+    def __init__(
+        self,
+        child,
+        now: Optional[datetime.datetime] = None,
+        days: Optional[int] = None,
+        batch: Optional[_SnapshotBatch] = None,
+    ):
+        """
+        :param child: Child model instance
+        :param now: reference time of the snapshot (default: now)
+        :param days: window size in days (default: ``WINDOW_DAYS``)
+        :param batch: shared loader, set by ``for_children``
+        """
+        self.child = child
+        self.now = now or timezone.now()
+        self.since = self.now - timedelta(days=days or self.WINDOW_DAYS)
+        self._batch = batch
+
+    @classmethod
+    def for_children(
+        cls,
+        children,
+        now: Optional[datetime.datetime] = None,
+        days: Optional[int] = None,
+    ) -> List["ActivitySnapshot"]:
+        """
+        מחזיר תמונת מצב לכל ילד, עם שאילתה אחת לכל סוג נתונים
+        Returns one snapshot per child; all of them are loaded together with
+        one query per collection.
+        """
+        children = list(children)
+        now = now or timezone.now()
+        batch = _SnapshotBatch(
+            [child.id for child in children],
+            now - timedelta(days=days or cls.WINDOW_DAYS),
+        )
+        return [cls(child, now=now, days=days, batch=batch) for child in children]
+
+    def covers(self, since: datetime.datetime) -> bool:
+        """Whether every row at or after ``since`` is held by the snapshot."""
+        return since >= self.since
+
+    @cached_property
+    def feedings(self) -> List[SimpleNamespace]:
+        """Feedings that ended inside the window, ordered by start."""
+        if self._batch is not None:
+            return self._batch.rows("feedings", self.child.id)
+
+        from core.models import Feeding
+
+        return _rows(
+            Feeding.objects.filter(child=self.child, end__gte=self.since).order_by(
+                "start"
+            ),
+            FEEDING_FIELDS,
+        )
+
+    @cached_property
+    def latest_feedings(self) -> List[SimpleNamespace]:
+        """
+        The child's most recent feedings regardless of the window. Only
+        batched snapshots preload these; a single snapshot lets
+        ``BabyAnalytics`` query the database directly instead.
+        """
+        if self._batch is not None:
+            return self._batch.rows("latest_feedings", self.child.id)
+        return []
+
+    @cached_property
+    def sleeps(self) -> List[SimpleNamespace]:
+        """Sleep entries that ended inside the window, ordered by start."""
+        if self._batch is not None:
+            return self._batch.rows("sleeps", self.child.id)
+
+        from core.models import Sleep
+
+        return _rows(
+            Sleep.objects.filter(child=self.child, end__gte=self.since).order_by(
+                "start"
+            ),
+            SLEEP_FIELDS,
+        )
+
+    @cached_property
+    def latest_sleeps(self) -> List[SimpleNamespace]:
+        """The child's most recent sleep entries (see ``latest_feedings``)."""
+        if self._batch is not None:
+            return self._batch.rows("latest_sleeps", self.child.id)
+        return []
+
+    @cached_property
+    def diaper_changes(self) -> List[SimpleNamespace]:
+        """Diaper changes inside the window, ordered by time."""
+        if self._batch is not None:
+            return self._batch.rows("diaper_changes", self.child.id)
+
+        from core.models import DiaperChange
+
+        return _rows(
+            DiaperChange.objects.filter(
+                child=self.child, time__gte=self.since
+            ).order_by("time"),
+            DIAPER_FIELDS,
+        )
+
+    @cached_property
+    def active_timers(self) -> List[SimpleNamespace]:
+        """The child's active timers, most recently started first."""
+        if self._batch is not None:
+            return self._batch.rows("active_timers", self.child.id)
+
+        from core.models import Timer
+
+        return _rows(
+            Timer.objects.filter(child=self.child, active=True).order_by("-start"),
+            TIMER_FIELDS,
+        )
+
+    @cached_property
+    def wake_window_state(self):
+        """The child's learned wake windows (a ``WakeWindowState``)."""
+        from core.models import WakeWindowState
+
+        if self._batch is not None:
+            rows = self._batch.rows("wake_window_states", self.child.id)
+            if rows:
+                return WakeWindowState(child=self.child, **vars(rows[0]))
+        return WakeWindowState.for_child(self.child)
+
+    @cached_property
+    def feeding_pattern_state(self):
+        """The child's learned feeding pattern (a ``FeedingPatternState``)."""
+        from core.models import FeedingPatternState
+
+        if self._batch is not None:
+            rows = self._batch.rows("feeding_pattern_states", self.child.id)
+            if rows:
+                return FeedingPatternState(child=self.child, **vars(rows[0]))
+        return FeedingPatternState.for_child(self.child)
+
+    def by_recency(self, name: str) -> Tuple[List[SimpleNamespace], bool]:
+        """
+        Rows of the ``feedings`` or ``sleeps`` collection, newest end first,
+        topped up with the preloaded latest rows when the window is short.
+        The rows are always a complete prefix of the child's entries by end;
+        the flag tells whether they are all of the child's entries.
+        """
+        rows = getattr(self, name)
+        exhaustive = False
+        if self._batch is not None and len(rows) < _SnapshotBatch.LATEST_ROWS:
+            latest = getattr(self, f"latest_{name}")
+            seen = {row.id for row in rows}
+            rows = rows + [row for row in latest if row.id not in seen]
+            exhaustive = len(latest) < _SnapshotBatch.LATEST_ROWS
+        return sorted(rows, key=lambda row: row.end, reverse=True), exhaustive
+
+
+_flights = SingleFlight()
+
+
+def coalesced(method):
+    """
+    מאחד חישובים זהים שרצים במקביל
+    Makes concurrent identical calls of a ``BabyAnalytics`` entry point share
+    one computation.
+
+    Calls for the same child, data generation, arguments, language and time
+    zone (results hold translated text and local times) made while one is in
+    flight wait for it (see ``SingleFlight``); with the
+    ``ANALYTICS_SHARED_SINGLE_FLIGHT`` setting, across worker processes too.
+    Waiting callers get a copy of the result, so they may change it freely,
+    and adopt the snapshot it was computed from for their follow-up calls.
+    Calls on instances that already have a snapshot, and calls nested in a
+    coalesced call, are computed directly.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.snapshot is not None or self._in_flight:
+            return method(self, *args, **kwargs)
+
+        computed = []
+
+        def compute():
+            self._in_flight = True
+            try:
+                computed.append(method(self, *args, **kwargs))
+            finally:
+                self._in_flight = False
+            return computed[0], self.snapshot
+
+        key = (
+            method.__name__,
+            self.child.pk,
+            self.child.generation(),
+            args,
+            tuple(sorted(kwargs.items())),
+            get_language(),
+            timezone.get_current_timezone_name(),
+        )
+        result, snapshot = _flights.do(
+            key,
+            compute,
+            shared=getattr(settings, "ANALYTICS_SHARED_SINGLE_FLIGHT", False),
+        )
+        if computed:
+            return computed[0]
+        self.snapshot = snapshot
+        return copy.deepcopy(result)
+
+    return wrapper
 
 
 class BabyAnalytics:
@@ -19,14 +404,207 @@ class BabyAnalytics:
     Class for analyzing baby data and predicting patterns
     """
 
-    def __init__(self, child):
+    def __init__(self, child, snapshot: Optional[ActivitySnapshot] = None):
         """
         :param child: Child model instance
+        :param snapshot: optional ActivitySnapshot of the child; when set,
+            every method computes from it instead of querying the database.
         """
         self.child = child
+        self.snapshot = snapshot
+        self._in_flight = False
+
+    @classmethod
+    def for_children(cls, children) -> List["BabyAnalytics"]:
+        """
+        מחזיר מופע אנליטיקה לכל ילד, כשכולם חולקים את אותן שאילתות
+        Returns one analytics instance per child. Their snapshots are loaded
+        together (see ``ActivitySnapshot.for_children``), so computing the
+        same figures for every child costs one query per model in total.
+        """
+        return [
+            cls(snapshot.child, snapshot=snapshot)
+            for snapshot in ActivitySnapshot.for_children(children)
+        ]
+
+    # ==================== Data Access ====================
+
+    def _feeding_rows(
+        self,
+        since: datetime.datetime,
+        until: Optional[datetime.datetime] = None,
+        field: str = "start",
+        exclude_solids: bool = False,
+    ) -> List[SimpleNamespace]:
+        """
+        Feedings with ``since <= field <= until``, ordered by start.
+        """
+        if self.snapshot is not None and self.snapshot.covers(since):
+            rows = [
+                row
+                for row in self.snapshot.feedings
+                if getattr(row, field) >= since
+                and (until is None or getattr(row, field) <= until)
+            ]
+        else:
+            from core.models import Feeding
+
+            queryset = Feeding.objects.filter(
+                child=self.child, **{f"{field}__gte": since}
+            )
+            if until is not None:
+                queryset = queryset.filter(**{f"{field}__lte": until})
+            rows = _rows(queryset.order_by("start"), FEEDING_FIELDS)
+        if exclude_solids:
+            rows = [row for row in rows if row.type != "solid food"]
+        return rows
+
+    def _latest_feeding(
+        self, exclude_solids: bool = False, index: int = 0
+    ) -> Optional[SimpleNamespace]:
+        """The ``index``-th most recent feeding by end time (0 = last)."""
+        if self.snapshot is not None:
+            rows, exhaustive = self.snapshot.by_recency("feedings")
+            rows = [
+                row for row in rows if not exclude_solids or row.type != "solid food"
+            ]
+            if len(rows) > index:
+                return rows[index]
+            if exhaustive:
+                return None
+
+        from core.models import Feeding
+
+        queryset = Feeding.objects.filter(child=self.child)
+        if exclude_solids:
+            queryset = queryset.exclude(type="solid food")
+        return _first_row(queryset.order_by("-end"), FEEDING_FIELDS, index)
+
+    def _sleep_rows(
+        self,
+        since: datetime.datetime,
+        until: Optional[datetime.datetime] = None,
+        field: str = "start",
+    ) -> List[SimpleNamespace]:
+        """
+        Sleep entries with ``since <= field <= until``, ordered by start.
+        """
+        if self.snapshot is not None and self.snapshot.covers(since):
+            return [
+                row
+                for row in self.snapshot.sleeps
+                if getattr(row, field) >= since
+                and (until is None or getattr(row, field) <= until)
+            ]
+
+        from core.models import Sleep
+
+        queryset = Sleep.objects.filter(child=self.child, **{f"{field}__gte": since})
+        if until is not None:
+            queryset = queryset.filter(**{f"{field}__lte": until})
+        return _rows(queryset.order_by("start"), SLEEP_FIELDS)
+
+    def _latest_sleep(self, night_only: bool = False) -> Optional[SimpleNamespace]:
+        """
+        The most recent sleep entry by end time. With ``night_only`` only
+        completed night sleeps (nap=False with a duration) are considered.
+        """
+        if self.snapshot is not None:
+            rows, exhaustive = self.snapshot.by_recency("sleeps")
+            rows = [
+                row
+                for row in rows
+                if not night_only or (not row.nap and row.duration is not None)
+            ]
+            if rows:
+                return rows[0]
+            if exhaustive:
+                return None
+
+        from core.models import Sleep
+
+        queryset = Sleep.objects.filter(child=self.child)
+        if night_only:
+            queryset = queryset.filter(nap=False).exclude(duration=None)
+        return _first_row(queryset.order_by("-end"), SLEEP_FIELDS)
+
+    def _diaper_rows(
+        self,
+        since: datetime.datetime,
+        until: Optional[datetime.datetime] = None,
+    ) -> List[SimpleNamespace]:
+        """Diaper changes with ``since <= time <= until``, ordered by time."""
+        if self.snapshot is not None and self.snapshot.covers(since):
+            return [
+                row
+                for row in self.snapshot.diaper_changes
+                if row.time >= since and (until is None or row.time <= until)
+            ]
+
+        from core.models import DiaperChange
+
+        queryset = DiaperChange.objects.filter(child=self.child, time__gte=since)
+        if until is not None:
+            queryset = queryset.filter(time__lte=until)
+        return _rows(queryset.order_by("time"), DIAPER_FIELDS)
+
+    def _latest_diaper(self) -> Optional[SimpleNamespace]:
+        """The most recent diaper change."""
+        if self.snapshot is not None and self.snapshot.diaper_changes:
+            return self.snapshot.diaper_changes[-1]
+
+        from core.models import DiaperChange
+
+        return _first_row(
+            DiaperChange.objects.filter(child=self.child).order_by("-time"),
+            DIAPER_FIELDS,
+        )
+
+    def _active_timer(self, names) -> Optional[SimpleNamespace]:
+        """The most recently started active timer with one of ``names``."""
+        if self.snapshot is not None:
+            return next(
+                (row for row in self.snapshot.active_timers if row.name in names),
+                None,
+            )
+
+        from core.models import Timer
+
+        return _first_row(
+            Timer.objects.filter(
+                child=self.child, active=True, name__in=names
+            ).order_by("-start"),
+            TIMER_FIELDS,
+        )
+
+    def _wake_window_state(self):
+        """The child's learned wake windows, from the snapshot when in use."""
+        if self.snapshot is not None:
+            return self.snapshot.wake_window_state
+
+        from core.models import WakeWindowState
+
+        return WakeWindowState.for_child(self.child)
+
+    def _feeding_pattern_state(self):
+        """The child's learned feeding pattern, from the snapshot when in use."""
+        if self.snapshot is not None:
+            return self.snapshot.feeding_pattern_state
+
+        from core.models import FeedingPatternState
+
+        return FeedingPatternState.for_child(self.child)
+
+    @staticmethod
+    def _average_duration(rows) -> Optional[timedelta]:
+        durations = [row.duration for row in rows if row.duration is not None]
+        if not durations:
+            return None
+        return sum(durations, timedelta()) / len(durations)
 
     # ==================== Feeding Analytics ====================
 
+    @coalesced
     def get_feeding_stats(self, days: int = 7, exclude_solids: bool = False) -> Dict:
         """
         מחזיר סטטיסטיקות על האכלות בימים האחרונים
@@ -35,15 +613,10 @@ class BabyAnalytics:
         :param exclude_solids: when True, solid food tastings are ignored so
             that milk/formula intervals and amounts are not distorted.
         """
-        from core.models import Feeding
-
         cutoff = timezone.now() - timedelta(days=days)
-        feedings = Feeding.objects.filter(child=self.child, start__gte=cutoff)
-        if exclude_solids:
-            feedings = feedings.exclude(type="solid food")
-        feedings = feedings.order_by("start")
+        feeding_list = self._feeding_rows(cutoff, exclude_solids=exclude_solids)
 
-        if not feedings.exists():
+        if not feeding_list:
             return {
                 "count": 0,
                 "average_duration_minutes": 0,
@@ -53,13 +626,11 @@ class BabyAnalytics:
             }
 
         # חישוב ממוצעים
-        stats = feedings.aggregate(
-            avg_duration=Avg("duration"), total_amount=Sum("amount"), count=Count("id")
-        )
+        avg_duration = self._average_duration(feeding_list)
+        total_amount = sum(f.amount for f in feeding_list if f.amount is not None)
 
         # חישוב מרווח ממוצע בין האכלות
         intervals = []
-        feeding_list = list(feedings)
         for i in range(len(feeding_list) - 1):
             interval = feeding_list[i + 1].start - feeding_list[i].end
             intervals.append(interval.total_seconds() / 60)  # המרה לדקות
@@ -68,19 +639,17 @@ class BabyAnalytics:
 
         # ספירה לפי סוג
         by_type = {}
-        for feeding in feedings:
+        for feeding in feeding_list:
             type_name = feeding.type
             by_type[type_name] = by_type.get(type_name, 0) + 1
 
         return {
-            "count": stats["count"],
+            "count": len(feeding_list),
             "average_duration_minutes": (
-                stats["avg_duration"].total_seconds() / 60
-                if stats["avg_duration"]
-                else 0
+                avg_duration.total_seconds() / 60 if avg_duration else 0
             ),
             "average_interval_minutes": round(avg_interval, 1),
-            "total_amount": stats["total_amount"] or 0,
+            "total_amount": total_amount or 0,
             "by_type": by_type,
             "period_days": days,
         }
@@ -93,12 +662,7 @@ class BabyAnalytics:
         :param exclude_solids: when True, solid food tastings are ignored so
             the "last feeding" reflects the last milk/formula feeding.
         """
-        from core.models import Feeding
-
-        last_feeding_qs = Feeding.objects.filter(child=self.child)
-        if exclude_solids:
-            last_feeding_qs = last_feeding_qs.exclude(type="solid food")
-        last_feeding = last_feeding_qs.order_by("-end").first()
+        last_feeding = self._latest_feeding(exclude_solids=exclude_solids)
 
         if not last_feeding:
             return None
@@ -132,14 +696,8 @@ class BabyAnalytics:
 
         :param exclude_solids: when True, solid food tastings are ignored.
         """
-        from core.models import Feeding
-
-        previous_qs = Feeding.objects.filter(child=self.child)
-        if exclude_solids:
-            previous_qs = previous_qs.exclude(type="solid food")
         # Second most recent feeding (index 1).
-        previous_matches = list(previous_qs.order_by("-end")[1:2])
-        previous_feeding = previous_matches[0] if previous_matches else None
+        previous_feeding = self._latest_feeding(exclude_solids=exclude_solids, index=1)
 
         if not previous_feeding:
             return None
@@ -165,21 +723,30 @@ class BabyAnalytics:
             "amount_formatted": amount_formatted,
         }
 
+    @coalesced
     def predict_next_feeding(self, exclude_solids: bool = False) -> Optional[Dict]:
         """
         מנבא מתי תהיה ההאכלה הבאה בהתבסס על דפוסים
         Predicts when the next feeding will be based on patterns
 
+        The interval is the exponentially weighted mean of the learned
+        ``FeedingPatternState``, kept up to date on every save, so no feeding
+        history is read here.
+
         :param exclude_solids: when True, solid food tastings are ignored so the
             prediction is based purely on milk/formula feedings.
         """
-        stats = self.get_feeding_stats(days=7, exclude_solids=exclude_solids)
         last_feeding = self.get_last_feeding_info(exclude_solids=exclude_solids)
+        if not last_feeding:
+            return None
 
-        if not last_feeding or stats["count"] < 2:
+        learned = self._feeding_pattern_state().interval_estimate(
+            "milk" if exclude_solids else "all"
+        )
+        if not learned or learned["count"] < 2:
             return None
 
-        avg_interval_minutes = stats["average_interval_minutes"]
+        avg_interval_minutes = round(learned["mean_minutes"], 1)
         time_since_minutes = last_feeding["time_since_minutes"]
 
         # חישוב זמן משוער להאכלה הבאה
@@ -209,9 +776,11 @@ class BabyAnalytics:
             "minutes_until_next": round(minutes_until_next, 1),
             "estimated_time": next_feeding_time,
             "average_interval_minutes": avg_interval_minutes,
-            "confidence": "high" if stats["count"] >= 10 else "medium",
+            "interval_std_minutes": round(learned["std_minutes"], 1),
+            "confidence": "high" if learned["count"] >= 10 else "medium",
         }
 
+    @coalesced
     def get_feeding_day_summary(self, exclude_solids: bool = True) -> Dict:
         """
         מסכם את האכלות היום ומשווה לממוצע היומי של 7 הימים הקודמים
@@ -222,55 +791,42 @@ class BabyAnalytics:
             milk/formula amounts are not mixed with solids (whose "amount" is
             not comparable to millilitres of milk).
         """
-        from core.models import Feeding
+        from core.models import site_localtime
 
-        now = timezone.localtime()
+        # Totals and the baseline curve are read from the learned
+        # FeedingPatternState instead of the last 7 days of feedings. Its days
+        # are in the site's time zone, so "today" is too.
+        now = site_localtime()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_start = today_start - timedelta(days=7)
 
-        base_qs = Feeding.objects.filter(child=self.child)
-        if exclude_solids:
-            base_qs = base_qs.exclude(type="solid food")
+        state = self._feeding_pattern_state()
+        track = "milk" if exclude_solids else "all"
 
         # A feeding counts on the day it finished, matching the behaviour of the
         # existing "Recent Feedings" card (which groups by ``end``).
-        today_qs = base_qs.filter(end__gte=today_start, end__lte=now)
-        today = today_qs.aggregate(total=Sum("amount"), count=Count("id"))
-        today_amount = today["total"] or 0
-        today_count = today["count"] or 0
-
-        # Previous 7 full days are the comparison baseline.
-        prev_qs = base_qs.filter(end__gte=week_start, end__lt=today_start)
-        prev = prev_qs.aggregate(total=Sum("amount"), count=Count("id"))
-        prev_total = prev["total"] or 0
-        prev_count = prev["count"] or 0
-
-        # Divide only by days that actually have data so a short history (e.g. a
-        # newborn with two days of records) or an occasional empty day does not
-        # drag the average down. Dates are localized for a correct day boundary.
-        days_with_data = {
-            timezone.localtime(end).date()
-            for end in prev_qs.values_list("end", flat=True)
-        }
-        divisor = len(days_with_data) or 1
+        today = state.day(track, now.date())
+        today_amount = today["amount"]
+        today_count = today["count"]
 
-        avg_amount = prev_total / divisor
-        avg_count = prev_count / divisor
+        # Previous 7 full days are the comparison baseline. Divide only by days
+        # that actually have data so a short history (e.g. a newborn with two
+        # days of records) or an occasional empty day does not drag the
+        # average down.
+        baseline = state.baseline(track, now.date())
+        days_with_data = baseline["days"]
+        divisor = days_with_data or 1
+
+        avg_amount = baseline["amount"] / divisor
+        avg_count = baseline["count"] / divisor
 
         # Time-of-day aware comparison: how much was, on average, already eaten by
         # this time of day on the baseline days. This avoids the naive "today vs
         # full-day average", which would always look low in the morning.
         seconds_into_day = (now - today_start).total_seconds()
-        amount_by_now_per_day = {}
-        for end, amount in prev_qs.values_list("end", "amount"):
-            local_end = timezone.localtime(end)
-            day_start = local_end.replace(hour=0, minute=0, second=0, microsecond=0)
-            if (local_end - day_start).total_seconds() <= seconds_into_day:
-                amount_by_now_per_day[local_end.date()] = amount_by_now_per_day.get(
-                    local_end.date(), 0
-                ) + (amount or 0)
         expected_amount_by_now = (
-            sum(amount_by_now_per_day.values()) / divisor if days_with_data else 0
+            state.amount_by(baseline, seconds_into_day) / divisor
+            if days_with_data
+            else 0
         )
 
         # Pace status compares today's running total to what was typically eaten
@@ -293,26 +849,23 @@ class BabyAnalytics:
             "average_amount": round(avg_amount, 1),
             "average_count": round(avg_count, 1),
             "expected_amount_by_now": round(expected_amount_by_now, 1),
-            "baseline_days": len(days_with_data),
-            "has_baseline": len(days_with_data) > 0,
+            "baseline_days": days_with_data,
+            "has_baseline": days_with_data > 0,
             "pace_status": pace_status,
         }
 
     # ==================== Sleep Analytics ====================
 
+    @coalesced
     def get_sleep_stats(self, days: int = 7) -> Dict:
         """
         מחזיר סטטיסטיקות על שינה בימים האחרונים
         Returns sleep statistics for the last N days
         """
-        from core.models import Sleep
-
         cutoff = timezone.now() - timedelta(days=days)
-        sleep_entries = Sleep.objects.filter(
-            child=self.child, start__gte=cutoff
-        ).order_by("start")
+        sleep_entries = self._sleep_rows(cutoff)
 
-        if not sleep_entries.exists():
+        if not sleep_entries:
             return {
                 "count": 0,
                 "total_sleep_hours": 0,
@@ -322,35 +875,24 @@ class BabyAnalytics:
                 "average_nap_duration_minutes": 0,
             }
 
-        stats = sleep_entries.aggregate(
-            avg_duration=Avg("duration"),
-            total_duration=Sum("duration"),
-            count=Count("id"),
-        )
-
-        naps = sleep_entries.filter(nap=True)
-        night_sleep = sleep_entries.filter(nap=False)
+        naps = [s for s in sleep_entries if s.nap]
+        night_sleep = [s for s in sleep_entries if not s.nap]
 
-        total_hours = (
-            stats["total_duration"].total_seconds() / 3600
-            if stats["total_duration"]
-            else 0
+        total_duration = sum(
+            (s.duration for s in sleep_entries if s.duration is not None), timedelta()
         )
+        total_hours = total_duration.total_seconds() / 3600
         avg_hours_per_day = total_hours / days if days > 0 else 0
 
-        nap_avg = naps.aggregate(avg_duration=Avg("duration"))
-        nap_avg_minutes = (
-            nap_avg["avg_duration"].total_seconds() / 60
-            if nap_avg["avg_duration"]
-            else 0
-        )
+        nap_avg = self._average_duration(naps)
+        nap_avg_minutes = nap_avg.total_seconds() / 60 if nap_avg else 0
 
         return {
-            "count": stats["count"],
+            "count": len(sleep_entries),
             "total_sleep_hours": round(total_hours, 1),
             "average_sleep_hours_per_day": round(avg_hours_per_day, 1),
-            "naps_count": naps.count(),
-            "night_sleep_count": night_sleep.count(),
+            "naps_count": len(naps),
+            "night_sleep_count": len(night_sleep),
             "average_nap_duration_minutes": round(nap_avg_minutes, 1),
             "period_days": days,
         }
@@ -360,9 +902,7 @@ class BabyAnalytics:
         מחזיר מידע על שינה אחרונה
         Returns info about last sleep
         """
-        from core.models import Sleep
-
-        last_sleep = Sleep.objects.filter(child=self.child).order_by("-end").first()
+        last_sleep = self._latest_sleep()
 
         if not last_sleep:
             return None
@@ -484,6 +1024,10 @@ class BabyAnalytics:
     # בכמה דקות מקצרים את החלון אחרי תנומה קצרה או יום קשוח
     SHORT_NAP_WINDOW_REDUCTION = 15.0
 
+    # רווח סמך של כ-80% סביב חלון הערות החזוי
+    WAKE_WINDOW_INTERVAL_LEVEL = 0.8
+    WAKE_WINDOW_INTERVAL_Z = 1.28
+
     def _get_wake_window_adjustment(self, last_sleep: Optional[Dict]) -> float:
         """
         התאמת חלון הערות למצב היום (דקות, שלילי = קיצור).
@@ -492,8 +1036,6 @@ class BabyAnalytics:
         תנומה אחרונה קצרה, או יום קשוח (שתי תנומות קצרות ומעלה היום),
         מקצרים את החלון בכ-15 דקות.
         """
-        from core.models import Sleep
-
         if (
             last_sleep
             and last_sleep.get("was_nap")
@@ -504,112 +1046,25 @@ class BabyAnalytics:
         # יום קשוח: לפחות שתי תנומות קצרות מתחילת היום
         local_now = timezone.localtime()
         today_start = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
-        naps_today = Sleep.objects.filter(
-            child=self.child, nap=True, end__gte=today_start
-        ).exclude(duration=None)
         short_naps = sum(
             1
-            for nap in naps_today
-            if nap.duration.total_seconds() < self.SHORT_NAP_MINUTES * 60
+            for nap in self._sleep_rows(today_start, field="end")
+            if nap.nap
+            and nap.duration is not None
+            and nap.duration.total_seconds() < self.SHORT_NAP_MINUTES * 60
         )
         if short_naps >= 2:
             return -self.SHORT_NAP_WINDOW_REDUCTION
 
         return 0.0
 
-    def _calculate_wake_windows(self, days: int = 14) -> List[Dict]:
-        """
-        מחשב את חלונות הערות בפועל מנתוני השינה.
-        Calculates actual wake windows from sleep data.
-
-        חלון ערות = הזמן מסוף שינה אחת עד תחילת השינה הבאה.
-        Wake window = time from end of one sleep to start of next sleep.
-        """
-        from core.models import Sleep
-
-        cutoff = timezone.now() - timedelta(days=days)
-        sleep_entries = list(
-            Sleep.objects.filter(child=self.child, start__gte=cutoff)
-            .order_by("start")
-        )
-
-        if len(sleep_entries) < 2:
-            return []
-
-        wake_windows = []
-        for i in range(len(sleep_entries) - 1):
-            current_end = sleep_entries[i].end
-            next_start = sleep_entries[i + 1].start
-
-            wake_minutes = (next_start - current_end).total_seconds() / 60
-
-            # מסנן ערכים לא הגיוניים (למשל חפיפות או פערים מעל 12 שעות)
-            if wake_minutes < 5 or wake_minutes > 720:
-                continue
-
-            local_end = timezone.localtime(current_end)
-            hour_of_day = local_end.hour
-
-            wake_windows.append({
-                "wake_minutes": wake_minutes,
-                "hour_of_day": hour_of_day,
-                "date": local_end.date(),
-                "was_nap": sleep_entries[i].nap,
-                "next_was_nap": sleep_entries[i + 1].nap,
-                "sleep_duration_minutes": (
-                    sleep_entries[i].duration.total_seconds() / 60
-                    if sleep_entries[i].duration
-                    else 0
-                ),
-            })
-
-        return wake_windows
-
-    def _weighted_average_wake_window(
-        self, wake_windows: List[Dict], current_hour: Optional[int] = None
-    ) -> float:
-        """
-        ממוצע משוקלל של חלונות ערות.
-        Weighted average of wake windows with recency bias and time-of-day matching.
-
-        חלונות אחרונים מקבלים משקל גבוה יותר (דעיכה אקספוננציאלית).
-        חלונות בשעה דומה ביום מקבלים בונוס.
-        """
-        if not wake_windows:
-            return 0
-
-        now = timezone.localdate()
-        total_weight = 0.0
-        weighted_sum = 0.0
-
-        for ww in wake_windows:
-            # משקל לפי עדכניות (דעיכה אקספוננציאלית)
-            days_ago = (now - ww["date"]).days
-            recency_weight = 0.9 ** days_ago  # כל יום שעובר = 10% פחות משקל
-
-            # בונוס לשעה דומה ביום (±2 שעות)
-            time_weight = 1.0
-            if current_hour is not None:
-                hour_diff = abs(ww["hour_of_day"] - current_hour)
-                if hour_diff > 12:
-                    hour_diff = 24 - hour_diff
-                if hour_diff <= 2:
-                    time_weight = 1.5  # 50% בונוס לשעה דומה
-                elif hour_diff <= 4:
-                    time_weight = 1.2  # 20% בונוס לשעה קרובה
-
-            weight = recency_weight * time_weight
-            weighted_sum += ww["wake_minutes"] * weight
-            total_weight += weight
-
-        return weighted_sum / total_weight if total_weight > 0 else 0
-
+    @coalesced
     def predict_next_sleep(self) -> Optional[Dict]:
         """
         אלגוריתם חכם לחיזוי שינה - לומד מנתוני השינה בפועל.
         Smart sleep prediction algorithm - learns from actual sleep data.
 
-        שלב 1: מחשב חלונות ערות מנתונים היסטוריים (14 ימים)
+        שלב 1: קורא את חלונות הערות הנלמדים (WakeWindowState)
         שלב 2: ממוצע משוקלל עם דגש על ימים אחרונים ושעת היום
         שלב 3: משלב עם טווח מומלץ לפי גיל כ-fallback
         שלב 4: מחזיר חיזוי עם רמת ביטחון
@@ -630,8 +1085,13 @@ class BabyAnalytics:
         # ספירת ערות מאז סוף השינה האחרונה (לפי נתונים אמיתיים)
         time_awake_minutes = last_sleep["time_since_minutes"]
 
-        # שלב 1: חלונות ערות מהנתונים
-        wake_windows = self._calculate_wake_windows(days=14)
+        # שלב 1: חלונות ערות נלמדים - ממוצע משוקלל לפי עדכניות ושעת היום,
+        # מתעדכן בכל שמירה / מחיקה של שינה ולכן הקריאה כאן בזמן קבוע
+        # (השעות הנלמדות לפי אזור הזמן של האתר)
+        from core.models import site_localtime
+
+        learned = self._wake_window_state().estimate(site_localtime(now).hour)
+        sample_size = learned["sample_size"] if learned else 0
 
         # שלב 2: חלון ערות לפי גיל, מחולק לפי שעת היום
         # (חלון בוקר קצר, חלון לפני שנת לילה ארוך)
@@ -647,20 +1107,16 @@ class BabyAnalytics:
         window_midpoint = (window_min + window_max) / 2
 
         # שלב 3: חישוב נקודת הערכה בתוך החלון (לזמן שינה משוער)
-        if len(wake_windows) >= 5:
+        if sample_size >= 5:
             # מספיק נתונים - נשתמש בממוצע משוקלל
-            data_wake_window = self._weighted_average_wake_window(
-                wake_windows, current_hour
-            )
+            data_wake_window = learned["mean_minutes"]
             # משלב 70% נתונים + 30% חלון לפי גיל ושעה
             predicted_wake_window = (data_wake_window * 0.7) + (window_midpoint * 0.3)
             confidence = "high"
             data_source = "learned"
-        elif len(wake_windows) >= 2:
+        elif sample_size >= 2:
             # מעט נתונים - שילוב עם דגש על החלון המומלץ
-            data_wake_window = self._weighted_average_wake_window(
-                wake_windows, current_hour
-            )
+            data_wake_window = learned["mean_minutes"]
             predicted_wake_window = (data_wake_window * 0.4) + (window_midpoint * 0.6)
             confidence = "medium"
             data_source = "mixed"
@@ -725,15 +1181,30 @@ class BabyAnalytics:
 
         estimated_sleep_time = timezone.now() + timedelta(minutes=max(0, minutes_until_tired))
 
-        # סטטיסטיקות על חלונות ערות
+        # סטטיסטיקות על חלונות ערות ורווח סמך מהשונות הנלמדת:
+        # כ-80% מחלונות הערות נופלים בטווח של 1.28 סטיות תקן מהחיזוי
         ww_stats = {}
-        if wake_windows:
-            ww_values = [ww["wake_minutes"] for ww in wake_windows]
+        interval = None
+        if learned:
             ww_stats = {
-                "sample_size": len(wake_windows),
-                "average_minutes": round(sum(ww_values) / len(ww_values), 1),
-                "shortest_minutes": round(min(ww_values), 1),
-                "longest_minutes": round(max(ww_values), 1),
+                "sample_size": sample_size,
+                "average_minutes": round(learned["mean_minutes"], 1),
+                "std_minutes": round(learned["std_minutes"], 1),
+            }
+        if sample_size >= 2:
+            spread = self.WAKE_WINDOW_INTERVAL_Z * learned["std_minutes"]
+            interval_min = max(0.0, predicted_wake_window - spread)
+            interval_max = predicted_wake_window + spread
+            interval = {
+                "level": self.WAKE_WINDOW_INTERVAL_LEVEL,
+                "min_minutes": round(interval_min, 1),
+                "max_minutes": round(interval_max, 1),
+                "earliest_sleep_time": (
+                    now + timedelta(minutes=max(0, interval_min - time_awake_minutes))
+                ).isoformat(),
+                "latest_sleep_time": (
+                    now + timedelta(minutes=max(0, interval_max - time_awake_minutes))
+                ).isoformat(),
             }
 
         return {
@@ -757,21 +1228,21 @@ class BabyAnalytics:
                 "max_minutes": age_max,
             },
             "wake_window_stats": ww_stats,
+            "confidence_interval": interval,
         }
 
     # ==================== Diaper Change Analytics ====================
 
+    @coalesced
     def get_diaper_stats(self, days: int = 7) -> Dict:
         """
         מחזיר סטטיסטיקות על חיתולים
         Returns diaper change statistics
         """
-        from core.models import DiaperChange
-
         cutoff = timezone.now() - timedelta(days=days)
-        changes = DiaperChange.objects.filter(child=self.child, time__gte=cutoff)
+        changes = self._diaper_rows(cutoff)
 
-        if not changes.exists():
+        if not changes:
             return {
                 "count": 0,
                 "wet_count": 0,
@@ -779,14 +1250,14 @@ class BabyAnalytics:
                 "average_per_day": 0,
             }
 
-        wet_count = changes.filter(wet=True).count()
-        solid_count = changes.filter(solid=True).count()
+        wet_count = sum(1 for change in changes if change.wet)
+        solid_count = sum(1 for change in changes if change.solid)
 
         return {
-            "count": changes.count(),
+            "count": len(changes),
             "wet_count": wet_count,
             "solid_count": solid_count,
-            "average_per_day": round(changes.count() / days, 1),
+            "average_per_day": round(len(changes) / days, 1),
             "period_days": days,
         }
 
@@ -795,11 +1266,7 @@ class BabyAnalytics:
         מחזיר מידע על חיתול אחרון
         Returns info about last diaper change
         """
-        from core.models import DiaperChange
-
-        last_change = (
-            DiaperChange.objects.filter(child=self.child).order_by("-time").first()
-        )
+        last_change = self._latest_diaper()
 
         if not last_change:
             return None
@@ -819,15 +1286,22 @@ class BabyAnalytics:
 
     # ==================== Combined Analytics ====================
 
+    @coalesced
     def get_daily_summary(self, date: Optional[datetime.date] = None) -> Dict:
         """
         מחזיר סיכום יומי של כל הפעילויות
         Returns daily summary of all activities
+
+        Past days are read from their DailyRollup row, unless the active time
+        zone is not the one rollups are kept in. Today is always computed from
+        the entries.
         """
-        from core.models import Feeding, Sleep, DiaperChange
+        from core.models import DailyRollup
 
         if date is None:
             date = timezone.localdate()
+        elif date < timezone.localdate() and DailyRollup.in_current_time_zone():
+            return self._daily_summary_from_rollup(date)
 
         start_of_day = timezone.make_aware(
             datetime.datetime.combine(date, datetime.time.min)
@@ -837,19 +1311,13 @@ class BabyAnalytics:
         )
 
         # Feedings
-        feedings = Feeding.objects.filter(
-            child=self.child, start__gte=start_of_day, start__lte=end_of_day
-        )
+        feedings = self._feeding_rows(start_of_day, until=end_of_day)
 
         # Sleep
-        sleep_entries = Sleep.objects.filter(
-            child=self.child, start__gte=start_of_day, start__lte=end_of_day
-        )
+        sleep_entries = self._sleep_rows(start_of_day, until=end_of_day)
 
         # Diaper changes
-        diaper_changes = DiaperChange.objects.filter(
-            child=self.child, time__gte=start_of_day, time__lte=end_of_day
-        )
+        diaper_changes = self._diaper_rows(start_of_day, until=end_of_day)
 
         # חישובים
         total_feeding_duration = sum(
@@ -863,20 +1331,51 @@ class BabyAnalytics:
         return {
             "date": date.isoformat(),
             "feedings": {
-                "count": feedings.count(),
+                "count": len(feedings),
                 "total_duration_minutes": round(total_feeding_duration, 1),
                 "total_amount": total_feeding_amount,
             },
             "sleep": {
-                "count": sleep_entries.count(),
+                "count": len(sleep_entries),
                 "total_duration_minutes": round(total_sleep_duration, 1),
                 "total_duration_hours": round(total_sleep_duration / 60, 1),
-                "naps": sleep_entries.filter(nap=True).count(),
+                "naps": sum(1 for s in sleep_entries if s.nap),
+            },
+            "diapers": {
+                "count": len(diaper_changes),
+                "wet": sum(1 for d in diaper_changes if d.wet),
+                "solid": sum(1 for d in diaper_changes if d.solid),
+            },
+        }
+
+    def _daily_summary_from_rollup(self, date: datetime.date) -> Dict:
+        """
+        סיכום יומי של יום שעבר מתוך טבלת הסיכומים
+        Daily summary of a past day, read from its DailyRollup row.
+        """
+        from core.models import DailyRollup
+
+        rollup = DailyRollup.for_dates(self.child, [date])[date]
+        feeding_minutes = rollup.feeding_duration.total_seconds() / 60
+        sleep_minutes = rollup.sleep_duration.total_seconds() / 60
+
+        return {
+            "date": date.isoformat(),
+            "feedings": {
+                "count": rollup.feeding_count,
+                "total_duration_minutes": round(feeding_minutes, 1),
+                "total_amount": rollup.feeding_amount,
+            },
+            "sleep": {
+                "count": rollup.sleep_count,
+                "total_duration_minutes": round(sleep_minutes, 1),
+                "total_duration_hours": round(sleep_minutes / 60, 1),
+                "naps": rollup.nap_count,
             },
             "diapers": {
-                "count": diaper_changes.count(),
-                "wet": diaper_changes.filter(wet=True).count(),
-                "solid": diaper_changes.filter(solid=True).count(),
+                "count": rollup.diaper_count,
+                "wet": rollup.diaper_wet,
+                "solid": rollup.diaper_solid,
             },
         }
 
@@ -885,14 +1384,7 @@ class BabyAnalytics:
         מחזיר סטטוס האכלה - האם התינוק אוכל כרגע.
         Returns feeding status - whether the baby is currently being fed.
         """
-        from core.models import Timer
-
-        feeding_timer_names = ["Feeding", "האכלה"]
-        active_feeding_timer = Timer.objects.filter(
-            child=self.child,
-            active=True,
-            name__in=feeding_timer_names,
-        ).order_by("-start").first()
+        active_feeding_timer = self._active_timer(FEEDING_TIMER_NAMES)
 
         if active_feeding_timer:
             now = timezone.now()
@@ -924,19 +1416,12 @@ class BabyAnalytics:
         - good_morning: בוקר טוב (לפני 06:00 או לפני התנומה הראשונה)
         - good_night: לילה טוב (אחרי 18:00)
         """
-        from core.models import Sleep, Timer
-
         now = timezone.now()
         local_now = timezone.localtime(now)
         current_hour = local_now.hour
 
         # בדיקה אם יש טיימר שינה פעיל (התינוק ישן כרגע)
-        sleep_timer_names = ["Sleep", "שינה"]
-        active_sleep_timer = Timer.objects.filter(
-            child=self.child,
-            active=True,
-            name__in=sleep_timer_names,
-        ).order_by("-start").first()
+        active_sleep_timer = self._active_timer(SLEEP_TIMER_NAMES)
 
         # האם הילדה ישנה כרגע (יש טיימר שינה פעיל)?
         if active_sleep_timer:
@@ -960,10 +1445,9 @@ class BabyAnalytics:
             }
 
         # מחפשים את השינה האחרונה (ב-24 שעות אחרונות)
-        last_sleep = Sleep.objects.filter(
-            child=self.child,
-            end__gte=now - datetime.timedelta(hours=24),
-        ).order_by("-end").first()
+        last_sleep = self._latest_sleep()
+        if last_sleep and last_sleep.end < now - datetime.timedelta(hours=24):
+            last_sleep = None
 
         if last_sleep:
             # ערה - כמה זמן מאז שהתעוררה
@@ -1030,20 +1514,14 @@ class BabyAnalytics:
         mins = total_minutes % 60
         return "{}:{:02d}".format(hours, mins)
 
+    @coalesced
     def get_last_night_sleep(self) -> Optional[Dict]:
         """
         מחזיר את שינת הלילה האחרונה: מתי נרדמה ומתי קמה.
         Returns the most recent completed night sleep (nap=False): when the
         baby fell asleep (start) and woke up (end).
         """
-        from core.models import Sleep
-
-        last = (
-            Sleep.objects.filter(child=self.child, nap=False)
-            .exclude(duration=None)
-            .order_by("-end")
-            .first()
-        )
+        last = self._latest_sleep(night_only=True)
         if not last:
             return None
 
@@ -1060,6 +1538,7 @@ class BabyAnalytics:
             "duration_str": self._format_hhmm(duration_minutes),
         }
 
+    @coalesced
     def get_night_sleep_schedule(
         self, days: int = 14, limit: int = 7
     ) -> Optional[Dict]:
@@ -1071,14 +1550,16 @@ class BabyAnalytics:
         לכל לילה מוחזרים: שעת ההרדמה (start), שעת הקימה (end) ומשך שינת הלילה.
         בנוסף מחושבים ממוצעים של שעת ההרדמה, שעת הקימה ומשך שינת הלילה.
         """
-        from core.models import Sleep
-
         cutoff = timezone.now() - datetime.timedelta(days=days)
-        instances = (
-            Sleep.objects.filter(child=self.child, nap=False, end__gte=cutoff)
-            .exclude(duration=None)
-            .order_by("-end")[:limit]
-        )
+        instances = sorted(
+            (
+                s
+                for s in self._sleep_rows(cutoff, field="end")
+                if not s.nap and s.duration is not None
+            ),
+            key=lambda s: s.end,
+            reverse=True,
+        )[:limit]
 
         nights = []
         bedtime_minutes = []  # דקות ביחס לצהריים, כדי לטפל בהרדמות אחרי חצות
@@ -1128,11 +1609,18 @@ class BabyAnalytics:
             "avg_duration_str": self._format_hhmm(avg_duration),
         }
 
+    @coalesced
     def get_current_status(self) -> Dict:
         """
         מחזיר את המצב הנוכחי - מה קרה לאחרונה ומה צפוי להיות בקרוב
         Returns current status - what happened recently and what's coming
+
+        All sections are computed from one ActivitySnapshot, which is kept on
+        the instance so follow-up calls in the same request reuse it too.
         """
+        if self.snapshot is None:
+            self.snapshot = ActivitySnapshot(self.child)
+
         return {
             "last_feeding": self.get_last_feeding_info(),
             "next_feeding_prediction": self.predict_next_feeding(),
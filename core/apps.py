@@ -28,3 +28,7 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         post_migrate.connect(add_read_only_group_permissions, sender=self)
+
+        from core import signals
+
+        signals.connect()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Management command לבדיקת התראות ברקע ושליחתן ל-webhooks
+Evaluates the alerts of all children on a tick and pushes them to the
+configured webhook URLs
+"""
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.alerts import DEFAULT_THRESHOLDS, AlertWorker
+from api.llm_messages import get_message_generator
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the alerts of all children every interval and push new ones to "
+        "webhook URLs, retrying failed deliveries with backoff"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Seconds between ticks (default: 60)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run a single tick and exit",
+        )
+        parser.add_argument(
+            "--url",
+            action="append",
+            dest="urls",
+            help="Webhook URL to push alerts to; can be repeated "
+            "(default: ALERT_WEBHOOK_URLS)",
+        )
+        parser.add_argument(
+            "--feeding-threshold",
+            type=int,
+            default=DEFAULT_THRESHOLDS["feeding"],
+            help="Minutes overdue to trigger a feeding alert (default: 15)",
+        )
+        parser.add_argument(
+            "--sleep-threshold",
+            type=int,
+            default=DEFAULT_THRESHOLDS["sleep"],
+            help="Minutes awake to trigger an overtired alert (default: the "
+            "age and time-of-day wake window)",
+        )
+        parser.add_argument(
+            "--diaper-threshold",
+            type=int,
+            default=DEFAULT_THRESHOLDS["diaper"],
+            help="Minutes since the last diaper change to alert (default: 180)",
+        )
+        parser.add_argument(
+            "--medication-threshold",
+            type=int,
+            default=DEFAULT_THRESHOLDS["medication"],
+            help="Minutes before a dose to alert (default: 0)",
+        )
+        parser.add_argument(
+            "--snooze-minutes",
+            type=int,
+            default=30,
+            help="Minutes before the same alert is pushed again (default: 30)",
+        )
+        parser.add_argument(
+            "--quiet-hours-start",
+            type=int,
+            default=22,
+            help="Hour the quiet period starts (default: 22)",
+        )
+        parser.add_argument(
+            "--quiet-hours-end",
+            type=int,
+            default=7,
+            help="Hour the quiet period ends (default: 7)",
+        )
+        parser.add_argument(
+            "--ignore-quiet-hours",
+            action="store_true",
+            help="Push alerts during quiet hours too",
+        )
+        parser.add_argument(
+            "--no-llm",
+            action="store_true",
+            help="Use template messages instead of the LLM",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10,
+            help="Seconds to wait for each webhook request (default: 10)",
+        )
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or getattr(settings, "ALERT_WEBHOOK_URLS", [])
+        if not urls:
+            raise CommandError("No webhook URLs: pass --url or set ALERT_WEBHOOK_URLS")
+
+        worker = AlertWorker(
+            urls,
+            thresholds={
+                "feeding": options["feeding_threshold"],
+                "sleep": options["sleep_threshold"],
+                "diaper": options["diaper_threshold"],
+                "medication": options["medication_threshold"],
+            },
+            snooze_minutes=options["snooze_minutes"],
+            quiet_hours=(
+                None
+                if options["ignore_quiet_hours"]
+                else (options["quiet_hours_start"], options["quiet_hours_end"])
+            ),
+            use_llm=not options["no_llm"],
+            timeout=options["timeout"],
+        )
+
+        if options["once"]:
+            self.report(worker.tick())
+            return
+
+        if not options["no_llm"]:
+            # Pre-generate message templates so alerts rarely wait for the LLM.
+            get_message_generator().warm()
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.stdout.write(
+            f"🔔 Checking alerts every {options['interval']}s for {len(urls)} URL(s)"
+        )
+        while self.running:
+            started = time.monotonic()
+            self.report(worker.tick())
+            # Sleep in short steps so a stop signal is handled promptly.
+            while self.running and time.monotonic() - started < options["interval"]:
+                time.sleep(min(1, options["interval"]))
+        self.stdout.write(self.style.SUCCESS("✅ Alerts worker stopped"))
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def report(self, result):
+        if any(result.values()):
+            self.stdout.write(
+                f"- queued {result['queued']}, sent {result['sent']}, "
+                f"failed {result['failed']}"
+            )
@@ -2,17 +2,84 @@
 """
 Management command לגיבוי אוטומטי של בסיס הנתונים
 Automatic database backup management command
+
+Objects are streamed from the database in chunks and written one at a time,
+so memory use does not grow with the amount of data. The default JSON Lines
+format also supports incremental backups (changes since the last backup,
+including deletions) and is read back by the ``restore_database`` command.
 """
-import os
+import glob
+import gzip
 import json
-from datetime import datetime
+import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
 from django.core import serializers
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from core import models
 
+# מודלים לגיבוי, כל מודל אחרי המודלים שהוא מפנה אליהם
+# Backed up models, each after the models it refers to (the restore order).
+BACKUP_MODELS = [
+    models.Tag,
+    models.Child,
+    models.Medication,
+    models.Feeding,
+    models.Sleep,
+    models.DiaperChange,
+    models.TummyTime,
+    models.Temperature,
+    models.Weight,
+    models.Height,
+    models.HeadCircumference,
+    models.BMI,
+    models.Note,
+    models.Timer,
+    models.Pumping,
+    models.SolidFood,
+    models.MedicationDose,
+    models.Tagged,
+]
+
+CHUNK_SIZE = 2000
+
+COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def open_backup(path, mode):
+    """
+    פתיחת קובץ גיבוי לפי הסיומת שלו
+    Opens a backup file in text ``mode``, (de)compressing by its extension.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise CommandError(
+                "zstd compression requires the zstandard package "
+                "(pip install zstandard)"
+            )
+        return zstandard.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class _Counter:
+    """Counts the objects of an iterable as they are consumed."""
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.iterable:
+            self.count += 1
+            yield item
+
 
 class Command(BaseCommand):
     help = 'גיבוי אוטומטי של כל נתוני Baby Buddy / Backup all Baby Buddy data'
@@ -27,96 +94,222 @@ class Command(BaseCommand):
         parser.add_argument(
             '--format',
             type=str,
-            choices=['json', 'xml'],
-            default='json',
+            choices=['jsonl', 'json', 'xml'],
+            default='jsonl',
             help='פורמט הגיבוי / Backup format',
         )
+        parser.add_argument(
+            '--compress',
+            type=str,
+            choices=list(COMPRESSION_EXTENSIONS),
+            default='gzip',
+            help='דחיסה / Compression of the backup file',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'גיבוי שינויים מאז הגיבוי האחרון / '
+                'Only back up changes since the last backup in --output-dir'
+            ),
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help=(
+                'גיבוי שינויים מאז זמן מסוים / '
+                'Only back up changes since this ISO 8601 date and time'
+            ),
+        )
 
     def handle(self, *args, **options):
         output_dir = options['output_dir']
         backup_format = options['format']
 
+        since = self.get_since(options)
+        if since and backup_format != 'jsonl':
+            raise CommandError('Incremental backups require --format jsonl')
+        if since and not models.ChangeLog.covers(since):
+            raise CommandError(
+                'Changes since {} were pruned from the change log; '
+                'run a full backup'.format(since.isoformat())
+            )
+
         # יצירת תיקייה אם לא קיימת
         os.makedirs(output_dir, exist_ok=True)
 
-        # שם קובץ עם timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'babybuddy_backup_{timestamp}.{backup_format}'
-        filepath = os.path.join(output_dir, filename)
+        # זמן תחילת הגיבוי - שינויים מכאן והלאה ייכנסו לגיבוי הבא
+        backup_date = timezone.now()
+        timestamp = timezone.localtime(backup_date).strftime('%Y%m%d_%H%M%S')
+        name = f'babybuddy_backup_{timestamp}'
+        if since:
+            name += '_incremental'
+        filepath = os.path.join(
+            output_dir,
+            f'{name}.{backup_format}'
+            + COMPRESSION_EXTENSIONS[options['compress']],
+        )
 
         self.stdout.write(self.style.WARNING(f'מתחיל גיבוי... / Starting backup...'))
 
-        # רשימת כל המודלים לגיבוי
-        models_to_backup = [
-            models.Child,
-            models.Feeding,
-            models.Sleep,
-            models.DiaperChange,
-            models.TummyTime,
-            models.Temperature,
-            models.Weight,
-            models.Height,
-            models.HeadCircumference,
-            models.BMI,
-            models.Note,
-            models.Timer,
-            models.Pumping,
-            models.Tag,
-        ]
+        try:
+            with open_backup(filepath, 'wt') as stream:
+                if since:
+                    counts, deleted = self.write_changes(stream, since)
+                elif backup_format == 'jsonl':
+                    counts, deleted = self.write_jsonl(stream), 0
+                else:
+                    counts, deleted = self.write_document(stream, backup_format), 0
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ שגיאה בגיבוי / Backup error: {str(e)}')
+            )
+            raise
 
-        # איסוף כל הנתונים
-        all_objects = []
-        for model in models_to_backup:
-            objects = model.objects.all()
-            all_objects.extend(objects)
+        for model in BACKUP_MODELS:
             self.stdout.write(
-                f'  ✓ {model._meta.verbose_name_plural}: {objects.count()} רשומות'
+                f'  ✓ {model._meta.verbose_name_plural}: '
+                f'{counts[model._meta.model_name]} רשומות'
             )
 
-        # סיריאליזציה ושמירה
-        try:
-            serialized_data = serializers.serialize(backup_format, all_objects)
+        # חישוב גודל קובץ
+        file_size = os.path.getsize(filepath)
+        file_size_mb = file_size / (1024 * 1024)
+        total_records = sum(counts.values())
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✅ גיבוי הושלם בהצלחה! / Backup completed successfully!'
+            )
+        )
+        self.stdout.write(f'   קובץ: {filepath}')
+        self.stdout.write(f'   גודל: {file_size_mb:.2f} MB')
+        self.stdout.write(f'   סה"כ רשומות: {total_records}')
+        if since:
+            self.stdout.write(f'   נמחקו: {deleted}')
 
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(serialized_data)
+        # יצירת קובץ מטא-דאטה
+        metadata = {
+            'backup_date': backup_date.isoformat(),
+            'since': since.isoformat() if since else None,
+            'file': os.path.basename(filepath),
+            'total_records': total_records,
+            'deleted_records': deleted,
+            'file_size_bytes': file_size,
+            'format': backup_format,
+            'compression': options['compress'],
+            'models': counts,
+        }
 
-            # חישוב גודל קובץ
-            file_size = os.path.getsize(filepath)
-            file_size_mb = file_size / (1024 * 1024)
+        metadata_file = os.path.join(output_dir, f'{name}_metadata.json')
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'\n✅ גיבוי הושלם בהצלחה! / Backup completed successfully!'
+        self.stdout.write(f'   מטא-דאטה: {metadata_file}')
+
+        return f'Backup saved to {filepath}'
+
+    def get_since(self, options):
+        """
+        זמן ההתחלה של גיבוי מצטבר
+        The time an incremental backup starts from, or None for a full one.
+        """
+        if options.get('since'):
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since value: {options['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            return since
+
+        if not options['incremental']:
+            return None
+
+        dates = []
+        pattern = os.path.join(
+            options['output_dir'], 'babybuddy_backup_*_metadata.json'
+        )
+        for path in glob.glob(pattern):
+            with open(path, encoding='utf-8') as f:
+                backup_date = json.load(f).get('backup_date')
+            if backup_date:
+                dates.append(parse_datetime(backup_date))
+        if not dates:
+            raise CommandError(
+                'No previous backup found in {}; run a full backup first'.format(
+                    options['output_dir']
                 )
             )
-            self.stdout.write(f'   קובץ: {filepath}')
-            self.stdout.write(f'   גודל: {file_size_mb:.2f} MB')
-            self.stdout.write(f'   סה"כ רשומות: {len(all_objects)}')
-
-            # יצירת קובץ מטא-דאטה
-            metadata = {
-                'backup_date': datetime.now().isoformat(),
-                'total_records': len(all_objects),
-                'file_size_bytes': file_size,
-                'format': backup_format,
-                'models': {
-                    model._meta.model_name: model.objects.count()
-                    for model in models_to_backup
-                },
-            }
-
-            metadata_file = filepath.replace(
-                f'.{backup_format}', f'_metadata.json'
+        return max(dates)
+
+    @staticmethod
+    def write_jsonl(stream):
+        """כתיבת כל הרשומות, מודל אחרי מודל / Writes every object, model by model."""
+        serializer = serializers.get_serializer('jsonl')()
+        counts = {}
+        for model in BACKUP_MODELS:
+            objects = _Counter(
+                model.objects.order_by('pk').iterator(chunk_size=CHUNK_SIZE)
             )
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
+            serializer.serialize(objects, stream=stream)
+            counts[model._meta.model_name] = objects.count
+        return counts
 
-            self.stdout.write(f'   מטא-דאטה: {metadata_file}')
+    @staticmethod
+    def write_document(stream, backup_format):
+        """
+        כתיבת כל הרשומות כמסמך JSON/XML אחד
+        Writes every object as a single JSON or XML document, still streamed.
+        """
+        counters = [
+            _Counter(model.objects.order_by('pk').iterator(chunk_size=CHUNK_SIZE))
+            for model in BACKUP_MODELS
+        ]
+        serializers.serialize(
+            backup_format,
+            (obj for counter in counters for obj in counter),
+            stream=stream,
+        )
+        return {
+            model._meta.model_name: counter.count
+            for model, counter in zip(BACKUP_MODELS, counters)
+        }
 
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'❌ שגיאה בגיבוי / Backup error: {str(e)}')
-            )
-            raise
+    @staticmethod
+    def write_changes(stream, since):
+        """
+        כתיבת השינויים מאז ``since``
+        Writes the current state of objects saved since ``since``, followed
+        by a ``{"model", "pk", "deleted": true}`` line per deleted object.
+        """
+        saved = {}
+        deleted = []
+        for (model, pk), action in models.ChangeLog.changes(since).items():
+            if model not in BACKUP_MODELS:
+                continue
+            if action == models.ChangeLog.DELETE:
+                deleted.append((model, pk))
+            else:
+                saved.setdefault(model, []).append(pk)
 
-        return f'Backup saved to {filepath}'
+        serializer = serializers.get_serializer('jsonl')()
+        counts = {}
+        for model in BACKUP_MODELS:
+            pks = iter(sorted(saved.get(model, [])))
+            count = 0
+            while chunk := list(islice(pks, CHUNK_SIZE)):
+                objects = _Counter(model.objects.filter(pk__in=chunk).order_by('pk'))
+                serializer.serialize(objects, stream=stream)
+                count += objects.count
+            counts[model._meta.model_name] = count
+
+        # מחיקות בסדר הפוך, כך שרשומות תלויות נמחקות קודם
+        order = {model: index for index, model in enumerate(BACKUP_MODELS)}
+        for model, pk in sorted(deleted, key=lambda item: -order[item[0]]):
+            stream.write(
+                json.dumps(
+                    {'model': model._meta.label_lower, 'pk': pk, 'deleted': True}
+                )
+                + '\n'
+            )
+        return counts, len(deleted)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Management command למדידת ביצועי שאילתות נפוצות
+Benchmarks the timeline, card and analytics queries and shows their plans
+
+Populate a multi-year dataset first, e.g.:
+
+    python manage.py fake --children 3 --days 1100
+    python manage.py benchmark_queries
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from core import models
+
+
+class Command(BaseCommand):
+    help = "Time common per-child queries and print their database query plans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--child",
+            type=str,
+            help="Slug of the child to query (default: the child with most feedings)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="How many times each query is run",
+        )
+
+    def handle(self, *args, **options):
+        child = self.get_child(options.get("child"))
+        self.stdout.write(f"Child: {child.name()}\n")
+
+        for name, queryset in self.queries(child):
+            timings = []
+            for _ in range(options["repeat"]):
+                began = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - began) * 1000)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: median {statistics.median(timings):.2f} ms"
+                )
+            )
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
+
+    @staticmethod
+    def get_child(slug):
+        if slug:
+            try:
+                return models.Child.objects.get(slug=slug)
+            except models.Child.DoesNotExist:
+                raise CommandError(f"Child not found: {slug}")
+        child = (
+            models.Child.objects.annotate(feedings=Count("feeding"))
+            .order_by("-feedings")
+            .first()
+        )
+        if child is None:
+            raise CommandError("No children in the system")
+        return child
+
+    @staticmethod
+    def queries(child):
+        now = timezone.now()
+        day_start = timezone.localtime(now).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        week_ago = day_start - timezone.timedelta(days=6)
+        two_weeks_ago = now - timezone.timedelta(days=14)
+
+        return [
+            # Timeline: every event of one day.
+            (
+                "timeline feedings",
+                models.Feeding.objects.filter(
+                    child=child, start__gte=day_start, start__lt=now
+                ),
+            ),
+            (
+                "timeline sleep",
+                models.Sleep.objects.filter(
+                    child=child, start__gte=day_start, start__lt=now
+                ),
+            ),
+            (
+                "timeline diaper changes",
+                models.DiaperChange.objects.filter(child=child, time__gte=day_start),
+            ),
+            (
+                "timeline tummy time",
+                models.TummyTime.objects.filter(child=child, start__gte=day_start),
+            ),
+            (
+                "timeline notes",
+                models.Note.objects.filter(child=child, time__gte=day_start),
+            ),
+            # Cards.
+            (
+                "card diaper types (7 days)",
+                models.DiaperChange.objects.filter(child=child, time__gt=week_ago),
+            ),
+            (
+                "card naps today",
+                models.Sleep.objects.filter(
+                    child=child, nap=True, start__gte=day_start
+                ),
+            ),
+            (
+                "card last temperature",
+                models.Temperature.objects.filter(child=child).order_by("-time")[:1],
+            ),
+            (
+                "card active timers",
+                models.Timer.objects.filter(child=child, active=True),
+            ),
+            # Analytics.
+            (
+                "analytics last feeding",
+                models.Feeding.objects.filter(child=child).order_by("-end")[:1],
+            ),
+            (
+                "analytics feedings (14 days)",
+                models.Feeding.objects.filter(
+                    child=child, end__gte=two_weeks_ago
+                ).order_by("start"),
+            ),
+            (
+                "analytics sleep (14 days)",
+                models.Sleep.objects.filter(
+                    child=child, end__gte=two_weeks_ago
+                ).order_by("start"),
+            ),
+            (
+                "analytics medication doses today",
+                models.MedicationDose.objects.filter(child=child, time__gte=day_start),
+            ),
+        ]
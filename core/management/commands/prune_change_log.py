@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Management command לניקוי יומן השינויים
+Deletes the change log rows older than the retention period
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the saves and deletes recorded in the change log before the "
+        "retention period (settings.CHANGE_LOG_RETENTION_DAYS)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help="Days of changes to keep (default: CHANGE_LOG_RETENTION_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days < 0:
+            raise CommandError("--days must not be negative")
+        if days == 0:
+            self.stdout.write("Change log retention is disabled; nothing pruned")
+            return
+
+        count = ChangeLog.prune(timezone.now() - timedelta(days=days))
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Pruned {count} changes older than {days} days")
+        )
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Management command לבנייה מחדש של סיכומים יומיים
+Rebuilds the per-child DailyRollup, WakeWindowState, FeedingPatternState and
+MedicationSlot tables from raw entries
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import (
+    Child,
+    DailyRollup,
+    FeedingPatternState,
+    MedicationSlot,
+    WakeWindowState,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily rollups, learned sleep and feeding patterns and "
+        "medication schedule of all (or one) children from raw entries"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--child",
+            type=str,
+            help="Slug of the child to rebuild (default: all children)",
+        )
+
+    def handle(self, *args, **options):
+        children = Child.objects.all()
+        if options.get("child"):
+            children = children.filter(slug=options["child"])
+            if not children.exists():
+                raise CommandError(f"Child not found: {options['child']}")
+
+        for child in children:
+            count = self.rebuild(child)
+            WakeWindowState.rebuild(child.id)
+            FeedingPatternState.rebuild(child.id)
+            MedicationSlot.rebuild(child.id)
+            self.stdout.write(f"- {child.name()}: {count} days")
+
+        self.stdout.write(
+            self.style.SUCCESS("✅ Daily rollups and learned patterns rebuilt")
+        )
+
+    @staticmethod
+    def rebuild(child):
+        """
+        Reads each model's entries for the child once, groups them by date in
+        the site's time zone and replaces the child's rollups in a single bulk insert.
+        """
+        days = {}
+        for section, (model, field, fields) in DailyRollup.SECTIONS.items():
+            entries = {}
+            for entry in model.objects.filter(child=child).values(field, *fields):
+                date = DailyRollup.local_date(entry.pop(field))
+                entries.setdefault(date, []).append(entry)
+            for date, day_entries in entries.items():
+                rollup = days.setdefault(date, DailyRollup(child=child, date=date))
+                values = DailyRollup.section_values(section, day_entries)
+                for name, value in values.items():
+                    setattr(rollup, name, value)
+
+        with transaction.atomic():
+            DailyRollup.objects.filter(child=child).delete()
+            DailyRollup.objects.bulk_create(days.values(), batch_size=500)
+        return len(days)
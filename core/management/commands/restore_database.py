@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Management command לשחזור גיבוי JSON Lines
+Restores a JSON Lines backup written by the backup_database command
+
+Full and incremental backups are read one line at a time, so memory use does
+not grow with the size of the backup. Restore a full backup first, then its
+incremental backups in the order they were taken. JSON and XML backups can be
+restored with Django's ``loaddata`` command.
+"""
+
+import json
+from collections import Counter
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from core import models
+from core.management.commands.backup_database import BACKUP_MODELS, open_backup
+
+
+class Command(BaseCommand):
+    help = "שחזור גיבוי של Baby Buddy / Restore a Baby Buddy JSON Lines backup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "backup_file",
+            type=str,
+            help="קובץ הגיבוי / Backup file (.jsonl, .jsonl.gz or .jsonl.zst)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["backup_file"]
+        if ".jsonl" not in path:
+            raise CommandError(
+                "Only JSON Lines backups can be restored; use loaddata for "
+                "JSON and XML backups"
+            )
+
+        self.stdout.write(self.style.WARNING("מתחיל שחזור... / Starting restore..."))
+
+        restored = Counter()
+        deleted = 0
+        try:
+            with open_backup(path, "rt") as stream, transaction.atomic():
+                for line in stream:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("deleted"):
+                        model = apps.get_model(data["model"])
+                        model.objects.filter(pk=data["pk"]).delete()
+                        deleted += 1
+                        continue
+                    for obj in serializers.deserialize("python", [data]):
+                        obj.save()
+                        restored[obj.object._meta.model_name] += 1
+                self.reset_sequences()
+        except FileNotFoundError:
+            raise CommandError(f"Backup file not found: {path}")
+
+        for model in BACKUP_MODELS:
+            if restored[model._meta.model_name]:
+                self.stdout.write(
+                    f"  ✓ {model._meta.verbose_name_plural}: "
+                    f"{restored[model._meta.model_name]} רשומות"
+                )
+
+        # שחזור עוקף את ה-signals, לכן בונים מחדש נתונים נגזרים
+        for child_id in models.Child.objects.values_list("pk", flat=True):
+            models.Child.bump_generation(child_id)
+        call_command("rebuild_rollups", stdout=self.stdout)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "\n✅ שחזור הושלם בהצלחה! / Restore completed successfully!"
+            )
+        )
+        self.stdout.write(f'   סה"כ רשומות: {sum(restored.values())}')
+        self.stdout.write(f"   נמחקו: {deleted}")
+
+    @staticmethod
+    def reset_sequences():
+        """Moves primary key sequences past the restored ids, as loaddata does."""
+        statements = connection.ops.sequence_reset_sql(no_style(), BACKUP_MODELS)
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
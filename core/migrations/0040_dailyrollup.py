@@ -0,0 +1,74 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:00
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0039_alter_solidfood_amount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                ("feeding_count", models.PositiveIntegerField(default=0)),
+                (
+                    "feeding_duration",
+                    models.DurationField(default=datetime.timedelta),
+                ),
+                ("feeding_amount", models.FloatField(default=0)),
+                ("feeding_by_type", models.JSONField(default=dict)),
+                ("feeding_by_method", models.JSONField(default=dict)),
+                ("sleep_count", models.PositiveIntegerField(default=0)),
+                ("sleep_duration", models.DurationField(default=datetime.timedelta)),
+                ("nap_count", models.PositiveIntegerField(default=0)),
+                ("nap_duration", models.DurationField(default=datetime.timedelta)),
+                ("diaper_count", models.PositiveIntegerField(default=0)),
+                ("diaper_wet", models.PositiveIntegerField(default=0)),
+                ("diaper_solid", models.PositiveIntegerField(default=0)),
+                ("diaper_empty", models.PositiveIntegerField(default=0)),
+                ("tummytime_count", models.PositiveIntegerField(default=0)),
+                (
+                    "tummytime_duration",
+                    models.DurationField(default=datetime.timedelta),
+                ),
+                ("medication_doses", models.PositiveIntegerField(default=0)),
+                ("medication_skipped", models.PositiveIntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "child",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily rollup",
+                "verbose_name_plural": "Daily rollups",
+                "ordering": ["-date"],
+                "default_permissions": ("view",),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("child", "date"), name="unique_child_date_rollup"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0040_dailyrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="diaperchange",
+            index=models.Index(
+                fields=["child", "time"], name="diaperchange_child_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feeding",
+            index=models.Index(
+                fields=["child", "start"], name="feeding_child_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feeding",
+            index=models.Index(fields=["child", "end"], name="feeding_child_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="solidfood",
+            index=models.Index(
+                fields=["child", "time"], name="solidfood_child_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(fields=["child", "time"], name="note_child_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pumping",
+            index=models.Index(
+                fields=["child", "start"], name="pumping_child_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pumping",
+            index=models.Index(fields=["child", "end"], name="pumping_child_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sleep",
+            index=models.Index(fields=["child", "start"], name="sleep_child_start_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sleep",
+            index=models.Index(fields=["child", "end"], name="sleep_child_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sleep",
+            index=models.Index(
+                fields=["child", "nap", "start"], name="sleep_child_nap_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="temperature",
+            index=models.Index(
+                fields=["child", "time"], name="temperature_child_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["child", "active"], name="timer_child_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tummytime",
+            index=models.Index(
+                fields=["child", "start"], name="tummytime_child_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tummytime",
+            index=models.Index(fields=["child", "end"], name="tummytime_child_end_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="medicationdose",
+            index=models.Index(
+                fields=["child", "time"], name="medicationdose_child_time_idx"
+            ),
+        ),
+    ]
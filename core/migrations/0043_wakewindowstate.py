@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0042_changelog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WakeWindowState",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("anchor", models.DateField(blank=True, null=True)),
+                ("hours", models.JSONField(default=dict)),
+                ("recent", models.JSONField(default=dict)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "child",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="wake_window_state",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Wake window state",
+                "verbose_name_plural": "Wake window states",
+                "default_permissions": ("view",),
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0043_wakewindowstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedingPatternState",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("anchor", models.DateField(blank=True, null=True)),
+                ("tracks", models.JSONField(default=dict)),
+                ("curve_date", models.DateField(blank=True, null=True)),
+                ("curves", models.JSONField(default=dict)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "child",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feeding_pattern_state",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Feeding pattern state",
+                "verbose_name_plural": "Feeding pattern states",
+                "default_permissions": ("view",),
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0044_feedingpatternstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertSnooze",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64, verbose_name="Alert")),
+                ("until", models.DateTimeField(verbose_name="Until")),
+                (
+                    "child",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alert_snoozes",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Alert snooze",
+                "verbose_name_plural": "Alert snoozes",
+                "default_permissions": ("view",),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("child", "key"), name="unique_child_alert_snooze"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="AlertOutbox",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.URLField(max_length=500, verbose_name="URL")),
+                ("payload", models.JSONField(verbose_name="Payload")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Attempts"),
+                ),
+                (
+                    "next_attempt",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Next attempt",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Last error"),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "sent",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Sent"),
+                ),
+                (
+                    "child",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alert_outbox",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Queued alert",
+                "verbose_name_plural": "Queued alerts",
+                "ordering": ["next_attempt", "id"],
+                "default_permissions": ("view",),
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt"],
+                        name="alertoutbox_due_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0045_alertsnooze_alertoutbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MedicationSlot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "time",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Time"),
+                ),
+                ("due", models.BooleanField(default=True, verbose_name="Due")),
+                (
+                    "fulfilled",
+                    models.BooleanField(default=False, verbose_name="Fulfilled"),
+                ),
+                (
+                    "child",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="medication_slots",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+                (
+                    "medication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slots",
+                        to="core.medication",
+                        verbose_name="Medication",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Medication slot",
+                "verbose_name_plural": "Medication slots",
+                "ordering": ["date", "time"],
+                "default_permissions": ("view",),
+                "indexes": [
+                    models.Index(
+                        fields=["child", "date"],
+                        name="medicationslot_child_date_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0046_medicationslot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MedicationDay",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "child",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="medication_days",
+                        to="core.child",
+                        verbose_name="Child",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Medication day",
+                "verbose_name_plural": "Medication days",
+                "default_permissions": ("view",),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("child", "date"),
+                        name="unique_child_date_medication_day",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
+import bisect
 import datetime
 import re
+import time
 
+from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db.utils import OperationalError
-from django.db import models
+from django.db import models, transaction
 from django.db.models.functions import Lower
+from django.dispatch import Signal
 from django.utils import timezone
 from django.utils.text import format_lazy, slugify
 from django.utils.translation import gettext_lazy as _
@@ -18,6 +22,17 @@ from babybuddy.site_settings import NapSettings
 from core.utils import random_color, timezone_aware_duration
 
 
+def site_localtime(value=None):
+    """
+    Convert a datetime to the site's time zone (``settings.TIME_ZONE``) rather
+    than the one activated for the user. Stored per-day data is keyed by these
+    days, so every user writes and reads the same days of a child.
+    :param value: a timezone aware datetime instance (default: now).
+    :return: a timezone aware datetime instance.
+    """
+    return timezone.localtime(value, timezone.get_default_timezone())
+
+
 def validate_date(date, field_name):
     """
     Confirm that a date is not in the future.
@@ -58,6 +73,9 @@ def validate_unique_period(queryset, model):
     :param model: a model instance with 'start' and 'end' attributes
     :return:
     """
+    # Batch validation checks all periods of a batch at once instead.
+    if getattr(model, "unique_period_checked", False):
+        return
     if model.id:
         queryset = queryset.exclude(id=model.id)
     if model.start and model.end:
@@ -214,10 +232,13 @@ class Child(models.Model):
         self.slug = slugify(self, allow_unicode=True)
         super(Child, self).save(*args, **kwargs)
         cache.set(self.cache_key_count, Child.objects.count(), None)
+        Child.bump_generation(self.pk)
 
     def delete(self, using=None, keep_parents=False):
+        pk = self.pk
         super(Child, self).delete(using, keep_parents)
         cache.set(self.cache_key_count, Child.objects.count(), None)
+        Child.bump_generation(pk)
 
     def picture_file_exists(self):
         if not self.picture:
@@ -251,6 +272,28 @@ class Child(models.Model):
         """Get a (cached) count of total number of Child instances."""
         return cache.get_or_set(cls.cache_key_count, Child.objects.count, None)
 
+    @staticmethod
+    def cache_key_generation(pk):
+        return f"core.child.{pk}.generation"
+
+    def generation(self):
+        """
+        Get the child's data generation: a number that changes whenever an
+        entry of the child is saved or deleted. Values derived from the
+        child's data can be cached under it without explicit invalidation.
+        """
+        # Start from the current time so a counter lost to cache eviction
+        # never repeats an earlier generation.
+        return cache.get_or_set(self.cache_key_generation(self.pk), time.time_ns, None)
+
+    @classmethod
+    def bump_generation(cls, pk):
+        """Start a new data generation for the child with primary key ``pk``."""
+        try:
+            cache.incr(cls.cache_key_generation(pk))
+        except ValueError:
+            cache.set(cls.cache_key_generation(pk), time.time_ns(), None)
+
 
 class DiaperChange(models.Model):
     model_name = "diaperchange"
@@ -285,6 +328,9 @@ class DiaperChange(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-time"]
+        indexes = [
+            models.Index(fields=["child", "time"], name="diaperchange_child_time_idx"),
+        ]
         verbose_name = _("Diaper Change")
         verbose_name_plural = _("Diaper Changes")
 
@@ -356,6 +402,10 @@ class Feeding(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-start"]
+        indexes = [
+            models.Index(fields=["child", "start"], name="feeding_child_start_idx"),
+            models.Index(fields=["child", "end"], name="feeding_child_end_idx"),
+        ]
         verbose_name = _("Feeding")
         verbose_name_plural = _("Feedings")
 
@@ -363,9 +413,13 @@ class Feeding(models.Model):
         return str(_("Feeding"))
 
     def save(self, *args, **kwargs):
+        self.compute_fields()
+        super(Feeding, self).save(*args, **kwargs)
+
+    def compute_fields(self):
+        """Sets the fields derived from others, as done on save."""
         if self.start and self.end:
             self.duration = timezone_aware_duration(self.start, self.end)
-        super(Feeding, self).save(*args, **kwargs)
 
     def clean(self):
         validate_time(self.start, "start")
@@ -409,6 +463,9 @@ class SolidFood(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-time"]
+        indexes = [
+            models.Index(fields=["child", "time"], name="solidfood_child_time_idx"),
+        ]
         verbose_name = _("Solid Food")
         verbose_name_plural = _("Solid Foods")
 
@@ -525,6 +582,9 @@ class Note(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-time"]
+        indexes = [
+            models.Index(fields=["child", "time"], name="note_child_time_idx"),
+        ]
         verbose_name = _("Note")
         verbose_name_plural = _("Notes")
 
@@ -566,6 +626,10 @@ class Pumping(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-start"]
+        indexes = [
+            models.Index(fields=["child", "start"], name="pumping_child_start_idx"),
+            models.Index(fields=["child", "end"], name="pumping_child_end_idx"),
+        ]
         verbose_name = _("Pumping")
         verbose_name_plural = _("Pumping")
 
@@ -573,9 +637,13 @@ class Pumping(models.Model):
         return str(_("Pumping"))
 
     def save(self, *args, **kwargs):
+        self.compute_fields()
+        super(Pumping, self).save(*args, **kwargs)
+
+    def compute_fields(self):
+        """Sets the fields derived from others, as done on save."""
         if self.start and self.end:
             self.duration = timezone_aware_duration(self.start, self.end)
-        super(Pumping, self).save(*args, **kwargs)
 
     def clean(self):
         validate_time(self.start, "start")
@@ -610,6 +678,13 @@ class Sleep(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-start"]
+        indexes = [
+            models.Index(fields=["child", "start"], name="sleep_child_start_idx"),
+            models.Index(fields=["child", "end"], name="sleep_child_end_idx"),
+            models.Index(
+                fields=["child", "nap", "start"], name="sleep_child_nap_start_idx"
+            ),
+        ]
         verbose_name = _("Sleep")
         verbose_name_plural = _("Sleep")
 
@@ -617,6 +692,17 @@ class Sleep(models.Model):
         return str(_("Sleep"))
 
     def save(self, *args, **kwargs):
+        self.compute_fields()
+        if self.start and self.end:
+            # Stop any active sleep timers for this child, since we now have
+            # a completed sleep record.  This prevents the dashboard from
+            # continuing to show "sleeping" after a wake-up is recorded via
+            # a form (rather than through the timer toggle).
+            Sleep.stop_sleep_timers([self.child_id])
+        super(Sleep, self).save(*args, **kwargs)
+
+    def compute_fields(self):
+        """Sets the fields derived from others, as done on save."""
         if self.nap is None:
             start_time = timezone.localtime(self.start).time()
             in_nap_hours = (
@@ -643,16 +729,22 @@ class Sleep(models.Model):
                 self.nap = in_nap_hours
         if self.start and self.end:
             self.duration = timezone_aware_duration(self.start, self.end)
-            # Stop any active sleep timers for this child, since we now have
-            # a completed sleep record.  This prevents the dashboard from
-            # continuing to show "sleeping" after a wake-up is recorded via
-            # a form (rather than through the timer toggle).
-            Timer.objects.filter(
-                child=self.child,
-                active=True,
-                name__in=["Sleep", "שינה"],
-            ).update(active=False)
-        super(Sleep, self).save(*args, **kwargs)
+
+    @staticmethod
+    def stop_sleep_timers(child_ids):
+        """
+        Stops the active sleep timers of the given children. Each timer is
+        saved on its own, so the change log and the child's data generation
+        see it (a queryset update would send no signals).
+        """
+        timers = Timer.objects.filter(
+            child_id__in=child_ids,
+            active=True,
+            name__in=["Sleep", "שינה"],
+        )
+        for timer in timers:
+            timer.active = False
+            timer.save(update_fields=["active"])
 
     def clean(self):
         validate_time(self.start, "start")
@@ -683,6 +775,9 @@ class Temperature(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-time"]
+        indexes = [
+            models.Index(fields=["child", "time"], name="temperature_child_time_idx"),
+        ]
         verbose_name = _("Temperature")
         verbose_name_plural = _("Temperature")
 
@@ -722,6 +817,9 @@ class Timer(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-start"]
+        indexes = [
+            models.Index(fields=["child", "active"], name="timer_child_active_idx"),
+        ]
         verbose_name = _("Timer")
         verbose_name_plural = _("Timers")
 
@@ -794,6 +892,10 @@ class TummyTime(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-start"]
+        indexes = [
+            models.Index(fields=["child", "start"], name="tummytime_child_start_idx"),
+            models.Index(fields=["child", "end"], name="tummytime_child_end_idx"),
+        ]
         verbose_name = _("Tummy Time")
         verbose_name_plural = _("Tummy Time")
 
@@ -801,9 +903,13 @@ class TummyTime(models.Model):
         return str(_("Tummy Time"))
 
     def save(self, *args, **kwargs):
+        self.compute_fields()
+        super(TummyTime, self).save(*args, **kwargs)
+
+    def compute_fields(self):
+        """Sets the fields derived from others, as done on save."""
         if self.start and self.end:
             self.duration = timezone_aware_duration(self.start, self.end)
-        super(TummyTime, self).save(*args, **kwargs)
 
     def clean(self):
         validate_time(self.start, "start")
@@ -960,79 +1066,20 @@ class Medication(models.Model):
     def __str__(self):
         return f"{self.name} - {self.child.name()}"
 
-    def is_due_today(self):
-        """Check if medication is due today based on frequency"""
-        today = timezone.localdate()
-
-        if not self.active:
-            return False
-
-        if self.end_date and today > self.end_date:
-            return False
-
-        if today < self.start_date:
-            return False
-
-        if self.frequency == "as_needed":
-            return False
-
-        if self.frequency == "weekly":
-            # Check if it's been 7 days since last dose
-            last_dose = self.doses.filter(given=True).order_by("-time").first()
-            if last_dose:
-                days_since = (today - last_dose.time.date()).days
-                return days_since >= 7
-            return True
+    def today_status(self):
+        """Today's state of the medication, see ``MedicationSlot.status``."""
+        for entry in MedicationSlot.status(MedicationSlot.for_day(self.child_id)):
+            if entry["medication"].pk == self.pk:
+                return entry
+        return {"medication": self, "due": False, "next_dose_time": None}
 
-        if self.frequency == "every_other_day":
-            last_dose = self.doses.filter(given=True).order_by("-time").first()
-            if last_dose:
-                days_since = (today - last_dose.time.date()).days
-                return days_since >= 2
-            return True
-
-        # For daily frequencies, check if already given or skipped today
-        doses_today = self.doses.filter(
-            time__date=today,
-        ).count()
-
-        frequency_map = {
-            "once_daily": 1,
-            "twice_daily": 2,
-            "three_times_daily": 3,
-        }
-
-        required_doses = frequency_map.get(self.frequency, 1)
-        return doses_today < required_doses
+    def is_due_today(self):
+        """Check if a dose of the medication is still due today"""
+        return self.today_status()["due"]
 
     def next_dose_time(self):
         """Get the next scheduled dose time"""
-        if not self.schedule_times:
-            return None
-
-        now = timezone.now()
-        today = timezone.localdate()
-        times = [t.strip() for t in self.schedule_times.split(",")]
-
-        for time_str in times:
-            try:
-                hour, minute = map(int, time_str.split(":"))
-                scheduled_time = timezone.make_aware(
-                    datetime.datetime.combine(today, datetime.time(hour, minute))
-                )
-
-                # Check if this dose was already given or skipped
-                dose_given = self.doses.filter(
-                    time__date=today,
-                    time__hour=hour,
-                ).exists()
-
-                if not dose_given and scheduled_time > now:
-                    return scheduled_time
-            except (ValueError, IndexError):
-                continue
-
-        return None
+        return self.today_status()["next_dose_time"]
 
 
 class MedicationDose(models.Model):
@@ -1083,6 +1130,11 @@ class MedicationDose(models.Model):
     class Meta:
         default_permissions = ("view", "add", "change", "delete")
         ordering = ["-time"]
+        indexes = [
+            models.Index(
+                fields=["child", "time"], name="medicationdose_child_time_idx"
+            ),
+        ]
         verbose_name = _("Medication dose")
         verbose_name_plural = _("Medication doses")
 
@@ -1091,3 +1143,1203 @@ class MedicationDose(models.Model):
 
     def clean(self):
         validate_date(self.time.date(), "time")
+
+
+class MedicationSlot(models.Model):
+    """
+    A dose of a medication scheduled on a date of the site's time zone (see
+    ``site_localtime``), which schedule times are read in too.
+
+    A medication due on a date has one slot per schedule time, plus untimed
+    slots up to its frequency's daily doses. A medication that is active on
+    the date but not due (taken as needed, or given weekly and not due yet)
+    has a single slot with ``due`` unset. ``for_day`` builds a day on its
+    first read; a ``MedicationDay`` marker, unique per child and date, makes
+    concurrent first reads (say the alerts worker and a webhook) build it
+    once, the others reading what the first one built.
+
+    The doses of the day fulfil the slots of their medication: a dose
+    fulfils the open slot of its hour, else an open untimed slot, else the
+    earliest open slot. Saving or deleting a medication or a dose rebuilds
+    the child's slots of that day and drops those of later days, which are
+    built again when read.
+    """
+
+    DAILY_DOSES = {"once_daily": 1, "twice_daily": 2, "three_times_daily": 3}
+    INTERVAL_DAYS = {"every_other_day": 2, "weekly": 7}
+
+    model_name = "medication slot"
+    medication = models.ForeignKey(
+        "Medication",
+        on_delete=models.CASCADE,
+        related_name="slots",
+        verbose_name=_("Medication"),
+    )
+    child = models.ForeignKey(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="medication_slots",
+        verbose_name=_("Child"),
+    )
+    date = models.DateField(verbose_name=_("Date"))
+    time = models.DateTimeField(blank=True, null=True, verbose_name=_("Time"))
+    due = models.BooleanField(default=True, verbose_name=_("Due"))
+    fulfilled = models.BooleanField(default=False, verbose_name=_("Fulfilled"))
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        ordering = ["date", "time"]
+        verbose_name = _("Medication slot")
+        verbose_name_plural = _("Medication slots")
+        indexes = [
+            models.Index(
+                fields=["child", "date"], name="medicationslot_child_date_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.medication} - {self.time or self.date}"
+
+    @staticmethod
+    def parse_times(schedule_times):
+        """The valid (hour, minute) pairs of ``schedule_times``, in order."""
+        times = set()
+        for time_str in (schedule_times or "").split(","):
+            try:
+                hour, minute = map(int, time_str.strip().split(":"))
+                times.add(datetime.time(hour, minute))
+            except ValueError:
+                continue
+        return sorted(times)
+
+    @classmethod
+    def schedule(cls, medication, date, last_given=None):
+        """
+        The unsaved slots of ``medication`` on ``date``, where ``last_given``
+        is the time of the last dose given before the date.
+        """
+        due = medication.frequency != "as_needed"
+        interval = cls.INTERVAL_DAYS.get(medication.frequency)
+        if due and interval and last_given:
+            due = (date - site_localtime(last_given).date()).days >= interval
+        if not due:
+            times = [None]
+        else:
+            tz = timezone.get_default_timezone()
+            times = [
+                timezone.make_aware(datetime.datetime.combine(date, slot_time), tz)
+                for slot_time in cls.parse_times(medication.schedule_times)
+            ]
+            doses = max(len(times), cls.DAILY_DOSES.get(medication.frequency, 1))
+            times += [None] * (doses - len(times))
+        return [
+            cls(
+                medication=medication,
+                child_id=medication.child_id,
+                date=date,
+                time=slot_time,
+                due=due,
+            )
+            for slot_time in times
+        ]
+
+    @staticmethod
+    def fulfil(slots, dose_times):
+        """Marks the slots of a medication fulfilled by its doses of the day."""
+        open_slots = [slot for slot in slots if slot.due]
+        for slot in open_slots:
+            slot.fulfilled = False
+        for dose_time in sorted(dose_times):
+            open_slots = [slot for slot in open_slots if not slot.fulfilled]
+            if not open_slots:
+                break
+            hour = site_localtime(dose_time).hour
+            timed = sorted(
+                (slot for slot in open_slots if slot.time), key=lambda s: s.time
+            )
+            slot = (
+                next(
+                    (s for s in timed if site_localtime(s.time).hour == hour),
+                    None,
+                )
+                or next((s for s in open_slots if s.time is None), None)
+                or timed[0]
+            )
+            slot.fulfilled = True
+
+    @classmethod
+    def build(cls, child_id, date):
+        """
+        Computes the child's unsaved slots of ``date`` from its medications
+        and doses.
+        """
+        medications = list(
+            Medication.objects.filter(
+                child_id=child_id, active=True, start_date__lte=date
+            ).filter(models.Q(end_date__isnull=True) | models.Q(end_date__gte=date))
+        )
+        start, end = DailyRollup.day_bounds(date)
+        last_given = {}
+        interval_ids = [
+            medication.id
+            for medication in medications
+            if medication.frequency in cls.INTERVAL_DAYS
+        ]
+        if interval_ids:
+            last_given = dict(
+                MedicationDose.objects.filter(
+                    medication_id__in=interval_ids, given=True, time__lt=start
+                )
+                .values("medication_id")
+                .annotate(last=models.Max("time"))
+                .values_list("medication_id", "last")
+            )
+        dose_times = {}
+        if medications:
+            for medication_id, dose_time in MedicationDose.objects.filter(
+                child_id=child_id, time__gte=start, time__lt=end
+            ).values_list("medication_id", "time"):
+                dose_times.setdefault(medication_id, []).append(dose_time)
+
+        slots = []
+        for medication in medications:
+            medication_slots = cls.schedule(
+                medication, date, last_given.get(medication.id)
+            )
+            cls.fulfil(medication_slots, dose_times.get(medication.id, ()))
+            slots.extend(medication_slots)
+        return slots
+
+    @classmethod
+    def refresh(cls, child_id, date):
+        """Rebuilds the child's slots of ``date`` and drops those of later days."""
+        with transaction.atomic():
+            # Locking the day's marker makes concurrent rebuilds of the day
+            # wait for each other rather than both insert their slots.
+            MedicationDay.objects.select_for_update().get_or_create(
+                child_id=child_id, date=date
+            )
+            MedicationDay.objects.filter(child_id=child_id, date__gt=date).delete()
+            cls.objects.filter(child_id=child_id, date__gte=date).delete()
+            slots = cls.build(child_id, date)
+            cls.objects.bulk_create(slots)
+        return slots
+
+    @classmethod
+    def rebuild(cls, child_id):
+        """Drops all the child's slots and builds those of today."""
+        with transaction.atomic():
+            MedicationDay.objects.filter(child_id=child_id).delete()
+            cls.objects.filter(child_id=child_id).delete()
+        return cls.for_day(child_id)
+
+    @classmethod
+    def for_day(cls, child_id, date=None):
+        """
+        The child's slots of ``date`` (default: today), with their
+        medications, in one query once the day is built.
+        """
+        date = date or site_localtime().date()
+        slots = cls.objects.filter(child_id=child_id, date=date).select_related(
+            "medication"
+        )
+        built = list(slots)
+        if built:
+            return built
+        with transaction.atomic():
+            # Only the read that creates the day's marker builds the day; a
+            # concurrent one waits on the marker's unique constraint until the
+            # first commits, then finds the marker and reads its slots.
+            _, created = MedicationDay.objects.get_or_create(
+                child_id=child_id, date=date
+            )
+            if created:
+                built = cls.build(child_id, date)
+                cls.objects.bulk_create(built)
+                return built
+        return list(slots.all())
+
+    @staticmethod
+    def status(slots, now=None):
+        """
+        The state of each medication of a day's ``slots``, by name: dicts with
+        the ``medication``, whether a dose is still ``due`` and the
+        ``next_dose_time`` (the earliest open slot still ahead, if any).
+        """
+        now = now or timezone.now()
+        medications = {}
+        for slot in slots:
+            entry = medications.setdefault(
+                slot.medication_id,
+                {"medication": slot.medication, "due": False, "next_dose_time": None},
+            )
+            if not slot.due or slot.fulfilled:
+                continue
+            entry["due"] = True
+            if slot.time is None or slot.time <= now:
+                continue
+            if entry["next_dose_time"] is None or slot.time < entry["next_dose_time"]:
+                entry["next_dose_time"] = slot.time
+        return sorted(medications.values(), key=lambda entry: entry["medication"].name)
+
+
+class MedicationDay(models.Model):
+    """
+    A date of a child whose ``MedicationSlot`` rows are built, including days
+    without any slot. The unique constraint lets only one of concurrent first
+    reads of a day build its slots.
+    """
+
+    model_name = "medication day"
+    child = models.ForeignKey(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="medication_days",
+        verbose_name=_("Child"),
+    )
+    date = models.DateField(verbose_name=_("Date"))
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        verbose_name = _("Medication day")
+        verbose_name_plural = _("Medication days")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["child", "date"], name="unique_child_date_medication_day"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.child} - {self.date}"
+
+
+class DailyRollup(models.Model):
+    """
+    Pre-aggregated totals of one child's activity on one local date.
+
+    Rows are kept up to date by the save/delete signal handlers below: a
+    change to an entry only recomputes the section of the rollup (feeding,
+    sleep, ...) for the day(s) the entry belongs to. ``for_dates`` computes
+    any missing rows on read without saving them, and the ``rebuild_rollups``
+    command rebuilds them in bulk. Entries are assigned to days as follows:
+    feedings and sleep by start, tummy time by end, diaper changes and
+    medication doses by time.
+
+    Days are always in the site's time zone (``settings.TIME_ZONE``), not in
+    the time zone activated for the user making the change or reading, so
+    every user writes and reads the same days of a child. Readers only use
+    rollups while ``in_current_time_zone`` and read the entries otherwise.
+    """
+
+    model_name = "daily rollup"
+    child = models.ForeignKey(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="daily_rollups",
+        verbose_name=_("Child"),
+    )
+    date = models.DateField(verbose_name=_("Date"))
+
+    feeding_count = models.PositiveIntegerField(default=0)
+    feeding_duration = models.DurationField(default=datetime.timedelta)
+    feeding_amount = models.FloatField(default=0)
+    feeding_by_type = models.JSONField(default=dict)
+    feeding_by_method = models.JSONField(default=dict)
+
+    sleep_count = models.PositiveIntegerField(default=0)
+    sleep_duration = models.DurationField(default=datetime.timedelta)
+    nap_count = models.PositiveIntegerField(default=0)
+    nap_duration = models.DurationField(default=datetime.timedelta)
+
+    diaper_count = models.PositiveIntegerField(default=0)
+    diaper_wet = models.PositiveIntegerField(default=0)
+    diaper_solid = models.PositiveIntegerField(default=0)
+    diaper_empty = models.PositiveIntegerField(default=0)
+
+    tummytime_count = models.PositiveIntegerField(default=0)
+    tummytime_duration = models.DurationField(default=datetime.timedelta)
+
+    medication_doses = models.PositiveIntegerField(default=0)
+    medication_skipped = models.PositiveIntegerField(default=0)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    # section name -> (model, field that assigns an entry to a day, fields
+    # the section is computed from)
+    SECTIONS = {
+        "feeding": (Feeding, "start", ("duration", "amount", "type", "method")),
+        "sleep": (Sleep, "start", ("duration", "nap")),
+        "diaper": (DiaperChange, "time", ("wet", "solid")),
+        "tummytime": (TummyTime, "end", ("duration",)),
+        "medication": (MedicationDose, "time", ("given",)),
+    }
+
+    class Meta:
+        default_permissions = ("view",)
+        ordering = ["-date"]
+        verbose_name = _("Daily rollup")
+        verbose_name_plural = _("Daily rollups")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["child", "date"], name="unique_child_date_rollup"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.child} - {self.date}"
+
+    @staticmethod
+    def day_bounds(date):
+        """
+        Aware datetimes of the start of ``date`` and of the next day, in the
+        site's time zone.
+        """
+        tz = timezone.get_default_timezone()
+        start = timezone.make_aware(
+            datetime.datetime.combine(date, datetime.time.min), tz
+        )
+        end = timezone.make_aware(
+            datetime.datetime.combine(
+                date + datetime.timedelta(days=1), datetime.time.min
+            ),
+            tz,
+        )
+        return start, end
+
+    @staticmethod
+    def local_date(moment):
+        """The date of an aware datetime in the site's time zone."""
+        return site_localtime(moment).date()
+
+    @staticmethod
+    def in_current_time_zone():
+        """
+        Whether rollup days are the days of the active time zone, i.e. the
+        user reading has no time zone of their own.
+        """
+        return (
+            timezone.get_current_timezone_name() == timezone.get_default_timezone_name()
+        )
+
+    @classmethod
+    def section_values(cls, section, entries):
+        """
+        Computes the fields of one section of a rollup from the ``values()``
+        rows of the day's entries.
+        """
+        return getattr(cls, f"_{section}_values")(entries)
+
+    @classmethod
+    def section_entries(cls, section, child_id, date):
+        """The ``values()`` rows a section of a day's rollup is built from."""
+        model, field, fields = cls.SECTIONS[section]
+        start, end = cls.day_bounds(date)
+        return model.objects.filter(
+            child_id=child_id, **{f"{field}__gte": start, f"{field}__lt": end}
+        ).values(*fields)
+
+    @staticmethod
+    def _feeding_values(entries):
+        values = {
+            "feeding_count": 0,
+            "feeding_duration": datetime.timedelta(),
+            "feeding_amount": 0,
+            "feeding_by_type": {},
+            "feeding_by_method": {},
+        }
+        for entry in entries:
+            by_type = values["feeding_by_type"].setdefault(
+                entry["type"], {"count": 0, "amount": 0}
+            )
+            values["feeding_count"] += 1
+            by_type["count"] += 1
+            if entry["duration"]:
+                values["feeding_duration"] += entry["duration"]
+            if entry["amount"]:
+                values["feeding_amount"] += entry["amount"]
+                by_type["amount"] += entry["amount"]
+            values["feeding_by_method"][entry["method"]] = (
+                values["feeding_by_method"].get(entry["method"], 0) + 1
+            )
+        return values
+
+    @staticmethod
+    def _sleep_values(entries):
+        values = {
+            "sleep_count": 0,
+            "sleep_duration": datetime.timedelta(),
+            "nap_count": 0,
+            "nap_duration": datetime.timedelta(),
+        }
+        for entry in entries:
+            duration = entry["duration"] or datetime.timedelta()
+            values["sleep_count"] += 1
+            values["sleep_duration"] += duration
+            if entry["nap"]:
+                values["nap_count"] += 1
+                values["nap_duration"] += duration
+        return values
+
+    @staticmethod
+    def _diaper_values(entries):
+        values = {
+            "diaper_count": 0,
+            "diaper_wet": 0,
+            "diaper_solid": 0,
+            "diaper_empty": 0,
+        }
+        for entry in entries:
+            values["diaper_count"] += 1
+            values["diaper_wet"] += entry["wet"]
+            values["diaper_solid"] += entry["solid"]
+            values["diaper_empty"] += not entry["wet"] and not entry["solid"]
+        return values
+
+    @staticmethod
+    def _tummytime_values(entries):
+        values = {"tummytime_count": 0, "tummytime_duration": datetime.timedelta()}
+        for entry in entries:
+            values["tummytime_count"] += 1
+            values["tummytime_duration"] += entry["duration"] or datetime.timedelta()
+        return values
+
+    @staticmethod
+    def _medication_values(entries):
+        values = {"medication_doses": 0, "medication_skipped": 0}
+        for entry in entries:
+            if entry["given"]:
+                values["medication_doses"] += 1
+            else:
+                values["medication_skipped"] += 1
+        return values
+
+    @classmethod
+    def refresh(cls, child_id, date, sections=None):
+        """
+        Recomputes ``sections`` (default: all) of a child's rollup for
+        ``date``. A missing row is always built in full.
+        """
+        rollup = cls.objects.filter(child_id=child_id, date=date).first()
+        if rollup is None:
+            rollup = cls(child_id=child_id, date=date)
+            sections = None
+        for section in sections or cls.SECTIONS:
+            entries = cls.section_entries(section, child_id, date)
+            for name, value in cls.section_values(section, entries).items():
+                setattr(rollup, name, value)
+        rollup.save()
+        return rollup
+
+    @classmethod
+    def build(cls, child_id, dates):
+        """
+        Computes unsaved rollups of ``dates`` from the entries, with one query
+        per section for all of them.
+        :returns: a ``{date: rollup}`` mapping.
+        """
+        rollups = {date: cls(child_id=child_id, date=date) for date in dates}
+        if not rollups:
+            return rollups
+        start = cls.day_bounds(min(rollups))[0]
+        end = cls.day_bounds(max(rollups))[1]
+        for section, (model, field, fields) in cls.SECTIONS.items():
+            entries = {date: [] for date in rollups}
+            for entry in model.objects.filter(
+                child_id=child_id, **{f"{field}__gte": start, f"{field}__lt": end}
+            ).values(field, *fields):
+                date = cls.local_date(entry.pop(field))
+                if date in entries:
+                    entries[date].append(entry)
+            for date, rollup in rollups.items():
+                values = cls.section_values(section, entries[date])
+                for name, value in values.items():
+                    setattr(rollup, name, value)
+        return rollups
+
+    @classmethod
+    def for_dates(cls, child, dates):
+        """
+        Returns a ``{date: rollup}`` mapping for ``dates``. Rows that do not
+        exist yet are computed but not saved, so reads never write.
+        """
+        dates = list(dates)
+        rollups = {
+            rollup.date: rollup
+            for rollup in cls.objects.filter(child=child, date__in=dates)
+        }
+        rollups.update(
+            cls.build(child.id, [date for date in dates if date not in rollups])
+        )
+        return rollups
+
+
+def _adjacent_entries(entries, start, pk, fields=("start", "end")):
+    """
+    The entries of ``entries`` right before and after an entry ``pk`` that
+    starts at ``start``, in (start, pk) order.
+    """
+    before = (
+        entries.filter(models.Q(start__lt=start) | models.Q(start=start, pk__lt=pk))
+        .order_by("-start", "-pk")
+        .only(*fields)
+        .first()
+    )
+    after = (
+        entries.filter(models.Q(start__gt=start) | models.Q(start=start, pk__gt=pk))
+        .order_by("start", "pk")
+        .only(*fields)
+        .first()
+    )
+    return before, after
+
+
+class WakeWindowState(models.Model):
+    """
+    A child's learned wake windows: the time awake between consecutive sleep
+    entries, summarized so the next sleep can be predicted without reading
+    the sleep history.
+
+    Windows are kept as recency-weighted sums per hour of the day they start
+    in, each weighted by ``DECAY`` per day before ``anchor``, so the mean and
+    variance near any hour are a constant-time read. Exact counts per day are
+    kept for the last ``RECENT_DAYS`` days. The save/delete signal handlers
+    below add and remove only the windows a changed sleep entry opens or
+    closes; ``for_child`` builds missing rows and the ``rebuild_rollups``
+    command rebuilds them in bulk. Days and hours are in the site's time zone
+    (see ``site_localtime``).
+    """
+
+    DECAY = 0.9
+    RECENT_DAYS = 14
+    # Shorter or longer gaps are overlaps or missing entries, not windows.
+    MIN_MINUTES = 5
+    MAX_MINUTES = 720
+    # Fields of a sleep entry the state is computed from.
+    ENTRY_FIELDS = ("child", "start", "end")
+
+    model_name = "wake window state"
+    child = models.OneToOneField(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="wake_window_state",
+        verbose_name=_("Child"),
+    )
+    anchor = models.DateField(blank=True, null=True)
+    # hour -> [weight, weighted sum, weighted sum of squares] (minutes)
+    hours = models.JSONField(default=dict)
+    # ISO date -> number of windows
+    recent = models.JSONField(default=dict)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        verbose_name = _("Wake window state")
+        verbose_name_plural = _("Wake window states")
+
+    def __str__(self):
+        return str(self.child)
+
+    def add(self, date, hour, minutes, sign=1):
+        """
+        Adds (``sign=1``) or removes (``sign=-1``) a window of ``minutes``
+        that started at ``hour`` on the local ``date``.
+        """
+        if self.anchor is None:
+            self.anchor = date
+        elif date > self.anchor:
+            scale = self.DECAY ** (date - self.anchor).days
+            self.hours = {
+                key: [value * scale for value in sums]
+                for key, sums in self.hours.items()
+            }
+            self.anchor = date
+
+        key = str(hour)
+        if sign < 0 and key not in self.hours:
+            return
+        weight = sign * self.DECAY ** (self.anchor - date).days
+        sums = self.hours.setdefault(key, [0.0, 0.0, 0.0])
+        sums[0] += weight
+        sums[1] += weight * minutes
+        sums[2] += weight * minutes**2
+        # Drop emptied (or fully decayed) hours rather than keep rounding noise.
+        if sums[0] < 1e-12:
+            del self.hours[key]
+
+        cutoff = site_localtime().date() - datetime.timedelta(days=self.RECENT_DAYS)
+        day = date.isoformat()
+        self.recent[day] = self.recent.get(day, 0) + sign
+        self.recent = {
+            day: count
+            for day, count in self.recent.items()
+            if count > 0 and day >= cutoff.isoformat()
+        }
+
+    def add_window(self, previous, following, sign=1):
+        """Adds or removes the window between two consecutive sleep entries."""
+        minutes = (following.start - previous.end).total_seconds() / 60
+        if not self.MIN_MINUTES <= minutes <= self.MAX_MINUTES:
+            return
+        local_end = site_localtime(previous.end)
+        self.add(local_end.date(), local_end.hour, minutes, sign)
+
+    @staticmethod
+    def hour_weight(hour, current_hour):
+        """Extra weight of windows that started close to ``current_hour``."""
+        difference = abs(hour - current_hour)
+        difference = min(difference, 24 - difference)
+        if difference <= 2:
+            return 1.5
+        if difference <= 4:
+            return 1.2
+        return 1.0
+
+    def estimate(self, current_hour):
+        """
+        Returns the recency- and time-of-day-weighted mean and standard
+        deviation of the child's wake windows (minutes) for a window starting
+        at ``current_hour`` of the site's time zone, with the number of
+        windows in the last ``RECENT_DAYS`` days, or None without any window.
+        """
+        weight = total = squares = 0.0
+        for hour, (hour_weight, hour_total, hour_squares) in self.hours.items():
+            factor = self.hour_weight(int(hour), current_hour)
+            weight += factor * hour_weight
+            total += factor * hour_total
+            squares += factor * hour_squares
+        if weight <= 0:
+            return None
+
+        mean = total / weight
+        cutoff = site_localtime().date() - datetime.timedelta(days=self.RECENT_DAYS)
+        return {
+            "mean_minutes": mean,
+            "std_minutes": max(squares / weight - mean**2, 0) ** 0.5,
+            "sample_size": sum(
+                count for day, count in self.recent.items() if day >= cutoff.isoformat()
+            ),
+        }
+
+    @classmethod
+    def update(cls, child_id, pk, changes):
+        """
+        Applies ``(sleep, sign)`` changes of the sleep entry ``pk`` to a
+        child's state: ``-1`` takes the entry's values out of the sequence of
+        the child's sleep entries, ``1`` puts them in. Neighbours are read
+        without entry ``pk``, a sequence that is the same before and after
+        the change.
+        """
+        with transaction.atomic():
+            state = cls.objects.select_for_update().filter(child_id=child_id).first()
+            if state is None:
+                cls.rebuild(child_id)
+                return
+            others = Sleep.objects.filter(child_id=child_id).exclude(pk=pk)
+            for sleep, sign in changes:
+                before, after = _adjacent_entries(others, sleep.start, pk)
+                if before and after:
+                    state.add_window(before, after, -sign)
+                if before:
+                    state.add_window(before, sleep, sign)
+                if after:
+                    state.add_window(sleep, after, sign)
+            state.save()
+
+    @classmethod
+    def rebuild(cls, child_id):
+        """Rebuilds a child's state from all of its sleep entries."""
+        state = cls.objects.filter(child_id=child_id).first() or cls(child_id=child_id)
+        state.anchor = None
+        state.hours = {}
+        state.recent = {}
+        previous = None
+        sleeps = (
+            Sleep.objects.filter(child_id=child_id)
+            .order_by("start", "pk")
+            .only("start", "end")
+        )
+        for sleep in sleeps.iterator(chunk_size=2000):
+            if previous is not None:
+                state.add_window(previous, sleep)
+            previous = sleep
+        state.save()
+        return state
+
+    @classmethod
+    def for_child(cls, child):
+        """Returns the state of ``child``, building it if it does not exist."""
+        return cls.objects.filter(child=child).first() or cls.rebuild(child.id)
+
+
+class FeedingPatternState(models.Model):
+    """
+    A child's learned feeding pattern, summarized so the feeding prediction
+    and pace cards can be computed without reading the feeding history.
+
+    Each track (``all`` feedings, or ``milk`` feedings without solid food)
+    holds exponentially weighted sums of the intervals between consecutive
+    feedings, weighted by ``DECAY`` per day before ``anchor`` as for
+    ``WakeWindowState``, and the totals of each of the last ``DAYS`` days
+    with the time of day each feeding ended. ``curves`` holds, for
+    ``curve_date``, the cumulative intake by time of day over the ``DAYS``
+    days before it. The save/delete signal handlers below only update what a
+    changed feeding touches; ``for_child`` builds missing rows and the
+    ``rebuild_rollups`` command rebuilds them in bulk. Days and times of day
+    are in the site's time zone (see ``site_localtime``).
+    """
+
+    DECAY = 0.9
+    DAYS = 7
+    # Longer gaps are missing entries rather than feeding intervals.
+    MAX_INTERVAL_MINUTES = 720
+    TRACKS = ("all", "milk")
+    # Fields of a feeding the state is computed from.
+    ENTRY_FIELDS = ("child", "start", "end", "type", "amount")
+
+    model_name = "feeding pattern state"
+    child = models.OneToOneField(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="feeding_pattern_state",
+        verbose_name=_("Child"),
+    )
+    anchor = models.DateField(blank=True, null=True)
+    # track -> {"intervals": [weight, weighted sum, weighted sum of squares],
+    #           "days": {ISO date: {"count", "amount", "ends": [[second, amount]]}}}
+    tracks = models.JSONField(default=dict)
+    curve_date = models.DateField(blank=True, null=True)
+    # track -> {"days", "count", "amount", "curve": [[second, cumulative amount]]}
+    curves = models.JSONField(default=dict)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        verbose_name = _("Feeding pattern state")
+        verbose_name_plural = _("Feeding pattern states")
+
+    def __str__(self):
+        return str(self.child)
+
+    @staticmethod
+    def in_track(feeding, track):
+        return track == "all" or feeding.type != "solid food"
+
+    def track(self, track):
+        return self.tracks.setdefault(track, {"intervals": [0.0, 0.0, 0.0], "days": {}})
+
+    def add_interval(self, track, previous, following, sign=1):
+        """
+        Adds (``sign=1``) or removes (``sign=-1``) the interval between two
+        consecutive feedings of a track.
+        """
+        minutes = (following.start - previous.end).total_seconds() / 60
+        if not 0 <= minutes <= self.MAX_INTERVAL_MINUTES:
+            return
+        date = site_localtime(previous.end).date()
+        if self.anchor is None:
+            self.anchor = date
+        elif date > self.anchor:
+            scale = self.DECAY ** (date - self.anchor).days
+            for data in self.tracks.values():
+                data["intervals"] = [value * scale for value in data["intervals"]]
+            self.anchor = date
+
+        sums = self.track(track)["intervals"]
+        if sign < 0 and sums[0] <= 0:
+            return
+        weight = sign * self.DECAY ** (self.anchor - date).days
+        sums[0] += weight
+        sums[1] += weight * minutes
+        sums[2] += weight * minutes**2
+        # Reset emptied (or fully decayed) sums rather than keep rounding noise.
+        if sums[0] < 1e-12:
+            sums[:] = [0.0, 0.0, 0.0]
+
+    def add_feeding(self, track, feeding, sign=1):
+        """Adds or removes a feeding from the totals of the day it ended."""
+        local_end = site_localtime(feeding.end)
+        cutoff = site_localtime().date() - datetime.timedelta(days=self.DAYS)
+        if local_end.date() < cutoff:
+            return
+        days = self.track(track)["days"]
+        key = local_end.date().isoformat()
+        if sign < 0 and key not in days:
+            return
+
+        day = days.setdefault(key, {"count": 0, "amount": 0, "ends": []})
+        second = (
+            local_end - local_end.replace(hour=0, minute=0, second=0, microsecond=0)
+        ).total_seconds()
+        end = [second, float(feeding.amount or 0)]
+        if sign > 0:
+            bisect.insort(day["ends"], end)
+        elif end in day["ends"]:
+            day["ends"].remove(end)
+        else:
+            return
+        day["count"] += sign
+        day["amount"] += sign * end[1]
+        self.track(track)["days"] = {
+            key: day
+            for key, day in days.items()
+            if day["count"] > 0 and key >= cutoff.isoformat()
+        }
+
+    def refresh_curves(self, date=None):
+        """
+        Rebuilds the cumulative intake curves of the ``DAYS`` days before
+        ``date`` (default: today).
+        """
+        date = date or site_localtime().date()
+        start = (date - datetime.timedelta(days=self.DAYS)).isoformat()
+        self.curves = {}
+        for track, data in self.tracks.items():
+            days = [
+                day
+                for key, day in data["days"].items()
+                if start <= key < date.isoformat()
+            ]
+            curve = []
+            total = 0
+            for second, amount in sorted(end for day in days for end in day["ends"]):
+                total += amount
+                curve.append([second, total])
+            self.curves[track] = {
+                "days": len(days),
+                "count": sum(day["count"] for day in days),
+                "amount": total,
+                "curve": curve,
+            }
+        self.curve_date = date
+
+    def interval_estimate(self, track):
+        """
+        Returns the exponentially weighted mean and standard deviation of a
+        track's feeding intervals (minutes), with the number of feedings in
+        the last ``DAYS`` days, or None without any interval.
+        """
+        data = self.tracks.get(track)
+        if not data or data["intervals"][0] <= 0:
+            return None
+        weight, total, squares = data["intervals"]
+        mean = total / weight
+        cutoff = site_localtime().date() - datetime.timedelta(days=self.DAYS)
+        return {
+            "mean_minutes": mean,
+            "std_minutes": max(squares / weight - mean**2, 0) ** 0.5,
+            "count": sum(
+                day["count"]
+                for key, day in data["days"].items()
+                if key >= cutoff.isoformat()
+            ),
+        }
+
+    def day(self, track, date):
+        """A track's ``count`` and ``amount`` totals of a recent ``date``."""
+        data = self.tracks.get(track, {"days": {}})
+        return data["days"].get(date.isoformat(), {"count": 0, "amount": 0})
+
+    def baseline(self, track, date):
+        """
+        Returns a track's ``days`` with data, ``count`` and ``amount`` over
+        the ``DAYS`` days before ``date``, with the ``curve`` of cumulative
+        intake by second of the day.
+        """
+        if self.curve_date != date:
+            self.refresh_curves(date)
+            if self.pk:
+                self.save(update_fields=["curve_date", "curves", "updated"])
+        return self.curves.get(track, {"days": 0, "count": 0, "amount": 0, "curve": []})
+
+    @staticmethod
+    def amount_by(baseline, second):
+        """The cumulative amount of a baseline's curve at ``second`` of a day."""
+        index = bisect.bisect_right(baseline["curve"], [second, float("inf")])
+        return baseline["curve"][index - 1][1] if index else 0
+
+    @classmethod
+    def update(cls, child_id, pk, changes):
+        """
+        Applies ``(feeding, sign)`` changes of the feeding ``pk`` to a child's
+        state, as ``WakeWindowState.update`` does for sleep entries.
+        """
+        with transaction.atomic():
+            state = cls.objects.select_for_update().filter(child_id=child_id).first()
+            if state is None:
+                cls.rebuild(child_id)
+                return
+            others = Feeding.objects.filter(child_id=child_id).exclude(pk=pk)
+            for track in cls.TRACKS:
+                if track == "milk":
+                    others = others.exclude(type="solid food")
+                for feeding, sign in changes:
+                    if not cls.in_track(feeding, track):
+                        continue
+                    state.add_feeding(track, feeding, sign)
+                    before, after = _adjacent_entries(others, feeding.start, pk)
+                    if before and after:
+                        state.add_interval(track, before, after, -sign)
+                    if before:
+                        state.add_interval(track, before, feeding, sign)
+                    if after:
+                        state.add_interval(track, feeding, after, sign)
+            state.refresh_curves()
+            state.save()
+
+    @classmethod
+    def rebuild(cls, child_id):
+        """Rebuilds a child's state from all of its feedings."""
+        state = cls.objects.filter(child_id=child_id).first() or cls(child_id=child_id)
+        state.anchor = None
+        state.tracks = {}
+        previous = {}
+        feedings = (
+            Feeding.objects.filter(child_id=child_id)
+            .order_by("start", "pk")
+            .only("start", "end", "type", "amount")
+        )
+        for feeding in feedings.iterator(chunk_size=2000):
+            for track in cls.TRACKS:
+                if not cls.in_track(feeding, track):
+                    continue
+                if track in previous:
+                    state.add_interval(track, previous[track], feeding)
+                state.add_feeding(track, feeding)
+                previous[track] = feeding
+        state.refresh_curves()
+        state.save()
+        return state
+
+    @classmethod
+    def for_child(cls, child):
+        """Returns the state of ``child``, building it if it does not exist."""
+        return cls.objects.filter(child=child).first() or cls.rebuild(child.id)
+
+
+class ChangeLog(models.Model):
+    """
+    An append-only record of every save and delete of Baby Buddy data.
+
+    Rows are written by the save/delete signal handlers in core.signals (raw
+    saves, as done by fixture loading and restores, are not recorded). Ids
+    increase in write order, so the last row of an object tells whether it
+    still exists; incremental backups use this to find what changed since a
+    point in time and the API's sync endpoint uses the ids as cursors. Rows
+    older than ``settings.CHANGE_LOG_RETENTION_DAYS`` are deleted by the
+    prune_change_log command.
+    """
+
+    SAVE = "save"
+    DELETE = "delete"
+
+    model_name = "change log"
+    content_type = models.ForeignKey(
+        "contenttypes.ContentType", on_delete=models.CASCADE
+    )
+    object_id = models.PositiveIntegerField()
+    # Not a foreign key, so entries outlive the child they belonged to.
+    child_id = models.PositiveIntegerField(blank=True, null=True)
+    action = models.CharField(
+        max_length=6, choices=[(SAVE, _("Save")), (DELETE, _("Delete"))]
+    )
+    time = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        ordering = ["id"]
+        verbose_name = _("Change")
+        verbose_name_plural = _("Changes")
+        indexes = [
+            models.Index(fields=["time"], name="changelog_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.content_type.model} {self.object_id}"
+
+    @classmethod
+    def changes(cls, since):
+        """
+        Returns a ``{(model, pk): action}`` mapping of the latest change of
+        every object changed after ``since``.
+        """
+        changes = {}
+        rows = (
+            cls.objects.filter(time__gt=since)
+            .order_by("id")
+            .values_list("content_type_id", "object_id", "action")
+        )
+        for content_type_id, object_id, action in rows.iterator(chunk_size=2000):
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            changes[(model, object_id)] = action
+        return changes
+
+    @classmethod
+    def prune(cls, before):
+        """
+        Deletes the changes made before ``before``, except the latest one,
+        which marks where the remaining log starts. Returns the number of
+        rows deleted.
+        """
+        latest = cls.objects.order_by("-id").first()
+        if latest is None:
+            return 0
+        return cls.objects.filter(time__lt=before, id__lt=latest.id).delete()[0]
+
+    @classmethod
+    def covers(cls, since):
+        """
+        Whether the log still holds every change after ``since``, a row id or
+        a time. Changes before the first remaining row may have been pruned.
+        """
+        first = cls.objects.order_by("id").first()
+        if first is None:
+            return True
+        if isinstance(since, int):
+            return since >= first.id - 1
+        return since >= first.time
+
+
+class AlertSnooze(models.Model):
+    """
+    The time until which an alert of a child is not pushed again. Written by
+    the ``alerts_worker`` command when it queues the alert.
+    """
+
+    model_name = "alert snooze"
+    child = models.ForeignKey(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="alert_snoozes",
+        verbose_name=_("Child"),
+    )
+    key = models.CharField(max_length=64, verbose_name=_("Alert"))
+    until = models.DateTimeField(verbose_name=_("Until"))
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        verbose_name = _("Alert snooze")
+        verbose_name_plural = _("Alert snoozes")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["child", "key"], name="unique_child_alert_snooze"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.child} - {self.key}"
+
+
+class AlertOutbox(models.Model):
+    """
+    An alert waiting to be pushed to a webhook URL.
+
+    The ``alerts_worker`` command adds one row per alert and URL in the same
+    transaction that snoozes the alert, so a queued alert survives restarts,
+    then posts due rows until they are accepted. A failed attempt is retried
+    after an exponentially growing delay, up to ``MAX_ATTEMPTS`` attempts.
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    MAX_ATTEMPTS = 8
+    BACKOFF = datetime.timedelta(seconds=30)
+    MAX_BACKOFF = datetime.timedelta(hours=1)
+
+    model_name = "alert outbox"
+    child = models.ForeignKey(
+        "Child",
+        on_delete=models.CASCADE,
+        related_name="alert_outbox",
+        verbose_name=_("Child"),
+    )
+    url = models.URLField(max_length=500, verbose_name=_("URL"))
+    payload = models.JSONField(verbose_name=_("Payload"))
+    status = models.CharField(
+        max_length=7,
+        choices=[
+            (PENDING, _("Pending")),
+            (SENT, _("Sent")),
+            (FAILED, _("Failed")),
+        ],
+        default=PENDING,
+        verbose_name=_("Status"),
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+    next_attempt = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Next attempt")
+    )
+    last_error = models.TextField(blank=True, verbose_name=_("Last error"))
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(blank=True, null=True, verbose_name=_("Sent"))
+
+    objects = models.Manager()
+
+    class Meta:
+        default_permissions = ("view",)
+        ordering = ["next_attempt", "id"]
+        verbose_name = _("Queued alert")
+        verbose_name_plural = _("Queued alerts")
+        indexes = [
+            models.Index(fields=["status", "next_attempt"], name="alertoutbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.payload.get('alert', {}).get('type')} -> {self.url}"
+
+    def backoff(self):
+        """The delay before the next attempt after ``attempts`` failures."""
+        return min(self.BACKOFF * 2 ** (self.attempts - 1), self.MAX_BACKOFF)
+
+    def record_attempt(self, error=None):
+        """Records a delivery attempt that succeeded, or failed with ``error``."""
+        now = timezone.now()
+        self.attempts += 1
+        if error is None:
+            self.status = self.SENT
+            self.sent = now
+            self.last_error = ""
+        else:
+            self.last_error = str(error)[:1000]
+            if self.attempts >= self.MAX_ATTEMPTS:
+                self.status = self.FAILED
+            else:
+                self.next_attempt = now + self.backoff()
+        self.save()
+
+
+# Sent with the created ``instances`` after entries are inserted with
+# ``bulk_create_entries``, since bulk inserts send no post_save signals.
+post_bulk_create = Signal()
+
+
+def bulk_create_entries(model, instances):
+    """
+    Inserts ``instances`` of an entry model in one transaction with
+    ``bulk_create``, setting derived fields first and notifying the
+    ``post_bulk_create`` handlers once for the whole batch.
+    """
+    for instance in instances:
+        if hasattr(instance, "compute_fields"):
+            instance.compute_fields()
+    with transaction.atomic():
+        created = model.objects.bulk_create(instances)
+        post_bulk_create.send(sender=model, instances=created)
+    return created
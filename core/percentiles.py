@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+טבלאות אחוזוני גדילה בזיכרון
+WHO growth reference percentiles, loaded once per process in to compact
+sorted arrays for O(log n) lookups by age
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from core import models
+
+# Percentile curves stored for each measure, as in the WeightPercentile and
+# HeightPercentile models.
+PERCENTILES = (3, 15, 50, 85, 97)
+
+_MODELS = {
+    "height": models.HeightPercentile,
+    "weight": models.WeightPercentile,
+}
+
+_tables = {}
+_loaded = set()
+_lock = threading.Lock()
+
+
+class PercentileTable:
+    """
+    Percentile curves of one measure for one sex, by age in days.
+    """
+
+    __slots__ = ("ages", "curves")
+
+    def __init__(self, ages, curves):
+        """
+        :param ages: an array of ages in days, sorted.
+        :param curves: a dict of an array of values per percentile in
+                       PERCENTILES, aligned with ``ages``.
+        """
+        self.ages = ages
+        self.curves = curves
+
+    def __len__(self):
+        return len(self.ages)
+
+    def until(self, age):
+        """
+        Get the curves up to an age, for plotting.
+        :param age: the last age in days to include.
+        :returns: a tuple of the list of ages and a dict of the list of values
+                  per percentile.
+        """
+        end = bisect_right(self.ages, age)
+        return (
+            list(self.ages[:end]),
+            {p: list(values[:end]) for p, values in self.curves.items()},
+        )
+
+    def values_at(self, age):
+        """
+        Get the value of each percentile curve at an age, interpolating
+        linearly between the ages of the table.
+        :param age: the age in days; clamped to the ages of the table.
+        :returns: a dict of the value per percentile.
+        """
+        i = bisect_left(self.ages, age)
+        if i == 0 or i == len(self.ages):
+            i = min(i, len(self.ages) - 1)
+            return {p: values[i] for p, values in self.curves.items()}
+        low, high = self.ages[i - 1], self.ages[i]
+        weight = (age - low) / (high - low)
+        return {
+            p: values[i - 1] + (values[i] - values[i - 1]) * weight
+            for p, values in self.curves.items()
+        }
+
+    def percentile(self, age, value):
+        """
+        Get the percentile of a measurement, interpolating linearly between the
+        percentile curves at the age.
+        :param age: the age in days at the measurement.
+        :param value: the measured value.
+        :returns: the percentile, clamped to the range of PERCENTILES.
+        """
+        at = self.values_at(age)
+        curve = [at[p] for p in PERCENTILES]
+        i = bisect_left(curve, value)
+        if i == 0:
+            return float(PERCENTILES[0])
+        if i == len(curve):
+            return float(PERCENTILES[-1])
+        weight = (value - curve[i - 1]) / (curve[i] - curve[i - 1])
+        return PERCENTILES[i - 1] + (PERCENTILES[i] - PERCENTILES[i - 1]) * weight
+
+
+def clear():
+    """Forget the loaded tables, e.g. after the reference data changes."""
+    with _lock:
+        _tables.clear()
+        _loaded.clear()
+
+
+def get_table(measure, sex):
+    """
+    Get the percentile table of a measure and sex, loading the tables of the
+    measure from the database on first use (or, until the reference data
+    exists, on every use).
+    :param measure: "height" or "weight".
+    :param sex: "boy" or "girl".
+    :returns: a PercentileTable instance, or None without reference data.
+    """
+    if measure not in _loaded:
+        with _lock:
+            if measure not in _loaded:
+                tables = _load(measure)
+                if tables:
+                    _tables.update(tables)
+                    _loaded.add(measure)
+    return _tables.get((measure, sex))
+
+
+def _load(measure):
+    """
+    Load the percentile tables of a measure for all sexes in one query.
+    :param measure: "height" or "weight".
+    :returns: a dict of PercentileTables by (measure, sex).
+    """
+    fields = ["p{}_{}".format(p, measure) for p in PERCENTILES]
+    rows = (
+        _MODELS[measure]
+        .objects.order_by("sex", "age_in_days")
+        .values_list("sex", "age_in_days", *fields)
+    )
+    tables = {}
+    for sex, age, *values in rows:
+        if (measure, sex) not in tables:
+            tables[(measure, sex)] = PercentileTable(
+                array("d"), {p: array("d") for p in PERCENTILES}
+            )
+        table = tables[(measure, sex)]
+        table.ages.append(age.days)
+        for p, value in zip(PERCENTILES, values):
+            table.curves[p].append(value)
+    return tables
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+מטפלי אותות של נתוני התינוק
+Signal handlers keeping the data derived from entries up to date: daily
+rollups, child data generations, the change log, sleep timers, learned states
+and medication slots. They are connected by ``connect``, called from
+``CoreConfig.ready``.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.models import (
+    BMI,
+    ChangeLog,
+    Child,
+    DailyRollup,
+    DiaperChange,
+    Feeding,
+    FeedingPatternState,
+    HeadCircumference,
+    Height,
+    Medication,
+    MedicationDose,
+    MedicationSlot,
+    Note,
+    Pumping,
+    Sleep,
+    SolidFood,
+    Tag,
+    Tagged,
+    Temperature,
+    Timer,
+    TummyTime,
+    WakeWindowState,
+    Weight,
+    post_bulk_create,
+    site_localtime,
+)
+
+# entry model -> the rollup section computed from its entries
+_ROLLUP_SECTIONS = {
+    model: section for section, (model, *fields) in DailyRollup.SECTIONS.items()
+}
+
+# Models whose saves start a new data generation of their child.
+_GENERATION_MODELS = (
+    BMI,
+    DiaperChange,
+    Feeding,
+    HeadCircumference,
+    Height,
+    Medication,
+    MedicationDose,
+    Note,
+    Pumping,
+    Sleep,
+    SolidFood,
+    Temperature,
+    Timer,
+    TummyTime,
+    Weight,
+)
+
+# Models whose saves and deletes are recorded in the change log.
+CHANGE_LOG_MODELS = (
+    BMI,
+    Child,
+    DiaperChange,
+    Feeding,
+    HeadCircumference,
+    Height,
+    Medication,
+    MedicationDose,
+    Note,
+    Pumping,
+    Sleep,
+    SolidFood,
+    Tag,
+    Tagged,
+    Temperature,
+    Timer,
+    TummyTime,
+    Weight,
+)
+
+
+def _rollup_keys(instance, field):
+    value = getattr(instance, field, None)
+    if not instance.child_id or value is None:
+        return set()
+    return {(instance.child_id, DailyRollup.local_date(value))}
+
+
+def remember_rollup_keys(sender, instance, raw=False, **kwargs):
+    """Records the day an existing entry belonged to before it changes."""
+    if raw or instance.pk is None:
+        return
+    field = DailyRollup.SECTIONS[_ROLLUP_SECTIONS[sender]][1]
+    previous = sender.objects.filter(pk=instance.pk).first()
+    instance._rollup_previous_keys = (
+        _rollup_keys(previous, field) if previous else set()
+    )
+
+
+def update_daily_rollups(sender, instance, raw=False, origin=None, **kwargs):
+    """Refreshes the rollup section of every day touched by the change."""
+    if raw:
+        return
+    # Nothing to keep up to date when the child itself is being deleted.
+    if isinstance(origin, Child) or getattr(origin, "model", None) is Child:
+        return
+    section = _ROLLUP_SECTIONS[sender]
+    keys = _rollup_keys(instance, DailyRollup.SECTIONS[section][1])
+    keys |= getattr(instance, "_rollup_previous_keys", set())
+    for child_id, date in keys:
+        DailyRollup.refresh(child_id, date, [section])
+
+
+def update_daily_rollups_in_bulk(sender, instances, **kwargs):
+    """Refreshes the rollup section of every day touched by a batch, once."""
+    section = _ROLLUP_SECTIONS[sender]
+    keys = set()
+    for instance in instances:
+        keys |= _rollup_keys(instance, DailyRollup.SECTIONS[section][1])
+    for child_id, date in keys:
+        DailyRollup.refresh(child_id, date, [section])
+
+
+def bump_child_generation(sender, instance, raw=False, **kwargs):
+    """Starts a new data generation for the child of a saved/deleted entry."""
+    if not raw and instance.child_id:
+        Child.bump_generation(instance.child_id)
+
+
+def bump_child_generations(sender, instances, **kwargs):
+    """Starts a new data generation for the children of a batch of entries."""
+    for child_id in {instance.child_id for instance in instances}:
+        if child_id:
+            Child.bump_generation(child_id)
+
+
+def record_change(sender, instance, raw=False, **kwargs):
+    """Appends a saved/deleted instance to the change log."""
+    if raw:
+        return
+    if isinstance(instance, Child):
+        child_id = instance.pk
+    else:
+        child_id = getattr(instance, "child_id", None)
+    ChangeLog.objects.create(
+        content_type=ContentType.objects.get_for_model(sender),
+        object_id=instance.pk,
+        child_id=child_id,
+        action=ChangeLog.SAVE if "created" in kwargs else ChangeLog.DELETE,
+    )
+    # Adding or removing a tag also changes the tagged entry.
+    if isinstance(instance, Tagged):
+        ChangeLog.objects.create(
+            content_type_id=instance.content_type_id,
+            object_id=instance.object_id,
+            action=ChangeLog.SAVE,
+        )
+
+
+def record_changes(sender, instances, **kwargs):
+    """Appends a batch of created instances to the change log."""
+    content_type = ContentType.objects.get_for_model(sender)
+    ChangeLog.objects.bulk_create(
+        ChangeLog(
+            content_type=content_type,
+            object_id=instance.pk,
+            child_id=getattr(instance, "child_id", None),
+            action=ChangeLog.SAVE,
+        )
+        for instance in instances
+    )
+
+
+def stop_sleep_timers(sender, instances, **kwargs):
+    """Stops the sleep timers of children with newly added sleep entries."""
+    Sleep.stop_sleep_timers(
+        {instance.child_id for instance in instances if instance.end}
+    )
+
+
+# entry model -> the learned state kept from its entries
+_LEARNED_STATES = {Feeding: FeedingPatternState, Sleep: WakeWindowState}
+
+
+def remember_learned_state_entry(sender, instance, raw=False, **kwargs):
+    """Records an entry's values before they change."""
+    if raw or instance.pk is None:
+        return
+    instance._learned_state_previous = (
+        sender.objects.filter(pk=instance.pk)
+        .only(*_LEARNED_STATES[sender].ENTRY_FIELDS)
+        .first()
+    )
+
+
+def update_learned_state(sender, instance, raw=False, origin=None, **kwargs):
+    """Moves a saved/deleted entry in its child's learned state."""
+    if raw:
+        return
+    if isinstance(origin, Child) or getattr(origin, "model", None) is Child:
+        return
+    state_model = _LEARNED_STATES[sender]
+    if "created" in kwargs:
+        previous = getattr(instance, "_learned_state_previous", None)
+        instance._learned_state_previous = None
+        changes = [(instance, 1)]
+        if previous is not None:
+            changes.insert(0, (previous, -1))
+    elif origin is not None and origin is not instance:
+        # The neighbours of each entry of a multiple delete are already gone
+        # when its signal is sent, so the child's state is rebuilt instead,
+        # once per delete.
+        rebuilt = origin.__dict__.setdefault("_learned_states_rebuilt", set())
+        if (state_model, instance.child_id) not in rebuilt:
+            rebuilt.add((state_model, instance.child_id))
+            state_model.rebuild(instance.child_id)
+        return
+    else:
+        changes = [(instance, -1)]
+    for child_id in {entry.child_id for entry, sign in changes}:
+        state_model.update(
+            child_id,
+            instance.pk,
+            [(entry, sign) for entry, sign in changes if entry.child_id == child_id],
+        )
+
+
+def rebuild_learned_states(sender, instances, **kwargs):
+    """Rebuilds the learned state of the children of a batch, once."""
+    for child_id in {instance.child_id for instance in instances}:
+        _LEARNED_STATES[sender].rebuild(child_id)
+
+
+def remember_medication_slot_day(sender, instance, raw=False, **kwargs):
+    """Records the child and time of a dose before they change."""
+    if raw or instance.pk is None:
+        return
+    instance._medication_slot_day = (
+        MedicationDose.objects.filter(pk=instance.pk)
+        .values_list("child_id", "time")
+        .first()
+    )
+
+
+def refresh_medication_slots(sender, instance, raw=False, origin=None, **kwargs):
+    """Rebuilds the medication slots of the day a medication or dose changed."""
+    if raw:
+        return
+    # Slots go along with a deleted child or medication; the medication's own
+    # signal then refreshes the day.
+    deleted = getattr(origin, "model", type(origin))
+    if deleted in (Child, Medication) and deleted is not sender:
+        return
+    days = {}
+    if sender is Medication:
+        if "created" in kwargs:
+            # Drop the slots left with another child by a moved medication.
+            MedicationSlot.objects.filter(medication=instance).exclude(
+                child_id=instance.child_id
+            ).delete()
+        days[instance.child_id] = site_localtime().date()
+    else:
+        previous = getattr(instance, "_medication_slot_day", None)
+        instance._medication_slot_day = None
+        for child_id, dose_time in filter(
+            None, (previous, (instance.child_id, instance.time))
+        ):
+            date = site_localtime(dose_time).date()
+            days[child_id] = min(date, days.get(child_id, date))
+    if origin is not None and origin is not instance:
+        # Refresh each day once per multiple delete.
+        refreshed = origin.__dict__.setdefault("_medication_slots_refreshed", set())
+        days = {key: value for key, value in days.items() if key not in refreshed}
+        refreshed.update(days)
+    for child_id, date in days.items():
+        MedicationSlot.refresh(child_id, date)
+
+
+def refresh_medication_slots_in_bulk(sender, instances, **kwargs):
+    """Rebuilds the medication slots of the days of a batch of doses."""
+    days = {}
+    for instance in instances:
+        date = site_localtime(instance.time).date()
+        days[instance.child_id] = min(date, days.get(instance.child_id, date))
+    for child_id, date in days.items():
+        MedicationSlot.refresh(child_id, date)
+
+
+def connect():
+    """Connects the handlers above to the signals of their models."""
+    for model in _ROLLUP_SECTIONS:
+        pre_save.connect(remember_rollup_keys, sender=model)
+        post_save.connect(update_daily_rollups, sender=model)
+        post_delete.connect(update_daily_rollups, sender=model)
+        post_bulk_create.connect(update_daily_rollups_in_bulk, sender=model)
+
+    for model in _GENERATION_MODELS:
+        post_save.connect(bump_child_generation, sender=model)
+        post_delete.connect(bump_child_generation, sender=model)
+        post_bulk_create.connect(bump_child_generations, sender=model)
+
+    for model in CHANGE_LOG_MODELS:
+        post_save.connect(record_change, sender=model)
+        post_delete.connect(record_change, sender=model)
+        post_bulk_create.connect(record_changes, sender=model)
+
+    post_bulk_create.connect(stop_sleep_timers, sender=Sleep)
+
+    for model in _LEARNED_STATES:
+        pre_save.connect(remember_learned_state_entry, sender=model)
+        post_save.connect(update_learned_state, sender=model)
+        post_delete.connect(update_learned_state, sender=model)
+        post_bulk_create.connect(rebuild_learned_states, sender=model)
+
+    pre_save.connect(remember_medication_slot_day, sender=MedicationDose)
+    for model in (Medication, MedicationDose):
+        post_save.connect(refresh_medication_slots, sender=model)
+        post_delete.connect(refresh_medication_slots, sender=model)
+    post_bulk_create.connect(refresh_medication_slots_in_bulk, sender=MedicationDose)
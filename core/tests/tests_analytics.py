@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import models
+from core.analytics import ActivitySnapshot, BabyAnalytics
+
+
+class ActivitySnapshotTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        self.child = models.Child.objects.create(
+            first_name="First",
+            last_name="Last",
+            birth_date=timezone.localdate() - timezone.timedelta(days=200),
+        )
+        now = timezone.now()
+        for hours_ago in (10, 7, 4, 1):
+            models.Feeding.objects.create(
+                child=self.child,
+                start=now - timezone.timedelta(hours=hours_ago, minutes=20),
+                end=now - timezone.timedelta(hours=hours_ago),
+                type="formula",
+                method="bottle",
+                amount=120,
+            )
+        for hours_ago in (9, 5, 2):
+            models.Sleep.objects.create(
+                child=self.child,
+                start=now - timezone.timedelta(hours=hours_ago, minutes=50),
+                end=now - timezone.timedelta(hours=hours_ago),
+                nap=True,
+            )
+        for hours_ago in (8, 3):
+            models.DiaperChange.objects.create(
+                child=self.child,
+                time=now - timezone.timedelta(hours=hours_ago),
+                wet=True,
+                solid=hours_ago == 3,
+            )
+        models.Timer.objects.create(
+            user=get_user_model().objects.create_user(username="timer-user"),
+            child=self.child,
+            name="Feeding",
+            start=now - timezone.timedelta(minutes=5),
+        )
+
+    def test_current_status_matches_direct_queries(self):
+        direct = BabyAnalytics(self.child)
+        snapshot = BabyAnalytics(self.child, snapshot=ActivitySnapshot(self.child))
+
+        for method in (
+            "get_feeding_stats",
+            "get_sleep_stats",
+            "get_diaper_stats",
+            "get_daily_summary",
+            "get_night_sleep_schedule",
+        ):
+            self.assertEqual(getattr(direct, method)(), getattr(snapshot, method)())
+
+        self.assertEqual(
+            direct.get_last_feeding_info()["feeding"],
+            snapshot.get_last_feeding_info()["feeding"],
+        )
+        self.assertEqual(
+            direct.get_previous_feeding_info()["feeding"],
+            snapshot.get_previous_feeding_info()["feeding"],
+        )
+        self.assertEqual(
+            direct.get_last_sleep_info()["sleep"],
+            snapshot.get_last_sleep_info()["sleep"],
+        )
+        self.assertEqual(
+            direct.get_last_diaper_info()["change"],
+            snapshot.get_last_diaper_info()["change"],
+        )
+        self.assertEqual(
+            direct.get_feeding_display_status()["mode"],
+            snapshot.get_feeding_display_status()["mode"],
+        )
+
+    def test_current_status_query_count(self):
+        analytics = BabyAnalytics(self.child)
+        # The child's data generation (from the default database cache), then
+        # feedings, sleeps, diaper changes, active timers and the learned wake
+        # windows and feeding pattern: one query each.
+        with self.assertNumQueries(7):
+            status = analytics.get_current_status()
+            analytics.snapshot.wake_window_state
+            analytics.get_previous_feeding_info()
+            analytics.get_night_sleep_schedule()
+        self.assertEqual(status["stats_7_days"]["feeding"]["count"], 4)
+        self.assertEqual(status["stats_7_days"]["diapers"]["solid_count"], 1)
+        self.assertEqual(status["feeding_display_status"]["mode"], "feeding")
+
+    def test_past_daily_summary_in_user_time_zone(self):
+        # 02:00 of a site day is the evening before in New York. Rollups keep
+        # the site's days, so a New York user's summary counts the entries.
+        day = timezone.localdate() - timezone.timedelta(days=3)
+        models.DiaperChange.objects.create(
+            child=self.child,
+            time=timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time(2)),
+                timezone.get_default_timezone(),
+            ),
+            wet=True,
+            solid=False,
+        )
+        analytics = BabyAnalytics(self.child)
+        self.assertEqual(analytics.get_daily_summary(day)["diapers"]["count"], 1)
+        with timezone.override("America/New_York"):
+            summary = analytics.get_daily_summary(day)
+            self.assertEqual(summary["diapers"]["count"], 0)
+            summary = analytics.get_daily_summary(day - timezone.timedelta(days=1))
+            self.assertEqual(summary["diapers"]["count"], 1)
+
+    def test_latest_entries_fall_back_outside_window(self):
+        models.Feeding.objects.filter(child=self.child).delete()
+        old = timezone.now() - timezone.timedelta(days=30)
+        feeding = models.Feeding.objects.create(
+            child=self.child,
+            start=old,
+            end=old + timezone.timedelta(minutes=15),
+            type="formula",
+            method="bottle",
+        )
+        analytics = BabyAnalytics(self.child, snapshot=ActivitySnapshot(self.child))
+        self.assertEqual(analytics.get_last_feeding_info()["feeding"].id, feeding.id)
+        self.assertEqual(analytics.get_feeding_stats()["count"], 0)
+
+
+class BatchedAnalyticsTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        now = timezone.now()
+        self.children = []
+        for index in range(3):
+            child = models.Child.objects.create(
+                first_name=f"Child{index}",
+                last_name="Last",
+                birth_date=timezone.localdate() - timezone.timedelta(days=100),
+            )
+            self.children.append(child)
+            for hours_ago in (9, 6, 3 + index):
+                models.Feeding.objects.create(
+                    child=child,
+                    start=now - timezone.timedelta(hours=hours_ago, minutes=15),
+                    end=now - timezone.timedelta(hours=hours_ago),
+                    type="breast milk",
+                    method="left breast",
+                )
+            models.Sleep.objects.create(
+                child=child,
+                start=now - timezone.timedelta(hours=2, minutes=40),
+                end=now - timezone.timedelta(hours=2),
+                nap=True,
+            )
+        # A child whose only entries are older than the snapshot window.
+        old = now - timezone.timedelta(days=40)
+        self.inactive = models.Child.objects.create(
+            first_name="Inactive",
+            last_name="Last",
+            birth_date=timezone.localdate() - timezone.timedelta(days=400),
+        )
+        self.old_feeding = models.Feeding.objects.create(
+            child=self.inactive,
+            start=old,
+            end=old + timezone.timedelta(minutes=10),
+            type="formula",
+            method="bottle",
+        )
+        self.children.append(self.inactive)
+
+    # Both sides compute times since the latest entries, so they must see the
+    # same now.
+    @mock.patch("django.utils.timezone.now", return_value=timezone.now())
+    def test_batched_results_match_single_child(self, now):
+        batched = BabyAnalytics.for_children(self.children)
+        self.assertEqual([a.child for a in batched], self.children)
+        for analytics in batched:
+            direct = BabyAnalytics(analytics.child)
+            self.assertEqual(
+                direct.get_last_feeding_info(), analytics.get_last_feeding_info()
+            )
+            self.assertEqual(
+                direct.get_last_sleep_info(), analytics.get_last_sleep_info()
+            )
+            prediction = direct.predict_next_feeding()
+            batched_prediction = analytics.predict_next_feeding()
+            self.assertEqual(prediction is None, batched_prediction is None)
+            if prediction:
+                self.assertEqual(prediction["status"], batched_prediction["status"])
+
+    def test_query_count_does_not_grow_with_children(self):
+        # Window feedings and sleeps, the latest feeding and sleep per child
+        # for the inactive child, then the learned feeding patterns, regardless
+        # of how many children.
+        with self.assertNumQueries(5):
+            for analytics in BabyAnalytics.for_children(self.children):
+                analytics.get_last_feeding_info()
+                analytics.get_last_sleep_info()
+                analytics.predict_next_feeding()
+        last = BabyAnalytics.for_children([self.inactive])[0]
+        self.assertEqual(
+            last.get_last_feeding_info()["feeding"].id, self.old_feeding.id
+        )
+        self.assertIsNone(last.get_last_sleep_info())
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 import datetime
+import glob
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
 from django.contrib.auth import get_user_model
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 from django.utils import timezone
 
@@ -27,6 +33,118 @@ class BMITestCase(TestCase):
         self.assertEqual(self.bmi.bmi, 63.2)
 
 
+class ChangeLogTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        self.child = models.Child.objects.create(
+            first_name="First", last_name="Last", birth_date=timezone.localdate()
+        )
+        self.time = timezone.localtime() - timezone.timedelta(hours=1)
+
+    def test_change_log(self):
+        since = timezone.now() - timezone.timedelta(seconds=1)
+        note = models.Note.objects.create(child=self.child, note="Note", time=self.time)
+        change = models.DiaperChange.objects.create(
+            child=self.child, time=self.time, wet=True, solid=False
+        )
+        change_id = change.id
+        change.delete()
+        # The child's own save, the note's and the diaper change's two.
+        self.assertEqual(
+            models.ChangeLog.objects.filter(child_id=self.child.id).count(), 4
+        )
+
+        changes = models.ChangeLog.changes(since)
+        self.assertEqual(changes[(models.Note, note.id)], models.ChangeLog.SAVE)
+        self.assertEqual(
+            changes[(models.DiaperChange, change_id)], models.ChangeLog.DELETE
+        )
+        self.assertEqual(models.ChangeLog.changes(timezone.now()), {})
+
+    def test_prune(self):
+        old = timezone.now() - timezone.timedelta(days=100)
+        models.Note.objects.create(child=self.child, note="Old", time=self.time)
+        models.ChangeLog.objects.update(time=old)
+        last_old = models.ChangeLog.objects.last()
+        self.assertTrue(models.ChangeLog.covers(0))
+
+        call_command("prune_change_log", days=0, stdout=StringIO())
+        self.assertEqual(models.ChangeLog.objects.count(), 2)
+        call_command("prune_change_log", stdout=StringIO())
+        # The latest change is kept to mark where the log starts.
+        self.assertEqual(list(models.ChangeLog.objects.all()), [last_old])
+        self.assertFalse(models.ChangeLog.covers(0))
+        self.assertTrue(models.ChangeLog.covers(last_old.id - 1))
+        self.assertFalse(models.ChangeLog.covers(old - timezone.timedelta(days=1)))
+        self.assertTrue(models.ChangeLog.covers(old))
+        with self.assertRaises(CommandError):
+            call_command(
+                "backup_database",
+                output_dir=tempfile.gettempdir(),
+                since=(old - timezone.timedelta(days=1)).isoformat(),
+                stdout=StringIO(),
+            )
+
+        note = models.Note.objects.create(child=self.child, note="New", time=self.time)
+        call_command("prune_change_log", stdout=StringIO())
+        self.assertEqual(
+            list(models.ChangeLog.objects.values_list("object_id", flat=True)),
+            [note.id],
+        )
+
+    def test_stopped_sleep_timer_logged(self):
+        user = get_user_model().objects.create_user(username="timer")
+        timer = models.Timer.objects.create(child=self.child, name="Sleep", user=user)
+        since = timezone.now()
+        models.Sleep.objects.create(
+            child=self.child,
+            start=self.time,
+            end=self.time + timezone.timedelta(minutes=30),
+        )
+        timer.refresh_from_db()
+        self.assertFalse(timer.active)
+        changes = models.ChangeLog.changes(since - timezone.timedelta(seconds=1))
+        self.assertEqual(changes[(models.Timer, timer.id)], models.ChangeLog.SAVE)
+
+    def test_backup_and_restore(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        models.Feeding.objects.create(
+            child=self.child,
+            start=self.time,
+            end=self.time + timezone.timedelta(minutes=15),
+            type="formula",
+            method="bottle",
+            amount=60,
+        )
+        note = models.Note.objects.create(child=self.child, note="Old", time=self.time)
+        call_command("backup_database", output_dir=output_dir, stdout=StringIO())
+        full_backup = glob.glob(os.path.join(output_dir, "*.jsonl.gz"))[0]
+
+        note.note = "New"
+        note.save()
+        models.Feeding.objects.all().delete()
+        call_command(
+            "backup_database",
+            output_dir=output_dir,
+            incremental=True,
+            stdout=StringIO(),
+        )
+        incremental_backup = glob.glob(
+            os.path.join(output_dir, "*_incremental.jsonl.gz")
+        )[0]
+
+        models.Child.objects.all().delete()
+        call_command("restore_database", full_backup, stdout=StringIO())
+        self.assertEqual(models.Feeding.objects.count(), 1)
+        self.assertEqual(models.Note.objects.get().note, "Old")
+        self.assertEqual(models.DailyRollup.objects.get().feeding_count, 1)
+
+        call_command("restore_database", incremental_backup, stdout=StringIO())
+        self.assertEqual(models.Feeding.objects.count(), 0)
+        self.assertEqual(models.Note.objects.get().note, "New")
+
+
 class ChildTestCase(TestCase):
     def setUp(self):
         call_command("migrate", verbosity=0)
@@ -83,6 +201,464 @@ class ChildTestCase(TestCase):
         )
 
 
+class DailyRollupTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        self.child = models.Child.objects.create(
+            first_name="First", last_name="Last", birth_date=timezone.localdate()
+        )
+        self.day = timezone.localdate() - timezone.timedelta(days=2)
+        self.morning = timezone.make_aware(
+            datetime.datetime.combine(self.day, datetime.time(9))
+        )
+
+    def rollup(self, date=None):
+        return models.DailyRollup.objects.get(child=self.child, date=date or self.day)
+
+    def test_rollup_follows_saves_and_deletes(self):
+        feeding = models.Feeding.objects.create(
+            child=self.child,
+            start=self.morning,
+            end=self.morning + timezone.timedelta(minutes=20),
+            type="formula",
+            method="bottle",
+            amount=90,
+        )
+        models.DiaperChange.objects.create(
+            child=self.child, time=self.morning, wet=True, solid=False
+        )
+        rollup = self.rollup()
+        self.assertEqual(rollup.feeding_count, 1)
+        self.assertEqual(rollup.feeding_amount, 90)
+        self.assertEqual(rollup.feeding_duration, timezone.timedelta(minutes=20))
+        self.assertEqual(
+            rollup.feeding_by_type, {"formula": {"count": 1, "amount": 90}}
+        )
+        self.assertEqual(rollup.feeding_by_method, {"bottle": 1})
+        self.assertEqual(rollup.diaper_wet, 1)
+
+        # Moving an entry to another day updates both days.
+        feeding.start -= timezone.timedelta(days=1)
+        feeding.end -= timezone.timedelta(days=1)
+        feeding.save()
+        self.assertEqual(self.rollup().feeding_count, 0)
+        self.assertEqual(self.rollup().diaper_count, 1)
+        previous_day = self.day - timezone.timedelta(days=1)
+        self.assertEqual(self.rollup(previous_day).feeding_count, 1)
+
+        feeding.delete()
+        self.assertEqual(self.rollup(previous_day).feeding_count, 0)
+
+    def test_rebuild_rollups(self):
+        models.Sleep.objects.create(
+            child=self.child,
+            start=self.morning,
+            end=self.morning + timezone.timedelta(hours=1),
+            nap=True,
+        )
+        models.TummyTime.objects.create(
+            child=self.child,
+            start=self.morning,
+            end=self.morning + timezone.timedelta(minutes=5),
+        )
+        incremental = self.rollup()
+        models.DailyRollup.objects.all().delete()
+
+        call_command("rebuild_rollups", verbosity=0, stdout=StringIO())
+        rebuilt = self.rollup()
+        self.assertEqual(rebuilt.nap_count, 1)
+        self.assertEqual(rebuilt.sleep_duration, timezone.timedelta(hours=1))
+        self.assertEqual(rebuilt.tummytime_count, 1)
+        for field in ("sleep_count", "nap_duration", "tummytime_duration"):
+            self.assertEqual(getattr(rebuilt, field), getattr(incremental, field))
+
+    def test_child_delete(self):
+        models.DiaperChange.objects.create(
+            child=self.child, time=self.morning, wet=True, solid=True
+        )
+        self.child.delete()
+        self.assertFalse(models.DailyRollup.objects.exists())
+
+    def test_days_in_site_time_zone(self):
+        # Early morning in the site's time zone is the previous evening in New
+        # York; the entry still belongs to the site's day for every user.
+        early = timezone.make_aware(
+            datetime.datetime.combine(self.day, datetime.time(2)),
+            timezone.get_default_timezone(),
+        )
+        with timezone.override("America/New_York"):
+            models.DiaperChange.objects.create(
+                child=self.child, time=early, wet=True, solid=False
+            )
+            rollups = models.DailyRollup.for_dates(self.child, [self.day])
+        self.assertEqual(self.rollup().diaper_count, 1)
+        self.assertEqual(rollups[self.day].diaper_count, 1)
+
+    def test_for_dates_does_not_write(self):
+        models.DiaperChange.objects.create(
+            child=self.child, time=self.morning, wet=True, solid=False
+        )
+        models.DailyRollup.objects.all().delete()
+        previous_day = self.day - timezone.timedelta(days=1)
+        rollups = models.DailyRollup.for_dates(self.child, [previous_day, self.day])
+        self.assertEqual(rollups[self.day].diaper_count, 1)
+        self.assertEqual(rollups[self.day].diaper_wet, 1)
+        self.assertEqual(rollups[previous_day].diaper_count, 0)
+        self.assertFalse(models.DailyRollup.objects.exists())
+
+
+class WakeWindowStateTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        # Requests made by earlier tests leave their user's time zone active.
+        timezone.deactivate()
+        self.child = models.Child.objects.create(
+            first_name="First", last_name="Last", birth_date=timezone.localdate()
+        )
+        self.day = timezone.localdate() - timezone.timedelta(days=2)
+
+    def sleep(self, hour, minutes=60):
+        start = timezone.make_aware(
+            datetime.datetime.combine(self.day, datetime.time(hour))
+        )
+        return models.Sleep.objects.create(
+            child=self.child,
+            start=start,
+            end=start + timezone.timedelta(minutes=minutes),
+            nap=True,
+        )
+
+    def assertMatchesRebuild(self):
+        state = models.WakeWindowState.objects.get(child=self.child)
+        rebuilt = models.WakeWindowState.rebuild(self.child.id)
+        self.assertEqual(state.anchor, rebuilt.anchor)
+        self.assertEqual(state.recent, rebuilt.recent)
+        self.assertEqual(set(state.hours), set(rebuilt.hours))
+        for hour, sums in rebuilt.hours.items():
+            for value, expected in zip(state.hours[hour], sums):
+                self.assertAlmostEqual(value, expected)
+        return rebuilt
+
+    def test_state_follows_saves_and_deletes(self):
+        self.sleep(8)
+        self.sleep(14)
+        middle = self.sleep(11)
+        state = self.assertMatchesRebuild()
+        # 09:00-11:00 and 12:00-14:00
+        self.assertEqual(state.recent, {self.day.isoformat(): 2})
+        self.assertEqual(set(state.hours), {"9", "12"})
+
+        # Moving an entry removes its old windows and adds the new ones.
+        middle.start -= timezone.timedelta(minutes=30)
+        middle.end -= timezone.timedelta(minutes=30)
+        middle.save()
+        self.assertMatchesRebuild()
+
+        middle.delete()
+        state = self.assertMatchesRebuild()
+        self.assertEqual(state.estimate(9)["mean_minutes"], 300)
+
+    def test_estimate(self):
+        self.sleep(6)
+        self.sleep(8)
+        self.sleep(11)
+        estimate = models.WakeWindowState.for_child(self.child).estimate(8)
+        # 60 and 120 minute windows starting at 07:00 and 09:00, same weight.
+        self.assertAlmostEqual(estimate["mean_minutes"], 90)
+        self.assertAlmostEqual(estimate["std_minutes"], 30)
+        self.assertEqual(estimate["sample_size"], 2)
+
+    def test_hours_in_site_time_zone(self):
+        # The window from 07:00 to 08:00 of the site's time zone is kept at
+        # the site's hour 7, even when a user in New York logs the sleep.
+        self.sleep(6)
+        start = timezone.make_aware(
+            datetime.datetime.combine(self.day, datetime.time(8))
+        )
+        with timezone.override("America/New_York"):
+            models.Sleep.objects.create(
+                child=self.child,
+                start=start,
+                end=start + timezone.timedelta(hours=1),
+                nap=True,
+            )
+        self.assertEqual(
+            list(models.WakeWindowState.for_child(self.child).hours), ["7"]
+        )
+
+    def test_bulk_create_and_rebuild(self):
+        models.bulk_create_entries(
+            models.Sleep,
+            [
+                models.Sleep(
+                    child=self.child,
+                    start=timezone.make_aware(
+                        datetime.datetime.combine(self.day, datetime.time(hour))
+                    ),
+                    end=timezone.make_aware(
+                        datetime.datetime.combine(self.day, datetime.time(hour + 1))
+                    ),
+                )
+                for hour in (7, 10, 13)
+            ],
+        )
+        incremental = self.assertMatchesRebuild()
+        models.WakeWindowState.objects.all().delete()
+
+        call_command("rebuild_rollups", verbosity=0, stdout=StringIO())
+        rebuilt = models.WakeWindowState.objects.get(child=self.child)
+        self.assertEqual(rebuilt.hours, incremental.hours)
+        self.assertEqual(rebuilt.recent, {self.day.isoformat(): 2})
+
+
+class FeedingPatternStateTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        # Requests made by earlier tests leave their user's time zone active.
+        timezone.deactivate()
+        self.child = models.Child.objects.create(
+            first_name="First", last_name="Last", birth_date=timezone.localdate()
+        )
+        self.day = timezone.localdate() - timezone.timedelta(days=2)
+
+    def feeding(self, hour, amount=100, type="formula", day=None):
+        start = timezone.make_aware(
+            datetime.datetime.combine(day or self.day, datetime.time(hour))
+        )
+        return models.Feeding.objects.create(
+            child=self.child,
+            start=start,
+            end=start + timezone.timedelta(minutes=20),
+            type=type,
+            method="bottle",
+            amount=amount,
+        )
+
+    def assertMatchesRebuild(self):
+        state = models.FeedingPatternState.objects.get(child=self.child)
+        rebuilt = models.FeedingPatternState.rebuild(self.child.id)
+        self.assertEqual(state.anchor, rebuilt.anchor)
+        self.assertEqual(state.curves, rebuilt.curves)
+        for track, data in rebuilt.tracks.items():
+            self.assertEqual(state.tracks[track]["days"], data["days"])
+            for value, expected in zip(
+                state.tracks[track]["intervals"], data["intervals"]
+            ):
+                self.assertAlmostEqual(value, expected)
+        return rebuilt
+
+    def test_state_follows_saves_and_deletes(self):
+        self.feeding(6)
+        self.feeding(12)
+        middle = self.feeding(9)
+        solid = self.feeding(10, amount=30, type="solid food")
+        state = self.assertMatchesRebuild()
+        self.assertEqual(state.day("milk", self.day)["amount"], 300)
+        self.assertEqual(state.day("all", self.day)["count"], 4)
+        # 06:20-09:00 and 09:20-12:00, without the solid food in between.
+        self.assertAlmostEqual(state.interval_estimate("milk")["mean_minutes"], 160)
+
+        middle.start -= timezone.timedelta(days=1)
+        middle.end -= timezone.timedelta(days=1)
+        middle.save()
+        self.assertMatchesRebuild()
+        solid.type = "formula"
+        solid.save()
+        self.assertMatchesRebuild()
+
+        middle.delete()
+        state = self.assertMatchesRebuild()
+        self.assertEqual(state.day("milk", self.day)["count"], 3)
+
+        # Deleting several entries at once rebuilds the state.
+        models.Feeding.objects.filter(child=self.child, start__hour__gte=10).delete()
+        state = self.assertMatchesRebuild()
+        self.assertIsNone(state.interval_estimate("all"))
+
+    def test_days_in_site_time_zone(self):
+        # An early morning feeding of the site's day is on the previous
+        # evening in New York; it is still counted on the site's day.
+        with timezone.override("America/New_York"):
+            start = timezone.make_aware(
+                datetime.datetime.combine(self.day, datetime.time(2)),
+                timezone.get_default_timezone(),
+            )
+            models.Feeding.objects.create(
+                child=self.child,
+                start=start,
+                end=start + timezone.timedelta(minutes=20),
+                type="formula",
+                method="bottle",
+                amount=100,
+            )
+        state = models.FeedingPatternState.for_child(self.child)
+        self.assertEqual(state.day("all", self.day)["count"], 1)
+
+    def test_decimal_amount(self):
+        # The fake command, like any caller, may give amounts as Decimal.
+        self.feeding(6, amount=Decimal("4.5"))
+        self.feeding(9, amount=Decimal("3.5"))
+        state = self.assertMatchesRebuild()
+        self.assertEqual(state.day("all", self.day)["amount"], 8)
+
+    def test_pace_curve(self):
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        for day in (self.day, yesterday):
+            self.feeding(8, amount=60, day=day)
+            self.feeding(14, amount=90, day=day)
+        self.feeding(8, amount=30, type="solid food", day=yesterday)
+
+        state = models.FeedingPatternState.for_child(self.child)
+        baseline = state.baseline("milk", timezone.localdate())
+        self.assertEqual(baseline["days"], 2)
+        self.assertEqual(baseline["count"], 4)
+        self.assertEqual(baseline["amount"], 300)
+        self.assertEqual(state.amount_by(baseline, 7 * 3600), 0)
+        self.assertEqual(state.amount_by(baseline, 12 * 3600), 120)
+        self.assertEqual(state.amount_by(baseline, 23 * 3600), 300)
+        self.assertEqual(
+            state.amount_by(state.baseline("all", timezone.localdate()), 12 * 3600),
+            150,
+        )
+
+
+class MedicationSlotTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        # Requests made by earlier tests leave their user's time zone active.
+        timezone.deactivate()
+        self.child = models.Child.objects.create(
+            first_name="First", last_name="Last", birth_date=timezone.localdate()
+        )
+        self.day = timezone.localdate() - timezone.timedelta(days=2)
+        self.twice = self.medication("Drops", "twice_daily", "21:00, 09:00")
+        self.once = self.medication("Vitamin D", "once_daily")
+        self.as_needed = self.medication("Paracetamol", "as_needed")
+
+    def medication(self, name, frequency, schedule_times=""):
+        return models.Medication.objects.create(
+            child=self.child,
+            name=name,
+            frequency=frequency,
+            schedule_times=schedule_times,
+            start_date=self.day - timezone.timedelta(days=30),
+        )
+
+    def at(self, hour, minute=0, day=None):
+        return timezone.make_aware(
+            datetime.datetime.combine(day or self.day, datetime.time(hour, minute))
+        )
+
+    def dose(self, medication, hour, minute=0, day=None, given=True):
+        return models.MedicationDose.objects.create(
+            child=self.child,
+            medication=medication,
+            time=self.at(hour, minute, day),
+            given=given,
+        )
+
+    def status(self, now=None):
+        slots = models.MedicationSlot.for_day(self.child.id, self.day)
+        return {
+            entry["medication"].name: (entry["due"], entry["next_dose_time"])
+            for entry in models.MedicationSlot.status(slots, now or self.at(0))
+        }
+
+    def test_schedule(self):
+        self.assertEqual(
+            self.status(),
+            {
+                "Drops": (True, self.at(9)),
+                "Paracetamol": (False, None),
+                "Vitamin D": (True, None),
+            },
+        )
+        self.assertEqual(
+            models.MedicationSlot.objects.filter(
+                child=self.child, date=self.day
+            ).count(),
+            4,
+        )
+        # Built days are read with a single query.
+        with self.assertNumQueries(1):
+            models.MedicationSlot.for_day(self.child.id, self.day)
+
+    def test_day_built_once(self):
+        # A read that lost the race to build the day finds its marker and
+        # reads the slots the winner built instead of inserting its own.
+        models.MedicationDay.objects.create(child=self.child, date=self.day)
+        self.assertEqual(models.MedicationSlot.for_day(self.child.id, self.day), [])
+        self.assertFalse(models.MedicationSlot.objects.filter(date=self.day))
+
+        models.MedicationSlot.refresh(self.child.id, self.day)
+        models.MedicationSlot.refresh(self.child.id, self.day)
+        self.assertEqual(len(models.MedicationSlot.for_day(self.child.id, self.day)), 4)
+        self.assertEqual(models.MedicationSlot.objects.filter(date=self.day).count(), 4)
+
+    def test_doses_fulfil_slots(self):
+        self.dose(self.twice, 9, 20)
+        self.dose(self.once, 14)
+        status = self.status()
+        self.assertEqual(status["Drops"], (True, self.at(21)))
+        self.assertEqual(status["Vitamin D"], (False, None))
+
+        # An off-schedule dose fulfils the earliest open slot.
+        extra = self.dose(self.twice, 12)
+        self.assertEqual(self.status()["Drops"], (False, None))
+        extra.delete()
+        self.assertEqual(self.status()["Drops"], (True, self.at(21)))
+        self.assertEqual(self.status(now=self.at(22))["Drops"], (True, None))
+
+    def test_site_time_zone(self):
+        # A dose at 21:30 of the site's time zone fulfils the 21:00 slot, also
+        # when logged by a user in New York.
+        time = self.at(21, 30)
+        with timezone.override("America/New_York"):
+            models.MedicationDose.objects.create(
+                child=self.child, medication=self.twice, time=time, given=True
+            )
+        self.assertEqual(self.status()["Drops"], (True, self.at(9)))
+
+    def test_interval_frequency(self):
+        weekly = self.medication("Iron", "weekly")
+        self.assertTrue(self.status()["Iron"][0])
+        self.dose(weekly, 10, day=self.day - timezone.timedelta(days=3))
+        self.assertFalse(self.status()["Iron"][0])
+        # Skipped doses do not count as the last dose given.
+        models.MedicationDose.objects.filter(medication=weekly).update(given=False)
+        models.MedicationSlot.refresh(self.child.id, self.day)
+        self.assertTrue(self.status()["Iron"][0])
+
+    def test_medication_changes(self):
+        self.status()
+        self.twice.schedule_times = "08:00"
+        self.twice.save()
+        self.once.active = False
+        self.once.save()
+        today = timezone.localdate()
+        status = models.MedicationSlot.status(
+            models.MedicationSlot.for_day(self.child.id),
+            timezone.make_aware(datetime.datetime.combine(today, datetime.time.min)),
+        )
+        self.assertEqual(
+            [(entry["medication"].name, entry["due"]) for entry in status],
+            [("Drops", True), ("Paracetamol", False)],
+        )
+        self.assertFalse(
+            models.MedicationSlot.objects.filter(child=self.child, date__gt=today)
+        )
+
+        self.dose(self.twice, 9)
+        twice_id = self.twice.id
+        self.twice.delete()
+        self.assertFalse(models.MedicationSlot.objects.filter(medication_id=twice_id))
+        slots = models.MedicationSlot.for_day(self.child.id)
+        self.assertEqual(
+            [entry["medication"] for entry in models.MedicationSlot.status(slots)],
+            [self.as_needed],
+        )
+
+
 class DiaperChangeTestCase(TestCase):
     def setUp(self):
         call_command("migrate", verbosity=0)
@@ -110,6 +686,20 @@ class DiaperChangeTestCase(TestCase):
     def test_diaperchange_attributes(self):
         self.assertListEqual(self.change.attributes(), ["Wet", "Solid", "Black"])
 
+    def test_save_query_count(self):
+        """
+        Saving one entry also writes its daily rollup, the child's data
+        generation and the change log; the first entry of a day builds the
+        day's whole rollup.
+        """
+        self.change.amount = 2
+        with self.assertNumQueries(12):
+            self.change.save()
+        with self.assertNumQueries(15):
+            models.DiaperChange.objects.create(
+                child=self.child, time=timezone.localtime(), wet=1, solid=0
+            )
+
 
 class FeedingTestCase(TestCase):
     def setUp(self):
@@ -143,6 +733,19 @@ class FeedingTestCase(TestCase):
         self.assertEqual(str(feeding), "Feeding")
         self.assertEqual(feeding.method, "both breasts")
 
+    def test_save_query_count(self):
+        """Feedings also update the child's learned feeding pattern."""
+        feeding = models.Feeding.objects.create(
+            child=self.child,
+            start=timezone.localtime() - timezone.timedelta(minutes=30),
+            end=timezone.localtime(),
+            type="formula",
+            method="bottle",
+        )
+        feeding.amount = 2
+        with self.assertNumQueries(25):
+            feeding.save()
+
 
 class HeadCircumferenceTestCase(TestCase):
     def setUp(self):
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import percentiles
+
+
+class PercentilesTestCase(TestCase):
+    def setUp(self):
+        call_command("migrate", verbosity=0)
+        percentiles.clear()
+
+    def tearDown(self):
+        percentiles.clear()
+
+    def test_get_table(self):
+        with self.assertNumQueries(1):
+            boys = percentiles.get_table("weight", "boy")
+            girls = percentiles.get_table("weight", "girl")
+        with self.assertNumQueries(0):
+            self.assertIs(percentiles.get_table("weight", "boy"), boys)
+            self.assertIsNone(percentiles.get_table("weight", None))
+        self.assertIsNot(boys, girls)
+        self.assertEqual(len(boys), 1857)
+        self.assertEqual(boys.ages[0], 0)
+        self.assertEqual(boys.curves[50][0], 3.346)
+
+    def test_values_at(self):
+        boys = percentiles.get_table("weight", "boy")
+        self.assertEqual(boys.values_at(0)[50], 3.346)
+        self.assertAlmostEqual(boys.values_at(0.5)[50], (3.346 + 3.317) / 2)
+        self.assertEqual(boys.values_at(-1), boys.values_at(0))
+        self.assertEqual(boys.values_at(10000), boys.values_at(boys.ages[-1]))
+
+    def test_percentile(self):
+        boys = percentiles.get_table("weight", "boy")
+        self.assertEqual(boys.percentile(0, 3.346), 50)
+        self.assertAlmostEqual(boys.percentile(0, (3.346 + 3.878) / 2), 67.5)
+        self.assertEqual(boys.percentile(0, 1), 3)
+        self.assertEqual(boys.percentile(0, 10), 97)
+
+    def test_until(self):
+        ages, curves = percentiles.get_table("height", "girl").until(30)
+        self.assertEqual(ages, list(range(31)))
+        self.assertEqual(sorted(curves), list(percentiles.PERCENTILES))
+        self.assertEqual(len(curves[97]), 31)
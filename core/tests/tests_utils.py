@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import datetime
+import threading
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from core import utils
@@ -33,3 +35,69 @@ class UtilsTestCase(TestCase):
         self.assertEqual(
             datetime.timedelta(hours=13), utils.timezone_aware_duration(start, end)
         )
+
+    def test_single_flight(self):
+        flights = utils.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"value": len(calls)}
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do("key", compute))
+        )
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(
+            target=lambda: results.append(flights.do("key", compute))
+        )
+        follower.start()
+        # The follower waits for the leader instead of computing.
+        follower.join(0.1)
+        self.assertTrue(follower.is_alive())
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [{"value": 1}, {"value": 1}])
+
+        # Once the flight landed, the next call computes again.
+        self.assertEqual(flights.do("key", compute), {"value": 2})
+
+    def test_single_flight_error(self):
+        def fail():
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            utils.SingleFlight().do("key", fail)
+
+    # The "other process" below is a thread, which cannot see this test's
+    # transaction through the database cache.
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "single-flight",
+            }
+        }
+    )
+    def test_single_flight_shared(self):
+        flights = utils.SingleFlight(wait=5)
+        digest = utils.hashlib.md5(repr("shared").encode()).hexdigest()
+        # Another process holds the lock and stores its result shortly after.
+        cache.add(f"singleflight.lock.{digest}", True, 5)
+        timer = threading.Timer(
+            0.1, cache.set, (f"singleflight.result.{digest}", "theirs", 5)
+        )
+        timer.start()
+        self.assertEqual(flights.do("shared", lambda: "ours", shared=True), "theirs")
+        timer.join()
+        cache.delete(f"singleflight.lock.{digest}")
+        cache.delete(f"singleflight.result.{digest}")
+        self.assertEqual(flights.do("other", lambda: "ours", shared=True), "ours")
@@ -7,7 +7,7 @@ from django.utils import timezone
 
 from faker import Faker
 
-from core import models
+from core import models, timeline
 
 
 class ViewsTestCase(TestCase):
@@ -225,6 +225,50 @@ class ViewsTestCase(TestCase):
         response = self.c.get("/timeline/")
         self.assertEqual(response.status_code, 200)
 
+        date = timezone.localdate() - timezone.timedelta(days=6)
+        response = self.c.get("/timeline/?date={}&days=7&page=2".format(date))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["days"], 7)
+        events = response.context["timeline_objects"]
+        self.assertLessEqual(len(events), self.user.settings.pagination_count)
+        times = [event["time"] for event in events]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+        # Pages fetch only the rows up to their end, yet add up to the whole
+        # range (including sleeps ending after later entries started).
+        def key(event):
+            return (
+                event["edit_link"],
+                event.get("type"),
+                event["time"],
+                event.get("time_since_prev"),
+            )
+
+        start = timezone.localtime(
+            timezone.make_aware(
+                timezone.datetime.combine(date, timezone.datetime.min.time())
+            )
+        )
+        models.Sleep.objects.create(
+            child=models.Child.objects.first(),
+            start=start + timezone.timedelta(minutes=1),
+            end=timezone.localtime() - timezone.timedelta(minutes=1),
+        )
+        expected = [key(event) for event in timeline.get_objects(start, days=7)]
+        response = self.c.get("/timeline/?date={}&days=7".format(date))
+        paginator = response.context["page_obj"].paginator
+        self.assertEqual(paginator.count, len(expected))
+        paged = []
+        for number in paginator.page_range:
+            response = self.c.get(
+                "/timeline/?date={}&days=7&page={}".format(date, number)
+            )
+            paged += [key(event) for event in response.context["timeline_objects"]]
+        self.assertEqual(paged, expected)
+
+        response = self.c.get("/timeline/?date={}".format(date))
+        self.assertNotIn("page_obj", response.context)
+
     def test_tummytime_views(self):
         page = self.c.get("/tummy-time/")
         self.assertEqual(page.status_code, 200)
@@ -1,285 +1,437 @@
-# -*- coding: utf-8 -*-
-from datetime import timedelta
-
-from django.urls import reverse
-from django.utils import timezone, timesince
-from django.utils.translation import gettext as _
-
-from core.models import (
-    DiaperChange,
-    Feeding,
-    Note,
-    Sleep,
-    SolidFood,
-    TummyTime,
-    Temperature,
-)
-from core.utils import duration_string
-
-
-def get_objects(date, child=None):
-    """
-    Create a time-sorted dictionary of all events for a child.
-    :param date: a DateTime instance for the day to be summarized.
-    :param child: Child instance to filter results for (no filter if `None`).
-    :returns: a list of the day's events.
-    """
-    min_date = date
-    max_date = date.replace(hour=23, minute=59, second=59)
-    events = []
-
-    _add_diaper_changes(min_date, max_date, events, child)
-    _add_feedings(min_date, max_date, events, child)
-    _add_sleeps(min_date, max_date, events, child)
-    _add_tummy_times(min_date, max_date, events, child)
-    _add_notes(min_date, max_date, events, child)
-    _add_temperature_measurements(min_date, max_date, events, child)
-    _add_solid_foods(min_date, max_date, events, child)
-
-    explicit_type_ordering = {"start": 0, "end": 1}
-    events.sort(
-        key=lambda x: (
-            x["time"],
-            explicit_type_ordering.get(x.get("type"), -1),
-        ),
-        reverse=True,
-    )
-
-    return events
-
-
-def _add_tummy_times(min_date, max_date, events, child=None):
-    instances = TummyTime.objects.filter(start__range=(min_date, max_date)).order_by(
-        "-start"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        details = []
-        if instance.milestone:
-            details.append(instance.milestone)
-        edit_link = reverse("core:tummytime-update", args=[instance.id])
-        events.append(
-            {
-                "time": timezone.localtime(instance.start),
-                "event": _("%(child)s started tummy time!")
-                % {"child": instance.child.first_name},
-                "details": details,
-                "edit_link": edit_link,
-                "model_name": instance.model_name,
-                "type": "start",
-                "tags": instance.tags.all(),
-            }
-        )
-
-        end = {
-            "time": timezone.localtime(instance.end),
-            "event": _("%(child)s finished tummy time.")
-            % {"child": instance.child.first_name},
-            "details": details,
-            "edit_link": edit_link,
-            "model_name": instance.model_name,
-            "type": "end",
-            "tags": instance.tags.all(),
-        }
-        if instance.duration > timedelta(seconds=0):
-            end["duration"] = duration_string(instance.duration)
-
-        events.append(end)
-
-
-def _add_sleeps(min_date, max_date, events, child=None):
-    instances = Sleep.objects.filter(start__range=(min_date, max_date)).order_by(
-        "-start"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        details = []
-        if instance.notes:
-            details.append(instance.notes)
-        edit_link = reverse("core:sleep-update", args=[instance.id])
-        events.append(
-            {
-                "time": timezone.localtime(instance.start),
-                "event": _("%(child)s fell asleep.")
-                % {"child": instance.child.first_name},
-                "details": details,
-                "edit_link": edit_link,
-                "model_name": instance.model_name,
-                "type": "start",
-                "tags": instance.tags.all(),
-            }
-        )
-
-        end = {
-            "time": timezone.localtime(instance.end),
-            "event": _("%(child)s woke up.") % {"child": instance.child.first_name},
-            "details": details,
-            "edit_link": edit_link,
-            "model_name": instance.model_name,
-            "type": "end",
-            "tags": instance.tags.all(),
-        }
-        if instance.duration > timedelta(seconds=0):
-            end["duration"] = duration_string(instance.duration)
-        events.append(end)
-
-
-def _add_feedings(min_date, max_date, events, child=None):
-    # Ensure first feeding has a previous.
-    yesterday = min_date - timedelta(days=1)
-    prev_start = None
-
-    instances = Feeding.objects.filter(start__range=(yesterday, max_date)).order_by(
-        "start"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        details = []
-        if instance.notes:
-            details.append(instance.notes)
-        time_since_prev = None
-        if prev_start:
-            time_since_prev = timesince.timesince(prev_start, now=instance.start)
-        prev_start = instance.start
-        if instance.start < min_date:
-            continue
-        edit_link = reverse("core:feeding-update", args=[instance.id])
-        if instance.amount:
-            details.append(_("Amount") + ": " + str(instance.amount))
-
-        base_object = {
-            "time": timezone.localtime(instance.start),
-            "details": details,
-            "edit_link": edit_link,
-            "model_name": instance.model_name,
-            "tags": instance.tags.all(),
-        }
-
-        if instance.duration > timedelta(seconds=0):
-            start_event = {
-                **base_object,
-                "event": _("%(child)s started feeding.")
-                % {"child": instance.child.first_name},
-                "time_since_prev": time_since_prev,
-                "type": "start",
-            }
-
-            end_event = {
-                **base_object,
-                "time": timezone.localtime(instance.end),
-                "event": _("%(child)s finished feeding.")
-                % {"child": instance.child.first_name},
-                "type": "end",
-                "duration": duration_string(instance.duration),
-            }
-
-            events.extend([start_event, end_event])
-        else:
-            feed_event = {
-                **base_object,
-                "event": _("%(child)s had a feeding.")
-                % {"child": instance.child.first_name},
-                "time_since_prev": time_since_prev,
-            }
-            events.append(feed_event)
-
-
-def _add_diaper_changes(min_date, max_date, events, child):
-    instances = DiaperChange.objects.filter(time__range=(min_date, max_date)).order_by(
-        "-time"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        contents = []
-        if instance.wet:
-            contents.append("💧")
-        if instance.solid:
-            contents.append("💩")
-        events.append(
-            {
-                "time": timezone.localtime(instance.time),
-                "event": _("%(child)s had a %(type)s diaper change.")
-                % {
-                    "child": instance.child.first_name,
-                    "type": "".join(contents),
-                },
-                "edit_link": reverse("core:diaperchange-update", args=[instance.id]),
-                "model_name": instance.model_name,
-                "tags": instance.tags.all(),
-            }
-        )
-
-
-def _add_notes(min_date, max_date, events, child):
-    instances = Note.objects.filter(time__range=(min_date, max_date)).order_by("-time")
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        events.append(
-            {
-                "time": timezone.localtime(instance.time),
-                "details": [instance.note],
-                "edit_link": reverse("core:note-update", args=[instance.id]),
-                "model_name": instance.model_name,
-                "tags": instance.tags.all(),
-            }
-        )
-
-
-def _add_temperature_measurements(min_date, max_date, events, child):
-    instances = Temperature.objects.filter(time__range=(min_date, max_date)).order_by(
-        "-time"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        details = []
-        if instance.notes:
-            details.append(instance.notes)
-        if instance.temperature:
-            details.append(_("Temperature") + ": " + str(instance.temperature))
-        events.append(
-            {
-                "time": timezone.localtime(instance.time),
-                "event": _("%(child)s had a temperature measurement.")
-                % {
-                    "child": instance.child.first_name,
-                },
-                "details": details,
-                "edit_link": reverse("core:temperature-update", args=[instance.id]),
-                "model_name": instance.model_name,
-                "tags": instance.tags.all(),
-            }
-        )
-
-
-def _add_solid_foods(min_date, max_date, events, child):
-    instances = SolidFood.objects.filter(time__range=(min_date, max_date)).order_by(
-        "-time"
-    )
-    if child:
-        instances = instances.filter(child=child)
-    for instance in instances:
-        details = []
-        if instance.notes:
-            details.append(instance.notes)
-        if instance.amount:
-            details.append(_("Amount") + ": " + str(instance.amount))
-        events.append(
-            {
-                "time": timezone.localtime(instance.time),
-                "event": _("%(child)s tasted %(food)s.")
-                % {
-                    "child": instance.child.first_name,
-                    "food": instance.food,
-                },
-                "details": details,
-                "edit_link": reverse("core:solidfood-update", args=[instance.id]),
-                "model_name": instance.model_name,
-                "tags": instance.tags.all(),
-            }
-        )
+# -*- coding: utf-8 -*-
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+from django.urls import reverse
+from django.utils import timezone, timesince
+from django.utils.translation import gettext as _, gettext_lazy
+
+from core.models import (
+    DiaperChange,
+    Feeding,
+    Note,
+    Sleep,
+    SolidFood,
+    Tagged,
+    TummyTime,
+    Temperature,
+)
+from core.utils import duration_string
+
+# Events at the same time are listed "end" first, then "start", then others.
+EXPLICIT_TYPE_ORDERING = {"start": 0, "end": 1}
+
+# Stands in for an instance id when building edit link templates.
+_ID_PLACEHOLDER = 987654321
+
+
+def _sort_key(event):
+    return event["time"], EXPLICIT_TYPE_ORDERING.get(event.get("type"), -1)
+
+
+def _date_range(date, days):
+    max_date = (date + timedelta(days=days - 1)).replace(hour=23, minute=59, second=59)
+    return date, max_date
+
+
+def get_objects(date, child=None, days=1, limit=None):
+    """
+    Create a time-sorted list of all events for a child.
+    :param date: a DateTime instance for the first day to be summarized.
+    :param child: Child instance to filter results for (no filter if `None`).
+    :param days: number of days, starting at `date`, to include.
+    :param limit: only return the `limit` most recent events (all if `None`);
+                  each model then only fetches the rows of its latest events.
+    :returns: a list of the events, most recent first.
+    """
+    min_date, max_date = _date_range(date, days)
+    rows = {
+        source: source.rows(min_date, max_date, child, limit) for source in _SOURCES
+    }
+    tags = _get_tags(rows)
+
+    streams = []
+    for source, source_rows in rows.items():
+        builder = source(tags.get(source.model, {}))
+        for events in builder.streams(source_rows, min_date):
+            # Each query is already ordered, so this is a cheap pass over
+            # nearly sorted events; the streams are then merged, not sorted.
+            streams.append(sorted(events, key=_sort_key, reverse=True))
+
+    events = heapq.merge(*streams, key=_sort_key, reverse=True)
+    return list(islice(events, limit))
+
+
+class Timeline:
+    """
+    The events of `get_objects` as a lazy sequence for a Paginator: a slice
+    only builds the events up to its end, and the number of events is
+    counted by the database without building any.
+    """
+
+    def __init__(self, date, child=None, days=1):
+        self.date = date
+        self.child = child
+        self.days = days
+
+    def count(self):
+        min_date, max_date = _date_range(self.date, self.days)
+        return sum(source.count(min_date, max_date, self.child) for source in _SOURCES)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.step is not None:
+                raise ValueError("Timeline slices need an end and no step.")
+            events = get_objects(self.date, self.child, self.days, limit=index.stop)
+            return events[index]
+        return self[index : index + 1][0]
+
+
+def _get_tags(rows):
+    """
+    Fetch the tags of every row with a single query.
+    :returns: a `{model: {object_id: [tags]}}` dictionary.
+    """
+    content_types = {}
+    query = Q()
+    for source, source_rows in rows.items():
+        if source_rows:
+            content_type = ContentType.objects.get_for_model(source.model)
+            content_types[content_type.id] = source.model
+            query |= Q(
+                content_type=content_type,
+                object_id__in=[row["id"] for row in source_rows],
+            )
+    if not content_types:
+        return {}
+
+    tags = {}
+    for tagged in (
+        Tagged.objects.filter(query).select_related("tag").order_by(Lower("tag__name"))
+    ):
+        model = content_types[tagged.content_type_id]
+        tags.setdefault(model, {}).setdefault(tagged.object_id, []).append(tagged.tag)
+    return tags
+
+
+class _Source:
+    """
+    Turns the rows of one model into timeline events. Only the columns in
+    `fields` are fetched, together with the id and child's first name.
+    """
+
+    model = None
+    field = None
+    fields = ()
+    url_name = None
+    # Row fields each event stream is ordered by.
+    stream_fields = None
+
+    def __init__(self, tags):
+        self.tags = tags
+        link = reverse(self.url_name, args=[_ID_PLACEHOLDER])
+        self.link_format = link.replace(str(_ID_PLACEHOLDER), "{}")
+
+    @classmethod
+    def queryset(cls, min_date, max_date, child):
+        instances = cls.model.objects.filter(
+            **{f"{cls.field}__range": (min_date, max_date)}
+        )
+        if child:
+            instances = instances.filter(child=child)
+        return instances.order_by(f"-{cls.field}")
+
+    @classmethod
+    def rows(cls, min_date, max_date, child, limit=None):
+        """
+        Fetch the rows, or with a `limit` only the rows of the latest `limit`
+        events of each stream.
+        """
+        rows = cls.queryset(min_date, max_date, child).values(
+            "id", "child__first_name", *cls.fields
+        )
+        if limit is None:
+            return list(rows)
+        latest = {}
+        for field in cls.stream_fields or (cls.field,):
+            for row in rows.order_by(f"-{field}", "-id")[:limit]:
+                latest.setdefault(row["id"], row)
+        return list(latest.values())
+
+    @classmethod
+    def count(cls, min_date, max_date, child):
+        """The number of events in the range."""
+        return cls.queryset(min_date, max_date, child).count()
+
+    def base(self, row):
+        return {
+            "edit_link": self.link_format.format(row["id"]),
+            "model_name": self.model.model_name,
+            "tags": self.tags.get(row["id"], []),
+        }
+
+    def streams(self, rows, min_date):
+        """Yields lists of events, each ordered by time."""
+        yield [self.event(row) for row in rows]
+
+    def event(self, row):
+        raise NotImplementedError
+
+
+class _IntervalSource(_Source):
+    """A source whose entries emit a "start" and an "end" event."""
+
+    field = "start"
+    stream_fields = ("start", "end")
+    start_message = None
+    end_message = None
+
+    @classmethod
+    def count(cls, min_date, max_date, child):
+        return 2 * super().count(min_date, max_date, child)
+
+    def details(self, row):
+        return []
+
+    def streams(self, rows, min_date):
+        starts = []
+        ends = []
+        for row in rows:
+            details = self.details(row)
+            child = {"child": row["child__first_name"]}
+            starts.append(
+                {
+                    **self.base(row),
+                    "time": timezone.localtime(row["start"]),
+                    "event": self.start_message % child,
+                    "details": details,
+                    "type": "start",
+                }
+            )
+            end = {
+                **self.base(row),
+                "time": timezone.localtime(row["end"]),
+                "event": self.end_message % child,
+                "details": details,
+                "type": "end",
+            }
+            if row["duration"] and row["duration"] > timedelta(seconds=0):
+                end["duration"] = duration_string(row["duration"])
+            ends.append(end)
+        yield starts
+        yield ends
+
+
+class _TummyTimes(_IntervalSource):
+    model = TummyTime
+    fields = ("start", "end", "duration", "milestone")
+    url_name = "core:tummytime-update"
+
+    start_message = gettext_lazy("%(child)s started tummy time!")
+    end_message = gettext_lazy("%(child)s finished tummy time.")
+
+    def details(self, row):
+        return [row["milestone"]] if row["milestone"] else []
+
+
+class _Sleeps(_IntervalSource):
+    model = Sleep
+    fields = ("start", "end", "duration", "notes")
+    url_name = "core:sleep-update"
+
+    start_message = gettext_lazy("%(child)s fell asleep.")
+    end_message = gettext_lazy("%(child)s woke up.")
+
+    def details(self, row):
+        return [row["notes"]] if row["notes"] else []
+
+
+class _Feedings(_Source):
+    model = Feeding
+    field = "start"
+    fields = ("start", "end", "duration", "amount", "notes")
+    url_name = "core:feeding-update"
+    stream_fields = ("start", "end")
+
+    @classmethod
+    def queryset(cls, min_date, max_date, child):
+        # Ensure first feeding has a previous.
+        yesterday = min_date - timedelta(days=1)
+        instances = Feeding.objects.filter(start__range=(yesterday, max_date))
+        if child:
+            instances = instances.filter(child=child)
+        return instances.order_by("start")
+
+    @classmethod
+    def rows(cls, min_date, max_date, child, limit=None):
+        if limit is None:
+            return super().rows(min_date, max_date, child)
+        # One more row, as the previous feeding of the oldest one.
+        rows = super().rows(min_date, max_date, child, limit + 1)
+        return sorted(rows, key=lambda row: row["start"])
+
+    @classmethod
+    def count(cls, min_date, max_date, child):
+        # Feedings with a duration have a "start" and an "end" event.
+        instances = Feeding.objects.filter(start__range=(min_date, max_date))
+        if child:
+            instances = instances.filter(child=child)
+        counts = instances.aggregate(
+            all=Count("id"), timed=Count("id", filter=Q(duration__gt=timedelta(0)))
+        )
+        return counts["all"] + counts["timed"]
+
+    def streams(self, rows, min_date):
+        starts = []
+        ends = []
+        prev_start = None
+        for row in rows:
+            time_since_prev = None
+            if prev_start:
+                time_since_prev = timesince.timesince(prev_start, now=row["start"])
+            prev_start = row["start"]
+            if row["start"] < min_date:
+                continue
+
+            details = []
+            if row["notes"]:
+                details.append(row["notes"])
+            if row["amount"]:
+                details.append(_("Amount") + ": " + str(row["amount"]))
+            child = {"child": row["child__first_name"]}
+            base_object = {
+                **self.base(row),
+                "time": timezone.localtime(row["start"]),
+                "details": details,
+            }
+
+            if row["duration"] and row["duration"] > timedelta(seconds=0):
+                starts.append(
+                    {
+                        **base_object,
+                        "event": _("%(child)s started feeding.") % child,
+                        "time_since_prev": time_since_prev,
+                        "type": "start",
+                    }
+                )
+                ends.append(
+                    {
+                        **base_object,
+                        "time": timezone.localtime(row["end"]),
+                        "event": _("%(child)s finished feeding.") % child,
+                        "type": "end",
+                        "duration": duration_string(row["duration"]),
+                    }
+                )
+            else:
+                starts.append(
+                    {
+                        **base_object,
+                        "event": _("%(child)s had a feeding.") % child,
+                        "time_since_prev": time_since_prev,
+                    }
+                )
+        yield starts
+        yield ends
+
+
+class _DiaperChanges(_Source):
+    model = DiaperChange
+    field = "time"
+    fields = ("time", "wet", "solid")
+    url_name = "core:diaperchange-update"
+
+    def event(self, row):
+        contents = []
+        if row["wet"]:
+            contents.append("💧")
+        if row["solid"]:
+            contents.append("💩")
+        return {
+            **self.base(row),
+            "time": timezone.localtime(row["time"]),
+            "event": _("%(child)s had a %(type)s diaper change.")
+            % {
+                "child": row["child__first_name"],
+                "type": "".join(contents),
+            },
+        }
+
+
+class _Notes(_Source):
+    model = Note
+    field = "time"
+    fields = ("time", "note")
+    url_name = "core:note-update"
+
+    def event(self, row):
+        return {
+            **self.base(row),
+            "time": timezone.localtime(row["time"]),
+            "details": [row["note"]],
+        }
+
+
+class _TemperatureMeasurements(_Source):
+    model = Temperature
+    field = "time"
+    fields = ("time", "temperature", "notes")
+    url_name = "core:temperature-update"
+
+    def event(self, row):
+        details = []
+        if row["notes"]:
+            details.append(row["notes"])
+        if row["temperature"]:
+            details.append(_("Temperature") + ": " + str(row["temperature"]))
+        return {
+            **self.base(row),
+            "time": timezone.localtime(row["time"]),
+            "event": _("%(child)s had a temperature measurement.")
+            % {
+                "child": row["child__first_name"],
+            },
+            "details": details,
+        }
+
+
+class _SolidFoods(_Source):
+    model = SolidFood
+    field = "time"
+    fields = ("time", "food", "amount", "notes")
+    url_name = "core:solidfood-update"
+
+    def event(self, row):
+        details = []
+        if row["notes"]:
+            details.append(row["notes"])
+        if row["amount"]:
+            details.append(_("Amount") + ": " + str(row["amount"]))
+        return {
+            **self.base(row),
+            "time": timezone.localtime(row["time"]),
+            "event": _("%(child)s tasted %(food)s.")
+            % {
+                "child": row["child__first_name"],
+                "food": row["food"],
+            },
+            "details": details,
+        }
+
+
+_SOURCES = (
+    _DiaperChanges,
+    _Feedings,
+    _Sleeps,
+    _TummyTimes,
+    _Notes,
+    _TemperatureMeasurements,
+    _SolidFoods,
+)
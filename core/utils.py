@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 import datetime
+import hashlib
 import random
+import threading
+import time
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import ngettext
 
@@ -77,3 +81,78 @@ def timezone_aware_duration(
     """
     utc = datetime.timezone.utc
     return end.astimezone(utc) - start.astimezone(utc)
+
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once and shares the result.
+
+    A call made while another with the same key is in flight in the process
+    waits for it and gets its result (or exception). With ``shared`` calls of
+    other processes are coalesced too, through a lock in the cache: a process
+    finding the lock taken polls the cache for the result of the holder for up
+    to ``wait`` seconds before computing the result itself. Shared results
+    must be picklable.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, wait=10):
+        self.wait = wait
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, shared=False):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn) if shared else fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _do_shared(self, key, fn):
+        digest = hashlib.md5(repr(key).encode()).hexdigest()
+        lock_key = f"singleflight.lock.{digest}"
+        result_key = f"singleflight.result.{digest}"
+        if cache.add(lock_key, True, self.wait):
+            try:
+                result = fn()
+                cache.set(result_key, result, self.wait)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            found = cache.get(result_key, _MISSING)
+            if found is not _MISSING:
+                return found
+            if not cache.get(lock_key):
+                # The holder failed, or its result is already gone.
+                break
+        return fn()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_MISSING = object()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.paginator import Paginator
 from django.db.models import Count
 from django.db.models.functions import Lower
 from django.forms import Form
@@ -16,16 +17,38 @@ from babybuddy.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from babybuddy.views import BabyBuddyFilterView, BabyBuddyPaginatedView
 from core import filters, forms, models, timeline
 
+# The longest range, in days, the timeline shows on one page.
+TIMELINE_MAX_DAYS = 7
 
-def _prepare_timeline_context_data(context, date, child=None):
+
+def _prepare_timeline_context_data(context, request, child=None):
+    date = request.GET.get("date", str(timezone.localdate()))
     date = timezone.datetime.strptime(date, "%Y-%m-%d")
     date = timezone.localtime(timezone.make_aware(date))
-    context["timeline_objects"] = timeline.get_objects(date, child)
+    try:
+        days = min(max(int(request.GET.get("days", 1)), 1), TIMELINE_MAX_DAYS)
+    except ValueError:
+        days = 1
+
+    if days > 1:
+        # Pages of a multi-day range only build the events up to the page.
+        paginator = Paginator(
+            timeline.Timeline(date, child, days),
+            request.user.settings.pagination_count,
+        )
+        page = paginator.get_page(request.GET.get("page"))
+        context["timeline_objects"] = page.object_list
+        context["page_obj"] = page
+        context["is_paginated"] = page.has_other_pages()
+    else:
+        context["timeline_objects"] = timeline.get_objects(date, child)
     context["date"] = date
-    context["date_previous"] = date - timezone.timedelta(days=1)
-    if date.date() < timezone.localdate():
-        context["date_next"] = date + timezone.timedelta(days=1)
-    pass
+    context["days"] = days
+    if days > 1:
+        context["date_end"] = date + timezone.timedelta(days=days - 1)
+    context["date_previous"] = date - timezone.timedelta(days=days)
+    if (date + timezone.timedelta(days=days - 1)).date() < timezone.localdate():
+        context["date_next"] = date + timezone.timedelta(days=days)
 
 
 class CoreAddView(PermissionRequiredMixin, SuccessMessageMixin, CreateView):
@@ -121,8 +144,7 @@ class ChildDetail(PermissionRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super(ChildDetail, self).get_context_data(**kwargs)
-        date = self.request.GET.get("date", str(timezone.localdate()))
-        _prepare_timeline_context_data(context, date, self.object)
+        _prepare_timeline_context_data(context, self.request, self.object)
         return context
 
 
@@ -517,8 +539,7 @@ class Timeline(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super(Timeline, self).get_context_data(**kwargs)
-        date = self.request.GET.get("date", str(timezone.localdate()))
-        _prepare_timeline_context_data(context, date)
+        _prepare_timeline_context_data(context, self.request)
         return context
 
 
@@ -6,8 +6,10 @@ from django.utils import timezone
 from django.utils.translation import gettext as _
 
 import collections
+import datetime
+from bisect import bisect_right
 
-from core import models
+from core import models, percentiles
 
 register = template.Library()
 
@@ -67,27 +69,45 @@ def card_diaperchange_types(context, child, date=None):
         hour=0, minute=0, second=0
     )
 
-    stats = {}
-    for x in range(7):
-        stats[x] = {"wet": 0.0, "solid": 0.0, "empty": 0.0, "changes": 0.0}
-
-    instances = (
-        models.DiaperChange.objects.filter(child=child)
-        .filter(time__gt=min_date)
-        .filter(time__lt=max_date)
-        .order_by("-time")
-    )
-    empty = len(instances) == 0
+    # Key 0 is the day of ``date``, key 6 is six days before it. Past days
+    # come from their rollups when those are kept in the active time zone;
+    # the others are counted from the diaper changes.
+    dates = [min_date.date() + timezone.timedelta(days=6 - x) for x in range(7)]
+    rollups = {}
+    if models.DailyRollup.in_current_time_zone():
+        rollups = models.DailyRollup.for_dates(
+            child, [day for day in dates if day < timezone.localdate()]
+        )
 
-    for instance in instances:
-        key = (max_date - timezone.localtime(instance.time)).days
-        stats[key]["changes"] += 1
-        if instance.wet:
-            stats[key]["wet"] += 1
-        if instance.solid:
-            stats[key]["solid"] += 1
-        if not instance.wet and not instance.solid:
-            stats[key]["empty"] += 1
+    stats = {}
+    for key, day in enumerate(dates):
+        stats[key] = {"wet": 0, "solid": 0, "empty": 0, "changes": 0}
+        if day in rollups:
+            stats[key]["wet"] = rollups[day].diaper_wet
+            stats[key]["solid"] = rollups[day].diaper_solid
+            stats[key]["empty"] = rollups[day].diaper_empty
+            stats[key]["changes"] = rollups[day].diaper_count
+
+    raw_keys = [key for key, day in enumerate(dates) if day not in rollups]
+    if raw_keys:
+        instances = (
+            models.DiaperChange.objects.filter(child=child)
+            .filter(time__gt=max_date - timezone.timedelta(days=max(raw_keys) + 1))
+            .filter(time__lt=max_date)
+            .order_by("-time")
+        )
+        for instance in instances:
+            key = (max_date - timezone.localtime(instance.time)).days
+            if key not in raw_keys:
+                continue
+            stats[key]["changes"] += 1
+            if instance.wet:
+                stats[key]["wet"] += 1
+            if instance.solid:
+                stats[key]["solid"] += 1
+            if not instance.wet and not instance.solid:
+                stats[key]["empty"] += 1
+    empty = not any(info["changes"] for info in stats.values())
 
     week_total = 0
     for key, info in stats.items():
@@ -685,6 +705,14 @@ def card_statistics(context, child):
                 "title": _("Weight change per week"),
             }
         )
+        if weight["percentiles"]:
+            stats.append(
+                {
+                    "type": "percentiles",
+                    "stat": weight["percentiles"],
+                    "title": _("Weight percentile (boy / girl)"),
+                }
+            )
 
     height = _height_statistics(child)
     if height:
@@ -695,6 +723,14 @@ def card_statistics(context, child):
                 "title": _("Height change per week"),
             }
         )
+        if height["percentiles"]:
+            stats.append(
+                {
+                    "type": "percentiles",
+                    "stat": height["percentiles"],
+                    "title": _("Height percentile (boy / girl)"),
+                }
+            )
 
     head_circumference = _head_circumference_statistics(child)
     if head_circumference:
@@ -721,51 +757,78 @@ def card_statistics(context, child):
     return {"stats": stats, "empty": empty, "hide_empty": _hide_empty(context)}
 
 
+def _frequency_windows():
+    """
+    Lower bounds of the windows frequency statistics are averaged over.
+    :returns: a list of datetimes, with `None` for "all time".
+    """
+    now = timezone.localtime()
+    return [now - timezone.timedelta(days=3), now - timezone.timedelta(weeks=2), None]
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _microseconds(value):
+    """An aware datetime as an exact integer number of epoch microseconds."""
+    return (value - _EPOCH) // timezone.timedelta(microseconds=1)
+
+
+def _interval_averages(rows, windows):
+    """
+    Average time between consecutive entries, for several windows at once.
+
+    The gap after an entry runs from its end to the start of the next one,
+    and belongs to a window when the entry starts after the window's lower
+    bound. Since entries are ordered by start, each window is a suffix of
+    the gaps: suffix sums of the gaps and a binary search per window replace
+    a loop over every entry for every window.
+    :param rows: a list of (start, end) tuples ordered by start.
+    :param windows: window lower bounds, `None` for no bound.
+    :returns: a list with the average gap (or 0.0) for each window.
+    """
+    starts = [_microseconds(start) for start, end in rows]
+    ends = [_microseconds(end) for start, end in rows]
+    suffix = [0] * (len(rows) + 1)
+    for i in range(len(rows) - 2, -1, -1):
+        suffix[i] = suffix[i + 1] + starts[i + 1] - ends[i]
+
+    averages = []
+    for bound in windows:
+        first = 0 if bound is None else bisect_right(starts, _microseconds(bound))
+        count = len(rows) - 1 - first
+        if count > 0:
+            averages.append(timezone.timedelta(microseconds=suffix[first]) / count)
+        else:
+            averages.append(0.0)
+    return averages
+
+
 def _diaperchange_statistics(child):
     """
     Averaged Diaper Change data.
     :param child: an instance of the Child model.
     :returns: a dictionary of statistics.
     """
-    changes = [
-        {
-            "start": timezone.localtime() - timezone.timedelta(days=3),
-            "title": _("Diaper change frequency (past 3 days)"),
-        },
-        {
-            "start": timezone.localtime() - timezone.timedelta(weeks=2),
-            "title": _("Diaper change frequency (past 2 weeks)"),
-        },
-        {
-            "start": None,
-            "title": _("Diaper change frequency"),
-        },
-    ]
-    for timespan in changes:
-        timespan["btwn_total"] = timezone.timedelta(0)
-        timespan["btwn_count"] = 0
-        timespan["btwn_average"] = 0.0
-
-    instances = models.DiaperChange.objects.filter(child=child).order_by("time")
-    if len(instances) == 0:
+    times = list(
+        models.DiaperChange.objects.filter(child=child)
+        .order_by("time")
+        .values_list("time", flat=True)
+    )
+    if len(times) == 0:
         return False
-    last_instance = None
 
-    for instance in instances:
-        if last_instance:
-            for timespan in changes:
-                last_time = timezone.localtime(last_instance.time)
-                if timespan["start"] is None or last_time > timespan["start"]:
-                    timespan["btwn_total"] += (
-                        timezone.localtime(instance.time) - last_time
-                    )
-                    timespan["btwn_count"] += 1
-        last_instance = instance
-
-    for timespan in changes:
-        if timespan["btwn_count"] > 0:
-            timespan["btwn_average"] = timespan["btwn_total"] / timespan["btwn_count"]
-    return changes
+    titles = [
+        _("Diaper change frequency (past 3 days)"),
+        _("Diaper change frequency (past 2 weeks)"),
+        _("Diaper change frequency"),
+    ]
+    windows = _frequency_windows()
+    averages = _interval_averages([(time, time) for time in times], windows)
+    return [
+        {"start": start, "title": title, "btwn_average": average}
+        for start, title, average in zip(windows, titles, averages)
+    ]
 
 
 def _feeding_statistics(child):
@@ -774,59 +837,40 @@ def _feeding_statistics(child):
     :param child: an instance of the Child model.
     :returns: a dictionary of statistics.
     """
-    feedings = [
-        {
-            "start": timezone.localtime() - timezone.timedelta(days=3),
-            "title": _("Feeding frequency (past 3 days)"),
-        },
-        {
-            "start": timezone.localtime() - timezone.timedelta(weeks=2),
-            "title": _("Feeding frequency (past 2 weeks)"),
-        },
-        {
-            "start": None,
-            "title": _("Feeding frequency"),
-        },
-    ]
-    for timespan in feedings:
-        timespan["btwn_total"] = timezone.timedelta(0)
-        timespan["btwn_count"] = 0
-        timespan["btwn_average"] = 0.0
-
-    instances = models.Feeding.objects.filter(child=child).order_by("start")
-    if len(instances) == 0:
+    rows = list(
+        models.Feeding.objects.filter(child=child)
+        .order_by("start")
+        .values_list("start", "end")
+    )
+    if len(rows) == 0:
         return False
-    last_instance = None
 
-    for instance in instances:
-        if last_instance:
-            for timespan in feedings:
-                start = timezone.localtime(instance.start)
-                last_start = timezone.localtime(last_instance.start)
-                last_end = timezone.localtime(last_instance.end)
-                if timespan["start"] is None or last_start > timespan["start"]:
-                    timespan["btwn_total"] += start - last_end
-                    timespan["btwn_count"] += 1
-        last_instance = instance
-
-    for timespan in feedings:
-        if timespan["btwn_count"] > 0:
-            timespan["btwn_average"] = timespan["btwn_total"] / timespan["btwn_count"]
-    return feedings
+    titles = [
+        _("Feeding frequency (past 3 days)"),
+        _("Feeding frequency (past 2 weeks)"),
+        _("Feeding frequency"),
+    ]
+    windows = _frequency_windows()
+    averages = _interval_averages(rows, windows)
+    return [
+        {"start": start, "title": title, "btwn_average": average}
+        for start, title, average in zip(windows, titles, averages)
+    ]
 
 
 def _medicationdose_statistics(child):
     today = timezone.localdate()
     week_start = today - timezone.timedelta(days=6)
 
-    qs = models.MedicationDose.objects.filter(child=child, given=True)
-    if not qs.exists():
+    counts = models.MedicationDose.objects.filter(child=child, given=True).aggregate(
+        total=Count("id"),
+        today=Count("id", filter=Q(time__date=today)),
+        week=Count("id", filter=Q(time__date__gte=week_start, time__date__lte=today)),
+    )
+    if not counts["total"]:
         return False
 
-    return {
-        "today": qs.filter(time__date=today).count(),
-        "week": qs.filter(time__date__gte=week_start, time__date__lte=today).count(),
-    }
+    return {"today": counts["today"], "week": counts["week"]}
 
 
 def _nap_statistics(child):
@@ -865,31 +909,26 @@ def _sleep_statistics(child):
     :param child: an instance of the Child model.
     :returns: a dictionary of statistics.
     """
-    instances = models.Sleep.objects.filter(child=child).order_by("start")
-    if len(instances) == 0:
+    rows = list(
+        models.Sleep.objects.filter(child=child)
+        .order_by("start")
+        .values_list("start", "end", "duration")
+    )
+    if len(rows) == 0:
         return False
 
+    durations = [duration for start, end, duration in rows if duration is not None]
     sleep = {
-        "total": instances.aggregate(Sum("duration"))["duration__sum"],
-        "count": instances.count(),
+        "total": sum(durations, timezone.timedelta(0)) if durations else None,
+        "count": len(rows),
         "average": 0.0,
-        "btwn_total": timezone.timedelta(0),
-        "btwn_count": instances.count() - 1,
-        "btwn_average": 0.0,
+        "btwn_count": len(rows) - 1,
     }
-
-    last_instance = None
-    for instance in instances:
-        if last_instance:
-            start = timezone.localtime(instance.start)
-            last_end = timezone.localtime(last_instance.end)
-            sleep["btwn_total"] += start - last_end
-        last_instance = instance
-
-    if sleep["count"] > 0:
+    if sleep["total"] is not None:
         sleep["average"] = sleep["total"] / sleep["count"]
-    if sleep["btwn_count"] > 0:
-        sleep["btwn_average"] = sleep["btwn_total"] / sleep["btwn_count"]
+    sleep["btwn_average"] = _interval_averages(
+        [(start, end) for start, end, duration in rows], [None]
+    )[0]
 
     return sleep
 
@@ -914,9 +953,29 @@ def _weight_statistics(child):
         weeks = (newest.date - oldest.date).days / 7
         weight["change_weekly"] = weight_change / weeks
 
+    weight["percentiles"] = _growth_percentiles(
+        "weight", (newest.date - child.birth_date).days, newest.weight
+    )
+
     return weight
 
 
+def _growth_percentiles(measure, age, value):
+    """
+    Percentiles of a measurement on the boy and girl growth references.
+    :param measure: "height" or "weight".
+    :param age: the child's age in days at the measurement.
+    :param value: the measured value.
+    :returns: a dictionary of the percentile per sex, or None without data.
+    """
+    result = {}
+    for sex in ("boy", "girl"):
+        table = percentiles.get_table(measure, sex)
+        if table:
+            result[sex] = table.percentile(age, value)
+    return result or None
+
+
 def _height_statistics(child):
     """
     Statistical height data.
@@ -937,6 +996,10 @@ def _height_statistics(child):
         weeks = (newest.date - oldest.date).days / 7
         height["change_weekly"] = height_change / weeks
 
+    height["percentiles"] = _growth_percentiles(
+        "height", (newest.date - child.birth_date).days, newest.height
+    )
+
     return height
 
 
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.utils import timezone
@@ -156,6 +157,29 @@ class TemplateTagsTestCase(TestCase):
         }
         self.assertEqual(data["stats"], stats)
 
+    def test_card_diaperchange_types_rollups(self):
+        # Rollups are kept in the site's time zone: the fixture user's own
+        # time zone is counted from the entries, and today always is.
+        with mock.patch.object(models.DailyRollup, "for_dates") as for_dates:
+            cards.card_diaperchange_types(self.context, self.child, self.date)
+        for_dates.assert_not_called()
+
+        with timezone.override(settings.TIME_ZONE):
+            data = cards.card_diaperchange_types(self.context, self.child, self.date)
+            with mock.patch.object(
+                models.DailyRollup, "in_current_time_zone", return_value=False
+            ):
+                raw = cards.card_diaperchange_types(self.context, self.child, self.date)
+            self.assertEqual(data["stats"], raw["stats"])
+
+            with mock.patch.object(
+                models.DailyRollup, "for_dates", return_value={}
+            ) as for_dates:
+                cards.card_diaperchange_types(self.context, self.child)
+            dates = for_dates.call_args.args[1]
+            self.assertEqual(len(dates), 6)
+            self.assertNotIn(timezone.localdate(), dates)
+
     def test_card_feeding_recent(self):
         data = cards.card_feeding_recent(self.context, self.child, self.date)
 
@@ -405,7 +429,17 @@ class TemplateTagsTestCase(TestCase):
                 "type": "duration",
             },
             {"title": "Weight change per week", "stat": 1.0, "type": "float"},
+            {
+                "title": "Weight percentile (boy / girl)",
+                "stat": {"boy": 97.0, "girl": 97.0},
+                "type": "percentiles",
+            },
             {"title": "Height change per week", "stat": 1.0, "type": "float"},
+            {
+                "title": "Height percentile (boy / girl)",
+                "stat": {"boy": 3.0, "girl": 3.0},
+                "type": "percentiles",
+            },
             {
                 "title": "Head circumference change per week",
                 "stat": 1.0,
@@ -50,3 +50,31 @@ class ViewsTestCase(TestCase):
         )
         page = self.c.get("/dashboard/")
         self.assertEqual(page.status_code, 200)
+
+    def test_child_dashboard_cards(self):
+        call_command("fake", verbosity=0, children=1, days=1)
+        child = Child.objects.first()
+        base_url = "/children/{}/dashboard/".format(child.slug)
+
+        page = self.c.get(base_url)
+        self.assertEqual(page.status_code, 200)
+        self.assertContains(page, "{}cards/statistics/".format(base_url))
+        self.assertNotIn("Server-Timing", page)
+
+        page = self.c.get(base_url, {"cards": "inline"})
+        self.assertEqual(page.status_code, 200)
+        self.assertIn("card-statistics;dur=", page["Server-Timing"])
+
+        for card in page.context["cards"]:
+            fragment = self.c.get(card["url"])
+            self.assertEqual(fragment.status_code, 200)
+            timing = "card-{};dur=".format(card["name"])
+            self.assertTrue(fragment["Server-Timing"].startswith(timing))
+
+        page = self.c.get("{}cards/unknown/".format(base_url))
+        self.assertEqual(page.status_code, 404)
+
+        child.feeding_mode = "bottle_only"
+        child.save()
+        page = self.c.get("{}cards/breastfeeding/".format(base_url))
+        self.assertEqual(page.status_code, 404)
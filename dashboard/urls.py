@@ -12,6 +12,11 @@ urlpatterns = [
         views.ChildDashboard.as_view(),
         name="dashboard-child",
     ),
+    path(
+        "children/<str:slug>/dashboard/cards/<str:card>/",
+        views.ChildDashboardCard.as_view(),
+        name="dashboard-child-card",
+    ),
     path(
         "children/<str:slug>/analytics/",
         views.ChildAnalyticsDashboard.as_view(),
@@ -1,13 +1,70 @@
 # -*- coding: utf-8 -*-
-from django.http import HttpResponseRedirect
+import time
+
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.template import engines
 from django.urls import reverse
 from django.views.generic.base import TemplateView
 from django.views.generic.detail import DetailView
 
+from babybuddy import instrumentation
 from babybuddy.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from core.models import Child
 from core.analytics import BabyAnalytics
 
+# Cards of the child dashboard, in display order. Each name maps to the
+# `card_<name>` inclusion tag in `dashboard.templatetags.cards`.
+CHILD_DASHBOARD_CARDS = (
+    "sleep_prediction",
+    "feeding_prediction",
+    "feeding_day",
+    "feeding_amounts",
+    "feeding_recent",
+    "sleep_schedule",
+    "sleep_recent",
+    "diaperchange_types",
+    "statistics",
+    "breastfeeding",
+)
+
+_card_templates = {}
+
+
+def child_dashboard_cards(child):
+    """
+    The names of the cards shown on a child's dashboard.
+    """
+    cards = list(CHILD_DASHBOARD_CARDS)
+    if child.feeding_mode == "bottle_only":
+        cards.remove("breastfeeding")
+    return cards
+
+
+def render_card(request, child, name):
+    """
+    Render a single dashboard card.
+    :returns: the card's HTML and its render time in milliseconds.
+    """
+    template = _card_templates.get(name)
+    if template is None:
+        template = engines["django"].from_string(
+            "{% load cards %}{% card_" + name + " object %}"
+        )
+        _card_templates[name] = template
+    began = time.perf_counter()
+    with instrumentation.span("card-" + name):
+        html = template.render({"object": child}, request)
+    return html, (time.perf_counter() - began) * 1000
+
+
+def server_timing(timings):
+    """
+    Format `(card name, milliseconds)` pairs as a Server-Timing header value.
+    """
+    return ", ".join(
+        f'card-{name};dur={duration:.1f};desc="{name}"' for name, duration in timings
+    )
+
 
 class Dashboard(LoginRequiredMixin, TemplateView):
     # TODO: Use .card-deck in this template once BS4 is finalized.
@@ -33,10 +90,62 @@ class Dashboard(LoginRequiredMixin, TemplateView):
 
 
 class ChildDashboard(PermissionRequiredMixin, DetailView):
+    """
+    A child's dashboard. By default the cards are loaded as separate fragments
+    (see `ChildDashboardCard`) so the page paints without waiting on the
+    slowest card; `?cards=inline` renders them all with the page instead.
+    """
+
     model = Child
     permission_required = ("core.view_child",)
     template_name = "dashboard/child.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        lazy = self.request.GET.get("cards") != "inline"
+        self.timings = []
+        cards = []
+        for name in child_dashboard_cards(self.object):
+            card = {
+                "name": name,
+                "url": reverse(
+                    "dashboard:dashboard-child-card", args=[self.object.slug, name]
+                ),
+            }
+            if not lazy:
+                card["html"], duration = render_card(self.request, self.object, name)
+                self.timings.append((name, duration))
+            cards.append(card)
+        context["cards"] = cards
+        context["lazy_cards"] = lazy
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        if self.timings:
+            response["Server-Timing"] = server_timing(self.timings)
+        return response
+
+
+class ChildDashboardCard(PermissionRequiredMixin, DetailView):
+    """
+    A single card of a child's dashboard as an HTML fragment, with its render
+    time in the Server-Timing header.
+    """
+
+    model = Child
+    permission_required = ("core.view_child",)
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        name = kwargs["card"]
+        if name not in child_dashboard_cards(self.object):
+            raise Http404
+        html, duration = render_card(request, self.object, name)
+        response = HttpResponse(html)
+        response["Server-Timing"] = server_timing([(name, duration)])
+        return response
+
 
 class ChildAnalyticsDashboard(PermissionRequiredMixin, DetailView):
     """
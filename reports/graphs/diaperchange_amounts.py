@@ -2,7 +2,6 @@
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -12,7 +11,7 @@ def diaperchange_amounts(instances):
     """
     Create a graph showing daily diaper change amounts over time.
     :param instances: a QuerySet of DiaperChange instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     totals = {}
     for instance in instances:
@@ -39,5 +38,4 @@ def diaperchange_amounts(instances):
     layout_args["yaxis"]["title"] = _("Change amount")
 
     fig = go.Figure({"data": [trace], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -2,9 +2,7 @@
 from django.db.models import Count, Case, When
 from django.db.models.functions import TruncDate
 from django.utils.translation import gettext as _
-from django.utils.translation import get_language
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from core.utils import duration_parts
@@ -16,50 +14,25 @@ def diaperchange_intervals(changes):
     """
     Create a graph showing intervals of diaper changes.
     :param changes: a QuerySet of Diaper Change instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
 
     changes = changes.order_by("time")
-    intervals = []
-    intervals_solid = []
-    intervals_wet = []
+    intervals = {"solid": [], "wet": [], "total": []}
     last_change = changes.first()
     for change in changes[1:]:
         interval = change.time - last_change.time
         if interval.total_seconds() > 0:
-            intervals.append(interval)
+            intervals["total"].append((change.time, interval))
             if change.solid:
-                intervals_solid.append(interval)
+                intervals["solid"].append((change.time, interval))
             if change.wet:
-                intervals_wet.append(interval)
+                intervals["wet"].append((change.time, interval))
         last_change = change
 
-    trace_solid = go.Scatter(
-        name=_("Solid"),
-        line=dict(shape="spline"),
-        x=list(changes.values_list("time", flat=True))[1:],
-        y=[i.total_seconds() / 3600 for i in intervals_solid],
-        hoverinfo="text",
-        text=[_duration_string_hms(i) for i in intervals_solid],
-    )
-
-    trace_wet = go.Scatter(
-        name=_("Wet"),
-        line=dict(shape="spline"),
-        x=list(changes.values_list("time", flat=True))[1:],
-        y=[i.total_seconds() / 3600 for i in intervals_wet],
-        hoverinfo="text",
-        text=[_duration_string_hms(i) for i in intervals_wet],
-    )
-
-    trace_total = go.Scatter(
-        name=_("Total"),
-        line=dict(shape="spline"),
-        x=list(changes.values_list("time", flat=True))[1:],
-        y=[i.total_seconds() / 3600 for i in intervals],
-        hoverinfo="text",
-        text=[_duration_string_hms(i) for i in intervals],
-    )
+    trace_solid = _interval_trace(_("Solid"), intervals["solid"])
+    trace_wet = _interval_trace(_("Wet"), intervals["wet"])
+    trace_total = _interval_trace(_("Total"), intervals["total"])
 
     layout_args = utils.default_graph_layout_options()
     layout_args["barmode"] = "stack"
@@ -77,13 +50,29 @@ def diaperchange_intervals(changes):
             "layout": go.Layout(**layout_args),
         }
     )
-    output = plotly.plot(
-        fig,
-        output_type="div",
-        include_plotlyjs=False,
-        config={"locale": get_language()},
+    return utils.figure_spec(fig)
+
+
+def _interval_trace(name, intervals):
+    """
+    Create a downsampled trace of diaper change intervals.
+    :param name: the name of the trace.
+    :param intervals: a list of (time, interval) tuples.
+    :returns: a Scatter trace.
+    """
+    x, y, text = utils.downsample(
+        [time for time, _interval in intervals],
+        [interval.total_seconds() / 3600 for _time, interval in intervals],
+        [_duration_string_hms(interval) for _time, interval in intervals],
+    )
+    return go.Scatter(
+        name=name,
+        line=dict(shape="spline"),
+        x=x,
+        y=y,
+        hoverinfo="text",
+        text=text,
     )
-    return utils.split_graph_output(output)
 
 
 def _duration_string_hms(duration):
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -11,7 +10,7 @@ def diaperchange_lifetimes(changes):
     """
     Create a graph showing how long diapers last (time between changes).
     :param changes: a QuerySet of Diaper Change instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     changes = changes.order_by("time")
     durations = []
@@ -38,5 +37,4 @@ def diaperchange_lifetimes(changes):
     layout_args["yaxis"]["dtick"] = 1
 
     fig = go.Figure({"data": [trace], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -2,9 +2,7 @@
 from django.db.models import Count, Case, When
 from django.db.models.functions import TruncDate
 from django.utils.translation import gettext as _
-from django.utils.translation import get_language
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -14,7 +12,7 @@ def diaperchange_types(changes):
     """
     Create a graph showing types of totals for diaper changes.
     :param changes: a QuerySet of Diaper Change instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     changes = (
         changes.annotate(date=TruncDate("time"))
@@ -59,10 +57,4 @@ def diaperchange_types(changes):
             "layout": go.Layout(**layout_args),
         }
     )
-    output = plotly.plot(
-        fig,
-        output_type="div",
-        include_plotlyjs=False,
-        config={"locale": get_language()},
-    )
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -2,7 +2,6 @@
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -13,7 +12,7 @@ def feeding_amounts(instances):
     """
     Create a graph showing daily feeding amounts over time.
     :param instances: a QuerySet of Feeding instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     feeding_types, feeding_types_desc = map(
         list, zip(*models.Feeding._meta.get_field("type").choices)
@@ -73,5 +72,4 @@ def feeding_amounts(instances):
 
     fig = go.Figure({"data": traces, "layout": go.Layout(**layout_args)})
     fig.update_layout(barmode="stack")
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -5,7 +5,6 @@ from django.db.models import Count, Sum
 from django.db.models.functions import TruncDate
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from core.utils import duration_parts
@@ -22,7 +21,7 @@ def feeding_duration(instances):
     was equal to seven.
 
     :param instances: a QuerySet of Feeding instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     totals = (
         instances.annotate(date=TruncDate("start"))
@@ -69,8 +68,7 @@ def feeding_duration(instances):
     fig = go.Figure(
         {"data": [trace_avg, trace_count], "layout": go.Layout(**layout_args)}
     )
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
 
 
 def _duration_string_ms(duration):
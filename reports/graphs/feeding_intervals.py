@@ -3,7 +3,6 @@ from django.db.models import Count, Sum
 from django.db.models.functions import TruncDate
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from core.utils import duration_parts
@@ -16,25 +15,32 @@ def feeding_intervals(instances):
     Create a graph showing intervals of feeding instances over time.
 
     :param instances: a QuerySet of Feeding instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     totals = instances.annotate(count=Count("id")).order_by("start")
 
+    starts = []
     intervals = []
     last_feeding = totals.first()
     for feeding in totals[1:]:
         interval = feeding.start - last_feeding.start
         if interval.total_seconds() > 0:
+            starts.append(feeding.start)
             intervals.append(interval)
         last_feeding = feeding
 
+    x, y, text = utils.downsample(
+        starts,
+        [i.total_seconds() / 3600 for i in intervals],
+        [_duration_string_hms(i) for i in intervals],
+    )
     trace_avg = go.Scatter(
         name=_("Interval"),
         line=dict(shape="spline"),
-        x=list(totals.values_list("start", flat=True)),
-        y=[i.total_seconds() / 3600 for i in intervals],
+        x=x,
+        y=y,
         hoverinfo="text",
-        text=[_duration_string_hms(i) for i in intervals],
+        text=text,
     )
 
     layout_args = utils.default_graph_layout_options()
@@ -47,8 +53,7 @@ def feeding_intervals(instances):
     layout_args["yaxis"]["title"] = _("Feeding interval (hours)")
 
     fig = go.Figure({"data": [trace_avg], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
 
 
 def _duration_string_hms(duration):
@@ -4,16 +4,15 @@ from collections import OrderedDict
 from django.utils import timezone, formats
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 import plotly.colors as colors
 
 from core.utils import duration_string
 from core.models import Feeding
 
-from reports import utils
+from reports import segments, utils
 
-from datetime import timedelta
+import datetime
 
 FEEDING_COLORS = {
     method: colors.DEFAULT_PLOTLY_COLORS[i]
@@ -28,103 +27,55 @@ def feeding_pattern(feedings):
     """
     Create a graph showing blocked out periods of feeding during each day.
     :param feedings: a QuerySet of Feeding instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
-    last_end_time = None
-    adjustment = None
-
-    first_day = timezone.localtime(feedings.first().start)
-    last_day = timezone.localtime(feedings.last().end)
-    days = _init_days(first_day, last_day)
-
-    for feeding in feedings:
-        start_time = timezone.localtime(feeding.start)
-        end_time = timezone.localtime(feeding.end)
-        start_date = start_time.date().isoformat()
-        end_date = end_time.date().isoformat()
-        duration = feeding.duration
-
-        # Check if the previous entry crossed midnight (see below).
-        if adjustment:
-            _add_adjustment(adjustment, days)
-            last_end_time = timezone.localtime(adjustment["end_time"])
-            adjustment = None
-
-        # If the dates do not match, set up an adjustment for the next day.
-        if end_time.date() != start_time.date():
-            adj_start_time = end_time.replace(hour=0, minute=0, second=0)
-            adjustment = {
-                "column": end_date,
-                "start_time": adj_start_time,
-                "end_time": end_time,
-                "duration": end_time - adj_start_time,
-                "method": feeding.method,
-            }
-
-            # Adjust end_time for the current entry.
-            end_time = end_time.replace(
-                year=start_time.year,
-                month=start_time.month,
-                day=start_time.day,
-                hour=23,
-                minute=59,
-                second=0,
+    feedings = list(feedings.order_by("start").values_list("start", "end", "method"))
+
+    # Stack not feeding and feeding blocks of each day, in minutes since
+    # midnight on the wall clock.
+    days = {}
+    for day in segments.split_days(
+        [start.timestamp() for start, end, method in feedings],
+        [end.timestamp() for start, end, method in feedings],
+    ):
+        blocks = []
+        boundaries = [moment for segment in day.segments for moment in segment[:2]]
+        minutes = segments.clock_minutes(day, boundaries)
+        last_end = 0
+        for (start, end, index), start_minutes, end_minutes in zip(
+            day.segments, minutes[::2], minutes[1::2]
+        ):
+            # Overlapping entries are stacked after the previous entry.
+            start_minutes = max(start_minutes, last_end)
+            end_minutes = max(end_minutes, start_minutes)
+            method = feedings[index][2]
+            blocks.append(
+                {"time": start_minutes - last_end, "label": None, "method": None}
             )
-            duration = end_time - start_time
-
-        if last_end_time:
-            if last_end_time.date() < start_time.date():
-                # Not feeding across midnight
-                last_date = last_end_time.date().isoformat()
-                last_midnight = last_end_time.replace(hour=23, minute=59)
-                days[last_date].append(
-                    {
-                        "time": (last_midnight - last_end_time).seconds / 60,
-                        "label": None,
-                        "method": None,
-                    }
-                )
-                last_end_time = start_time.replace(hour=0, minute=0, second=0)
-
-        if not last_end_time:
-            last_end_time = start_time.replace(hour=0, minute=0, second=0)
-
-        # Not feeding time.
-        days[start_date].append(
-            {
-                "time": (start_time - last_end_time).seconds / 60,
-                "label": None,
-                "method": None,
-            }
-        )
-
-        # Feeding time.
-        days[start_date].append(
-            {
-                "time": duration.seconds / 60,
-                "label": _format_label(duration, start_time, end_time, feeding.method),
-                "method": feeding.method,
-            }
-        )
-
-        # Update the previous entry duration if an offset change occurred.
-        # This can happen when an entry crosses a daylight savings time change.
-        if start_time.utcoffset() != end_time.utcoffset():
-            diff = start_time.utcoffset() - end_time.utcoffset()
-            duration -= timezone.timedelta(seconds=diff.seconds)
-            yesterday = end_time - timezone.timedelta(days=1)
-            yesterday = yesterday.date().isoformat()
-            days[yesterday][len(days[yesterday]) - 1] = {
-                "time": duration.seconds / 60,
-                "label": _format_label(duration, start_time, end_time, feeding.method),
-                "method": feeding.method,
-            }
-
-        last_end_time = end_time
-
-    # Handle any left over adjustment (if the last entry crossed midnight).
-    if adjustment:
-        _add_adjustment(adjustment, days)
+            blocks.append(
+                {
+                    "time": end_minutes - start_minutes,
+                    "label": _format_label(
+                        timezone.timedelta(seconds=end - start),
+                        _clock_time(start_minutes),
+                        _clock_time(end_minutes),
+                        method,
+                    ),
+                    "method": method,
+                }
+            )
+            last_end = end_minutes
+        days[day.date.isoformat()] = blocks
+
+    # Snap the blocks of wide ranges to a coarser resolution (see
+    # utils.coarsen_blocks()); zoomed in ranges are fetched at full detail.
+    resolution = utils.pattern_resolution(len(days))
+    if resolution:
+        for date, blocks in days.items():
+            blocks = utils.coarsen_blocks(
+                blocks, resolution, lambda index, block: block["method"]
+            )
+            days[date] = [block for method, block in blocks]
 
     # Create dates for x-axis using a 12:00:00 time to ensure correct
     # positioning of bars (covering entire day).
@@ -200,37 +151,17 @@ def feeding_pattern(feedings):
     layout_args["yaxis"]["tickfont"] = {"size": 10}
 
     fig = go.Figure({"data": traces, "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
-
-
-def _init_days(first_day, last_day):
-    period = (last_day.date() - first_day.date()).days + 1
+    return utils.figure_spec(fig)
 
-    def new_day(d):
-        return (first_day + timedelta(days=d)).date().isoformat()
 
-    return {new_day(day): [] for day in range(period)}
-
-
-def _add_adjustment(adjustment, days):
+def _clock_time(minutes):
     """
-    Adds "adjustment" data for entries that cross midnight.
-    :param adjustment: Column, start time, end time, and duration of entry.
-    :param blocks: List of days
+    Convert minutes since midnight to a time of day.
+    :param minutes: minutes since midnight on the wall clock.
+    :return: a datetime.time instance.
     """
-    column = adjustment.pop("column")
-    if column not in days:
-        days[column] = []
-
-    # Real adjustment entry.
-    days[column].append(
-        {
-            "time": adjustment["duration"].seconds / 60,
-            "label": _format_label(**adjustment),
-            "method": adjustment["method"],
-        }
-    )
+    minutes = int(minutes)
+    return datetime.time(minutes // 60 % 24, minutes % 60)
 
 
 def _format_label(duration, start_time, end_time, method):
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -11,7 +10,7 @@ def head_circumference_change(objects):
     """
     Create a graph showing head_circumference over time.
     :param objects: a QuerySet of Head Circumference instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     objects = objects.order_by("-date")
 
@@ -30,5 +29,4 @@ def head_circumference_change(objects):
     layout_args["yaxis"]["title"] = _("Head Circumference")
 
     fig = go.Figure({"data": [trace], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -1,23 +1,37 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
+from typing import Optional
+
 from django.utils.translation import gettext as _
 from django.db.models.manager import BaseManager
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
+from core.percentiles import PercentileTable
+
 from reports import utils
 
+# Percentile lines drawn over the measurements, from the top down.
+PERCENTILE_COLORS = [
+    (97, "red"),
+    (85, "orange"),
+    (50, "green"),
+    (15, "orange"),
+    (3, "red"),
+]
+
 
 def height_change(
-    actual_heights: BaseManager, percentile_heights: BaseManager, birthday: datetime
+    actual_heights: BaseManager,
+    percentiles: Optional[PercentileTable],
+    birthday: datetime,
 ):
     """
     Create a graph showing height over time.
     :param actual_heights: a QuerySet of Height instances.
-    :param percentile_heights: a QuerySet of Height Percentile instances.
+    :param percentiles: a PercentileTable of height percentiles, or None.
     :param birthday: a datetime of the child's birthday
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     actual_heights = actual_heights.order_by("-date")
 
@@ -34,49 +48,21 @@ def height_change(
         mode="lines+markers",
     )
 
-    if percentile_heights:
-        dates = list(
-            map(
-                lambda timedelta: birthday + timedelta,
-                percentile_heights.values_list("age_in_days", flat=True),
-            )
-        )
-
-        # reduce percentile data xrange to end 1 day after last height measurement in for formatting purposes
+    if percentiles:
+        # reduce percentile data xrange to end 1 day after the last measurement for formatting purposes
         # https://github.com/babybuddy/babybuddy/pull/708#discussion_r1332335789
-        last_date_for_percentiles = min(max(dates), max(measuring_dates))
-        dates = dates[: dates.index(last_date_for_percentiles) + 1]
-
-        percentile_height_3_trace = go.Scatter(
-            name=_("P3"),
-            x=dates,
-            y=list(percentile_heights.values_list("p3_height", flat=True)),
-            line={"color": "red"},
-        )
-        percentile_height_15_trace = go.Scatter(
-            name=_("P15"),
-            x=dates,
-            y=list(percentile_heights.values_list("p15_height", flat=True)),
-            line={"color": "orange"},
-        )
-        percentile_height_50_trace = go.Scatter(
-            name=_("P50"),
-            x=dates,
-            y=list(percentile_heights.values_list("p50_height", flat=True)),
-            line={"color": "green"},
-        )
-        percentile_height_85_trace = go.Scatter(
-            name=_("P85"),
-            x=dates,
-            y=list(percentile_heights.values_list("p85_height", flat=True)),
-            line={"color": "orange"},
-        )
-        percentile_height_97_trace = go.Scatter(
-            name=_("P97"),
-            x=dates,
-            y=list(percentile_heights.values_list("p97_height", flat=True)),
-            line={"color": "red"},
-        )
+        ages, curves = percentiles.until((max(measuring_dates) - birthday).days)
+        dates = [birthday + timedelta(days=age) for age in ages]
+        names = {3: _("P3"), 15: _("P15"), 50: _("P50"), 85: _("P85"), 97: _("P97")}
+        percentile_traces = [
+            go.Scatter(
+                name=names[p],
+                x=dates,
+                y=curves[p],
+                line={"color": color},
+            )
+            for p, color in PERCENTILE_COLORS
+        ]
 
     data = [
         actual_heights_trace,
@@ -87,23 +73,14 @@ def height_change(
     layout_args["xaxis"]["title"] = _("Date")
     layout_args["xaxis"]["rangeselector"] = utils.rangeselector_date()
     layout_args["yaxis"]["title"] = _("Height")
-    if percentile_heights:
+    if percentiles:
         # zoom in on the relevant dates
         layout_args["xaxis"]["range"] = [
             birthday,
             max(measuring_dates) + timedelta(days=1),
         ]
         layout_args["yaxis"]["range"] = [0, max(measured_heights) * 1.5]
-        data.extend(
-            [
-                percentile_height_97_trace,
-                percentile_height_85_trace,
-                percentile_height_50_trace,
-                percentile_height_15_trace,
-                percentile_height_3_trace,
-            ]
-        )
+        data.extend(percentile_traces)
 
     fig = go.Figure({"data": data, "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
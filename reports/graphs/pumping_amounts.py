@@ -2,7 +2,6 @@
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -12,7 +11,7 @@ def pumping_amounts(objects):
     """
     Create a graph showing pumping amounts over time.
     :param instances: a QuerySet of Pumping instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     objects = objects.order_by("start")
 
@@ -68,5 +67,4 @@ def pumping_amounts(objects):
 
     fig = go.Figure({"data": traces, "layout": go.Layout(**layout_args)})
     fig.update_layout(barmode="stack", annotations=total_labels)
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -4,15 +4,14 @@ from collections import OrderedDict
 from django.utils import timezone, formats
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 import plotly.colors as colors
 
 from core.utils import duration_string
 
-from reports import utils
+from reports import segments, utils
 
-from datetime import timedelta
+import datetime
 
 ASLEEP_COLOR = "rgb(35, 110, 150)"
 AWAKE_COLOR = colors.DEFAULT_PLOTLY_COLORS[2]
@@ -22,96 +21,58 @@ def sleep_pattern(sleeps):
     """
     Create a graph showing blocked out periods of sleep during each day.
     :param sleeps: a QuerySet of Sleep instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
-    last_end_time = None
-    adjustment = None
-
-    first_day = timezone.localtime(sleeps.first().start)
-    last_day = timezone.localtime(sleeps.last().end)
-    days = _init_days(first_day, last_day)
-
-    for sleep in sleeps:
-        start_time = timezone.localtime(sleep.start)
-        end_time = timezone.localtime(sleep.end)
-        start_date = start_time.date().isoformat()
-        end_date = end_time.date().isoformat()
-        duration = sleep.duration
-
-        # Check if the previous entry crossed midnight (see below).
-        if adjustment:
-            _add_adjustment(adjustment, days)
-            last_end_time = timezone.localtime(adjustment["end_time"])
-            adjustment = None
-
-        # If the dates do not match, set up an adjustment for the next day.
-        if end_time.date() != start_time.date():
-            adj_start_time = end_time.replace(hour=0, minute=0, second=0)
-            adjustment = {
-                "column": end_date,
-                "start_time": adj_start_time,
-                "end_time": end_time,
-                "duration": end_time - adj_start_time,
-            }
-
-            # Adjust end_time for the current entry.
-            end_time = end_time.replace(
-                year=start_time.year,
-                month=start_time.month,
-                day=start_time.day,
-                hour=23,
-                minute=59,
-                second=0,
-            )
-            duration = end_time - start_time
-
-        if last_end_time:
-            if last_end_time.date() < start_time.date():
-                # Awake across midnight
-                days[last_end_time.date().isoformat()].append(
-                    _awake_event(
-                        last_end_time,
-                        last_end_time.replace(
-                            hour=23,
-                            minute=59,
-                            second=0,
-                        ),
-                    )
-                )
-
-                last_end_time = start_time.replace(hour=0, minute=0, second=0)
-
-        if not last_end_time:
-            last_end_time = start_time.replace(hour=0, minute=0, second=0)
-
-        # Awake time.
-        days[start_date].append(_awake_event(last_end_time, start_time))
-
-        # Asleep time.
-        days[start_date].append(
-            {
-                "time": duration.seconds / 60,
-                "label": _format_asleep_label(duration, start_time, end_time),
-            }
-        )
-
-        # Update the previous entry duration if an offset change occurred.
-        # This can happen when an entry crosses a daylight savings time change.
-        if start_time.utcoffset() != end_time.utcoffset():
-            diff = start_time.utcoffset() - end_time.utcoffset()
-            duration -= timezone.timedelta(seconds=diff.seconds)
-            yesterday = end_time - timezone.timedelta(days=1)
-            yesterday = yesterday.date().isoformat()
-            days[yesterday][len(days[yesterday]) - 1] = {
-                "time": duration.seconds / 60,
-                "label": _format_asleep_label(duration, start_time, end_time),
-            }
-
-        last_end_time = end_time
+    sleeps = list(sleeps.order_by("start").values_list("start", "end"))
+    split = segments.split_days(
+        [start.timestamp() for start, end in sleeps],
+        [end.timestamp() for start, end in sleeps],
+    )
 
-    # Handle any left over adjustment (if the last entry crossed midnight).
-    if adjustment:
-        _add_adjustment(adjustment, days)
+    # Stack alternating awake and asleep blocks of each day, in minutes since
+    # midnight on the wall clock.
+    days = {}
+    for day in split:
+        blocks = []
+        boundaries = [moment for segment in day.segments for moment in segment[:2]]
+        minutes = segments.clock_minutes(day, boundaries)
+        last_end = 0
+        for (start, end, index), start_minutes, end_minutes in zip(
+            day.segments, minutes[::2], minutes[1::2]
+        ):
+            # Overlapping entries are stacked after the previous entry.
+            start_minutes = max(start_minutes, last_end)
+            end_minutes = max(end_minutes, start_minutes)
+            blocks.append(_awake_event(last_end, start_minutes))
+            blocks.append(
+                {
+                    "time": end_minutes - start_minutes,
+                    "label": _format_asleep_label(
+                        timezone.timedelta(seconds=end - start),
+                        _clock_time(start_minutes),
+                        _clock_time(end_minutes),
+                    ),
+                }
+            )
+            last_end = end_minutes
+
+        # Awake until midnight, unless this is the last day.
+        if blocks and day is not split[-1] and last_end < 24 * 60:
+            blocks.append(_awake_event(last_end, 24 * 60))
+        days[day.date.isoformat()] = blocks
+
+    # Snap the blocks of wide ranges to a coarser resolution (see
+    # utils.coarsen_blocks()); zoomed in ranges are fetched at full detail.
+    # Blocks alternate between awake and asleep starting with awake.
+    resolution = utils.pattern_resolution(len(days))
+    if resolution:
+        for date, blocks in days.items():
+            blocks = utils.coarsen_blocks(
+                blocks, resolution, lambda index, block: index % 2
+            )
+            if blocks and blocks[0][0]:
+                blocks.insert(0, (0, {"time": 0, "label": None}))
+            days[date] = [block for asleep, block in blocks]
 
     # Create dates for x-axis using a 12:00:00 time to ensure correct
     # positioning of bars (covering entire day).
@@ -187,46 +148,29 @@ def sleep_pattern(sleeps):
     layout_args["yaxis"]["tickfont"] = {"size": 10}
 
     fig = go.Figure({"data": traces, "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
-
+    return utils.figure_spec(fig)
 
-def _init_days(first_day, last_day):
-    period = (last_day.date() - first_day.date()).days + 1
 
-    def new_day(d):
-        return (first_day + timedelta(days=d)).date().isoformat()
-
-    return {new_day(day): [] for day in range(period)}
+def _awake_event(last_end_minutes, next_start_minutes):
+    awake_duration = timezone.timedelta(minutes=next_start_minutes - last_end_minutes)
+    return {
+        "time": next_start_minutes - last_end_minutes,
+        "label": _format_awake_label(
+            awake_duration,
+            _clock_time(last_end_minutes),
+            _clock_time(next_start_minutes),
+        ),
+    }
 
 
-def _add_adjustment(adjustment, days):
+def _clock_time(minutes):
     """
-    Adds "adjustment" data for entries that cross midnight.
-    :param adjustment: Column, start time, end time, and duration of entry.
-    :param blocks: List of days
+    Convert minutes since midnight to a time of day.
+    :param minutes: minutes since midnight on the wall clock.
+    :return: a datetime.time instance.
     """
-    column = adjustment.pop("column")
-    if not column in days:
-        days[column] = []
-    # Fake (0) entry to keep the color switching logic working.
-    days[column].append({"time": 0, "label": 0})
-
-    # Real adjustment entry.
-    days[column].append(
-        {
-            "time": adjustment["duration"].seconds / 60,
-            "label": _format_asleep_label(**adjustment),
-        }
-    )
-
-
-def _awake_event(last_end_time, next_start_time):
-    awake_duration = next_start_time - last_end_time
-    return {
-        "time": awake_duration.seconds / 60,
-        "label": _format_awake_label(awake_duration, last_end_time, next_start_time),
-    }
+    minutes = int(minutes)
+    return datetime.time(minutes // 60 % 24, minutes % 60)
 
 
 def _format_asleep_label(duration, start_time, end_time):
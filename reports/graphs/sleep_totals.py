@@ -2,52 +2,34 @@
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from core.utils import duration_parts
 
-from reports import utils
+from reports import segments, utils
 
 
 def sleep_totals(instances):
     """
     Create a graph showing total time sleeping for each day.
     :param instances: a QuerySet of Sleep instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
+    sleeps = list(instances.order_by("start").values_list("start", "end"))
     totals = {}
-    for instance in instances:
-        start = timezone.localtime(instance.start)
-        end = timezone.localtime(instance.end)
-        if start.date() not in totals.keys():
-            totals[start.date()] = timezone.timedelta(seconds=0)
-        if end.date() not in totals.keys():
-            totals[end.date()] = timezone.timedelta(seconds=0)
-
-        # Account for dates crossing midnight.
-        if start.date() != end.date():
-            totals[start.date()] += (
-                end.replace(
-                    year=start.year,
-                    month=start.month,
-                    day=start.day,
-                    hour=23,
-                    minute=59,
-                    second=59,
-                )
-                - start
-            )
-            totals[end.date()] += end - start.replace(
-                year=end.year, month=end.month, day=end.day, hour=0, minute=0, second=0
+    for day in segments.split_days(
+        [start.timestamp() for start, end in sleeps],
+        [end.timestamp() for start, end in sleeps],
+    ):
+        if day.segments:
+            totals[day.date] = timezone.timedelta(
+                seconds=sum(end - start for start, end, index in day.segments)
             )
-        else:
-            totals[start.date()] += instance.duration
 
     trace = go.Bar(
         name=_("Total sleep"),
         x=list(totals.keys()),
-        y=[td.seconds / 3600 for td in totals.values()],
+        y=[td.total_seconds() / 3600 for td in totals.values()],
         hoverinfo="text",
         textposition="outside",
         text=[_duration_string_short(td) for td in totals.values()],
@@ -64,8 +46,7 @@ def sleep_totals(instances):
     layout_args["yaxis"]["title"] = _("Hours of sleep")
 
     fig = go.Figure({"data": [trace], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
 
 
 def _duration_string_short(duration):
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from reports import utils
@@ -11,15 +10,15 @@ def temperature_change(objects):
     """
     Create a graph showing temperature over time.
     :param objects: a QuerySet of Temperature instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     objects = objects.order_by("-time")
 
-    trace = go.Scatter(
-        name=_("Temperature"),
-        x=list(objects.values_list("time", flat=True)),
-        y=list(objects.values_list("temperature", flat=True)),
+    x, y = utils.downsample(
+        list(objects.values_list("time", flat=True)),
+        list(objects.values_list("temperature", flat=True)),
     )
+    trace = go.Scatter(name=_("Temperature"), x=x, y=y)
 
     layout_args = utils.default_graph_layout_options()
     layout_args["barmode"] = "stack"
@@ -32,5 +31,4 @@ def temperature_change(objects):
     layout_args["yaxis"]["title"] = _("Temperature")
 
     fig = go.Figure({"data": [trace], "layout": go.Layout(**layout_args)})
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
@@ -3,7 +3,6 @@ from django.db.models import Count, Sum
 from django.db.models.functions import TruncDate
 from django.utils.translation import gettext as _
 
-import plotly.offline as plotly
 import plotly.graph_objs as go
 
 from core.utils import duration_parts
@@ -16,7 +15,7 @@ def tummytime_duration(instances):
     Create a graph showing total duration of tummy time instances per day.
 
     :param instances: a QuerySet of TummyTime instances.
-    :returns: a tuple of the graph's html and javascript.
+    :returns: a JSON string of the graph's figure spec.
     """
     totals = (
         instances.annotate(date=TruncDate("start"))
@@ -64,8 +63,7 @@ def tummytime_duration(instances):
     fig = go.Figure(
         {"data": [trace_avg, trace_count], "layout": go.Layout(**layout_args)}
     )
-    output = plotly.plot(fig, output_type="div", include_plotlyjs=False)
-    return utils.split_graph_output(output)
+    return utils.figure_spec(fig)
 
 
 def _duration_string_ms(duration):
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Management command למדידת ביצועי חלוקת אירועים לימים בדוחות
+Benchmarks splitting years of synthetic sleep/feeding intervals at local
+midnights, as the sleep and feeding pattern and sleep totals reports do
+
+    python manage.py benchmark_reports --years 5 --per-day 12
+"""
+
+import datetime
+import random
+import statistics
+import time
+import zoneinfo
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports import segments
+
+
+class Command(BaseCommand):
+    help = (
+        "Time splitting synthetic intervals in to local days with the shared "
+        "day-segment engine and with per-event local time conversion"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--years",
+            type=int,
+            default=5,
+            help="Years of synthetic data (default: 5)",
+        )
+        parser.add_argument(
+            "--per-day",
+            type=int,
+            default=12,
+            help="Intervals per day (default: 12)",
+        )
+        parser.add_argument(
+            "--timezone",
+            type=str,
+            help="Time zone to split days in (default: the current time zone)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="How many times each method is run",
+        )
+
+    def handle(self, *args, **options):
+        tz = timezone.get_current_timezone()
+        if options["timezone"]:
+            try:
+                tz = zoneinfo.ZoneInfo(options["timezone"])
+            except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+                raise CommandError(f"Unknown time zone: {options['timezone']}")
+
+        starts, ends = self.intervals(options["years"], options["per_day"])
+        self.stdout.write(f"{len(starts)} intervals in {tz}\n")
+
+        methods = [
+            ("day-segment engine", self.split_segments),
+            ("per-event local time", self.split_per_event),
+        ]
+        for name, method in methods:
+            timings = []
+            for _ in range(options["repeat"]):
+                began = time.perf_counter()
+                method(starts, ends, tz)
+                timings.append((time.perf_counter() - began) * 1000)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: median {statistics.median(timings):.2f} ms"
+                )
+            )
+
+    @staticmethod
+    def intervals(years, per_day):
+        """Synthetic sorted intervals, some of them crossing midnight."""
+        rng = random.Random(0)
+        start = timezone.now().timestamp() - years * 365 * segments.DAY
+        step = segments.DAY / per_day
+        starts = []
+        ends = []
+        for i in range(years * 365 * per_day):
+            begin = start + i * step + rng.uniform(0, step / 2)
+            starts.append(begin)
+            ends.append(begin + rng.uniform(step / 4, step * 1.5))
+        return starts, ends
+
+    @staticmethod
+    def split_segments(starts, ends, tz):
+        """Split with the day-segment engine, including wall clock minutes."""
+        for day in segments.split_days(starts, ends, tz):
+            segments.clock_minutes(
+                day,
+                [moment for segment in day.segments for moment in segment[:2]],
+                tz,
+            )
+
+    @staticmethod
+    def split_per_event(starts, ends, tz):
+        """Convert every interval to local time and split it at midnights."""
+        days = {}
+        for start, end in zip(starts, ends):
+            start = datetime.datetime.fromtimestamp(start, tz)
+            end = datetime.datetime.fromtimestamp(end, tz)
+            while start.date() != end.date():
+                midnight = datetime.datetime.combine(
+                    start.date() + datetime.timedelta(days=1),
+                    datetime.time(),
+                    tzinfo=tz,
+                )
+                days.setdefault(start.date(), []).append((start, midnight))
+                start = midnight
+            days.setdefault(start.date(), []).append((start, end))
+        return days
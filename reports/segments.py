@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import datetime
+from collections import namedtuple
+
+from django.utils import timezone
+
+DAY = 24 * 60 * 60
+
+# A local day of split intervals: its date, its midnight in epoch seconds, its
+# length in seconds (23 or 25 hours when the clocks change for daylight saving
+# time) and the (start, end, index) parts of the intervals in the day, where
+# index is the interval's position in the lists passed to split_days().
+Day = namedtuple("Day", ["date", "midnight", "length", "segments"])
+
+
+def clock_minutes(day, moments, tz=None):
+    """
+    Convert moments in a day to minutes on the local wall clock since midnight,
+    so a time-of-day axis lines up with the clock on days the clocks change.
+    :param day: a Day from split_days().
+    :param moments: a list of epoch seconds within the day.
+    :param tz: the time zone of the day (default: the current time zone).
+    :returns: a list of minutes, 24 * 60 for the end of the day.
+    """
+    end = day.midnight + day.length
+    if day.length == DAY:
+        return [(moment - day.midnight) / 60 for moment in moments]
+
+    tz = tz or timezone.get_current_timezone()
+    minutes = []
+    for moment in moments:
+        if moment >= end:
+            minutes.append(24 * 60)
+            continue
+        local = datetime.datetime.fromtimestamp(moment, tz)
+        minutes.append(local.hour * 60 + local.minute + local.second / 60)
+    return minutes
+
+
+def split_days(starts, ends, tz=None):
+    """
+    Split intervals at local midnights. The midnights are computed once per
+    calendar day rather than converting every interval to local time, and
+    each interval is then split with arithmetic only.
+    :param starts: a list of interval starts in epoch seconds, sorted.
+    :param ends: a list of interval ends in epoch seconds.
+    :param tz: the time zone of the days (default: the current time zone).
+    :returns: a list of Days from the day of the first start through the day
+              of the last end, including days without intervals.
+    """
+    if not starts:
+        return []
+    tz = tz or timezone.get_current_timezone()
+    dates, midnights = _midnights(starts[0], max(ends), tz)
+
+    segments = [[] for _ in dates]
+    day = 0
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        # Starts are sorted, so the day of the next start is never earlier.
+        while start >= midnights[day + 1]:
+            day += 1
+        current = day
+        while end > midnights[current + 1]:
+            segments[current].append((start, midnights[current + 1], index))
+            start = midnights[current + 1]
+            current += 1
+        segments[current].append((start, end, index))
+
+    return [
+        Day(date, midnights[i], midnights[i + 1] - midnights[i], segments[i])
+        for i, date in enumerate(dates)
+    ]
+
+
+def _midnights(first, last, tz):
+    """
+    Get the local midnights of the days from ``first`` through ``last``.
+    :param first: epoch seconds in the first day.
+    :param last: epoch seconds in the last day.
+    :param tz: the time zone of the days.
+    :returns: a tuple of the list of dates and the list of their midnights in
+              epoch seconds, followed by the midnight ending the last day.
+    """
+    date = datetime.datetime.fromtimestamp(first, tz).date()
+    last_date = datetime.datetime.fromtimestamp(last, tz).date()
+    dates = []
+    midnights = []
+    while True:
+        midnight = datetime.datetime.combine(date, datetime.time(), tzinfo=tz)
+        midnights.append(midnight.timestamp())
+        if date > last_date:
+            return dates, midnights
+        dates.append(date)
+        date += datetime.timedelta(days=1)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import datetime
+import zoneinfo
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from reports import segments
+
+
+class SegmentsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tz = zoneinfo.ZoneInfo("America/New_York")
+
+    def moment(self, *args):
+        return datetime.datetime(*args, tzinfo=self.tz).timestamp()
+
+    def test_split_days(self):
+        starts = [self.moment(2024, 3, 8, 22), self.moment(2024, 3, 9, 13)]
+        ends = [self.moment(2024, 3, 8, 23), self.moment(2024, 3, 11, 1)]
+
+        days = segments.split_days(starts, ends, self.tz)
+        self.assertEqual(
+            [day.date for day in days],
+            [datetime.date(2024, 3, day) for day in (8, 9, 10, 11)],
+        )
+        self.assertEqual(days[0].segments, [(starts[0], ends[0], 0)])
+        self.assertEqual(days[1].segments, [(starts[1], self.moment(2024, 3, 10), 1)])
+        self.assertEqual(
+            days[2].segments, [(days[2].midnight, self.moment(2024, 3, 11), 1)]
+        )
+        self.assertEqual(days[3].segments, [(days[3].midnight, ends[1], 1)])
+
+        self.assertEqual(segments.split_days([], [], self.tz), [])
+
+    def test_split_days_daylight_saving_time(self):
+        # Clocks go forward at 2am on 2024-03-10 and back on 2024-11-03.
+        days = segments.split_days(
+            [self.moment(2024, 3, 10), self.moment(2024, 11, 3)],
+            [self.moment(2024, 3, 10, 7), self.moment(2024, 11, 3, 7)],
+            self.tz,
+        )
+        self.assertEqual(days[0].length, 23 * 60 * 60)
+        self.assertEqual(days[1].length, 24 * 60 * 60)
+        self.assertEqual(days[-1].length, 25 * 60 * 60)
+        self.assertEqual(days[-1].date, datetime.date(2024, 11, 3))
+
+        # Time of day follows the wall clock.
+        start, end, index = days[0].segments[0]
+        self.assertEqual(
+            segments.clock_minutes(days[0], [start, end], self.tz), [0, 7 * 60]
+        )
+        start, end, index = days[-1].segments[0]
+        self.assertEqual(
+            segments.clock_minutes(days[-1], [start, end], self.tz), [0, 7 * 60]
+        )
+        self.assertEqual(
+            segments.clock_minutes(
+                days[-1], [days[-1].midnight + days[-1].length], self.tz
+            ),
+            [24 * 60],
+        )
+
+    def test_benchmark_reports(self):
+        output = StringIO()
+        call_command("benchmark_reports", years=1, per_day=4, repeat=1, stdout=output)
+        self.assertIn("1460 intervals", output.getvalue())
+        self.assertIn("day-segment engine: median", output.getvalue())
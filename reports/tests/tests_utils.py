@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import datetime
+import math
+
+from django.test import SimpleTestCase
+
+from reports import utils
+
+
+class UtilsTestCase(SimpleTestCase):
+    def test_lttb(self):
+        x = list(range(5000))
+        y = [math.sin(i / 100) for i in x]
+
+        keep = utils.lttb(x, y, 100)
+        self.assertEqual(len(keep), 100)
+        self.assertEqual(keep, sorted(set(keep)))
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 4999)
+        # Peaks and troughs survive downsampling.
+        kept = [y[i] for i in keep]
+        self.assertGreater(max(kept), 0.99)
+        self.assertLess(min(kept), -0.99)
+
+        self.assertEqual(utils.lttb(x[:50], y[:50], 100), list(range(50)))
+
+    def test_downsample(self):
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        x = [start - datetime.timedelta(hours=i) for i in range(3000)]
+        y = [i % 7 for i in range(3000)]
+        text = [str(i) for i in range(3000)]
+
+        x, y, text = utils.downsample(x, y, text, threshold=300)
+        self.assertEqual(len(x), 300)
+        self.assertEqual(x[0], start)
+        # Columns stay aligned with the points kept.
+        self.assertEqual(x, [start - datetime.timedelta(hours=int(i)) for i in text])
+        self.assertEqual(y, [int(i) % 7 for i in text])
+
+    def test_coarsen_blocks(self):
+        blocks = [
+            {"time": 300, "label": None},
+            {"time": 7, "label": "Asleep 7m"},
+            {"time": 20, "label": None},
+            {"time": 90, "label": "Asleep 1h30m"},
+            {"time": 3, "label": None},
+            {"time": 60, "label": "Asleep 1h"},
+        ]
+        merged = utils.coarsen_blocks(blocks, 30, lambda index, block: index % 2)
+        self.assertEqual(
+            merged,
+            [
+                (0, {"time": 330, "label": None}),
+                (1, {"time": 150, "label": "Asleep 1h30m<br>Asleep 1h"}),
+            ],
+        )
+
+    def test_pattern_resolution(self):
+        self.assertEqual(utils.pattern_resolution(utils.PATTERN_DETAIL_DAYS), 0)
+        self.assertEqual(utils.pattern_resolution(utils.PATTERN_DETAIL_DAYS + 1), 10)
+        self.assertEqual(utils.pattern_resolution(3 * 365), 60)
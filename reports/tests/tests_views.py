@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
+from unittest import mock
+
 from django.test import TestCase
 from django.test import Client as HttpClient
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.management import call_command
+from django.utils import timezone
 
 from faker import Faker
 
 from core import models
+from reports import views
 
 
 class ViewsTestCase(TestCase):
@@ -80,3 +85,103 @@ class ViewsTestCase(TestCase):
 
         page = self.c.get("{}/weight/weight/".format(base_url))
         self.assertEqual(page.status_code, 200)
+        page = self.c.get("{}/weight/boy/".format(base_url))
+        self.assertEqual(page.status_code, 200)
+        page = self.c.get("{}/weight/girl/".format(base_url))
+        self.assertEqual(page.status_code, 200)
+
+    def test_graph_child_data_views(self):
+        child = models.Child.objects.first()
+        base_url = "/children/{}/reports".format(child.slug)
+
+        page = self.c.get("{}/changes/types/".format(base_url))
+        self.assertContains(page, "{}/changes/types.json".format(base_url))
+
+        for report in [
+            "bmi/bmi",
+            "changes/amounts",
+            "changes/intervals",
+            "feeding/pattern",
+            "height/boy",
+            "sleep/totals",
+            "weight/weight",
+            "weight/boy",
+            "weight/girl",
+        ]:
+            response = self.c.get("{}/{}.json".format(base_url, report))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "application/json")
+            figure = response.json()
+            if figure is not None:
+                self.assertIn("data", figure)
+                self.assertIn("layout", figure)
+
+    def test_graph_child_data_cache(self):
+        child = models.Child.objects.first()
+        url = "/children/{}/reports/changes/types.json".format(child.slug)
+        self.c.get(url)
+
+        with mock.patch.object(
+            views.DiaperChangeTypesChildReport,
+            "get_figure",
+            return_value='{"data": [], "layout": {}}',
+        ) as get_figure:
+            response = self.c.get(url)
+            get_figure.assert_not_called()
+            self.assertIn("layout", response.json())
+
+            # A new entry starts a new data generation for the child.
+            models.DiaperChange.objects.create(
+                child=child, time=timezone.localtime(), wet=True, solid=False
+            )
+            response = self.c.get(url)
+            get_figure.assert_called_once()
+            self.assertEqual(response.json(), {"data": [], "layout": {}})
+
+    def test_graph_child_data_views_no_data(self):
+        child = models.Child.objects.create(
+            first_name="Empty", last_name="Child", birth_date=timezone.localdate()
+        )
+        base_url = "/children/{}/reports".format(child.slug)
+
+        page = self.c.get("{}/sleep/pattern/".format(base_url))
+        self.assertContains(page, "There is not enough data")
+        self.assertNotContains(page, "sleep/pattern.json")
+
+        response = self.c.get("{}/sleep/pattern.json".format(base_url))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json())
+
+    def test_graph_child_data_views_range(self):
+        child = models.Child.objects.first()
+        base_url = "/children/{}/reports".format(child.slug)
+
+        page = self.c.get("{}/sleep/pattern/".format(base_url))
+        self.assertTrue(page.context["ranged"])
+        page = self.c.get("{}/bmi/bmi/".format(base_url))
+        self.assertFalse(page.context.get("ranged"))
+
+        last = child.temperature.order_by("time").last().time
+        url = "{}/temperature/temperature.json".format(base_url)
+        with mock.patch.object(
+            views.TemperatureChangeChildReport, "get_figure", return_value="{}"
+        ) as get_figure:
+            response = self.c.get(
+                url,
+                {
+                    "start": (last - timezone.timedelta(days=3)).isoformat(),
+                    "end": last.isoformat(),
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+            entries = get_figure.call_args.args[1]
+            for time in entries.values_list("time", flat=True):
+                self.assertGreaterEqual(time, last - timezone.timedelta(days=4))
+                self.assertLessEqual(time, last + timezone.timedelta(days=1))
+
+            # Ranged requests are not cached; invalid ranges fall back to the
+            # cached figure of the whole history.
+            cache.clear()
+            self.c.get(url, {"start": "tomorrow", "end": "today"})
+            self.c.get(url, {"start": "tomorrow", "end": "today"})
+            self.assertEqual(get_figure.call_count, 2)
@@ -5,115 +5,126 @@ from . import views
 
 app_name = "reports"
 
+
+def report_paths(route, view, name):
+    """
+    Paths of a report page at ``route`` and of the JSON figure spec it plots.
+    """
+    return [
+        path(route + "/", view.as_view(), name=name),
+        path(route + ".json", view.as_view(format="json"), name=name + "-data"),
+    ]
+
+
 urlpatterns = [
     path(
         "children/<str:slug>/reports",
         views.ChildReportList.as_view(),
         name="report-list",
     ),
-    path(
-        "children/<str:slug>/reports/bmi/bmi/",
-        views.BMIChangeChildReport.as_view(),
-        name="report-bmi-change-child",
-    ),
-    path(
-        "children/<str:slug>/reports/changes/amounts/",
-        views.DiaperChangeAmounts.as_view(),
-        name="report-diaperchange-amounts-child",
-    ),
-    path(
-        "children/<str:slug>/reports/changes/lifetimes/",
-        views.DiaperChangeLifetimesChildReport.as_view(),
-        name="report-diaperchange-lifetimes-child",
-    ),
-    path(
-        "children/<str:slug>/reports/changes/types/",
-        views.DiaperChangeTypesChildReport.as_view(),
-        name="report-diaperchange-types-child",
-    ),
-    path(
-        "children/<str:slug>/reports/changes/intervals/",
-        views.DiaperChangeIntervalsChildReport.as_view(),
-        name="report-diaperchange-intervals-child",
-    ),
-    path(
-        "children/<str:slug>/reports/feeding/amounts/",
-        views.FeedingAmountsChildReport.as_view(),
-        name="report-feeding-amounts-child",
-    ),
-    path(
-        "children/<str:slug>/reports/head-circumference/head-circumference/",
-        views.HeadCircumferenceChangeChildReport.as_view(),
-        name="report-head-circumference-change-child",
-    ),
-    path(
-        "children/<str:slug>/reports/height/height/",
-        views.HeightChangeChildReport.as_view(),
-        name="report-height-change-child",
-    ),
-    path(
-        "children/<str:slug>/reports/height/boy/",
-        views.HeightChangeChildBoyReport.as_view(),
-        name="report-height-change-child-boy",
-    ),
-    path(
-        "children/<str:slug>/reports/height/girl/",
-        views.HeightChangeChildGirlReport.as_view(),
-        name="report-height-change-child-girl",
-    ),
-    path(
-        "children/<str:slug>/reports/feeding/duration/",
-        views.FeedingDurationChildReport.as_view(),
-        name="report-feeding-duration-child",
-    ),
-    path(
-        "children/<str:slug>/reports/pumping/amounts/",
-        views.PumpingAmounts.as_view(),
-        name="report-pumping-amounts-child",
-    ),
-    path(
-        "children/<str:slug>/reports/feeding/intervals/",
-        views.FeedingIntervalsChildReport.as_view(),
-        name="report-feeding-intervals-child",
-    ),
-    path(
-        "children/<str:slug>/reports/feeding/pattern/",
-        views.FeedingPatternChildReport.as_view(),
-        name="report-feeding-pattern-child",
-    ),
-    path(
-        "children/<str:slug>/reports/sleep/pattern/",
-        views.SleepPatternChildReport.as_view(),
-        name="report-sleep-pattern-child",
-    ),
-    path(
-        "children/<str:slug>/reports/sleep/totals/",
-        views.SleepTotalsChildReport.as_view(),
-        name="report-sleep-totals-child",
-    ),
-    path(
-        "children/<str:slug>/reports/temperature/temperature/",
-        views.TemperatureChangeChildReport.as_view(),
-        name="report-temperature-change-child",
-    ),
-    path(
-        "children/<str:slug>/reports/tummy-time/duration/",
-        views.TummyTimeDurationChildReport.as_view(),
-        name="report-tummy-time-duration-child",
-    ),
-    path(
-        "children/<str:slug>/reports/weight/weight/",
-        views.WeightChangeChildReport.as_view(),
-        name="report-weight-change-child",
-    ),
-    path(
-        "children/<str:slug>/reports/weight/boy/",
-        views.WeightChangeChildBoyReport.as_view(),
-        name="report-weight-change-child-boy",
-    ),
-    path(
-        "children/<str:slug>/reports/weight/girl/",
-        views.WeightChangeChildGirlReport.as_view(),
-        name="report-weight-change-child-girl",
+    *report_paths(
+        "children/<str:slug>/reports/bmi/bmi",
+        views.BMIChangeChildReport,
+        "report-bmi-change-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/changes/amounts",
+        views.DiaperChangeAmounts,
+        "report-diaperchange-amounts-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/changes/lifetimes",
+        views.DiaperChangeLifetimesChildReport,
+        "report-diaperchange-lifetimes-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/changes/types",
+        views.DiaperChangeTypesChildReport,
+        "report-diaperchange-types-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/changes/intervals",
+        views.DiaperChangeIntervalsChildReport,
+        "report-diaperchange-intervals-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/feeding/amounts",
+        views.FeedingAmountsChildReport,
+        "report-feeding-amounts-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/head-circumference/head-circumference",
+        views.HeadCircumferenceChangeChildReport,
+        "report-head-circumference-change-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/height/height",
+        views.HeightChangeChildReport,
+        "report-height-change-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/height/boy",
+        views.HeightChangeChildBoyReport,
+        "report-height-change-child-boy",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/height/girl",
+        views.HeightChangeChildGirlReport,
+        "report-height-change-child-girl",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/feeding/duration",
+        views.FeedingDurationChildReport,
+        "report-feeding-duration-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/pumping/amounts",
+        views.PumpingAmounts,
+        "report-pumping-amounts-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/feeding/intervals",
+        views.FeedingIntervalsChildReport,
+        "report-feeding-intervals-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/feeding/pattern",
+        views.FeedingPatternChildReport,
+        "report-feeding-pattern-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/sleep/pattern",
+        views.SleepPatternChildReport,
+        "report-sleep-pattern-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/sleep/totals",
+        views.SleepTotalsChildReport,
+        "report-sleep-totals-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/temperature/temperature",
+        views.TemperatureChangeChildReport,
+        "report-temperature-change-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/tummy-time/duration",
+        views.TummyTimeDurationChildReport,
+        "report-tummy-time-duration-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/weight/weight",
+        views.WeightChangeChildReport,
+        "report-weight-change-child",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/weight/boy",
+        views.WeightChangeChildBoyReport,
+        "report-weight-change-child-boy",
+    ),
+    *report_paths(
+        "children/<str:slug>/reports/weight/girl",
+        views.WeightChangeChildGirlReport,
+        "report-weight-change-child-girl",
     ),
 ]
@@ -1,6 +1,18 @@
 # -*- coding: utf-8 -*-
+import datetime
+import math
 import time
 
+import plotly.io as pio
+
+# Points a series trace is downsampled to when it holds more: about the width
+# of a graph in pixels, so zoomed-out graphs lose no visible detail.
+MAX_POINTS = 1000
+
+# Days a pattern graph shows at full detail. Wider ranges snap the blocks of
+# each day to a coarser time-of-day resolution.
+PATTERN_DETAIL_DAYS = 62
+
 
 def autorangeoptions(dates, padding=10000000):
     """
@@ -18,6 +30,37 @@ def autorangeoptions(dates, padding=10000000):
     )
 
 
+def coarsen_blocks(blocks, resolution, state):
+    """
+    Snap the time-of-day blocks of one day of a pattern graph to a resolution.
+    Blocks shorter than the resolution disappear in to their neighbours and
+    adjacent blocks in the same state are merged, so wide ranges stack far
+    fewer bars.
+    :param blocks: list of block dicts with "time" (minutes) and "label" keys.
+    :param resolution: minutes to snap the block boundaries to.
+    :param state: a function of a block's index and dict returning its state.
+    :returns: a list of (state, block dict) tuples.
+    """
+    merged = []
+    elapsed = 0
+    start = 0
+    for index, block in enumerate(blocks):
+        elapsed += block["time"]
+        end = round(elapsed / resolution) * resolution
+        if end == start:
+            continue
+        block_state = state(index, block)
+        if merged and merged[-1][0] == block_state:
+            previous = merged[-1][1]
+            previous["time"] += end - start
+            labels = [label for label in (previous["label"], block["label"]) if label]
+            previous["label"] = "<br>".join(labels) or None
+        else:
+            merged.append((block_state, dict(block, time=end - start)))
+        start = end
+    return merged
+
+
 def default_graph_layout_options():
     """
     Default layout options for all graphs.
@@ -49,6 +92,84 @@ def default_graph_layout_options():
     }
 
 
+def downsample(x, y, *columns, threshold=MAX_POINTS):
+    """
+    Downsample a series with lttb().
+    :param x: list of the series' x values.
+    :param y: list of the series' y values.
+    :param columns: lists of other per point values (e.g. hover texts).
+    :param threshold: maximum number of points to keep.
+    :returns: a tuple of the downsampled x, y and columns lists.
+    """
+    keep = lttb(x, y, threshold)
+    return tuple([values[i] for i in keep] for values in (x, y) + columns)
+
+
+def figure_spec(fig):
+    """
+    Serialize a Plotly figure to the JSON spec the report pages plot.
+    :param fig: a plotly.graph_objs.Figure instance.
+    :returns: a compact JSON string of the figure's data and layout.
+    """
+    return pio.to_json(fig, validate=False, pretty=False)
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """
+    Choose the points of a series to keep with Largest-Triangle-Three-Buckets,
+    which preserves the visual shape of the series (peaks and troughs).
+    See: https://skemman.is/handle/1946/15343
+    :param x: list of the series' x values (numbers, dates or datetimes),
+              sorted in either direction.
+    :param y: list of the series' y values.
+    :param threshold: maximum number of points to keep.
+    :returns: a list of the indexes of the points to keep, in order.
+    """
+    count = len(x)
+    if count <= threshold or threshold < 3:
+        return list(range(count))
+
+    xs = [_number(value) for value in x]
+    ys = [float(value) for value in y]
+    size = (count - 2) / (threshold - 2)
+    keep = [0]
+    for bucket in range(threshold - 2):
+        # The average of the next bucket is the third point of the triangles.
+        start = int((bucket + 1) * size) + 1
+        end = min(int((bucket + 2) * size) + 1, count)
+        next_x = sum(xs[start:end]) / (end - start)
+        next_y = sum(ys[start:end]) / (end - start)
+
+        # Keep the point of this bucket making the largest triangle with the
+        # last kept point and the next bucket's average.
+        last = keep[-1]
+        best = None
+        best_area = -1
+        for i in range(int(bucket * size) + 1, start):
+            area = abs(
+                (xs[last] - next_x) * (ys[i] - ys[last])
+                - (xs[last] - xs[i]) * (next_y - ys[last])
+            )
+            if area > best_area:
+                best = i
+                best_area = area
+        keep.append(best)
+    keep.append(count - 1)
+    return keep
+
+
+def pattern_resolution(days):
+    """
+    Time-of-day resolution of a pattern graph showing a number of days.
+    :param days: the number of days in the graph.
+    :returns: minutes to snap blocks to with coarsen_blocks(), or 0 to show
+              the blocks at full detail.
+    """
+    if days <= PATTERN_DETAIL_DAYS:
+        return 0
+    return min(60, 5 * math.ceil(days / PATTERN_DETAIL_DAYS))
+
+
 def rangeselector_date():
     """
     Graph date range selectors settings for 1w, 2w, 1m, 3m, and all.
@@ -86,12 +207,14 @@ def rangeselector_time():
     }
 
 
-def split_graph_output(output):
+def _number(value):
     """
-    Split out of a Plotly graph in to html and javascript.
-    :param output: a string of html and javascript comprising the graph.
-    :returns: a tuple of the graph's html and javascript.
+    Convert a series x value to a number for lttb().
+    :param value: a number, date or datetime.
+    :returns: a float.
     """
-    html, js = output.split("<script")
-    js = "<script" + js
-    return html, js
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return float(value.toordinal())
+    return float(value)
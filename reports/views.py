@@ -1,29 +1,159 @@
 # -*- coding: utf-8 -*-
+import datetime
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.translation import get_language
 from django.views.generic.detail import DetailView
 
 from babybuddy.mixins import PermissionRequiredMixin
-from core import models
+from core import models, percentiles
 
 from . import graphs
 
+RANGE_PADDING = datetime.timedelta(days=1)
 
-class BMIChangeChildReport(PermissionRequiredMixin, DetailView):
+
+class ChildReport(PermissionRequiredMixin, DetailView):
     """
-    Graph of BMI change over time.
+    Base view of a graph of a child's data. The page is rendered without the
+    graph, which is fetched from the report's JSON endpoint (the same view with
+    ``format="json"``). Figure specs are cached per child data generation, so
+    repeat views cost a cache hit until an entry of the child changes.
+
+    Reports with a ``range_field`` also serve the entries of a date range
+    (``?start=&end=``), which the page fetches as the graph is zoomed in to
+    show the detail that is downsampled away over the whole history.
     """
 
     model = models.Child
     permission_required = ("core.view_child",)
-    template_name = "reports/bmi_change.html"
+    format = "html"
+    graph = None
+    range_field = None
+    cache_timeout = 60 * 60 * 24
+
+    def get(self, request, *args, **kwargs):
+        if self.format != "json":
+            return super(ChildReport, self).get(request, *args, **kwargs)
+        self.object = self.get_object()
+        date_range = self.get_date_range()
+        if date_range:
+            entries = self.get_entries(self.object).filter(
+                **{self.range_field + "__range": date_range}
+            )
+            spec = self.build_figure_spec(self.object, entries)
+        else:
+            spec = self.get_figure_spec(self.object)
+        return HttpResponse(spec, content_type="application/json")
+
+    def build_figure_spec(self, child, entries):
+        """
+        Build the figure spec of the graph if there is enough data.
+        :param child: the Child instance of the report.
+        :param entries: a QuerySet from get_entries().
+        :returns: a JSON string of the figure spec, or "null" without data.
+        """
+        if not self.has_data(entries):
+            return "null"
+        return self.get_figure(child, entries)
 
     def get_context_data(self, **kwargs):
-        context = super(BMIChangeChildReport, self).get_context_data(**kwargs)
+        context = super(ChildReport, self).get_context_data(**kwargs)
         child = context["object"]
-        objects = models.BMI.objects.filter(child=child)
-        if objects:
-            context["html"], context["js"] = graphs.bmi_change(objects)
+        if self.has_data(self.get_entries(child)):
+            context["data_url"] = reverse(
+                self.request.resolver_match.view_name + "-data",
+                kwargs={"slug": child.slug},
+            )
+            context["ranged"] = self.range_field is not None
         return context
 
+    def get_date_range(self):
+        """
+        Parse the date range of a ranged request. The range is padded by a day
+        on each side so entries crossing its edges (and the intervals ending
+        in it) are drawn.
+        :returns: a (start, end) tuple of aware datetimes, or None.
+        """
+        if not self.range_field:
+            return None
+        date_range = []
+        for param in ("start", "end"):
+            value = self.request.GET.get(param, "")
+            try:
+                moment = parse_datetime(value) or parse_date(value)
+            except ValueError:
+                return None
+            if moment is None:
+                return None
+            if not isinstance(moment, datetime.datetime):
+                moment = datetime.datetime.combine(moment, datetime.time())
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            date_range.append(moment)
+        return date_range[0] - RANGE_PADDING, date_range[1] + RANGE_PADDING
+
+    def get_entries(self, child):
+        """
+        Get the entries the graph is built from.
+        :param child: the Child instance of the report.
+        :returns: a QuerySet of the child's entries.
+        """
+        raise NotImplementedError
+
+    def has_data(self, entries):
+        """
+        Check if there are enough entries to build the graph.
+        :param entries: a QuerySet from get_entries().
+        :returns: True if the graph can be built.
+        """
+        return entries.exists()
+
+    def get_figure(self, child, entries):
+        """
+        Build the graph's figure spec.
+        :param child: the Child instance of the report.
+        :param entries: a QuerySet from get_entries().
+        :returns: a JSON string of the figure spec.
+        """
+        return self.graph(entries)
+
+    def get_figure_spec(self, child):
+        """
+        Get the cached figure spec of the graph, building it on a miss. The key
+        includes the language and time zone the spec was rendered in.
+        :param child: the Child instance of the report.
+        :returns: a JSON string of the figure spec, or "null" without data.
+        """
+        key = "reports.{}.{}.{}.{}.{}".format(
+            self.request.resolver_match.view_name,
+            child.pk,
+            child.generation(),
+            get_language(),
+            timezone.get_current_timezone_name(),
+        )
+        spec = cache.get(key)
+        if spec is None:
+            spec = self.build_figure_spec(child, self.get_entries(child))
+            cache.set(key, spec, self.cache_timeout)
+        return spec
+
+
+class BMIChangeChildReport(ChildReport):
+    """
+    Graph of BMI change over time.
+    """
+
+    template_name = "reports/bmi_change.html"
+    graph = staticmethod(graphs.bmi_change)
+
+    def get_entries(self, child):
+        return models.BMI.objects.filter(child=child)
+
 
 class ChildReportList(PermissionRequiredMixin, DetailView):
     """
@@ -35,376 +165,247 @@ class ChildReportList(PermissionRequiredMixin, DetailView):
     template_name = "reports/report_list.html"
 
 
-class DiaperChangeAmounts(PermissionRequiredMixin, DetailView):
+class DiaperChangeAmounts(ChildReport):
     """
     Graph of diaper "amounts" - measurements of urine output.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/diaperchange_amounts.html"
+    graph = staticmethod(graphs.diaperchange_amounts)
 
-    def get_context_data(self, **kwargs):
-        context = super(DiaperChangeAmounts, self).get_context_data(**kwargs)
-        child = context["object"]
-        changes = models.DiaperChange.objects.filter(child=child, amount__gt=0)
-        if changes and changes.count() > 0:
-            context["html"], context["js"] = graphs.diaperchange_amounts(changes)
-        return context
+    def get_entries(self, child):
+        return models.DiaperChange.objects.filter(child=child, amount__gt=0)
 
 
-class DiaperChangeLifetimesChildReport(PermissionRequiredMixin, DetailView):
+class DiaperChangeLifetimesChildReport(ChildReport):
     """
     Graph of diaper "lifetimes" - time between diaper changes.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/diaperchange_lifetimes.html"
+    graph = staticmethod(graphs.diaperchange_lifetimes)
 
-    def get_context_data(self, **kwargs):
-        context = super(DiaperChangeLifetimesChildReport, self).get_context_data(
-            **kwargs
-        )
-        child = context["object"]
-        changes = models.DiaperChange.objects.filter(child=child)
-        if changes and changes.count() > 1:
-            context["html"], context["js"] = graphs.diaperchange_lifetimes(changes)
-        return context
+    def get_entries(self, child):
+        return models.DiaperChange.objects.filter(child=child)
+
+    def has_data(self, entries):
+        return entries.count() > 1
 
 
-class DiaperChangeTypesChildReport(PermissionRequiredMixin, DetailView):
+class DiaperChangeTypesChildReport(ChildReport):
     """
     Graph of diaper changes by day and type.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/diaperchange_types.html"
+    graph = staticmethod(graphs.diaperchange_types)
 
-    def get_context_data(self, **kwargs):
-        context = super(DiaperChangeTypesChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        changes = models.DiaperChange.objects.filter(child=child)
-        if changes:
-            context["html"], context["js"] = graphs.diaperchange_types(changes)
-        return context
+    def get_entries(self, child):
+        return models.DiaperChange.objects.filter(child=child)
 
 
-class DiaperChangeIntervalsChildReport(PermissionRequiredMixin, DetailView):
+class DiaperChangeIntervalsChildReport(ChildReport):
     """
     Graph of diaper change intervals.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/diaperchange_intervals.html"
+    graph = staticmethod(graphs.diaperchange_intervals)
+    range_field = "time"
 
-    def get_context_data(self, **kwargs):
-        context = super(DiaperChangeIntervalsChildReport, self).get_context_data(
-            **kwargs
-        )
-        child = context["object"]
-        changes = models.DiaperChange.objects.filter(child=child)
-        if changes:
-            context["html"], context["js"] = graphs.diaperchange_intervals(changes)
-        return context
+    def get_entries(self, child):
+        return models.DiaperChange.objects.filter(child=child)
 
 
-class FeedingAmountsChildReport(PermissionRequiredMixin, DetailView):
+class FeedingAmountsChildReport(ChildReport):
     """
     Graph of daily feeding amounts over time.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/feeding_amounts.html"
+    graph = staticmethod(graphs.feeding_amounts)
 
-    def __init__(self):
-        super(FeedingAmountsChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
+    def get_entries(self, child):
+        return models.Feeding.objects.filter(child=child)
 
-    def get_context_data(self, **kwargs):
-        context = super(FeedingAmountsChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Feeding.objects.filter(child=child)
-        if instances:
-            context["html"], context["js"] = graphs.feeding_amounts(instances)
-        return context
 
-
-class FeedingDurationChildReport(PermissionRequiredMixin, DetailView):
+class FeedingDurationChildReport(ChildReport):
     """
     Graph of feeding durations over time.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/feeding_duration.html"
+    graph = staticmethod(graphs.feeding_duration)
 
-    def __init__(self):
-        super(FeedingDurationChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
-
-    def get_context_data(self, **kwargs):
-        context = super(FeedingDurationChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Feeding.objects.filter(child=child)
-        if instances:
-            context["html"], context["js"] = graphs.feeding_duration(instances)
-        return context
+    def get_entries(self, child):
+        return models.Feeding.objects.filter(child=child)
 
 
-class FeedingIntervalsChildReport(PermissionRequiredMixin, DetailView):
+class FeedingIntervalsChildReport(ChildReport):
     """
     Graph of diaper change intervals.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/feeding_intervals.html"
+    graph = staticmethod(graphs.feeding_intervals)
+    range_field = "start"
 
-    def get_context_data(self, **kwargs):
-        context = super(FeedingIntervalsChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Feeding.objects.filter(child=child)
-        if instances:
-            context["html"], context["js"] = graphs.feeding_intervals(instances)
-        return context
+    def get_entries(self, child):
+        return models.Feeding.objects.filter(child=child)
 
 
-class FeedingPatternChildReport(PermissionRequiredMixin, DetailView):
+class FeedingPatternChildReport(ChildReport):
     """
     Graph of feeding pattern.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/feeding_pattern.html"
+    graph = staticmethod(graphs.feeding_pattern)
+    range_field = "start"
 
-    def __init__(self):
-        super(FeedingPatternChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
-
-    def get_context_data(self, **kwargs):
-        context = super(FeedingPatternChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Feeding.objects.filter(child=child).order_by("start")
-        if instances:
-            context["html"], context["js"] = graphs.feeding_pattern(instances)
-        return context
+    def get_entries(self, child):
+        return models.Feeding.objects.filter(child=child).order_by("start")
 
 
-class HeadCircumferenceChangeChildReport(PermissionRequiredMixin, DetailView):
+class HeadCircumferenceChangeChildReport(ChildReport):
     """
     Graph of head circumference change over time.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/head_circumference_change.html"
+    graph = staticmethod(graphs.head_circumference_change)
 
-    def get_context_data(self, **kwargs):
-        context = super(HeadCircumferenceChangeChildReport, self).get_context_data(
-            **kwargs
-        )
-        child = context["object"]
-        objects = models.HeadCircumference.objects.filter(child=child)
-        if objects:
-            (
-                context["html"],
-                context["js"],
-            ) = graphs.head_circumference_change(objects)
-        return context
+    def get_entries(self, child):
+        return models.HeadCircumference.objects.filter(child=child)
 
 
-class HeightChangeChildReport(PermissionRequiredMixin, DetailView):
+class HeightChangeChildReport(ChildReport):
     """
     Graph of height change over time.
     """
 
-    def __init__(
-        self, sex=None, target_url="reports:report-height-change-child"
-    ) -> None:
-        self.model = models.Child
-        self.permission_required = ("core.view_child",)
-        self.template_name = "reports/height_change.html"
-        self.sex = sex
-        self.target_url = target_url
+    template_name = "reports/height_change.html"
+    sex = None
+    target_url = "reports:report-height-change-child"
 
     def get_context_data(self, **kwargs):
         context = super(HeightChangeChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        birthday = child.birth_date
-        actual_heights = models.Height.objects.filter(child=child)
-        percentile_heights = models.HeightPercentile.objects.filter(sex=self.sex)
         context["target_url"] = self.target_url
-        if actual_heights:
-            context["html"], context["js"] = graphs.height_change(
-                actual_heights, percentile_heights, birthday
-            )
         return context
 
+    def get_entries(self, child):
+        return models.Height.objects.filter(child=child)
 
-class HeightChangeChildBoyReport(HeightChangeChildReport):
-    def __init__(self):
-        super(HeightChangeChildBoyReport, self).__init__(
-            sex="boy", target_url="reports:report-height-change-child-boy"
+    def get_figure(self, child, entries):
+        return graphs.height_change(
+            entries,
+            percentiles.get_table("height", self.sex),
+            child.birth_date,
         )
 
 
+class HeightChangeChildBoyReport(HeightChangeChildReport):
+    sex = "boy"
+    target_url = "reports:report-height-change-child-boy"
+
+
 class HeightChangeChildGirlReport(HeightChangeChildReport):
-    def __init__(self):
-        super(HeightChangeChildGirlReport, self).__init__(
-            sex="girl", target_url="reports:report-height-change-child-girl"
-        )
+    sex = "girl"
+    target_url = "reports:report-height-change-child-girl"
 
 
-class PumpingAmounts(PermissionRequiredMixin, DetailView):
+class PumpingAmounts(ChildReport):
     """
     Graph of pumping milk amounts collected.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/pumping_amounts.html"
+    graph = staticmethod(graphs.pumping_amounts)
 
-    def get_context_data(self, **kwargs):
-        context = super(PumpingAmounts, self).get_context_data(**kwargs)
-        child = context["object"]
-        changes = models.Pumping.objects.filter(child=child)
-        if changes and changes.count() > 0:
-            context["html"], context["js"] = graphs.pumping_amounts(changes)
-        return context
+    def get_entries(self, child):
+        return models.Pumping.objects.filter(child=child)
 
 
-class SleepPatternChildReport(PermissionRequiredMixin, DetailView):
+class SleepPatternChildReport(ChildReport):
     """
     Graph of sleep pattern comparing sleep to wake times by day.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/sleep_pattern.html"
+    graph = staticmethod(graphs.sleep_pattern)
+    range_field = "start"
 
-    def __init__(self):
-        super(SleepPatternChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
+    def get_entries(self, child):
+        return models.Sleep.objects.filter(child=child).order_by("start")
 
-    def get_context_data(self, **kwargs):
-        context = super(SleepPatternChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Sleep.objects.filter(child=child).order_by("start")
-        if instances:
-            context["html"], context["js"] = graphs.sleep_pattern(instances)
-        return context
 
-
-class SleepTotalsChildReport(PermissionRequiredMixin, DetailView):
+class SleepTotalsChildReport(ChildReport):
     """
     Graph of total sleep by day.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/sleep_totals.html"
+    graph = staticmethod(graphs.sleep_totals)
 
-    def __init__(self):
-        super(SleepTotalsChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
-
-    def get_context_data(self, **kwargs):
-        context = super(SleepTotalsChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.Sleep.objects.filter(child=child).order_by("start")
-        if instances:
-            context["html"], context["js"] = graphs.sleep_totals(instances)
-        return context
+    def get_entries(self, child):
+        return models.Sleep.objects.filter(child=child).order_by("start")
 
 
-class TemperatureChangeChildReport(PermissionRequiredMixin, DetailView):
+class TemperatureChangeChildReport(ChildReport):
     """
     Graph of temperature change over time.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/temperature_change.html"
+    graph = staticmethod(graphs.temperature_change)
+    range_field = "time"
 
-    def get_context_data(self, **kwargs):
-        context = super(TemperatureChangeChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        objects = models.Temperature.objects.filter(child=child)
-        if objects:
-            context["html"], context["js"] = graphs.temperature_change(objects)
-        return context
+    def get_entries(self, child):
+        return models.Temperature.objects.filter(child=child)
 
 
-class TummyTimeDurationChildReport(PermissionRequiredMixin, DetailView):
+class TummyTimeDurationChildReport(ChildReport):
     """
     Graph of tummy time durations over time.
     """
 
-    model = models.Child
-    permission_required = ("core.view_child",)
     template_name = "reports/tummytime_duration.html"
+    graph = staticmethod(graphs.tummytime_duration)
 
-    def __init__(self):
-        super(TummyTimeDurationChildReport, self).__init__()
-        self.html = ""
-        self.js = ""
-
-    def get_context_data(self, **kwargs):
-        context = super(TummyTimeDurationChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        instances = models.TummyTime.objects.filter(child=child)
-        if instances:
-            context["html"], context["js"] = graphs.tummytime_duration(instances)
-        return context
+    def get_entries(self, child):
+        return models.TummyTime.objects.filter(child=child)
 
 
-class WeightChangeChildReport(PermissionRequiredMixin, DetailView):
+class WeightChangeChildReport(ChildReport):
     """
     Graph of weight change over time.
     """
 
-    def __init__(
-        self, sex=None, target_url="reports:report-weight-change-child"
-    ) -> None:
-        self.model = models.Child
-        self.permission_required = ("core.view_child",)
-        self.template_name = "reports/weight_change.html"
-        self.sex = sex
-        self.target_url = target_url
+    template_name = "reports/weight_change.html"
+    sex = None
+    target_url = "reports:report-weight-change-child"
 
     def get_context_data(self, **kwargs):
         context = super(WeightChangeChildReport, self).get_context_data(**kwargs)
-        child = context["object"]
-        birthday = child.birth_date
-        actual_weights = models.Weight.objects.filter(child=child)
-        percentile_weights = models.WeightPercentile.objects.filter(sex=self.sex)
         context["target_url"] = self.target_url
-        if actual_weights:
-            context["html"], context["js"] = graphs.weight_change(
-                actual_weights, percentile_weights, birthday
-            )
         return context
 
+    def get_entries(self, child):
+        return models.Weight.objects.filter(child=child)
 
-class WeightChangeChildBoyReport(WeightChangeChildReport):
-    def __init__(self):
-        super(WeightChangeChildBoyReport, self).__init__(
-            sex="boy", target_url="reports:report-weight-change-child-boy"
+    def get_figure(self, child, entries):
+        return graphs.weight_change(
+            entries,
+            percentiles.get_table("weight", self.sex),
+            child.birth_date,
         )
 
 
+class WeightChangeChildBoyReport(WeightChangeChildReport):
+    sex = "boy"
+    target_url = "reports:report-weight-change-child-boy"
+
+
 class WeightChangeChildGirlReport(WeightChangeChildReport):
-    def __init__(self):
-        super(WeightChangeChildGirlReport, self).__init__(
-            sex="girl", target_url="reports:report-weight-change-child-girl"
-        )
+    sex = "girl"
+    target_url = "reports:report-weight-change-child-girl"